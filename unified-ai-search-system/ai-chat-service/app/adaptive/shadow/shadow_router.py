@@ -6,7 +6,7 @@ Runs bandit-selected routes in parallel with production without affecting users
 import asyncio
 import time
 import uuid
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, is_dataclass, replace
 from typing import Any, Dict, Optional, Tuple
 
 import structlog
@@ -193,6 +193,10 @@ class ShadowRouter:
         try:
             shadow_route_func = shadow_route_map[selected_arm]
 
+            # Shadow model calls queue behind interactive traffic
+            if is_dataclass(state) and hasattr(state, "request_type"):
+                state = replace(state, request_type="shadow")
+
             # Execute with timeout
             shadow_task = asyncio.create_task(shadow_route_func(state))
             result_data = await asyncio.wait_for(
@@ -27,8 +27,8 @@ from app.core.timeout_utils import adaptive_timeout, timeout_manager
 from app.graphs.base import GraphState
 from app.graphs.chat_graph import ChatGraph
 from app.models.manager import QualityLevel
+from app.monitoring.generation_metrics import generation_metrics
 # Add optimization modules
-from app.optimization.intelligent_streaming import IntelligentResponseStreamer
 from app.optimization.enhanced_cache import EnhancedCacheManager
 from app.schemas.requests import ChatRequest, ChatStreamRequest
 from app.schemas.responses import (
@@ -47,10 +47,13 @@ settings = get_settings()
 
 
 # Note: Components are accessed from app.state.app_state, not global variables
-model_router = ModelRouter()  # Initialize model router
+model_router = ModelRouter(
+    hedging=settings.hedged_generation_enabled,
+    hedge_percentile=settings.hedge_percentile,
+    max_hedge_rate=settings.hedge_max_rate,
+)
 
 # Initialize optimization modules
-streaming_optimizer = IntelligentResponseStreamer()
 cache_manager = EnhancedCacheManager()
 
 # CORRECTED REQUEST MODELS WITH PROPER WRAPPERS
@@ -328,7 +331,7 @@ async def chat_complete(
 
             model_manager = get_model_manager()
             cache_manager = get_cache_manager()
-            chat_graph_instance = ChatGraph(model_manager, cache_manager)
+            chat_graph_instance = ChatGraph(model_manager, cache_manager, model_router=model_router)
         if chat_graph_instance is None:
             return create_error_response(
                 message="Chat graph is not initialized.",
@@ -728,7 +731,7 @@ async def chat_stream(
         cache_manager = cache_manager  # Fallback to global enhanced cache manager
 
     if chat_graph is None:
-        chat_graph = ChatGraph(model_manager, cache_manager_app)
+        chat_graph = ChatGraph(model_manager, cache_manager_app, model_router=model_router)
 
     async def generate_safe_stream():
         # Get user message first for caching and routing
@@ -837,32 +840,54 @@ async def chat_stream(
                 },
             )
             # Dependencies are already initialized above
-
-            # Use intelligent streaming approach: execute graph then stream optimally
-            chat_result = await safe_graph_execute(
-                chat_graph, graph_state, timeout=30.0
+            model_used = model_config.get("model", "phi3:mini")
+
+            # Run the graph in the background; the response generator forwards
+            # Ollama tokens through the queue while it is still generating
+            token_queue: asyncio.Queue = asyncio.Queue()
+            graph_state.token_queue = token_queue
+            graph_task = asyncio.create_task(
+                safe_graph_execute(chat_graph, graph_state, timeout=30.0)
+            )
+            # Stop generating, and free the GPU, as soon as the client goes away
+            disconnect_watcher = asyncio.create_task(
+                _cancel_on_disconnect(req, graph_task)
             )
-            chat_result = await ensure_awaited(chat_result)
+            streamed_any = False
+            try:
+                async for token in _drain_token_queue(token_queue, graph_task):
+                    streamed_any = True
+                    # A hedged stream may be answered by the fallback model
+                    model_used = graph_state.streaming_model or model_used
+                    yield _create_stream_chunk(query_id, model_used, token)
+                if graph_task.cancelled():
+                    logger.info(f"Client disconnected, generation cancelled: {query_id}")
+                    return
+                chat_result = await ensure_awaited(graph_task.result())
+            except (asyncio.CancelledError, GeneratorExit):
+                # The server tore the response down on disconnect
+                if not graph_task.done() and not disconnect_watcher.done():
+                    generation_metrics.increment("chat_stream_client_disconnects_total")
+                raise
+            finally:
+                disconnect_watcher.cancel()
+                if not graph_task.done():
+                    graph_task.cancel()
 
             if (
                 chat_result
                 and hasattr(chat_result, "final_response")
                 and chat_result.final_response
             ):
+                # Post-processed text of the whole answer
                 response_text = chat_result.final_response
-                model_used = "phi3:mini"  # Default model
 
-                # Get routing confidence and arm performance for intelligent streaming
-                routing_confidence = getattr(chat_result, 'routing_confidence', 0.7)
-                arm_performance = getattr(chat_result, 'arm_performance', 0.8)
-                
-                # Use intelligent streaming optimizer
-                streaming_config = streaming_optimizer.get_streaming_config(
-                    routing_confidence, arm_performance
-                )
-                
+                # Nothing streamed (fallback or non-streaming path): send the answer whole
+                if not streamed_any:
+                    yield _create_stream_chunk(query_id, model_used, response_text)
+
                 # Cache the response for future use with intelligent TTL
-                if should_cache and cache_manager:
+                if should_cache and cache_manager and not chat_result.errors:
                     cache_key = (
                         f"chat:{hashlib.md5(f'{user_message}'.encode()).hexdigest()}"
                     )
@@ -877,42 +902,7 @@ async def chat_stream(
                     except Exception as e:
                         logger.warning(f"Failed to cache response: {e}")
 
-                # Use intelligent streaming: adaptive chunk size and delay
-                chunks = streaming_optimizer.create_adaptive_chunks(
-                    response_text, streaming_config
-                )
-                
-                for i, chunk in enumerate(chunks):
-                    stream_chunk = {
-                        "id": f"chatcmpl-{query_id}",
-                        "object": "chat.completion.chunk",
-                        "created": int(time.time()),
-                        "model": model_used,
-                        "choices": [
-                            {
-                                "index": 0,
-                                "delta": {"content": chunk + " "},
-                                "finish_reason": None,
-                            }
-                        ],
-                    }
-                    yield f"data: {json.dumps(stream_chunk)}\n\n"
-
-                    # Use intelligent delay based on performance
-                    delay = streaming_optimizer.get_adaptive_delay(
-                        i, len(chunks), streaming_config
-                    )
-                    await asyncio.sleep(delay)
-
-                # Send final chunk
-                final_chunk = {
-                    "id": f"chatcmpl-{query_id}",
-                    "object": "chat.completion.chunk",
-                    "created": int(time.time()),
-                    "model": model_used,
-                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
-                }
-                yield f"data: {json.dumps(final_chunk)}\n\n"
+                yield _create_stream_chunk(query_id, model_used, None, finish_reason="stop")
                 yield "data: [DONE]\n\n"
             else:
                 yield _create_error_stream_chunk("No response generated")
@@ -934,6 +924,58 @@ async def chat_stream(
     )
 
 
+async def _cancel_on_disconnect(
+    request: Request, task: asyncio.Task, poll_interval: float = 0.25
+) -> bool:
+    """Cancel task if the client disconnects before it finishes."""
+    while not task.done():
+        if await request.is_disconnected():
+            generation_metrics.increment("chat_stream_client_disconnects_total")
+            task.cancel()
+            return True
+        await asyncio.sleep(poll_interval)
+    return False
+
+
+async def _drain_token_queue(token_queue: asyncio.Queue, producer: asyncio.Task):
+    """Yield tokens from the queue as they arrive until the producer task finishes."""
+    while True:
+        getter = asyncio.ensure_future(token_queue.get())
+        done, _ = await asyncio.wait(
+            {getter, producer}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if getter in done:
+            yield getter.result()
+            continue
+        getter.cancel()
+        # The producer finished; flush anything it queued last
+        while not token_queue.empty():
+            yield token_queue.get_nowait()
+        return
+
+
+def _create_stream_chunk(
+    query_id: str,
+    model: str,
+    content: Optional[str],
+    finish_reason: Optional[str] = None,
+) -> str:
+    chunk = {
+        "id": f"chatcmpl-{query_id}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"content": content} if content is not None else {},
+                "finish_reason": finish_reason,
+            }
+        ],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
 def _create_error_stream_chunk(error_message: str) -> str:
     error_chunk = {
         "id": f"chatcmpl-error-{int(time.time())}",
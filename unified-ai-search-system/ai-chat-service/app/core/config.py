@@ -67,6 +67,23 @@ class Settings(BaseSettings):
     ollama_host: str = Field(default_factory=lambda: get_ollama_host())
     ollama_timeout: int = 60
     ollama_max_retries: int = 3
+    ollama_retry_max_delay: float = 8.0
+    # Consecutive failures before a model's circuit opens, and how long it stays open
+    ollama_circuit_failure_threshold: int = 5
+    ollama_circuit_recovery_seconds: float = 30.0
+    # Generations admitted per model at once; match the server's OLLAMA_NUM_PARALLEL
+    ollama_num_parallel: int = 1
+    # Longest an interactive request waits for a generation slot
+    generation_max_queue_seconds: float = 30.0
+    # Hedge chat streams onto the fast tier when the first token is late
+    hedged_generation_enabled: bool = False
+    hedge_percentile: float = 95.0
+    hedge_max_rate: float = 0.1
+    # Warm models predicted from recent traffic this often (0 disables)
+    model_prefetch_interval_seconds: float = 30.0
+    # Directory of tokenizer.json files named by model family (e.g. llama3.json);
+    # families without one are estimated from character counts
+    tokenizer_dir: Optional[str] = None
 
     # Redis Configuration
     redis_url: str = Field(
@@ -253,6 +270,17 @@ API_COSTS = {
     "zerows_scraping": 0.02,
 }
 
+# Context windows (tokens) the service budgets prompts and replies against;
+# sent to Ollama as num_ctx so its window matches the budget
+MODEL_CONTEXT_WINDOWS = {
+    "phi3:mini": 4096,
+    "deepseek-llm:7b": 4096,
+    "mistral:7b": 8192,
+    "llama3:8b": 8192,
+    "qwen2.5:0.5b": 8192,
+    "tinyllama:latest": 2048,
+}
+
 # Model memory requirements (GB) for A5000 optimization
 MODEL_MEMORY_REQUIREMENTS = {
     "phi3:mini": 2,
@@ -262,6 +290,14 @@ MODEL_MEMORY_REQUIREMENTS = {
     "qwen2.5:0.5b": 0.5,  # Ultra-fast model from router
 }
 
+# How long Ollama keeps each tier's models resident after a request (-1 = pinned)
+KEEP_ALIVE_BY_TIER = {
+    "T0": -1,
+    "T1": "30m",
+    "T2": "10m",
+    "T3": "2m",
+}
+
 # A5000 memory configuration
 A5000_CONFIG = {
     "total_vram_gb": 24,
@@ -1,18 +1,29 @@
 """
 Memory-Aware Model Management for A5000
 Handles intelligent model loading, unloading, and hot-swapping based on VRAM constraints.
+Residency is read from Ollama's /api/ps and controlled with keep_alive.
 """
 
 import asyncio
+import collections
 import logging
 import time
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
-from app.core.config import A5000_CONFIG, MODEL_MEMORY_REQUIREMENTS, PRIORITY_TIERS
+from app.core.config import (
+    A5000_CONFIG,
+    KEEP_ALIVE_BY_TIER,
+    MODEL_MEMORY_REQUIREMENTS,
+    PRIORITY_TIERS,
+)
+from app.models.token_budget import TokenBudgeter
+from app.monitoring.generation_metrics import generation_metrics
 
 logger = logging.getLogger(__name__)
 
+BYTES_PER_GB = 1024**3
+
 
 @dataclass
 class ModelMemoryInfo:
@@ -28,17 +39,45 @@ class ModelMemoryInfo:
 
 
 class A5000MemoryManager:
-    """Intelligent memory management for A5000 with 24GB VRAM"""
-
-    def __init__(self):
+    """
+    Intelligent memory management for A5000 with 24GB VRAM
+
+    With an Ollama client, what is loaded (and how much VRAM it really uses)
+    comes from /api/ps, loads are warm-up requests carrying the tier's
+    keep_alive and the num_ctx generations will use, and evictions are keep_alive=0 requests. Models that recent
+    traffic predicts will be needed are prefetched while there is room.
+    Without a client only the bookkeeping runs.
+    """
+
+    def __init__(
+        self,
+        ollama_client: Any = None,
+        residency_ttl: float = 5.0,
+        traffic_window: float = 600.0,
+        prefetch_limit: int = 2,
+        token_budget: Optional[TokenBudgeter] = None,
+    ):
         self.config = A5000_CONFIG
         self.memory_requirements = MODEL_MEMORY_REQUIREMENTS
         self.priority_tiers = PRIORITY_TIERS
+        self.keep_alive_by_tier = KEEP_ALIVE_BY_TIER
+        self.ollama_client = ollama_client
+        # Loads use the same context window as generations, so Ollama does
+        # not reload the model to resize its KV cache on the first request
+        self.token_budget = token_budget or TokenBudgeter()
 
         # Memory tracking
         self.loaded_models: Dict[str, ModelMemoryInfo] = {}
         self.current_usage_gb = 0.0
         self.loading_locks: Dict[str, asyncio.Lock] = {}
+        self.residency_ttl = residency_ttl
+        self._residency_checked = 0.0
+
+        # Recent requests (timestamp, model) used to predict what to prefetch
+        self.traffic_window = traffic_window
+        self.prefetch_limit = prefetch_limit
+        self._recent_requests: collections.deque = collections.deque(maxlen=1000)
+        self._prefetch_task: Optional[asyncio.Task] = None
 
         # Statistics
         self.stats = {
@@ -46,6 +85,10 @@ class A5000MemoryManager:
             "total_unloads": 0,
             "cache_hits": 0,
             "memory_pressure_events": 0,
+            "cold_loads": 0,
+            "cold_load_seconds": 0.0,
+            "prefetches": 0,
+            "expired": 0,
         }
 
         logger.info(
@@ -59,8 +102,16 @@ class A5000MemoryManager:
                 return tier
         return "T3"  # Default to lowest priority
 
+    def keep_alive_for(self, model_name: str) -> Any:
+        """keep_alive to send with requests for a model, by priority tier"""
+        return self.keep_alive_by_tier.get(self.get_model_priority_tier(model_name), "5m")
+
     def get_memory_requirement(self, model_name: str) -> float:
         """Get memory requirement for a model"""
+        # Last measured size beats the estimate
+        if model_name in self.loaded_models and self.loaded_models[model_name].memory_gb:
+            return self.loaded_models[model_name].memory_gb
+
         # Check exact match first
         if model_name in self.memory_requirements:
             return self.memory_requirements[model_name]
@@ -135,11 +186,126 @@ class A5000MemoryManager:
 
         return False
 
+    async def refresh_residency(self, force: bool = False) -> None:
+        """
+        Sync loaded_models with what Ollama actually holds (/api/ps).
+
+        Models Ollama expired on its own are marked unloaded; models loaded
+        behind our back are adopted with their measured VRAM size.
+        """
+        if self.ollama_client is None:
+            return
+        now = time.time()
+        if not force and now - self._residency_checked < self.residency_ttl:
+            return
+        try:
+            running = await self.ollama_client.list_running_models()
+        except Exception as e:
+            logger.warning(f"Could not read Ollama residency: {e}")
+            return
+        self._residency_checked = now
+
+        resident = {}
+        for entry in running:
+            name = entry.get("name") or entry.get("model")
+            if name:
+                size = entry.get("size_vram") or entry.get("size") or 0
+                resident[name] = size / BYTES_PER_GB
+
+        for name, info in self.loaded_models.items():
+            if info.status == "loaded" and name not in resident:
+                info.status = "unloaded"
+                self.stats["expired"] += 1
+                logger.info(f"Model {name} is no longer resident in Ollama")
+
+        for name, memory_gb in resident.items():
+            info = self.loaded_models.get(name)
+            if info is None:
+                info = self.loaded_models[name] = ModelMemoryInfo(
+                    name=name,
+                    memory_gb=memory_gb,
+                    status="loaded",
+                    last_used=now,
+                    load_time=0.0,
+                    priority_tier=self.get_model_priority_tier(name),
+                )
+            elif info.status != "loading":
+                info.status = "loaded"
+            if memory_gb:
+                info.memory_gb = memory_gb
+
+        self.current_usage_gb = sum(
+            info.memory_gb for info in self.loaded_models.values() if info.status == "loaded"
+        )
+        generation_metrics.set_gauge("vram_resident_gb", round(self.current_usage_gb, 2))
+
+    def record_request(self, model_name: str) -> None:
+        """Note a generation request, for traffic-based prefetching"""
+        self._recent_requests.append((time.time(), model_name))
+
+    def predict_models(self) -> List[str]:
+        """Models requested within the traffic window, most requested first"""
+        cutoff = time.time() - self.traffic_window
+        counts = collections.Counter(
+            model for timestamp, model in self._recent_requests if timestamp >= cutoff
+        )
+        return [model for model, _ in counts.most_common()]
+
+    async def prefetch(self) -> List[str]:
+        """
+        Warm the most requested models that are not resident, but only into
+        free VRAM: prefetching never evicts anything.
+        """
+        await self.refresh_residency(force=True)
+        prefetched = []
+        for model_name in self.predict_models()[: self.prefetch_limit]:
+            info = self.loaded_models.get(model_name)
+            if info is not None and info.status in ("loaded", "loading"):
+                continue
+            free = self.config["available_vram_gb"] - self.current_usage_gb
+            if self.get_memory_requirement(model_name) > free:
+                continue
+            if await self.ensure_model_loaded(model_name):
+                prefetched.append(model_name)
+                self.stats["prefetches"] += 1
+        if prefetched:
+            logger.info(f"Prefetched models from recent traffic: {prefetched}")
+        return prefetched
+
+    def start_prefetch(self, interval: float = 30.0) -> None:
+        """Run prefetch() every ``interval`` seconds in the background"""
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = asyncio.create_task(self._prefetch_loop(interval))
+
+    async def stop_prefetch(self) -> None:
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            try:
+                await self._prefetch_task
+            except asyncio.CancelledError:
+                pass
+            self._prefetch_task = None
+
+    async def _prefetch_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.prefetch()
+            except Exception as e:
+                logger.warning(f"Model prefetch failed: {e}")
+
     async def ensure_model_loaded(
-        self, model_name: str, required_models: Optional[List[str]] = None
+        self,
+        model_name: str,
+        required_models: Optional[List[str]] = None,
+        deadline: Optional[float] = None,
     ) -> bool:
-        """Ensure a model is loaded, handling memory management"""
+        """
+        Ensure a model is loaded, handling memory management. A cold load
+        gives up at the monotonic ``deadline``.
+        """
         required_models = required_models or []
+        await self.refresh_residency()
 
         # Check if already loaded
         if (
@@ -165,14 +331,14 @@ class A5000MemoryManager:
                 self.loaded_models[model_name].last_used = time.time()
                 return True
 
-            # Check if we can fit the model
-            if not self.can_fit_model(model_name, required_models):
-                await self._free_memory_for_model(model_name, required_models)
+            # Evict lower-priority models if it does not fit in free VRAM now
+            # (can_fit_model() also counts room that eviction could make)
+            await self._free_memory_for_model(model_name, required_models)
 
             # Load the model
-            return await self._load_model(model_name)
+            return await self._load_model(model_name, deadline)
 
-    async def _load_model(self, model_name: str) -> bool:
+    async def _load_model(self, model_name: str, deadline: Optional[float] = None) -> bool:
         """Actually load a model"""
         start_time = time.time()
         required_memory = self.get_memory_requirement(model_name)
@@ -196,12 +362,14 @@ class A5000MemoryManager:
                 f"Loading model {model_name} ({required_memory}GB, {priority_tier})"
             )
 
-            # Here you would call your actual model loading logic
-            # For now, simulate the loading process
-            await asyncio.sleep(0.1)  # Simulate loading time
-
-            # Update memory tracking
-            self.current_usage_gb += required_memory
+            if self.ollama_client is not None:
+                # Warm-up request: loads the weights and sets how long they stay
+                await self.ollama_client.load_model(
+                    model_name,
+                    keep_alive=self.keep_alive_for(model_name),
+                    deadline=deadline,
+                    options={"num_ctx": self.token_budget.context_window(model_name)},
+                )
             load_time = time.time() - start_time
 
             # Update model info
@@ -209,7 +377,17 @@ class A5000MemoryManager:
             self.loaded_models[model_name].load_time = load_time
             self.loaded_models[model_name].last_used = time.time()
 
+            # Update memory tracking, with the measured size when Ollama is there
+            if self.ollama_client is not None:
+                await self.refresh_residency(force=True)
+            else:
+                self.current_usage_gb += required_memory
+
             self.stats["total_loads"] += 1
+            self.stats["cold_loads"] += 1
+            self.stats["cold_load_seconds"] += load_time
+            generation_metrics.increment("model_cold_loads_total")
+            generation_metrics.increment("model_cold_load_seconds_total", load_time)
 
             logger.info(
                 f"Model {model_name} loaded successfully in {load_time:.2f}s "
@@ -279,8 +457,8 @@ class A5000MemoryManager:
         logger.info(f"Unloading model {model_name} to free {info.memory_gb}GB")
 
         try:
-            # Here you would call your actual model unloading logic
-            await asyncio.sleep(0.05)  # Simulate unloading time
+            if self.ollama_client is not None:
+                await self.ollama_client.unload_model(model_name)
 
             # Update memory tracking
             self.current_usage_gb -= info.memory_gb
@@ -333,6 +511,8 @@ class A5000MemoryManager:
             ),
             "loaded_models_count": loaded_count,
             "total_models_tracked": len(self.loaded_models),
+            "residency_source": "ollama" if self.ollama_client is not None else "estimated",
+            "predicted_models": self.predict_models()[: self.prefetch_limit],
             "stats": self.stats.copy(),
             "loaded_models": {
                 name: {
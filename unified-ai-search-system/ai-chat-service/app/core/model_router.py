@@ -1,10 +1,17 @@
 """
 Intelligent Model Selection for Performance Optimization
-Routes queries to appropriate models based on complexity analysis.
+Routes queries to appropriate models based on complexity analysis, and
+optionally hedges slow generations onto a faster model tier.
 """
 
+import asyncio
+import collections
 import logging
-from typing import Any, Dict
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from app.models.ollama_client import StreamingChunk
+from app.monitoring.generation_metrics import generation_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +19,30 @@ logger = logging.getLogger(__name__)
 class ModelRouter:
     """Route queries to appropriate models based on complexity"""
 
-    def __init__(self):
+    # First-token latencies needed before the percentile replaces the default delay
+    MIN_LATENCY_SAMPLES = 20
+
+    def __init__(
+        self,
+        hedging: bool = False,
+        hedge_percentile: float = 95.0,
+        max_hedge_rate: float = 0.1,
+        default_hedge_delay: float = 2.0,
+        min_hedge_delay: float = 0.25,
+        max_hedge_delay: float = 10.0,
+    ):
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.max_hedge_rate = max_hedge_rate
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self._first_token_latencies: Dict[str, collections.deque] = collections.defaultdict(
+            lambda: collections.deque(maxlen=500)
+        )
+        # Whether each recent hedge-eligible stream was hedged; bounds the extra load
+        self._recent_hedges: collections.deque = collections.deque(maxlen=200)
+        self.hedge_stats = {"streams": 0, "hedged": 0, "fallback_wins": 0, "capped": 0}
         self.model_configs = {
             "ultra_fast": {
                 "model": "qwen2.5:0.5b",
@@ -127,3 +157,167 @@ class ModelRouter:
             return False
 
         return True
+
+    def fallback_model_for(self, model_name: str) -> Optional[str]:
+        """The faster tier a slow generation on ``model_name`` is hedged onto."""
+        fallback = self.model_configs["ultra_fast"]["model"]
+        return fallback if fallback != model_name else None
+
+    def record_first_token(self, model_name: str, seconds: float) -> None:
+        self._first_token_latencies[model_name].append(seconds)
+
+    def hedge_delay(self, model_name: str) -> float:
+        """
+        How long to wait for the first token before hedging: the configured
+        percentile of recent first-token latencies, so only the slowest
+        streams are hedged.
+        """
+        samples = sorted(self._first_token_latencies[model_name])
+        if len(samples) < self.MIN_LATENCY_SAMPLES:
+            delay = self.default_hedge_delay
+        else:
+            index = int(round(self.hedge_percentile / 100 * (len(samples) - 1)))
+            delay = samples[index]
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, delay))
+
+    def hedge_rate(self) -> float:
+        if not self._recent_hedges:
+            return 0.0
+        return sum(self._recent_hedges) / len(self._recent_hedges)
+
+    async def generate_stream_hedged(
+        self, model_manager, model_name: str, **kwargs
+    ) -> AsyncGenerator[StreamingChunk, None]:
+        """
+        Stream from ``model_name``, hedging onto the faster tier when needed.
+
+        If the primary stream has not produced its first token within
+        hedge_delay(), a second stream is started on the fallback model
+        (unless the recent hedge rate is already at max_hedge_rate). Whichever
+        produces a token first is streamed; the other is cancelled. The
+        winning model is reported on each chunk's ``model``.
+        """
+        fallback = self.fallback_model_for(model_name)
+        if not self.hedging or fallback is None:
+            start = time.monotonic()
+            waiting = True
+            async for chunk in model_manager.generate_stream(model_name=model_name, **kwargs):
+                if waiting and self._answered([chunk]):
+                    waiting = False
+                    self.record_first_token(model_name, time.monotonic() - start)
+                yield chunk
+            return
+
+        self.hedge_stats["streams"] += 1
+        started = {model_name: time.monotonic()}
+        contenders = {model_name: model_manager.generate_stream(model_name=model_name, **kwargs)}
+        heads = {model_name: asyncio.create_task(self._first_chunks(contenders[model_name]))}
+        winner: Optional[str] = None
+        hedged = False
+        try:
+            done, _ = await asyncio.wait(set(heads.values()), timeout=self.hedge_delay(model_name))
+            if not done:
+                if self.hedge_rate() < self.max_hedge_rate:
+                    hedged = True
+                    self.hedge_stats["hedged"] += 1
+                    generation_metrics.increment("generation_hedged_total")
+                    logger.info(
+                        f"Hedging {model_name} onto {fallback} after {time.monotonic() - started[model_name]:.2f}s without a token"
+                    )
+                    started[fallback] = time.monotonic()
+                    contenders[fallback] = model_manager.generate_stream(
+                        model_name=fallback, **self._fit_for(model_manager, fallback, kwargs)
+                    )
+                    heads[fallback] = asyncio.create_task(self._first_chunks(contenders[fallback]))
+                else:
+                    self.hedge_stats["capped"] += 1
+                    generation_metrics.increment("generation_hedges_capped_total")
+            self._recent_hedges.append(hedged)
+            generation_metrics.set_gauge("generation_hedge_rate", round(self.hedge_rate(), 4))
+            winner = await self._first_to_answer(heads)
+            answered_at = time.monotonic()
+        finally:
+            for name, task in heads.items():
+                if name != winner:
+                    task.cancel()
+            for name, stream in contenders.items():
+                if name != winner:
+                    await self._close_stream(heads[name], stream)
+
+        # Only the winner's latency is known; a primary that lost is only known to
+        # be slower, and recording that censored wait would pull hedge_delay down
+        if self._answered(heads[winner].result()):
+            self.record_first_token(winner, answered_at - started[winner])
+        if winner != model_name:
+            self.hedge_stats["fallback_wins"] += 1
+            generation_metrics.increment("generation_hedge_fallback_wins_total")
+
+        for chunk in heads[winner].result():
+            yield chunk.model_copy(update={"model": winner})
+        async for chunk in contenders[winner]:
+            yield chunk.model_copy(update={"model": winner})
+
+    @staticmethod
+    def _fit_for(model_manager, model_name: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Request arguments with the chat history re-fitted to ``model_name``'s
+        context window, since the caller trimmed it for the primary model.
+        """
+        token_budget = getattr(model_manager, "token_budget", None)
+        messages = kwargs.get("messages")
+        if token_budget is None or not messages:
+            return kwargs
+        fitted, dropped = token_budget.fit_messages(
+            messages, model_name, kwargs.get("max_tokens", 1000)
+        )
+        return {**kwargs, "messages": fitted} if dropped else kwargs
+
+    @staticmethod
+    async def _first_chunks(stream) -> List[StreamingChunk]:
+        """Read a stream up to and including its first token, or its end."""
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            if chunk.text or chunk.done:
+                break
+        return chunks
+
+    @staticmethod
+    async def _first_to_answer(heads: Dict[str, asyncio.Task]) -> str:
+        """The first contender to produce a token; failing ones lose unless all fail."""
+        pending = set(heads.values())
+        last_finished = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                last_finished = task
+                if not task.exception() and ModelRouter._answered(task.result()):
+                    return next(name for name, head in heads.items() if head is task)
+        if last_finished.exception():
+            raise last_finished.exception()
+        return next(name for name, head in heads.items() if head is last_finished)
+
+    @staticmethod
+    def _answered(chunks: List[StreamingChunk]) -> bool:
+        """Whether a stream's head ends in a real token rather than an error or the end."""
+        return bool(chunks) and bool(chunks[-1].text) and not chunks[-1].error
+
+    @staticmethod
+    async def _close_stream(head: asyncio.Task, stream) -> None:
+        """Stop a losing stream so its Ollama request is closed."""
+        try:
+            await head
+        except (asyncio.CancelledError, Exception):
+            pass
+        await stream.aclose()
+
+    def get_hedge_stats(self) -> Dict[str, Any]:
+        return {
+            **self.hedge_stats,
+            "enabled": self.hedging,
+            "hedge_rate": round(self.hedge_rate(), 4),
+            "hedge_delays": {
+                name: round(self.hedge_delay(name), 3)
+                for name in self._first_token_latencies
+            },
+        }
@@ -86,6 +86,13 @@ class GraphState:
     # Cache and optimization
     cache_hits: List[str] = field(default_factory=list)
     routing_shortcuts_used: List[str] = field(default_factory=list)
+    # Scheduling class for model calls: interactive, evaluation, cache_warming, shadow
+    request_type: str = "interactive"
+    # Streaming: when set, the response generator puts each generated token
+    # chunk on this asyncio.Queue as it arrives
+    token_queue: Optional[Any] = None
+    # Model producing the streamed tokens, when a router switched models
+    streaming_model: Optional[str] = None
     # Final output
     final_response: str = ""
     response_metadata: Dict[str, Any] = field(default_factory=dict)
@@ -93,6 +100,13 @@ class GraphState:
     errors: List[str] = field(default_factory=list)
     warnings: List[str] = field(default_factory=list)
 
+    def generation_priority(self) -> Dict[str, Any]:
+        """Scheduler arguments for this request's model calls"""
+        return {
+            "request_type": self.request_type,
+            "user_tier": self.user_preferences.get("tier", "free"),
+        }
+
     def add_execution_step(self, step_name: str, result: NodeResult):
         """Add execution step to the path"""
         self.execution_path.append(step_name)
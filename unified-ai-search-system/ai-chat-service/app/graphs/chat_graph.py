@@ -9,6 +9,7 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from app.core.logging import get_logger
+from app.core.model_router import ModelRouter
 from app.graphs.base import (
     BaseGraph,
     BaseGraphNode,
@@ -18,6 +19,8 @@ from app.graphs.base import (
     NodeType,
 )
 from app.models.manager import ModelManager, QualityLevel, TaskType
+from app.models.ollama_client import ModelResult
+from app.monitoring.generation_metrics import generation_metrics
 
 logger = get_logger("graphs.chat")
 
@@ -192,6 +195,7 @@ class IntentClassifierNode(BaseGraphNode):
                                 prompt=classification_prompt,
                                 max_tokens=10,
                                 temperature=0.1,
+                                **state.generation_priority(),
                             ),
                             timeout=timeout,
                         )
@@ -312,9 +316,15 @@ class ResponseGeneratorNode(BaseGraphNode):
     Generates responses using the optimal model based on context and intent.
     """
 
-    def __init__(self, model_manager: ModelManager):
+    BASE_INSTRUCTION = "You are a helpful, knowledgeable, and friendly AI assistant."
+    # History messages sent with each turn: between HISTORY_WINDOW and twice that
+    HISTORY_WINDOW = 10
+
+    def __init__(self, model_manager: ModelManager, model_router: Optional[ModelRouter] = None):
         super().__init__("response_generator", NodeType.PROCESSING)
         self.model_manager = model_manager
+        # Streams go through the router when set, so slow ones can be hedged
+        self.model_router = model_router
 
     def _determine_task_type(self, state):
         """
@@ -346,6 +356,48 @@ class ResponseGeneratorNode(BaseGraphNode):
         # ModelManager should handle unknown task_type/quality gracefully
         return self.model_manager.select_optimal_model(task_type, quality)
 
+    def _build_messages(self, state: GraphState) -> List[Dict[str, str]]:
+        """
+        Build /api/chat messages whose prefix stays identical across a session's turns.
+
+        The system message is the same every turn and earlier turns are sent
+        verbatim, so Ollama only evaluates the newest turn; the per-turn intent
+        and quality guidance travels with the current query at the end.
+        """
+        query = state.processed_query or state.original_query
+        intent = getattr(state, 'query_intent', 'conversation')
+        complexity = getattr(state, 'query_complexity', 0.5)
+        quality = getattr(state, 'quality_requirement', 'balanced')
+        turn_parts = [
+            self._get_turn_instructions(intent, quality),
+            self._build_query_section(query, intent, complexity),
+        ]
+        return [
+            {"role": "system", "content": self.BASE_INSTRUCTION},
+            *self._history_messages(state),
+            {"role": "user", "content": "\n\n".join(part for part in turn_parts if part.strip())},
+        ]
+
+    def _history_messages(self, state: GraphState) -> List[Dict[str, str]]:
+        """
+        Earlier turns as chat messages. The window start only advances in steps
+        of HISTORY_WINDOW messages, so between steps each turn's prompt extends
+        the previous one instead of shifting it.
+        """
+        messages = []
+        for entry in getattr(state, 'conversation_history', None) or []:
+            if 'role' in entry:
+                if entry['role'] in ('user', 'assistant') and entry.get('content'):
+                    messages.append({"role": entry['role'], "content": entry['content']})
+                continue
+            # Turns cached by the CacheUpdateNode
+            if entry.get('user_message'):
+                messages.append({"role": "user", "content": entry['user_message']})
+            if entry.get('assistant_response'):
+                messages.append({"role": "assistant", "content": entry['assistant_response']})
+        start = max(0, (len(messages) - self.HISTORY_WINDOW) // self.HISTORY_WINDOW * self.HISTORY_WINDOW)
+        return messages[start:]
+
     def _build_prompt(self, state: GraphState) -> str:
         """
         Build a comprehensive prompt for response generation based on conversation state.
@@ -366,7 +418,10 @@ class ResponseGeneratorNode(BaseGraphNode):
         return prompt
 
     def _get_system_instructions(self, intent: str, quality: str) -> str:
-        base_instruction = "You are a helpful, knowledgeable, and friendly AI assistant."
+        turn_instructions = self._get_turn_instructions(intent, quality)
+        return " ".join(part for part in [self.BASE_INSTRUCTION, turn_instructions] if part)
+
+    def _get_turn_instructions(self, intent: str, quality: str) -> str:
         intent_instructions = {
             'code': "You specialize in programming and technical problem-solving. Provide clear, working code examples with explanations.",
             'creative': "You excel at creative writing and imaginative tasks. Be expressive, engaging, and original in your responses.",
@@ -380,7 +435,7 @@ class ResponseGeneratorNode(BaseGraphNode):
             'balanced': "Provide a well-balanced response with appropriate detail.",
             'premium': "Provide a comprehensive, detailed response with thorough explanations and examples."
         }
-        instructions = [base_instruction]
+        instructions = []
         if intent in intent_instructions:
             instructions.append(intent_instructions[intent])
         if quality in quality_adjustments:
@@ -388,18 +443,13 @@ class ResponseGeneratorNode(BaseGraphNode):
         return " ".join(instructions)
 
     def _build_conversation_context(self, state: GraphState) -> str:
-        conversation_history = getattr(state, 'conversation_history', [])
-        if not conversation_history:
+        history = self._history_messages(state)
+        if not history:
             return ""
         context_lines = ["Previous conversation:"]
-        recent_history = conversation_history[-10:] if len(conversation_history) > 10 else conversation_history
-        for entry in recent_history:
-            role = entry.get('role', 'unknown')
-            content = entry.get('content', '')
-            if role == 'user':
-                context_lines.append(f"User: {content}")
-            elif role == 'assistant':
-                context_lines.append(f"Assistant: {content}")
+        for message in history:
+            speaker = "User" if message['role'] == 'user' else "Assistant"
+            context_lines.append(f"{speaker}: {message['content']}")
         return "\n".join(context_lines)
 
     def _build_query_section(self, query: str, intent: str, complexity: float) -> str:
@@ -537,6 +587,138 @@ class ResponseGeneratorNode(BaseGraphNode):
             cleaned = cleaned[:max_length].rstrip() + "..."
         return cleaned
 
+    async def _generate_streaming(
+        self,
+        state: GraphState,
+        model_name: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        timeout: float,
+        messages: Optional[List[Dict[str, str]]] = None,
+    ) -> ModelResult:
+        """
+        Forward generated tokens to state.token_queue as they arrive and return
+        the accumulated text, which is post-processed like a non-streamed reply.
+        A timeout keeps whatever was already streamed.
+        """
+        import time
+        import asyncio
+
+        start = time.time()
+        parts: List[str] = []
+        error: Optional[str] = None
+        final_chunk = None
+
+        if not hasattr(self.model_manager, "generate_stream"):
+            # Managers without streaming still answer; the text arrives as one chunk
+            result = await asyncio.wait_for(
+                self.model_manager.generate(
+                    model_name=model_name,
+                    prompt=prompt,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    messages=messages,
+                    **state.generation_priority(),
+                ),
+                timeout=timeout,
+            )
+            if result and result.success and result.text:
+                await state.token_queue.put(result.text)
+            return result
+
+        stream_kwargs = dict(
+            model_name=model_name,
+            prompt=prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=messages,
+            **state.generation_priority(),
+        )
+
+        async def forward_tokens():
+            nonlocal error, final_chunk, model_name
+            if self.model_router is not None:
+                stream = self.model_router.generate_stream_hedged(self.model_manager, **stream_kwargs)
+            else:
+                stream = self.model_manager.generate_stream(**stream_kwargs)
+            async for chunk in stream:
+                if chunk.model:
+                    model_name = chunk.model
+                    state.streaming_model = chunk.model
+                if chunk.done:
+                    final_chunk = chunk
+                if chunk.error:
+                    error = chunk.error
+                if chunk.text:
+                    parts.append(chunk.text)
+                    await state.token_queue.put(chunk.text)
+
+        try:
+            await asyncio.wait_for(forward_tokens(), timeout=timeout)
+        except asyncio.CancelledError:
+            # The client went away; the Ollama stream has been closed by now
+            generation_metrics.increment("generation_cancelled_total")
+            generation_metrics.increment("generation_wasted_chunks_total", len(parts))
+            generation_metrics.increment("generation_wasted_seconds_total", time.time() - start)
+            logger.info(
+                f"[ResponseGeneratorNode] Generation cancelled after {len(parts)} chunks | model={model_name}"
+            )
+            raise
+        except asyncio.TimeoutError:
+            error = f"Streaming generation timed out after {timeout}s"
+            logger.warning(f"[ResponseGeneratorNode] {error} | streamed_chunks={len(parts)}")
+
+        text = "".join(parts)
+        return ModelResult(
+            # A cut-off answer was already shown, but must not be cached as complete
+            success=bool(text.strip()) and error is None,
+            text=text,
+            execution_time=time.time() - start,
+            model_used=model_name,
+            error=error,
+            metadata={
+                "prompt_eval_count": getattr(final_chunk, "prompt_eval_count", None),
+                "prompt_eval_duration": (getattr(final_chunk, "prompt_eval_duration", None) or 0)
+                / 1_000_000_000,
+            },
+        )
+
+    def _fit_to_context(
+        self, state: GraphState, messages: List[Dict[str, str]], model_name: str, max_tokens: int
+    ) -> List[Dict[str, str]]:
+        """Drop the oldest history turns that would crowd the reply out of the model's context window."""
+        token_budget = getattr(self.model_manager, "token_budget", None)
+        if token_budget is None:
+            return messages
+        fitted, dropped = token_budget.fit_messages(messages, model_name, max_tokens)
+        if dropped:
+            logger.info(
+                "[ResponseGeneratorNode] History trimmed to context window",
+                session_id=state.session_id,
+                dropped_messages=dropped,
+                query_id=state.query_id,
+            )
+        return fitted
+
+    def _log_prompt_eval(self, state: GraphState, result: Optional[ModelResult], history_messages: int):
+        """Record how many prompt tokens Ollama had to evaluate this turn, and how long it took."""
+        metadata = (result.metadata or {}) if result else {}
+        prompt_tokens = metadata.get("prompt_eval_count")
+        if prompt_tokens is None:
+            return
+        prompt_eval_seconds = metadata.get("prompt_eval_duration") or 0.0
+        generation_metrics.increment("prompt_eval_tokens_total", prompt_tokens)
+        generation_metrics.increment("prompt_eval_seconds_total", prompt_eval_seconds)
+        logger.info(
+            "[ResponseGeneratorNode] Prompt evaluation",
+            session_id=state.session_id,
+            history_messages=history_messages,
+            prompt_eval_tokens=prompt_tokens,
+            prompt_eval_ms=round(prompt_eval_seconds * 1000, 1),
+            query_id=state.query_id,
+        )
+
     async def execute(self, state: GraphState, **kwargs) -> NodeResult:
         import time
         import asyncio
@@ -548,8 +730,10 @@ class ResponseGeneratorNode(BaseGraphNode):
         )
         try:
             model_name = self._select_model(state)
+            messages = self._build_messages(state)
             prompt = self._build_prompt(state)
             max_tokens = self._calculate_max_tokens(state)
+            messages = self._fit_to_context(state, messages, model_name, max_tokens)
             temperature = self._calculate_temperature(state)
             timeout = 60.0
             logger.debug(
@@ -582,15 +766,23 @@ class ResponseGeneratorNode(BaseGraphNode):
                 model_start = time.time()
                 try:
                     logger.debug(f"[ResponseGeneratorNode] BEFORE ModelManager.generate {time.time()} | correlation_id={correlation_id}")
-                    result = await asyncio.wait_for(
-                        self.model_manager.generate(
-                            model_name=model_name,
-                            prompt=prompt,
-                            max_tokens=max_tokens,
-                            temperature=temperature,
-                        ),
-                        timeout=timeout,
-                    )
+                    if state.token_queue is not None:
+                        result = await self._generate_streaming(
+                            state, model_name, prompt, max_tokens, temperature, timeout, messages
+                        )
+                    else:
+                        result = await asyncio.wait_for(
+                            self.model_manager.generate(
+                                model_name=model_name,
+                                prompt=prompt,
+                                max_tokens=max_tokens,
+                                temperature=temperature,
+                                messages=messages,
+                                **state.generation_priority(),
+                            ),
+                            timeout=timeout,
+                        )
+                    self._log_prompt_eval(state, result, len(messages) - 2)
                     logger.debug(f"[ResponseGeneratorNode] AFTER ModelManager.generate {time.time()} | correlation_id={correlation_id}", result=str(result))
                     elapsed = time.time() - model_start
                     logger.debug(f"[ResponseGeneratorNode] Model call completed in {elapsed:.2f}s | correlation_id={correlation_id}")
@@ -917,10 +1109,16 @@ class ChatGraph(BaseGraph):
     Fixed to properly use LangGraph START/END constants and correct compilation order.
     """
 
-    def __init__(self, model_manager: ModelManager, cache_manager=None):
+    def __init__(
+        self,
+        model_manager: ModelManager,
+        cache_manager=None,
+        model_router: Optional[ModelRouter] = None,
+    ):
         super().__init__(GraphType.CHAT, "chat_graph")
         self.model_manager = model_manager
         self.cache_manager = cache_manager
+        self.model_router = model_router
         self.execution_stats = {
             "total_executions": 0,
             "successful_executions": 0,
@@ -969,7 +1167,7 @@ class ChatGraph(BaseGraph):
             "start": ContextManagerNode(self.cache_manager),  # Entrypoint for LangGraph
             "context_manager": ContextManagerNode(self.cache_manager),
             "intent_classifier": IntentClassifierNode(self.model_manager),
-            "response_generator": ResponseGeneratorNode(self.model_manager),
+            "response_generator": ResponseGeneratorNode(self.model_manager, self.model_router),
             "cache_update": CacheUpdateNode(self.cache_manager),
             "error_handler": ErrorHandlerNode(),
             "end": EndNode(),  # Add end node for LangGraph termination
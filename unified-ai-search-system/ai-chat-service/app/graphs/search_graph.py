@@ -506,6 +506,7 @@ class ResponseSynthesisNode(BaseGraphNode):
                 prompt=synthesis_prompt,
                 max_tokens=800,
                 temperature=0.4,
+                **state.generation_priority(),
             )
 
             if model_result.success:
@@ -727,6 +728,7 @@ Response:"""
                 prompt=response_prompt,
                 max_tokens=300,
                 temperature=0.6,
+                **state.generation_priority(),
             )
 
             if model_result.success:
@@ -36,6 +36,7 @@ from app.graphs.chat_graph import ChatGraph
 from app.graphs.search_graph import SearchGraph, execute_search
 from app.models.manager import ModelManager
 from app.models.ollama_client import ModelStatus
+from app.monitoring.generation_metrics import generation_metrics
 from app.performance.optimization import OptimizedSearchSystem
 from app.schemas.responses import HealthStatus, create_error_response
 
@@ -180,7 +181,11 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         # Chat Graph (depends on model_manager and cache_manager)
 
         def init_chat_graph():
-            return ChatGraph(app_state["model_manager"], app_state["cache_manager"])
+            return ChatGraph(
+                app_state["model_manager"],
+                app_state["cache_manager"],
+                model_router=chat.model_router,
+            )
 
         chat_graph = await monitor.initialize_component("chat_graph", init_chat_graph)
         app_state["chat_graph"] = chat_graph
@@ -656,6 +661,7 @@ async def get_metrics():
                     "error": str(e),
                 }
         metrics["components"] = components
+        metrics["generation"] = generation_metrics.snapshot()
         api_status = actual_app_state.get("api_key_status", {})
         if isinstance(api_status, dict):
             metrics["api_keys"] = {
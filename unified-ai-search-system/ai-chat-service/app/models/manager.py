@@ -5,14 +5,17 @@ Handles model loading, selection, fallbacks, and performance tracking.
 
 import asyncio
 import collections
+import dataclasses
+import hashlib
+import json
 import threading
 import time
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
 
-from app.core.config import MODEL_ASSIGNMENTS, PRIORITY_TIERS
+from app.core.config import MODEL_ASSIGNMENTS, PRIORITY_TIERS, get_settings
 from app.core.logging import get_logger
 from app.core.memory_manager import A5000MemoryManager
 from app.models.ollama_client import (
@@ -20,7 +23,12 @@ from app.models.ollama_client import (
     ModelStatus,
     OllamaClient,
     OllamaException,
+    StreamingChunk,
 )
+from app.models.scheduler import GenerationScheduler, QueueTimeoutError
+from app.models.single_flight import SingleFlight
+from app.models.token_budget import TokenBudgeter
+from app.monitoring.generation_metrics import generation_metrics
 
 logger = get_logger("models.manager")
 
@@ -157,6 +165,19 @@ class ModelManager:
         # Threading for background operations
         self._background_lock = threading.Lock()
 
+        # Identical concurrent generations share one Ollama call
+        self.single_flight = SingleFlight()
+
+        # Per-model concurrency caps and priority queues in front of Ollama
+        settings = get_settings()
+        self.scheduler = GenerationScheduler(
+            concurrency=settings.ollama_num_parallel,
+            max_queue_seconds={"interactive": settings.generation_max_queue_seconds},
+        )
+
+        # Prompt token counts and num_predict sizing per model context window
+        self.token_budget = TokenBudgeter(tokenizer_dir=settings.tokenizer_dir)
+
         logger.info(f"ModelManager initialized with Ollama host: {ollama_host}")
 
     async def initialize(self, force_reload: bool = False) -> bool:
@@ -175,7 +196,15 @@ class ModelManager:
         try:
             # Initialize Ollama client
             if not self.ollama_client:
-                self.ollama_client = OllamaClient(base_url=self.ollama_host)
+                settings = get_settings()
+                self.ollama_client = OllamaClient(
+                    base_url=self.ollama_host,
+                    timeout=settings.ollama_timeout,
+                    max_retries=settings.ollama_max_retries,
+                    max_retry_delay=settings.ollama_retry_max_delay,
+                    circuit_failure_threshold=settings.ollama_circuit_failure_threshold,
+                    circuit_recovery_timeout=settings.ollama_circuit_recovery_seconds,
+                )
                 logger.info(f"📡 Created OllamaClient for {self.ollama_host}")
 
             # Health check with retry
@@ -222,7 +251,13 @@ class ModelManager:
             # Initialize memory manager
             try:
                 if not hasattr(self, "memory_manager") or not self.memory_manager:
-                    self.memory_manager = A5000MemoryManager()
+                    self.memory_manager = A5000MemoryManager(
+                        ollama_client=self.ollama_client, token_budget=self.token_budget
+                    )
+                    await self.memory_manager.refresh_residency(force=True)
+                    prefetch_interval = get_settings().model_prefetch_interval_seconds
+                    if prefetch_interval > 0:
+                        self.memory_manager.start_prefetch(prefetch_interval)
                     logger.info("🧠 Memory manager initialized")
             except Exception as e:
                 logger.warning(f"⚠️ Memory manager initialization failed: {e}")
@@ -444,6 +479,8 @@ class ModelManager:
         max_tokens: int = 1000,
         temperature: float = 0.7,
         timeout: Optional[float] = None,
+        request_type: str = "interactive",
+        user_tier: Optional[str] = None,
         **kwargs,
     ) -> ModelResult:
         """
@@ -456,6 +493,8 @@ class ModelManager:
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature
             timeout: Custom timeout for generation
+            request_type: Scheduling class (interactive, evaluation, cache_warming, shadow)
+            user_tier: User tier (enterprise, pro, free) for queue ordering
             **kwargs: Additional generation parameters
 
         Returns:
@@ -471,8 +510,6 @@ class ModelManager:
             if not refresh_success:
                 logger.error("❌ Model refresh failed - no models available")
 
-        start_time = time.time()
-
         # Auto-select model if not provided
         if not model_name:
             if task_type:
@@ -489,22 +526,124 @@ class ModelManager:
 
         # Set timeout
         generation_timeout = timeout if timeout else 120.0
+        prompt, max_tokens = self._apply_token_budget(model_name, prompt, max_tokens, kwargs)
+
+        key = self._flight_key(
+            model_name, prompt, max_tokens, temperature, kwargs, request_type, user_tier
+        )
+        result, shared = await self.single_flight.do(
+            key,
+            lambda: self._generate_once(
+                prompt,
+                model_name,
+                max_tokens,
+                temperature,
+                generation_timeout,
+                request_type,
+                user_tier,
+                **kwargs,
+            ),
+        )
+        if shared:
+            generation_metrics.increment("generation_coalesced_total")
+            result = dataclasses.replace(
+                result, metadata={**(result.metadata or {}), "coalesced": True}
+            )
+        return result
+
+    def _apply_token_budget(
+        self, model_name: str, prompt: str, max_tokens: int, options: Dict[str, Any]
+    ) -> Tuple[str, int]:
+        """
+        Size num_predict from the tokens the prompt leaves free in the model's
+        context window, and send num_ctx so Ollama uses the same window.
+
+        A plain prompt too long for the window is cut to fit here, since
+        Ollama would truncate it silently; chat messages are fitted by the
+        caller. Returns the prompt to send and num_predict.
+        """
+        if options.get("messages") is None:
+            prompt, cut_tokens = self.token_budget.fit_prompt(prompt, model_name, max_tokens)
+            if cut_tokens:
+                generation_metrics.increment("prompt_tokens_trimmed_total", cut_tokens)
+                logger.warning(
+                    f"Prompt for {model_name} cut by {cut_tokens} tokens to fit its context window"
+                )
+        budget = self.token_budget.plan(
+            model_name, max_tokens, prompt=prompt, messages=options.get("messages")
+        )
+        options.setdefault("num_ctx", budget.num_ctx)
+        generation_metrics.increment("prompt_tokens_budgeted_total", budget.prompt_tokens)
+        if budget.num_predict < max_tokens:
+            generation_metrics.increment("num_predict_clipped_total")
+        return prompt, budget.num_predict
+
+    @staticmethod
+    def _flight_key(
+        model_name: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        options: Dict[str, Any],
+        request_type: str = "interactive",
+        user_tier: Optional[str] = None,
+        stream: bool = False,
+    ) -> str:
+        """
+        Key identical generations: same model, prompt and sampling parameters.
+        The scheduling class and user tier are part of the key, so a request
+        never waits in a lower-priority caller's queue slot.
+        """
+        params = json.dumps(
+            {
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "request_type": request_type,
+                "user_tier": user_tier,
+                **options,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{'stream' if stream else 'generate'}:{model_name}:{prompt_hash}:{params}"
+
+    async def _generate_once(
+        self,
+        prompt: str,
+        model_name: str,
+        max_tokens: int,
+        temperature: float,
+        generation_timeout: float,
+        request_type: str = "interactive",
+        user_tier: Optional[str] = None,
+        **kwargs,
+    ) -> ModelResult:
+        """Run one generation against Ollama; shared by coalesced callers."""
+        start_time = time.time()
 
         try:
-            # Ensure model is loaded
+            # Ensure model is loaded; a cold load counts against the generation timeout
             await self._ensure_model_loaded(model_name)
-
-            # Generate response with timeout
-            result = await asyncio.wait_for(
-                self.ollama_client.generate(
-                    model_name=model_name,
-                    prompt=prompt,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    **kwargs,
-                ),
-                timeout=generation_timeout,
+            load_start = time.monotonic()
+            await self._ensure_resident(
+                model_name, kwargs, deadline=load_start + generation_timeout
             )
+            remaining = generation_timeout - (time.monotonic() - load_start)
+
+            # Wait for a slot on the model, then generate with timeout
+            async with self.scheduler.slot(model_name, request_type, user_tier):
+                result = await asyncio.wait_for(
+                    self.ollama_client.generate(
+                        model_name=model_name,
+                        prompt=prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        deadline=time.monotonic() + remaining,
+                        **kwargs,
+                    ),
+                    timeout=max(0.0, remaining),
+                )
 
             # Update model statistics
             if model_name in self.models:
@@ -518,6 +657,15 @@ class ModelManager:
 
             return result
 
+        except QueueTimeoutError as e:
+            return ModelResult(
+                success=False,
+                text="",
+                error=str(e),
+                execution_time=time.time() - start_time,
+                model_used=model_name,
+                metadata={"queue_timeout": True, "request_type": request_type},
+            )
         except asyncio.TimeoutError:
             logger.error(f"Generation timeout for model {model_name}")
             return ModelResult(
@@ -547,6 +695,130 @@ class ModelManager:
                 model_used=model_name,
             )
 
+    async def generate_stream(
+        self,
+        prompt: str,
+        model_name: str = "phi3:mini",
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        request_type: str = "interactive",
+        user_tier: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncGenerator[StreamingChunk, None]:
+        """
+        Stream generated tokens from the specified model as Ollama produces them.
+
+        The caller owns the deadline. Identical concurrent streams share one
+        Ollama call and each subscriber sees every chunk; the HTTP stream to
+        Ollama is closed once the last subscriber stops iterating. The stream
+        holds a scheduler slot on the model until it ends. Model statistics
+        are updated once the stream ends.
+
+        Yields:
+            StreamingChunk: Token chunks; the last one has done=True
+        """
+        if not self.is_initialized:
+            await self.initialize()
+
+        prompt, max_tokens = self._apply_token_budget(model_name, prompt, max_tokens, kwargs)
+        key = self._flight_key(
+            model_name,
+            prompt,
+            max_tokens,
+            temperature,
+            kwargs,
+            request_type,
+            user_tier,
+            stream=True,
+        )
+        if self.single_flight.is_in_flight(key):
+            generation_metrics.increment("generation_coalesced_total")
+        async for chunk in self.single_flight.stream(
+            key,
+            lambda: self._stream_once(
+                prompt,
+                model_name,
+                max_tokens,
+                temperature,
+                request_type,
+                user_tier,
+                **kwargs,
+            ),
+        ):
+            yield chunk
+
+    async def _stream_once(
+        self,
+        prompt: str,
+        model_name: str,
+        max_tokens: int,
+        temperature: float,
+        request_type: str = "interactive",
+        user_tier: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncGenerator[StreamingChunk, None]:
+        """Stream one generation from Ollama; shared by coalesced subscribers."""
+        start_time = time.time()
+        text_parts: List[str] = []
+        final_chunk: Optional[StreamingChunk] = None
+
+        await self._ensure_model_loaded(model_name)
+        await self._ensure_resident(model_name, kwargs)
+        try:
+            await self.scheduler.acquire(model_name, request_type, user_tier)
+        except QueueTimeoutError as e:
+            yield StreamingChunk(text="", done=True, error=str(e))
+            return
+        try:
+            async for chunk in self.ollama_client.generate_stream(
+                model_name=model_name,
+                prompt=prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **kwargs,
+            ):
+                text_parts.append(chunk.text)
+                if chunk.done:
+                    final_chunk = chunk
+                yield chunk
+        finally:
+            self.scheduler.release(model_name)
+
+        execution_time = time.time() - start_time
+        eval_count = final_chunk.eval_count if final_chunk else None
+        total_duration = final_chunk.total_duration if final_chunk else None
+        result = ModelResult(
+            success=bool("".join(text_parts).strip()) and not (final_chunk and final_chunk.error),
+            text="".join(text_parts),
+            execution_time=execution_time,
+            model_used=model_name,
+            error=final_chunk.error if final_chunk else "Stream ended early",
+            tokens_generated=eval_count,
+            tokens_per_second=(
+                eval_count / (total_duration / 1_000_000_000)
+                if eval_count and total_duration
+                else None
+            ),
+        )
+        if model_name in self.models:
+            self.models[model_name].update_stats(result)
+        self.usage_stats[model_name] += 1
+
+    async def _ensure_resident(
+        self, model_name: str, options: Dict[str, Any], deadline: Optional[float] = None
+    ) -> None:
+        """
+        Load the model into VRAM through the memory manager before generating,
+        so cold loads are timed and make room by evicting by tier, and send the
+        tier's keep_alive so the generation does not reset its residency. The
+        load gives up at the monotonic ``deadline``.
+        """
+        if self.memory_manager is None:
+            return
+        self.memory_manager.record_request(model_name)
+        options.setdefault("keep_alive", self.memory_manager.keep_alive_for(model_name))
+        await self.memory_manager.ensure_model_loaded(model_name, deadline=deadline)
+
     async def _ensure_model_loaded(self, model_name: str) -> bool:
         """Ensure a model is loaded and ready."""
         if model_name not in self.models:
@@ -570,15 +842,8 @@ class ModelManager:
         else:
             # Try to load the model
             try:
-                model_info.status = ModelStatus.LOADING
-                load_start = time.time()
-
-                # This would typically involve calling Ollama's load API
-                # For now, assume it's available if we reach here
-                await asyncio.sleep(0.1)  # Simulate load time
-
+                # The weights themselves are loaded by _ensure_resident
                 model_info.status = ModelStatus.READY
-                model_info.load_time = time.time() - load_start
 
                 logger.info(f"Model {model_name} loaded successfully")
                 return True
@@ -592,6 +857,9 @@ class ModelManager:
         """Gracefully shutdown the model manager."""
         logger.info("🔄 Shutting down ModelManager...")
 
+        if self.memory_manager:
+            await self.memory_manager.stop_prefetch()
+
         if self.ollama_client:
             try:
                 await self.ollama_client.close()
@@ -612,6 +880,13 @@ class ModelManager:
             "total_cost": sum(self.cost_tracker.values()),
             "initialization_status": self.initialization_status,
             "is_initialized": self.is_initialized,
+            "single_flight": self.single_flight.get_stats(),
+            "scheduler": self.scheduler.get_stats(),
+            "token_budget": self.token_budget.get_stats(),
+            "memory": self.memory_manager.get_memory_stats() if self.memory_manager else {},
+            "circuit_breakers": (
+                self.ollama_client.get_circuit_states() if self.ollama_client else {}
+            ),
         }
 
     def get_model_stats(self) -> Dict[str, Any]:
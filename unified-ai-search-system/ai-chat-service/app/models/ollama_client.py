@@ -8,12 +8,14 @@ import json
 import time
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, AsyncGenerator, Dict, List, Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
 
 import httpx
 from pydantic import BaseModel, Field
 
 from app.core.logging import get_correlation_id, get_logger, log_performance
+from app.models.resilience import CircuitBreaker, RetryPolicy
+from app.monitoring.generation_metrics import generation_metrics
 
 logger = get_logger("models.ollama_client")
 
@@ -66,7 +68,11 @@ class StreamingChunk(BaseModel):
     total_duration: Optional[int] = None
     load_duration: Optional[int] = None
     prompt_eval_count: Optional[int] = None
+    prompt_eval_duration: Optional[int] = None
     eval_count: Optional[int] = None
+    error: Optional[str] = None
+    # Set when a router picked the model that produced the stream
+    model: Optional[str] = None
 
 
 class OllamaException(Exception):
@@ -82,6 +88,23 @@ class OllamaException(Exception):
         self.model_name = model_name
         super().__init__(message)
 
+    @property
+    def retryable(self) -> bool:
+        """Connection problems, overload and server errors; not bad requests."""
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+class CircuitOpenError(OllamaException):
+    """Raised without calling Ollama while a model's circuit breaker is open."""
+
+    def __init__(self, model_name: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(
+            f"Circuit open for {model_name}; retry in {retry_after:.1f}s",
+            status_code=503,
+            model_name=model_name,
+        )
+
 
 class OllamaClient:
     """
@@ -91,7 +114,8 @@ class OllamaClient:
     - Async model loading and unloading
     - Streaming and non-streaming generation
     - Health monitoring and status checking
-    - Automatic retry logic with exponential backoff
+    - One deadline-aware retry policy with jittered backoff per request
+    - Per-model circuit breakers that fail fast while a model is unhealthy
     - Performance metrics collection
     """
 
@@ -101,11 +125,22 @@ class OllamaClient:
         timeout: float = 60.0,
         max_retries: int = 3,
         retry_delay: float = 1.0,
+        max_retry_delay: float = 8.0,
+        circuit_failure_threshold: int = 5,
+        circuit_recovery_timeout: float = 30.0,
     ):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.retry_policy = RetryPolicy(
+            max_attempts=max_retries + 1,
+            base_delay=retry_delay,
+            max_delay=max_retry_delay,
+        )
+        self.circuit_failure_threshold = circuit_failure_threshold
+        self.circuit_recovery_timeout = circuit_recovery_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
 
         # HTTP client configuration
         self.client_config = {
@@ -381,6 +416,69 @@ class OllamaClient:
             )
             return ModelStatus.ERROR
 
+    async def list_running_models(self) -> List[Dict[str, Any]]:
+        """
+        Models currently resident in Ollama (/api/ps).
+
+        Returns:
+            List[Dict]: Entries with name, size, size_vram and expires_at
+        """
+        response = await self._make_request("GET", "/api/ps")
+        return response.get("models", [])
+
+    async def load_model(
+        self,
+        model_name: str,
+        keep_alive: Any = None,
+        deadline: Optional[float] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Load a model into memory without generating, keeping it resident for
+        ``keep_alive`` (seconds, a duration such as "10m", or -1 for ever).
+        ``options`` such as num_ctx should match later generations; a request
+        with a different num_ctx makes Ollama reload the model.
+
+        Like a generation, the load goes through the model's circuit breaker
+        and gives up retrying at the monotonic ``deadline``.
+
+        Returns:
+            Dict: Ollama's response, including load_duration in nanoseconds
+
+        Raises:
+            CircuitOpenError: While the model's circuit breaker is open
+        """
+        breaker = self._get_breaker(model_name)
+        if not breaker.allow_request():
+            generation_metrics.increment("ollama_circuit_rejections_total")
+            raise CircuitOpenError(model_name, breaker.retry_after())
+
+        request_data: Dict[str, Any] = {"model": model_name, "stream": False}
+        if keep_alive is not None:
+            request_data["keep_alive"] = keep_alive
+        if options:
+            request_data["options"] = options
+        try:
+            response = await self._make_request(
+                "POST", "/api/generate", deadline=deadline, json=request_data
+            )
+        except asyncio.CancelledError:
+            breaker.record_abandoned()
+            raise
+        except Exception as e:
+            self._record_outcome(breaker, e)
+            raise
+        self._record_outcome(breaker)
+        return response
+
+    async def unload_model(self, model_name: str) -> None:
+        """Evict a model from memory now (keep_alive 0)."""
+        await self._make_request(
+            "POST",
+            "/api/generate",
+            json={"model": model_name, "keep_alive": 0, "stream": False},
+        )
+
     @log_performance("ollama_text_generation")
     async def generate(
         self,
@@ -388,23 +486,31 @@ class OllamaClient:
         prompt: str,
         max_tokens: int = 300,
         temperature: float = 0.7,
+        deadline: Optional[float] = None,
+        messages: Optional[List[Dict[str, str]]] = None,
         **kwargs,
     ) -> ModelResult:
         """
-        Generate text using the specified model with retry logic.
+        Generate text using the specified model.
+
+        Retries follow the client's retry policy and stop at ``deadline``; while
+        the model's circuit breaker is open the call fails fast without
+        contacting Ollama. With ``messages`` the request goes to /api/chat,
+        where Ollama reuses the KV cache for a prefix it has already evaluated.
 
         Args:
             model_name: Name of the model to use
-            prompt: Input prompt for generation
+            prompt: Input prompt for generation (ignored when messages are given)
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature (0.0 to 2.0)
+            deadline: Absolute time.monotonic() by which to give up retrying
+            messages: Chat messages ({"role", "content"}) to send instead of a prompt
             **kwargs: Additional generation parameters
 
         Returns:
             ModelResult: Generation result with metadata
         """
         correlation_id = get_correlation_id()
-        last_exception = None
 
         logger.debug(
             "Starting text generation",
@@ -415,115 +521,108 @@ class OllamaClient:
             correlation_id=correlation_id,
         )
 
+        breaker = self._get_breaker(model_name)
+        if not breaker.allow_request():
+            error = CircuitOpenError(model_name, breaker.retry_after())
+            generation_metrics.increment("ollama_circuit_rejections_total")
+            logger.warning(str(error), correlation_id=correlation_id)
+            return ModelResult(
+                success=False,
+                text="",
+                model_used=model_name,
+                error=str(error),
+                metadata={"circuit_state": breaker.state.value},
+            )
+
         await self.initialize()
         logger.debug("Prompt sent to LLM", prompt=prompt, model_name=model_name)
-        request_data = {
-            "model": model_name,
-            "prompt": prompt,
-            "options": {
-                "num_predict": max_tokens,
-                "temperature": temperature,
-                **kwargs,
-            },
-            "stream": False,
-        }
-
-        logger.debug(
-            "LLM generate() call details",
-            prompt=prompt,
-            model_name=model_name,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            kwargs=kwargs,
-            correlation_id=correlation_id,
+        endpoint, request_data = self._request_body(
+            model_name, prompt, messages, max_tokens, temperature, kwargs, stream=False
         )
 
-        for attempt in range(self.max_retries + 1):
-            try:
-                logger.debug(
-                    f"[LLM] Attempt {attempt+1}/{self.max_retries+1} | Model: {model_name} | Prompt: {prompt}"
-                )
-                start_time = time.monotonic()
-                response = await self._make_request(
-                    "POST", "/api/generate", json=request_data
-                )
-                execution_time = time.monotonic() - start_time
-                logger.debug(
-                    f"[LLM] Response: {response} | Time: {execution_time:.2f}s"
-                )
-
-                # Extract response text
-                response_text = response.get("response", "")
-                logger.debug(f"Raw Ollama response: {response}")
-
-                # Better empty response handling
-                if not response_text or response_text.strip() == "":
-                    logger.error(
-                        f"Empty response from Ollama for model {model_name}. Raw response: {response}"
-                    )
-                    response_text = f"Hello! I'm ready to help you. Could you please rephrase your question? (Model: {model_name})"
-
-                # Calculate performance metrics
-                total_duration = response.get("total_duration", 0)
-                eval_count = response.get("eval_count", 0)
-
-                tokens_per_second = 0.0
-                if eval_count > 0 and total_duration > 0:
-                    # Convert nanoseconds to seconds
-                    duration_seconds = total_duration / 1_000_000_000
-                    tokens_per_second = eval_count / duration_seconds
-
-                result = ModelResult(
-                    success=True,
-                    text=response_text,
-                    execution_time=execution_time,
-                    model_used=model_name,
-                    tokens_generated=eval_count,
-                    tokens_per_second=tokens_per_second,
-                    metadata={
-                        "total_duration": total_duration / 1_000_000_000,
-                        "load_duration": response.get("load_duration", 0)
-                        / 1_000_000_000,
-                        "prompt_eval_duration": response.get("prompt_eval_duration", 0)
-                        / 1_000_000_000,
-                        "eval_duration": response.get("eval_duration", 0)
-                        / 1_000_000_000,
-                    },
-                )
-
-                logger.info(
-                    "Text generation completed successfully",
-                    model_name=model_name,
-                    execution_time=execution_time,
-                    tokens_generated=eval_count,
-                    tokens_per_second=round(tokens_per_second, 2),
-                    correlation_id=correlation_id,
-                )
-
-                return result
+        start_time = time.monotonic()
+        try:
+            response = await self._make_request(
+                "POST", endpoint, deadline=deadline, json=request_data
+            )
+        except asyncio.CancelledError:
+            breaker.record_abandoned()
+            raise
+        except Exception as e:
+            self._record_outcome(breaker, e)
+            logger.error(
+                "Text generation failed",
+                model_name=model_name,
+                error=str(e),
+                circuit_state=breaker.state.value,
+                correlation_id=correlation_id,
+            )
+            return ModelResult(
+                success=False,
+                text="",
+                execution_time=time.monotonic() - start_time,
+                model_used=model_name,
+                error=str(e),
+            )
+        self._record_outcome(breaker)
+        execution_time = time.monotonic() - start_time
+        logger.debug(f"[LLM] Response: {response} | Time: {execution_time:.2f}s")
 
-            except Exception as e:
-                last_exception = e
-                logger.error(f"[LLM] Exception on attempt {attempt+1}: {e}")
+        # Extract response text
+        response_text = self._response_text(response)
 
-        # Fallback: always return a ModelResult, even on failure
-        logger.error(
-            f"[LLM] All {self.max_retries+1} attempts failed. Returning fallback ModelResult."
-        )
-        return ModelResult(
-            success=False,
-            text="",
-            execution_time=0.0,
+        # Better empty response handling
+        if not response_text or response_text.strip() == "":
+            logger.error(
+                f"Empty response from Ollama for model {model_name}. Raw response: {response}"
+            )
+            response_text = f"Hello! I'm ready to help you. Could you please rephrase your question? (Model: {model_name})"
+
+        # Calculate performance metrics
+        total_duration = response.get("total_duration", 0)
+        eval_count = response.get("eval_count", 0)
+
+        tokens_per_second = 0.0
+        if eval_count > 0 and total_duration > 0:
+            # Convert nanoseconds to seconds
+            duration_seconds = total_duration / 1_000_000_000
+            tokens_per_second = eval_count / duration_seconds
+
+        result = ModelResult(
+            success=True,
+            text=response_text,
+            execution_time=execution_time,
             model_used=model_name,
-            error=str(last_exception) if last_exception else "Empty response",
+            tokens_generated=eval_count,
+            tokens_per_second=tokens_per_second,
+            metadata={
+                "total_duration": total_duration / 1_000_000_000,
+                "load_duration": response.get("load_duration", 0) / 1_000_000_000,
+                "prompt_eval_count": response.get("prompt_eval_count"),
+                "prompt_eval_duration": response.get("prompt_eval_duration", 0)
+                / 1_000_000_000,
+                "eval_duration": response.get("eval_duration", 0) / 1_000_000_000,
+            },
         )
 
+        logger.info(
+            "Text generation completed successfully",
+            model_name=model_name,
+            execution_time=execution_time,
+            tokens_generated=eval_count,
+            tokens_per_second=round(tokens_per_second, 2),
+            correlation_id=correlation_id,
+        )
+
+        return result
+
     async def generate_stream(
         self,
         model_name: str,
         prompt: str,
         max_tokens: int = 300,
         temperature: float = 0.7,
+        messages: Optional[List[Dict[str, str]]] = None,
         **kwargs,
     ) -> AsyncGenerator[StreamingChunk, None]:
         """
@@ -531,9 +630,10 @@ class OllamaClient:
 
         Args:
             model_name: Name of the model to use
-            prompt: Input prompt for generation
+            prompt: Input prompt for generation (ignored when messages are given)
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature
+            messages: Chat messages to send to /api/chat instead of a prompt
             **kwargs: Additional generation parameters
 
         Yields:
@@ -548,25 +648,26 @@ class OllamaClient:
             correlation_id=correlation_id,
         )
 
+        breaker = self._get_breaker(model_name)
+        if not breaker.allow_request():
+            error = CircuitOpenError(model_name, breaker.retry_after())
+            generation_metrics.increment("ollama_circuit_rejections_total")
+            logger.warning(str(error), correlation_id=correlation_id)
+            yield StreamingChunk(text="", done=True, error=str(error))
+            return
+
         try:
             await self.initialize()
             logger.debug(
                 "Prompt sent to LLM (stream)", prompt=prompt, model_name=model_name
             )
 
-            request_data = {
-                "model": model_name,
-                "prompt": prompt,
-                "options": {
-                    "num_predict": max_tokens,
-                    "temperature": temperature,
-                    **kwargs,
-                },
-                "stream": True,
-            }
+            endpoint, request_data = self._request_body(
+                model_name, prompt, messages, max_tokens, temperature, kwargs, stream=True
+            )
 
             async with self._client.stream(
-                "POST", f"{self.base_url}/api/generate", json=request_data
+                "POST", f"{self.base_url}{endpoint}", json=request_data
             ) as response:
                 if response.status_code != 200:
                     error_text = await response.aread()
@@ -581,15 +682,15 @@ class OllamaClient:
                         try:
                             chunk_data = json.loads(line)
                             logger.debug("Raw LLM stream chunk", chunk_data=chunk_data)
-                            text = chunk_data.get("response", "")
-                            if not text:
-                                text = "[No response generated]"
+                            # The closing chunk carries timings and an empty response
+                            text = self._response_text(chunk_data)
                             yield StreamingChunk(
                                 text=text,
                                 done=chunk_data.get("done", False),
                                 total_duration=chunk_data.get("total_duration"),
                                 load_duration=chunk_data.get("load_duration"),
                                 prompt_eval_count=chunk_data.get("prompt_eval_count"),
+                                prompt_eval_duration=chunk_data.get("prompt_eval_duration"),
                                 eval_count=chunk_data.get("eval_count"),
                             )
 
@@ -598,30 +699,51 @@ class OllamaClient:
                         except json.JSONDecodeError:
                             continue
 
+            self._record_outcome(breaker)
             logger.debug(
                 "Streaming generation completed",
                 model_name=model_name,
                 correlation_id=correlation_id,
             )
 
+        except (asyncio.CancelledError, GeneratorExit):
+            # Leaving the stream context above closed the HTTP response, which stops Ollama
+            breaker.record_abandoned()
+            logger.info(
+                "Streaming generation cancelled",
+                model_name=model_name,
+                correlation_id=correlation_id,
+            )
+            raise
         except Exception as e:
+            self._record_outcome(breaker, e)
             logger.error(
                 "Streaming generation failed",
                 model_name=model_name,
                 error=str(e),
                 correlation_id=correlation_id,
             )
-            yield StreamingChunk(text="", done=True)
+            yield StreamingChunk(text="", done=True, error=str(e))
 
     async def _make_request(
-        self, method: str, endpoint: str, **kwargs
+        self,
+        method: str,
+        endpoint: str,
+        deadline: Optional[float] = None,
+        **kwargs,
     ) -> Dict[str, Any]:
         """
-        Make HTTP request with retry logic and error handling.
+        Make an HTTP request under the client's retry policy.
+
+        Connection errors, timeouts, 429 and 5xx responses are retried with
+        jittered exponential backoff; other errors are raised at once. No
+        retry starts, and no attempt outlives, the optional monotonic
+        ``deadline``.
 
         Args:
             method: HTTP method
             endpoint: API endpoint
+            deadline: Absolute time.monotonic() by which to give up
             **kwargs: Additional request parameters
 
         Returns:
@@ -630,87 +752,127 @@ class OllamaClient:
         correlation_id = get_correlation_id()
         url = f"{self.base_url}{endpoint}"
 
-        last_exception = None
+        attempt = 0
+        while True:
+            attempt += 1
+            request_kwargs = dict(kwargs)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise OllamaException(f"Deadline exceeded before {method} {endpoint}")
+                request_kwargs.setdefault("timeout", min(self.timeout, remaining))
 
-        for attempt in range(self.max_retries + 1):
             try:
                 await self.initialize()  # Ensure client is initialized
-                response = await self._client.request(method, url, **kwargs)
-
+                response = await self._client.request(method, url, **request_kwargs)
                 if response.status_code == 200:
                     return response.json()
-                else:
-                    error_text = response.text
-                    raise httpx.HTTPStatusError(
-                        f"HTTP {response.status_code}: {error_text}",
-                        request=response.request,
-                        response=response,
-                    )
-
+                error = OllamaException(
+                    f"HTTP {response.status_code}: {response.text}",
+                    status_code=response.status_code,
+                )
             except (
                 httpx.ConnectError,
                 httpx.TimeoutException,
                 httpx.NetworkError,
             ) as e:
-                last_exception = e
-
-                if attempt < self.max_retries:
-                    wait_time = self.retry_delay * (2**attempt)  # Exponential backoff
-
-                    logger.warning(
-                        "Connection error, retrying",
-                        method=method,
-                        endpoint=endpoint,
-                        attempt=attempt + 1,
-                        max_retries=self.max_retries,
-                        wait_time=wait_time,
-                        error=str(e),
-                        error_type=type(e).__name__,
-                        correlation_id=correlation_id,
-                    )
+                error = OllamaException(f"Connection to Ollama failed: {e}")
+
+            delay = self.retry_policy.next_delay(attempt, deadline) if error.retryable else None
+            if delay is None:
+                logger.error(
+                    "Request failed",
+                    method=method,
+                    endpoint=endpoint,
+                    attempts=attempt,
+                    error=str(error),
+                    correlation_id=correlation_id,
+                )
+                raise error
 
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(
-                        "Connection failed after all retries",
-                        method=method,
-                        endpoint=endpoint,
-                        attempts=attempt + 1,
-                        error=str(e),
-                        error_type=type(e).__name__,
-                        correlation_id=correlation_id,
-                    )
-                    raise OllamaException(f"Connection to Ollama failed: {e}")
-
-            except Exception as e:
-                last_exception = e
-
-                if attempt < self.max_retries:
-                    wait_time = self.retry_delay * (2**attempt)  # Exponential backoff
-
-                    logger.warning(
-                        "Request failed, retrying",
-                        method=method,
-                        endpoint=endpoint,
-                        attempt=attempt + 1,
-                        max_retries=self.max_retries,
-                        wait_time=wait_time,
-                        error=str(e),
-                        correlation_id=correlation_id,
-                    )
+            generation_metrics.increment("ollama_retries_total")
+            logger.warning(
+                "Request failed, retrying",
+                method=method,
+                endpoint=endpoint,
+                attempt=attempt,
+                max_attempts=self.retry_policy.max_attempts,
+                wait_time=round(delay, 3),
+                error=str(error),
+                correlation_id=correlation_id,
+            )
+            await asyncio.sleep(delay)
 
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(
-                        "Request failed after all retries",
-                        method=method,
-                        endpoint=endpoint,
-                        attempts=attempt + 1,
-                        error=str(e),
-                        correlation_id=correlation_id,
-                    )
+    @staticmethod
+    def _request_body(
+        model_name: str,
+        prompt: str,
+        messages: Optional[List[Dict[str, str]]],
+        max_tokens: int,
+        temperature: float,
+        options: Dict[str, Any],
+        stream: bool,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Endpoint and body for a completion: /api/chat with messages, else /api/generate."""
+        options = dict(options)
+        keep_alive = options.pop("keep_alive", None)
+        request_data = {
+            "model": model_name,
+            "options": {
+                "num_predict": max_tokens,
+                "temperature": temperature,
+                **options,
+            },
+            "stream": stream,
+        }
+        if keep_alive is not None:
+            # Residency is a request setting, not a model option
+            request_data["keep_alive"] = keep_alive
+        if messages is not None:
+            request_data["messages"] = messages
+            return "/api/chat", request_data
+        request_data["prompt"] = prompt
+        return "/api/generate", request_data
+
+    @staticmethod
+    def _response_text(data: Dict[str, Any]) -> str:
+        """Generated text from an /api/generate or /api/chat response (or chunk)."""
+        if "message" in data:
+            return (data.get("message") or {}).get("content", "")
+        return data.get("response", "")
+
+    def _get_breaker(self, model_name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model_name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                model_name,
+                failure_threshold=self.circuit_failure_threshold,
+                recovery_timeout=self.circuit_recovery_timeout,
+            )
+            self._breakers[model_name] = breaker
+        return breaker
+
+    def _record_outcome(self, breaker: CircuitBreaker, error: Optional[Exception] = None) -> None:
+        """Feed a call's outcome to its breaker; rejected requests are not the model's fault."""
+        previous_state = breaker.state
+        if error is None:
+            breaker.record_success()
+        elif isinstance(error, OllamaException) and not error.retryable:
+            breaker.record_abandoned()
+        else:
+            breaker.record_failure()
+        if breaker.state != previous_state:
+            logger.warning(
+                "Circuit breaker state changed",
+                model_name=breaker.name,
+                previous_state=previous_state.value,
+                state=breaker.state.value,
+            )
+        generation_metrics.set_gauge("ollama_circuit_breakers", self.get_circuit_states())
 
-        raise last_exception
+    def get_circuit_states(self) -> Dict[str, Dict[str, Any]]:
+        """Breaker state per model, for /metrics."""
+        return {name: breaker.to_dict() for name, breaker in self._breakers.items()}
 
     async def get_available_model_names(self, force_refresh: bool = False) -> set[str]:
         """
@@ -752,6 +914,7 @@ async def create_ollama_client(
 __all__ = [
     "OllamaClient",
     "OllamaException",
+    "CircuitOpenError",
     "ModelResult",
     "ModelStatus",
     "GenerationRequest",
@@ -0,0 +1,135 @@
+"""
+Resilience primitives for model backends: deadline-aware retries with jitter
+and a per-model circuit breaker.
+"""
+
+import random
+import time
+from enum import Enum
+from typing import Any, Dict, Optional
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker state."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, bounded by attempts and a deadline.
+
+    One policy governs a whole logical request, so retries never nest; a
+    retry is skipped when its backoff would run past the caller's deadline.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """Sleep before retry number ``attempt`` (1-based): uniform in [0, capped exponential]."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def next_delay(self, attempt: int, deadline: Optional[float]) -> Optional[float]:
+        """
+        Delay before retrying after ``attempt`` failed attempts, or None when
+        the request should give up.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker.
+
+    Opens after ``failure_threshold`` consecutive failures and rejects calls
+    for ``recovery_timeout`` seconds. It then half-opens and lets
+    ``half_open_max_calls`` probes through: a successful probe closes it, a
+    failed one opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._half_open_calls = 0
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def allow_request(self) -> bool:
+        """Whether a call may proceed now; admits half-open probes."""
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                self.stats["rejected"] += 1
+                return False
+            self.state = CircuitState.HALF_OPEN
+            self._half_open_calls = 0
+        if self.state == CircuitState.HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                self.stats["rejected"] += 1
+                return False
+            self._half_open_calls += 1
+        return True
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will admit a probe."""
+        if self.state != CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        self.stats["successes"] += 1
+        self.consecutive_failures = 0
+        self.state = CircuitState.CLOSED
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        if (
+            self.state == CircuitState.HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state != CircuitState.OPEN:
+                self.stats["opened"] += 1
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+
+    def record_abandoned(self) -> None:
+        """A call ended without an outcome (e.g. cancelled); free its probe slot."""
+        if self.state == CircuitState.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after(), 3),
+            **self.stats,
+        }
+
+
+__all__ = ["CircuitBreaker", "CircuitState", "RetryPolicy"]
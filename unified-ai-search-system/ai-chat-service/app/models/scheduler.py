@@ -0,0 +1,233 @@
+"""
+GenerationScheduler - Per-model admission control for Ollama generations.
+Caps concurrent requests per model at the server's parallelism and queues the
+rest by request type and user tier, so interactive chat is served first.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.core.logging import get_logger
+from app.monitoring.generation_metrics import generation_metrics
+
+logger = get_logger("models.scheduler")
+
+# Lower rank is served first; request type outranks user tier
+REQUEST_TYPE_RANKS = {
+    "interactive": 0,
+    "evaluation": 1,
+    "cache_warming": 2,
+    "shadow": 3,
+}
+USER_TIER_RANKS = {"enterprise": 0, "pro": 1, "free": 2}
+
+# Longest a request may wait for a slot, by request type (seconds)
+DEFAULT_MAX_QUEUE_SECONDS = {
+    "interactive": 30.0,
+    "evaluation": 120.0,
+    "cache_warming": 60.0,
+    "shadow": 10.0,
+}
+
+
+class QueueTimeoutError(Exception):
+    """A request waited longer than its max queue time for a generation slot."""
+
+    def __init__(self, model_name: str, request_type: str, waited: float):
+        self.model_name = model_name
+        self.request_type = request_type
+        self.waited = waited
+        super().__init__(
+            f"Queued {waited:.1f}s for {model_name} ({request_type}) without a free slot"
+        )
+
+
+class _Waiter:
+    __slots__ = ("future", "request_type", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, request_type: str):
+        self.future = future
+        self.request_type = request_type
+        self.enqueued_at = time.monotonic()
+
+
+class _ModelQueue:
+    """Slots in use and the priority-ordered waiters for one model."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.waiters: List[Any] = []
+
+    def depth(self) -> Dict[str, int]:
+        by_type: Dict[str, int] = {}
+        for _, _, waiter in self.waiters:
+            if not waiter.future.done():
+                by_type[waiter.request_type] = by_type.get(waiter.request_type, 0) + 1
+        return by_type
+
+
+class GenerationScheduler:
+    """
+    Grants generation slots per model, at most ``concurrency`` at a time.
+
+    When a model is saturated, requests wait in a priority queue ordered by
+    request type, then user tier, then arrival. A request that waits longer
+    than its max queue time gets QueueTimeoutError instead of piling onto
+    Ollama's own opaque queue.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 1,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        max_queue_seconds: Optional[Dict[str, float]] = None,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.model_concurrency = dict(model_concurrency or {})
+        self.max_queue_seconds = {**DEFAULT_MAX_QUEUE_SECONDS, **(max_queue_seconds or {})}
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._sequence = itertools.count()
+        self.stats = {"granted": 0, "queued": 0, "timeouts": 0}
+
+    @staticmethod
+    def priority(request_type: str, user_tier: Optional[str]) -> tuple:
+        return (
+            REQUEST_TYPE_RANKS.get(request_type, len(REQUEST_TYPE_RANKS)),
+            USER_TIER_RANKS.get(user_tier or "free", len(USER_TIER_RANKS)),
+        )
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        model_name: str,
+        request_type: str = "interactive",
+        user_tier: Optional[str] = None,
+        max_queue_seconds: Optional[float] = None,
+    ) -> AsyncIterator[float]:
+        """Hold one of the model's slots for the body; yields the seconds spent queued."""
+        waited = await self.acquire(model_name, request_type, user_tier, max_queue_seconds)
+        try:
+            yield waited
+        finally:
+            self.release(model_name)
+
+    async def acquire(
+        self,
+        model_name: str,
+        request_type: str = "interactive",
+        user_tier: Optional[str] = None,
+        max_queue_seconds: Optional[float] = None,
+    ) -> float:
+        """Wait for a slot on ``model_name``; returns the seconds spent queued."""
+        queue = self._queue(model_name)
+        if queue.active < queue.limit and not queue.waiters:
+            queue.active += 1
+            self.stats["granted"] += 1
+            self._publish()
+            return 0.0
+
+        if max_queue_seconds is None:
+            max_queue_seconds = self.max_queue_seconds.get(
+                request_type, DEFAULT_MAX_QUEUE_SECONDS["interactive"]
+            )
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), request_type)
+        heapq.heappush(
+            queue.waiters,
+            (self.priority(request_type, user_tier), next(self._sequence), waiter),
+        )
+        self.stats["queued"] += 1
+        self._publish()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), max_queue_seconds)
+        except asyncio.TimeoutError:
+            waited = time.monotonic() - waiter.enqueued_at
+            if self._withdraw(model_name, waiter):
+                self.stats["timeouts"] += 1
+                generation_metrics.increment("generation_queue_timeouts_total")
+                logger.warning(
+                    "Generation queue timeout",
+                    model_name=model_name,
+                    request_type=request_type,
+                    user_tier=user_tier,
+                    waited_seconds=round(waited, 3),
+                )
+                raise QueueTimeoutError(model_name, request_type, waited)
+        except asyncio.CancelledError:
+            if not self._withdraw(model_name, waiter):
+                self.release(model_name)
+            raise
+
+        waited = time.monotonic() - waiter.enqueued_at
+        generation_metrics.increment("generation_queue_wait_seconds_total", waited)
+        return waited
+
+    def release(self, model_name: str) -> None:
+        """Free a slot and hand it to the highest-priority waiter."""
+        queue = self._queue(model_name)
+        queue.active -= 1
+        while queue.waiters and queue.active < queue.limit:
+            _, _, waiter = heapq.heappop(queue.waiters)
+            if waiter.future.done():
+                continue
+            queue.active += 1
+            self.stats["granted"] += 1
+            waiter.future.set_result(None)
+        self._publish()
+
+    def _withdraw(self, model_name: str, waiter: _Waiter) -> bool:
+        """
+        Drop a waiter that gave up. Returns False if it was granted a slot
+        just before giving up; the caller then owns that slot.
+        """
+        if waiter.future.done():
+            return False
+        waiter.future.cancel()
+        queue = self._queue(model_name)
+        queue.waiters = [entry for entry in queue.waiters if entry[2] is not waiter]
+        heapq.heapify(queue.waiters)
+        self._publish()
+        return True
+
+    def _queue(self, model_name: str) -> _ModelQueue:
+        queue = self._queues.get(model_name)
+        if queue is None:
+            limit = self.model_concurrency.get(model_name, self.concurrency)
+            queue = self._queues[model_name] = _ModelQueue(max(1, limit))
+        return queue
+
+    def queue_depth(self, model_name: Optional[str] = None) -> int:
+        queues = [self._queue(model_name)] if model_name else self._queues.values()
+        return sum(sum(queue.depth().values()) for queue in queues)
+
+    def _publish(self) -> None:
+        generation_metrics.set_gauge(
+            "generation_queue_depth",
+            {name: queue.depth() for name, queue in self._queues.items()},
+        )
+        generation_metrics.set_gauge(
+            "generation_active",
+            {name: queue.active for name, queue in self._queues.items()},
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "concurrency": self.concurrency,
+            "models": {
+                name: {
+                    "active": queue.active,
+                    "limit": queue.limit,
+                    "queued": queue.depth(),
+                }
+                for name, queue in self._queues.items()
+            },
+        }
+
+
+__all__ = ["GenerationScheduler", "QueueTimeoutError"]
@@ -0,0 +1,140 @@
+"""
+SingleFlight - Coalesces identical concurrent generations into one.
+Concurrent callers with the same key share one in-flight task or token stream.
+"""
+
+import asyncio
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class _Flight:
+    """One in-flight generation and the callers waiting on it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.key: Optional[str] = None
+        self.subscribers = 0
+
+
+class _StreamFlight(_Flight):
+    """One in-flight stream; chunks are kept so late subscribers replay from the start."""
+
+    def __init__(self):
+        super().__init__(None)
+        self.chunks: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: Any = None, finished: bool = False, error: Optional[BaseException] = None):
+        if chunk is not None:
+            self.chunks.append(chunk)
+        if finished:
+            self.finished = True
+            self.error = error
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """
+    Shares one execution among concurrent callers with the same key.
+
+    The work runs in its own task, so a caller that gives up does not cancel
+    it for the others; it is cancelled only when the last caller leaves. The
+    key is forgotten as soon as the work finishes, so this coalesces bursts
+    and never serves stale results.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.stats = {"leaders": 0, "coalesced": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def is_in_flight(self, key: str) -> bool:
+        return key in self._flights
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Return ``(result, shared)``; ``shared`` is True for callers that
+        joined a generation another caller started.
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.create_task(factory()))
+            self._register(key, flight)
+        else:
+            self.stats["coalesced"] += 1
+
+        flight.subscribers += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            self._leave(flight)
+
+    async def stream(
+        self, key: str, factory: Callable[[], AsyncGenerator[Any, None]]
+    ) -> AsyncGenerator[Any, None]:
+        """Yield the shared stream for key, starting it if nobody else has."""
+        flight = self._flights.get(key)
+        if not isinstance(flight, _StreamFlight):
+            flight = _StreamFlight()
+            flight.task = asyncio.create_task(self._pump(flight, factory))
+            self._register(key, flight)
+        else:
+            self.stats["coalesced"] += 1
+
+        flight.subscribers += 1
+        try:
+            position = 0
+            while True:
+                changed = flight._changed
+                while position < len(flight.chunks):
+                    yield flight.chunks[position]
+                    position += 1
+                if flight.finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await changed.wait()
+        finally:
+            self._leave(flight)
+
+    async def _pump(self, flight: _StreamFlight, factory: Callable[[], AsyncGenerator[Any, None]]):
+        try:
+            async for chunk in factory():
+                flight.publish(chunk)
+        except asyncio.CancelledError:
+            flight.publish(finished=True, error=asyncio.CancelledError())
+            raise
+        except Exception as e:
+            flight.publish(finished=True, error=e)
+            return
+        flight.publish(finished=True)
+
+    def _register(self, key: str, flight: _Flight):
+        self.stats["leaders"] += 1
+        flight.key = key
+        self._flights[key] = flight
+        flight.task.add_done_callback(lambda _task: self._forget(flight))
+
+    def _forget(self, flight: _Flight):
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def _leave(self, flight: _Flight):
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.task.done():
+            # Nobody is waiting any more; stop generating, and let the next caller start afresh
+            self._forget(flight)
+            flight.task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": self.in_flight}
+
+
+__all__ = ["SingleFlight"]
@@ -0,0 +1,237 @@
+"""
+TokenBudgeter - Token accounting for prompts and replies.
+Counts prompt tokens with the model family's tokenizer, trims chat history and
+plain prompts to the context window and sizes num_predict from what is left.
+"""
+
+import collections
+import math
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import MODEL_CONTEXT_WINDOWS
+from app.core.logging import get_logger
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    # Token counts fall back to per-family character estimates
+    Tokenizer = None
+
+logger = get_logger("models.token_budget")
+
+# Average characters per token by model family, for estimates without a tokenizer
+CHARS_PER_TOKEN = {
+    "llama3": 4.0,
+    "qwen2.5": 4.0,
+    "deepseek-llm": 3.8,
+    "phi3": 3.5,
+    "mistral": 3.5,
+    "tinyllama": 3.5,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# Chat template tokens around each message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Stands in for the middle of a plain prompt that was cut to fit the window
+PROMPT_CUT_MARKER = "\n...\n"
+
+
+@dataclass
+class TokenBudget:
+    """How a generation request fits its model's context window."""
+
+    prompt_tokens: int
+    num_predict: int
+    num_ctx: int
+    fits: bool = True
+
+
+class TokenBudgeter:
+    """
+    Token accounting for generation requests.
+
+    Counts come from a ``tokenizers`` tokenizer loaded from
+    ``tokenizer_dir/<family>.json`` when one is available, otherwise from a
+    per-family characters-per-token estimate padded by ``safety_margin``.
+    Counts are cached per (family, text), so system prompts, templates and
+    earlier turns that recur every request are only tokenized once.
+    """
+
+    def __init__(
+        self,
+        tokenizer_dir: Optional[str] = None,
+        context_windows: Optional[Dict[str, int]] = None,
+        default_context_window: int = 4096,
+        min_output_tokens: int = 64,
+        safety_margin: float = 0.1,
+        cache_size: int = 4096,
+    ):
+        self.tokenizer_dir = tokenizer_dir
+        self.context_windows = context_windows or MODEL_CONTEXT_WINDOWS
+        self.default_context_window = default_context_window
+        self.min_output_tokens = min_output_tokens
+        self.safety_margin = safety_margin
+        self.cache_size = cache_size
+        self._tokenizers: Dict[str, Any] = {}
+        self._counts: "collections.OrderedDict[tuple, int]" = collections.OrderedDict()
+        self.stats = {"counted": 0, "cache_hits": 0, "trimmed_requests": 0, "overflows": 0}
+
+    @staticmethod
+    def family(model_name: str) -> str:
+        return model_name.split(":")[0]
+
+    def context_window(self, model_name: str) -> int:
+        return self.context_windows.get(model_name, self.default_context_window)
+
+    def count(self, text: str, model_name: str) -> int:
+        """Tokens in ``text`` for ``model_name``'s tokenizer."""
+        if not text:
+            return 0
+        family = self.family(model_name)
+        key = (family, text)
+        cached = self._counts.get(key)
+        if cached is not None:
+            self._counts.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return cached
+
+        tokens = self._count_uncached(text, family)
+        self.stats["counted"] += 1
+        self._counts[key] = tokens
+        if len(self._counts) > self.cache_size:
+            self._counts.popitem(last=False)
+        return tokens
+
+    def _count_uncached(self, text: str, family: str) -> int:
+        tokenizer = self._get_tokenizer(family)
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False).ids)
+        chars_per_token = CHARS_PER_TOKEN.get(family, DEFAULT_CHARS_PER_TOKEN)
+        return math.ceil(round(len(text) / chars_per_token * (1 + self.safety_margin), 6))
+
+    def count_messages(self, messages: List[Dict[str, str]], model_name: str) -> int:
+        return sum(
+            self.count(message.get("content", ""), model_name) + MESSAGE_OVERHEAD_TOKENS
+            for message in messages
+        )
+
+    def output_reserve(self, model_name: str, desired: int) -> int:
+        """Reply space to keep free when fitting a prompt: at most a quarter of the window."""
+        return max(self.min_output_tokens, min(desired, self.context_window(model_name) // 4))
+
+    def fit_messages(
+        self, messages: List[Dict[str, str]], model_name: str, desired_output: int
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Drop the oldest history turns until the prompt leaves room for the
+        reply. The system message and the final user message are always
+        kept. Returns the messages to send and how many were dropped.
+        """
+        limit = self.context_window(model_name) - self.output_reserve(model_name, desired_output)
+        head = messages[:1] if messages and messages[0].get("role") == "system" else []
+        tail = messages[-1:]
+        history = messages[len(head):-1] if len(messages) > len(head) else []
+
+        dropped = 0
+        while history and self.count_messages(head + history + tail, model_name) > limit:
+            # Drop a whole exchange so the history still starts with a user turn
+            step = 2 if len(history) > 1 and history[0].get("role") == "user" else 1
+            history = history[step:]
+            dropped += step
+
+        if dropped:
+            self.stats["trimmed_requests"] += 1
+        return head + history + tail, dropped
+
+    def fit_prompt(self, prompt: str, model_name: str, desired_output: int) -> Tuple[str, int]:
+        """
+        Cut the middle out of a plain prompt that would crowd the reply out
+        of the context window, keeping its head (instructions) and its tail
+        (the question). Returns the prompt to send and how many tokens were
+        cut.
+        """
+        limit = self.context_window(model_name) - self.output_reserve(model_name, desired_output)
+        tokens = self.count(prompt, model_name)
+        if tokens <= limit:
+            return prompt, 0
+
+        family = self.family(model_name)
+
+        def cut(keep: int) -> str:
+            head = keep // 2
+            return prompt[:head] + PROMPT_CUT_MARKER + prompt[len(prompt) - (keep - head):]
+
+        # Longest head + tail that fits; the candidates are not cached
+        low, high = 0, len(prompt) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._count_uncached(cut(middle), family) <= limit:
+                low = middle
+            else:
+                high = middle - 1
+
+        fitted = cut(low)
+        self.stats["trimmed_requests"] += 1
+        return fitted, tokens - self._count_uncached(fitted, family)
+
+    def plan(
+        self,
+        model_name: str,
+        desired_output: int,
+        prompt: str = "",
+        messages: Optional[List[Dict[str, str]]] = None,
+    ) -> TokenBudget:
+        """
+        Size a request: num_predict is the task's desired reply length,
+        capped by what the context window has left after the prompt.
+        """
+        window = self.context_window(model_name)
+        prompt_tokens = (
+            self.count_messages(messages, model_name)
+            if messages is not None
+            else self.count(prompt, model_name)
+        )
+        remaining = window - prompt_tokens
+        fits = remaining >= self.min_output_tokens
+        if not fits:
+            self.stats["overflows"] += 1
+            logger.warning(
+                "Prompt leaves no room for a reply in the context window",
+                model_name=model_name,
+                prompt_tokens=prompt_tokens,
+                context_window=window,
+            )
+        return TokenBudget(
+            prompt_tokens=prompt_tokens,
+            num_predict=max(self.min_output_tokens, min(desired_output, remaining)),
+            num_ctx=window,
+            fits=fits,
+        )
+
+    def _get_tokenizer(self, family: str):
+        if family in self._tokenizers:
+            return self._tokenizers[family]
+        tokenizer = None
+        if Tokenizer is not None and self.tokenizer_dir:
+            path = os.path.join(self.tokenizer_dir, f"{family}.json")
+            if os.path.exists(path):
+                try:
+                    tokenizer = Tokenizer.from_file(path)
+                    logger.info("Loaded tokenizer", family=family, path=path)
+                except Exception as e:
+                    logger.warning("Tokenizer could not be loaded", family=family, error=str(e))
+        self._tokenizers[family] = tokenizer
+        return tokenizer
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "cached_counts": len(self._counts),
+            "tokenizers": sorted(name for name, tok in self._tokenizers.items() if tok is not None),
+        }
+
+
+__all__ = ["TokenBudget", "TokenBudgeter"]
@@ -0,0 +1,44 @@
+"""
+Generation Metrics - In-process counters and gauges for LLM generation.
+Exposed under "generation" by the /metrics endpoint.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+
+
+class GenerationMetrics:
+    """Thread-safe counters and gauges for generation behaviour."""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: Any) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0.0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"counters": dict(self._counters), "gauges": dict(self._gauges)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+
+# Global instance shared by the API, graphs and model clients
+generation_metrics = GenerationMetrics()
+
+__all__ = ["GenerationMetrics", "generation_metrics"]
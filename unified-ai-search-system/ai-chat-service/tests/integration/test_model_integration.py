@@ -155,32 +155,30 @@ class TestOllamaClient:
     @pytest.mark.asyncio
     async def test_generation_with_retry(self):
         """Test generation with retry logic."""
-        client = OllamaClient(max_retries=2, retry_delay=0.1)
-
-        # Mock request that fails twice then succeeds
+        # Connection failures twice, then success, through the real retry loop
         call_count = 0
 
-        async def mock_make_request(*args, **kwargs):
+        def handler(request):
             nonlocal call_count
             call_count += 1
             if call_count <= 2:
-                raise httpx.ConnectError("Temporary failure")
-            return {
+                raise httpx.ConnectError("Temporary failure", request=request)
+            return httpx.Response(200, json={
                 "response": "Success after retries",
                 "total_duration": 1000000000,  # 1 second in nanoseconds
                 "eval_count": 5,
-            }
+            })
 
-        with patch.object(
-            client,
-            "_make_request",
-            side_effect=mock_make_request
-        ):
+        client = OllamaClient(base_url="http://ollama.test", max_retries=2, retry_delay=0.01)
+        client.client_config["transport"] = httpx.MockTransport(handler)
+        try:
             result = await client.generate("test:model", "test prompt")
+        finally:
+            await client.close()
 
-            assert result.success is True
-            assert result.text == "Success after retries"
-            assert call_count == 3
+        assert result.success is True
+        assert result.text == "Success after retries"
+        assert call_count == 3
 
 
 class TestModelManager:
@@ -0,0 +1,97 @@
+"""
+Test chat-format prompts with stable prefixes for Ollama KV-cache reuse
+"""
+
+import json
+
+import httpx
+import pytest
+
+from app.graphs.base import GraphState
+from app.graphs.chat_graph import ResponseGeneratorNode
+from app.models.ollama_client import OllamaClient
+
+
+def _turns(count):
+    return [
+        {"user_message": f"question {index}", "assistant_response": f"answer {index}"}
+        for index in range(count)
+    ]
+
+
+def _state(history, query, intent="question"):
+    return GraphState(
+        original_query=query, conversation_history=history, query_intent=intent
+    )
+
+
+def test_follow_up_turn_extends_the_previous_prompt():
+    node = ResponseGeneratorNode(model_manager=None)
+    first = node._build_messages(_state(_turns(2), "question 2", intent="code"))
+    second = node._build_messages(_state(_turns(3), "question 3", intent="analysis"))
+
+    # Everything before the current query is unchanged, whatever the new intent
+    assert second[: len(first) - 1] == first[:-1]
+    assert second[0] == {"role": "system", "content": node.BASE_INSTRUCTION}
+    assert second[-3:-1] == [
+        {"role": "user", "content": "question 2"},
+        {"role": "assistant", "content": "answer 2"},
+    ]
+    assert second[-1]["role"] == "user" and second[-1]["content"].endswith("question 3")
+
+
+def test_history_window_advances_in_steps():
+    node = ResponseGeneratorNode(model_manager=None)
+    window = node.HISTORY_WINDOW
+
+    sizes = [len(node._history_messages(_state(_turns(count), "next"))) for count in range(1, 16)]
+    starts = [
+        node._history_messages(_state(_turns(count), "next"))[0]["content"]
+        for count in range(1, 16)
+    ]
+
+    assert max(sizes) < 2 * window
+    # The oldest message kept changes only every HISTORY_WINDOW messages
+    assert len(set(starts)) == (2 * 15) // window
+
+
+def test_role_content_history_is_accepted():
+    node = ResponseGeneratorNode(model_manager=None)
+    history = [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+        {"role": "tool", "content": "ignored"},
+    ]
+    messages = node._build_messages(_state(history, "how are you?"))
+
+    assert [message["role"] for message in messages] == ["system", "user", "assistant", "user"]
+
+
+@pytest.mark.asyncio
+async def test_client_sends_messages_to_chat_endpoint():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(
+            200,
+            json={
+                "message": {"role": "assistant", "content": "Hi!"},
+                "done": True,
+                "prompt_eval_count": 4,
+                "prompt_eval_duration": 2_000_000,
+                "eval_count": 2,
+                "total_duration": 10_000_000,
+            },
+        )
+
+    client = OllamaClient(base_url="http://ollama.test")
+    client.client_config["transport"] = httpx.MockTransport(handler)
+    messages = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Hello"}]
+    result = await client.generate("phi3:mini", "", messages=messages)
+
+    assert result.success and result.text == "Hi!"
+    assert requests[0].url.path == "/api/chat"
+    assert json.loads(requests[0].content)["messages"] == messages
+    assert result.metadata["prompt_eval_count"] == 4
+    assert result.metadata["prompt_eval_duration"] == pytest.approx(0.002)
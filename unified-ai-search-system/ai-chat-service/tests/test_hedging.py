@@ -0,0 +1,134 @@
+"""
+Test hedged streaming onto the fast model tier
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.model_router import ModelRouter
+from app.models.ollama_client import StreamingChunk
+from app.models.token_budget import TokenBudgeter
+
+
+class DelayedStreamManager:
+    """Streams two tokens per model after a per-model first-token delay."""
+
+    def __init__(self, first_token_delays):
+        self.first_token_delays = first_token_delays
+        self.started = []
+        self.closed = []
+        self.kwargs = {}
+
+    async def generate_stream(self, model_name, **kwargs):
+        self.started.append(model_name)
+        self.kwargs[model_name] = kwargs
+        try:
+            await asyncio.sleep(self.first_token_delays[model_name])
+            yield StreamingChunk(text=f"{model_name}-1 ")
+            yield StreamingChunk(text=f"{model_name}-2")
+            yield StreamingChunk(text="", done=True)
+        finally:
+            self.closed.append(model_name)
+
+
+async def _collect(router, manager, model_name="phi3:mini", **kwargs):
+    stream = router.generate_stream_hedged(manager, model_name=model_name, **kwargs)
+    return [chunk async for chunk in stream]
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    router = ModelRouter(hedging=True, default_hedge_delay=0.2, min_hedge_delay=0.01)
+    manager = DelayedStreamManager({"phi3:mini": 0.0, "qwen2.5:0.5b": 0.0})
+
+    chunks = await _collect(router, manager)
+
+    assert manager.started == ["phi3:mini"]
+    assert "".join(chunk.text for chunk in chunks) == "phi3:mini-1 phi3:mini-2"
+    assert router.hedge_stats["hedged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_the_loser_cancelled():
+    router = ModelRouter(hedging=True, default_hedge_delay=0.05, min_hedge_delay=0.01, max_hedge_rate=1.0)
+    manager = DelayedStreamManager({"phi3:mini": 5.0, "qwen2.5:0.5b": 0.01})
+
+    chunks = await asyncio.wait_for(_collect(router, manager), timeout=2.0)
+
+    assert manager.started == ["phi3:mini", "qwen2.5:0.5b"]
+    assert "".join(chunk.text for chunk in chunks) == "qwen2.5:0.5b-1 qwen2.5:0.5b-2"
+    assert {chunk.model for chunk in chunks} == {"qwen2.5:0.5b"}
+    # The primary's stream was closed, which closes its Ollama request
+    assert "phi3:mini" in manager.closed
+    assert router.hedge_stats["fallback_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lost_primary_records_no_first_token_latency():
+    router = ModelRouter(hedging=True, default_hedge_delay=0.05, min_hedge_delay=0.01, max_hedge_rate=1.0)
+    manager = DelayedStreamManager({"phi3:mini": 5.0, "qwen2.5:0.5b": 0.01})
+
+    await asyncio.wait_for(_collect(router, manager), timeout=2.0)
+
+    # The primary's wait was cut short by the hedge, so it is not a latency sample
+    assert list(router._first_token_latencies["phi3:mini"]) == []
+    assert len(router._first_token_latencies["qwen2.5:0.5b"]) == 1
+    assert router._first_token_latencies["qwen2.5:0.5b"][0] < 1.0
+
+
+@pytest.mark.asyncio
+async def test_unhedged_streams_record_first_token_latency():
+    router = ModelRouter(hedging=False)
+    manager = DelayedStreamManager({"phi3:mini": 0.02})
+
+    await _collect(router, manager)
+
+    latencies = list(router._first_token_latencies["phi3:mini"])
+    assert len(latencies) == 1
+    assert latencies[0] >= 0.02
+
+
+@pytest.mark.asyncio
+async def test_fallback_gets_history_fitted_to_its_own_window():
+    router = ModelRouter(hedging=True, default_hedge_delay=0.05, min_hedge_delay=0.01, max_hedge_rate=1.0)
+    manager = DelayedStreamManager({"phi3:mini": 5.0, "qwen2.5:0.5b": 0.01})
+    manager.token_budget = TokenBudgeter(
+        context_windows={"phi3:mini": 4096, "qwen2.5:0.5b": 256}, min_output_tokens=16
+    )
+    turn = "x" * 200
+    messages = [{"role": "system", "content": "Be helpful."}]
+    messages += [{"role": "user", "content": turn}, {"role": "assistant", "content": turn}] * 4
+    messages += [{"role": "user", "content": "latest question"}]
+
+    await asyncio.wait_for(_collect(router, manager, messages=messages, max_tokens=64), timeout=2.0)
+
+    assert manager.kwargs["phi3:mini"]["messages"] == messages
+    fitted = manager.kwargs["qwen2.5:0.5b"]["messages"]
+    assert fitted[0] == messages[0] and fitted[-1] == messages[-1]
+    assert len(fitted) < len(messages)
+    assert manager.token_budget.count_messages(fitted, "qwen2.5:0.5b") <= 256 - 64
+
+
+@pytest.mark.asyncio
+async def test_hedge_rate_is_capped():
+    router = ModelRouter(hedging=True, default_hedge_delay=0.01, min_hedge_delay=0.01, max_hedge_rate=0.5)
+    manager = DelayedStreamManager({"phi3:mini": 0.03, "qwen2.5:0.5b": 1.0})
+
+    for _ in range(4):
+        await _collect(router, manager)
+
+    assert router.hedge_stats["hedged"] == 2
+    assert router.hedge_stats["capped"] == 2
+    assert router.hedge_rate() == 0.5
+
+
+def test_hedge_delay_tracks_first_token_percentile():
+    router = ModelRouter(hedging=True, hedge_percentile=90, default_hedge_delay=2.0, min_hedge_delay=0.0)
+    assert router.hedge_delay("phi3:mini") == 2.0
+
+    for latency in range(1, 101):
+        router.record_first_token("phi3:mini", latency / 100)
+
+    assert router.hedge_delay("phi3:mini") == pytest.approx(0.9, abs=0.011)
+    assert router.fallback_model_for("qwen2.5:0.5b") is None
@@ -0,0 +1,151 @@
+"""
+Test VRAM residency management against a stand-in Ollama HTTP server
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.memory_manager import BYTES_PER_GB, A5000MemoryManager
+from app.models.ollama_client import OllamaClient
+
+MODEL_SIZES_GB = {"phi3:mini": 2.5, "llama3:8b": 8.0, "mistral:7b": 7.0, "tinyllama:latest": 1.0}
+
+
+class StandInOllama(ThreadingHTTPServer):
+    """Serves /api/ps and the load/unload forms of /api/generate."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.resident = {}
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        assert self.path == "/api/ps"
+        self._reply(
+            {
+                "models": [
+                    {"name": name, "size": size, "size_vram": size, "keep_alive": keep_alive}
+                    for name, (size, keep_alive) in self.server.resident.items()
+                ]
+            }
+        )
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        if body.get("keep_alive") == 0:
+            self.server.resident.pop(body["model"], None)
+            self._reply({"model": body["model"], "done_reason": "unload", "done": True})
+            return
+        size = int(MODEL_SIZES_GB[body["model"]] * BYTES_PER_GB)
+        self.server.resident[body["model"]] = (size, body.get("keep_alive"))
+        self._reply({"model": body["model"], "done": True, "load_duration": 1_000_000})
+
+
+@pytest.fixture
+def ollama():
+    server = StandInOllama()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _manager(server, available_gb=12.0):
+    manager = A5000MemoryManager(
+        ollama_client=OllamaClient(base_url=server.url, max_retries=0), residency_ttl=0.0
+    )
+    manager.config = {**manager.config, "available_vram_gb": available_gb}
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_residency_and_sizes_come_from_ollama(ollama):
+    ollama.resident["llama3:8b"] = (int(8 * BYTES_PER_GB), "10m")
+    manager = _manager(ollama)
+
+    await manager.refresh_residency(force=True)
+    assert manager.get_memory_stats()["loaded_models"]["llama3:8b"]["memory_gb"] == 8.0
+
+    # Ollama expired it on its own
+    ollama.resident.clear()
+    await manager.refresh_residency(force=True)
+    assert manager.current_usage_gb == 0.0
+    assert manager.stats["expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_loads_with_tier_keep_alive_and_evicts_through_ollama(ollama):
+    manager = _manager(ollama)
+
+    assert await manager.ensure_model_loaded("phi3:mini")
+    assert await manager.ensure_model_loaded("llama3:8b")
+    assert ollama.resident["phi3:mini"][1] == -1  # T0 stays pinned
+    assert ollama.resident["llama3:8b"][1] == "10m"
+    # Warm-up loads use the context window generations will ask for
+    assert ollama.requests[0]["options"] == {"num_ctx": manager.token_budget.context_window("phi3:mini")}
+
+    # mistral:7b does not fit next to both; the T2 model is evicted, not the T0 one
+    assert await manager.ensure_model_loaded("mistral:7b")
+    assert set(ollama.resident) == {"phi3:mini", "mistral:7b"}
+    assert {"model": "llama3:8b", "keep_alive": 0, "stream": False} in ollama.requests
+    assert manager.current_usage_gb == pytest.approx(9.5)
+    assert manager.stats["cold_loads"] == 3
+
+    # Already resident: no request reaches Ollama
+    sent = len(ollama.requests)
+    assert await manager.ensure_model_loaded("phi3:mini")
+    assert len(ollama.requests) == sent
+
+
+@pytest.mark.asyncio
+async def test_prefetches_recent_traffic_into_free_memory_only(ollama):
+    manager = _manager(ollama, available_gb=9.5)
+    for model_name in ["llama3:8b", "llama3:8b", "phi3:mini", "mistral:7b"]:
+        manager.record_request(model_name)
+
+    prefetched = await manager.prefetch()
+
+    # The two most requested models are candidates; phi3:mini no longer fits
+    # next to llama3:8b, and prefetching never evicts to make room
+    assert prefetched == ["llama3:8b"]
+    assert set(ollama.resident) == {"llama3:8b"}
+
+
+@pytest.mark.asyncio
+async def test_cold_load_respects_deadline_and_circuit_breaker(ollama):
+    manager = _manager(ollama)
+
+    # A deadline that already passed gives up before contacting Ollama
+    assert not await manager.ensure_model_loaded("phi3:mini", deadline=time.monotonic() - 1)
+    assert ollama.requests == []
+
+    # While the model's breaker is open the load fails fast as well
+    breaker = manager.ollama_client._get_breaker("llama3:8b")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert not await manager.ensure_model_loaded("llama3:8b")
+    assert ollama.requests == []
+    assert manager.loaded_models["llama3:8b"].status == "error"
@@ -0,0 +1,127 @@
+"""
+Test deadline-aware retries and per-model circuit breakers for Ollama calls
+"""
+
+import time
+
+import httpx
+import pytest
+
+from app.models.ollama_client import OllamaClient
+from app.models.resilience import CircuitBreaker, CircuitState, RetryPolicy
+
+
+def _client(handler, **kwargs):
+    client = OllamaClient(base_url="http://ollama.test", retry_delay=0.01, **kwargs)
+    client.client_config["transport"] = httpx.MockTransport(handler)
+    return client
+
+
+def _ok(request):
+    return httpx.Response(200, json={"response": "hello", "eval_count": 1, "total_duration": 1})
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker("phi3:mini", failure_threshold=2, recovery_timeout=0.05)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    # One probe is admitted, concurrent ones are not
+    assert breaker.allow_request()
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.stats["opened"] == 2
+
+
+def test_retry_policy_respects_attempts_and_deadline():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=1.0)
+
+    assert policy.next_delay(3, None) is None
+    assert 0 <= policy.next_delay(1, None) <= 0.5
+    # No retry whose backoff could outlive the deadline
+    assert policy.next_delay(1, time.monotonic() - 0.001) is None
+
+
+@pytest.mark.asyncio
+async def test_retries_server_errors_then_succeeds():
+    responses = [httpx.Response(503, text="loading"), httpx.Response(500, text="oops")]
+
+    def handler(request):
+        return responses.pop(0) if responses else _ok(request)
+
+    client = _client(handler, max_retries=3)
+    result = await client.generate("phi3:mini", "hi")
+
+    assert result.success
+    assert result.text == "hello"
+    assert client.get_circuit_states()["phi3:mini"]["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried_or_counted():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(404, text="model not found")
+
+    client = _client(handler, max_retries=3, circuit_failure_threshold=1)
+    result = await client.generate("missing:model", "hi")
+
+    assert not result.success
+    assert len(calls) == 1
+    assert client.get_circuit_states()["missing:model"]["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_deadline():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503, text="busy")
+
+    client = _client(handler, max_retries=50, max_retry_delay=0.02)
+    start = time.monotonic()
+    result = await client.generate("phi3:mini", "hi", deadline=start + 0.1)
+
+    assert not result.success
+    assert time.monotonic() - start < 0.5
+    assert 1 < len(calls) < 50
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast_without_calling_ollama():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("connection refused")
+
+    client = _client(handler, max_retries=0, circuit_failure_threshold=2)
+    for _ in range(2):
+        assert not (await client.generate("phi3:mini", "hi")).success
+    assert len(calls) == 2
+
+    result = await client.generate("phi3:mini", "hi")
+    chunks = [chunk async for chunk in client.generate_stream("phi3:mini", "hi")]
+
+    assert len(calls) == 2
+    assert "Circuit open" in result.error
+    assert chunks[-1].done and "Circuit open" in chunks[-1].error
+    # Other models keep their own breaker
+    assert client.get_circuit_states()["phi3:mini"]["state"] == "open"
+    assert "llama3:8b" not in client.get_circuit_states()
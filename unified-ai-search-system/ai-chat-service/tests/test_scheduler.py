@@ -0,0 +1,107 @@
+"""
+Test per-model generation scheduling: concurrency caps, priority, queue timeouts
+"""
+
+import asyncio
+
+import pytest
+
+from app.models.manager import ModelInfo, ModelManager
+from app.models.ollama_client import ModelResult, ModelStatus
+from app.models.scheduler import GenerationScheduler, QueueTimeoutError
+from app.monitoring.generation_metrics import generation_metrics
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped_per_model():
+    scheduler = GenerationScheduler(concurrency=2)
+    running = []
+    peak = 0
+    release = asyncio.Event()
+
+    async def job(model):
+        nonlocal peak
+        async with scheduler.slot(model):
+            running.append(model)
+            peak = max(peak, running.count("phi3:mini"))
+            await release.wait()
+            running.remove(model)
+
+    tasks = [asyncio.create_task(job("phi3:mini")) for _ in range(5)]
+    tasks.append(asyncio.create_task(job("llama3:8b")))
+    await asyncio.sleep(0.01)
+
+    assert running.count("phi3:mini") == 2
+    assert "llama3:8b" in running
+    assert scheduler.queue_depth("phi3:mini") == 3
+    assert generation_metrics.snapshot()["gauges"]["generation_queue_depth"]["phi3:mini"] == {
+        "interactive": 3
+    }
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert peak == 2
+    assert scheduler.get_stats()["models"]["phi3:mini"]["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_and_higher_tiers_are_served_first():
+    scheduler = GenerationScheduler(concurrency=1)
+    order = []
+    await scheduler.acquire("phi3:mini")
+
+    async def job(name, request_type, tier):
+        async with scheduler.slot("phi3:mini", request_type, tier):
+            order.append(name)
+
+    tasks = [
+        asyncio.create_task(job("shadow", "shadow", "enterprise")),
+        asyncio.create_task(job("warming", "cache_warming", "free")),
+        asyncio.create_task(job("free-chat", "interactive", "free")),
+        asyncio.create_task(job("pro-chat", "interactive", "pro")),
+    ]
+    await asyncio.sleep(0.01)
+    scheduler.release("phi3:mini")
+    await asyncio.gather(*tasks)
+
+    assert order == ["pro-chat", "free-chat", "warming", "shadow"]
+
+
+@pytest.mark.asyncio
+async def test_waiting_past_max_queue_time_fails_and_frees_the_place():
+    scheduler = GenerationScheduler(concurrency=1, max_queue_seconds={"shadow": 0.02})
+    await scheduler.acquire("phi3:mini")
+
+    with pytest.raises(QueueTimeoutError):
+        await scheduler.acquire("phi3:mini", request_type="shadow")
+
+    assert scheduler.queue_depth() == 0
+    scheduler.release("phi3:mini")
+    assert await scheduler.acquire("phi3:mini") == 0.0
+
+
+class SlowOllamaClient:
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    async def generate(self, model_name, prompt, **kwargs):
+        await self.release.wait()
+        return ModelResult(success=True, text=prompt, model_used=model_name)
+
+
+@pytest.mark.asyncio
+async def test_manager_reports_queue_timeout_as_failed_result():
+    manager = ModelManager()
+    manager.is_initialized = True
+    manager.models = {"phi3:mini": ModelInfo(name="phi3:mini", status=ModelStatus.READY)}
+    manager.ollama_client = SlowOllamaClient()
+    manager.scheduler = GenerationScheduler(concurrency=1, max_queue_seconds={"evaluation": 0.02})
+
+    busy = asyncio.create_task(manager.generate("first", model_name="phi3:mini"))
+    await asyncio.sleep(0)
+    result = await manager.generate("second", model_name="phi3:mini", request_type="evaluation")
+
+    assert not result.success
+    assert result.metadata["queue_timeout"]
+    manager.ollama_client.release.set()
+    assert (await busy).success
@@ -0,0 +1,122 @@
+"""
+Test single-flight coalescing of identical concurrent generations
+"""
+
+import asyncio
+
+import pytest
+
+from app.models.manager import ModelInfo, ModelManager
+from app.models.ollama_client import ModelResult, ModelStatus, StreamingChunk
+from app.models.single_flight import SingleFlight
+
+
+class CountingOllamaClient:
+    def __init__(self):
+        self.generate_calls = 0
+        self.stream_calls = 0
+        self.release = asyncio.Event()
+
+    async def generate(self, model_name, prompt, **kwargs):
+        self.generate_calls += 1
+        await self.release.wait()
+        return ModelResult(success=True, text=f"answer to {prompt}", model_used=model_name)
+
+    async def generate_stream(self, model_name, prompt, **kwargs):
+        self.stream_calls += 1
+        for token in ["one ", "two ", "three"]:
+            await self.release.wait()
+            yield StreamingChunk(text=token)
+        yield StreamingChunk(text="", done=True)
+
+
+def _manager():
+    manager = ModelManager()
+    manager.is_initialized = True
+    manager.models = {"phi3:mini": ModelInfo(name="phi3:mini", status=ModelStatus.READY)}
+    manager.ollama_client = CountingOllamaClient()
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_generations_share_one_call():
+    manager = _manager()
+    calls = [
+        asyncio.create_task(manager.generate("same question", model_name="phi3:mini", max_tokens=50))
+        for _ in range(5)
+    ]
+    other = asyncio.create_task(
+        manager.generate("same question", model_name="phi3:mini", max_tokens=50, temperature=0.1)
+    )
+    await asyncio.sleep(0)
+    manager.ollama_client.release.set()
+    results = await asyncio.gather(*calls, other)
+
+    # Different sampling parameters are a different generation
+    assert manager.ollama_client.generate_calls == 2
+    assert {result.text for result in results} == {"answer to same question"}
+    assert sum(1 for result in results if (result.metadata or {}).get("coalesced")) == 4
+    assert manager.single_flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_generations_of_different_priority_are_not_coalesced():
+    manager = _manager()
+    calls = [
+        asyncio.create_task(manager.generate("same question", model_name="phi3:mini", user_tier="enterprise")),
+        asyncio.create_task(manager.generate("same question", model_name="phi3:mini", user_tier="free")),
+        asyncio.create_task(
+            manager.generate("same question", model_name="phi3:mini", request_type="cache_warming")
+        ),
+    ]
+    await asyncio.sleep(0)
+    manager.ollama_client.release.set()
+    results = await asyncio.gather(*calls)
+
+    # Each caller keeps its own queue position instead of riding another's slot
+    assert manager.ollama_client.generate_calls == 3
+    assert not any((result.metadata or {}).get("coalesced") for result in results)
+
+
+@pytest.mark.asyncio
+async def test_streaming_subscribers_share_the_token_stream():
+    manager = _manager()
+
+    async def collect():
+        return [chunk.text async for chunk in manager.generate_stream("tell me", model_name="phi3:mini")]
+
+    first = asyncio.create_task(collect())
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(collect())
+    await asyncio.sleep(0)
+    manager.ollama_client.release.set()
+
+    assert await first == await second == ["one ", "two ", "three", ""]
+    assert manager.ollama_client.stream_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_work_is_cancelled_only_when_the_last_caller_leaves():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def work():
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    first = asyncio.create_task(flight.do("key", work))
+    second = asyncio.create_task(flight.do("key", work))
+    await started.wait()
+
+    first.cancel()
+    await asyncio.sleep(0)
+    assert not cancelled.is_set()
+
+    second.cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1.0)
+    assert not flight.is_in_flight("key")
@@ -0,0 +1,161 @@
+"""
+Test end-to-end token streaming through the chat graph
+"""
+
+import asyncio
+
+import pytest
+
+from app.api.chat import _drain_token_queue
+from app.graphs.base import GraphState
+from app.graphs.chat_graph import ResponseGeneratorNode
+from app.models.manager import ModelManager
+from app.models.ollama_client import StreamingChunk
+
+
+class FakeOllamaClient:
+    def __init__(self, tokens, release: asyncio.Event = None):
+        self.tokens = tokens
+        self.release = release
+
+    async def health_check(self):
+        return True
+
+    async def generate_stream(self, model_name, prompt, **kwargs):
+        for index, token in enumerate(self.tokens):
+            if index == 1 and self.release is not None:
+                # Hold the rest of the answer until the test has seen the first token
+                await self.release.wait()
+            yield StreamingChunk(text=token)
+        yield StreamingChunk(text="", done=True, eval_count=len(self.tokens))
+
+
+def _streaming_manager(tokens, release=None):
+    manager = ModelManager()
+    manager.is_initialized = True
+    manager.ollama_client = FakeOllamaClient(tokens, release)
+    manager.select_optimal_model = lambda task_type, quality: "phi3:mini"
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_response_generator_forwards_tokens_as_they_arrive():
+    """The first token reaches the queue before generation finishes"""
+    release = asyncio.Event()
+    node = ResponseGeneratorNode(_streaming_manager(["  Hello", " there", "!  "], release))
+    state = GraphState(original_query="Say hello", token_queue=asyncio.Queue())
+
+    task = asyncio.create_task(node.execute(state))
+    first = await asyncio.wait_for(state.token_queue.get(), timeout=1.0)
+    assert first == "  Hello"
+    assert not task.done()
+
+    release.set()
+    result = await task
+
+    assert result.success
+    assert [state.token_queue.get_nowait() for _ in range(2)] == [" there", "!  "]
+    # Post-processing runs on the accumulated text
+    assert state.final_response == "Hello there!"
+
+
+class HedgingRouter:
+    """Answers every stream from the fast tier, as a hedge that won would."""
+
+    async def generate_stream_hedged(self, model_manager, model_name, **kwargs):
+        for token in ["fast ", "answer"]:
+            yield StreamingChunk(text=token, model="qwen2.5:0.5b")
+        yield StreamingChunk(text="", done=True, model="qwen2.5:0.5b")
+
+
+@pytest.mark.asyncio
+async def test_streaming_model_reports_the_model_that_answered():
+    node = ResponseGeneratorNode(_streaming_manager([]), HedgingRouter())
+    state = GraphState(original_query="Say hello", token_queue=asyncio.Queue())
+
+    result = await node.execute(state)
+
+    assert result.success
+    assert state.streaming_model == "qwen2.5:0.5b"
+    assert state.final_response == "fast answer"
+
+
+@pytest.mark.asyncio
+async def test_model_manager_stream_updates_usage_stats():
+    manager = _streaming_manager(["a", "b"])
+    chunks = [chunk async for chunk in manager.generate_stream("prompt", model_name="phi3:mini")]
+
+    assert "".join(chunk.text for chunk in chunks) == "ab"
+    assert chunks[-1].done
+    assert manager.usage_stats["phi3:mini"] == 1
+
+
+@pytest.mark.asyncio
+async def test_drain_token_queue_stops_with_producer():
+    queue = asyncio.Queue()
+
+    async def producer():
+        await queue.put("one")
+        await asyncio.sleep(0.01)
+        await queue.put("two")
+        queue.put_nowait("three")
+        return "done"
+
+    task = asyncio.create_task(producer())
+    tokens = [token async for token in _drain_token_queue(queue, task)]
+
+    assert tokens == ["one", "two", "three"]
+    assert task.result() == "done"
+
+
+class HangingOllamaClient(FakeOllamaClient):
+    """Streams one token, then waits until cancelled; records the stream closing."""
+
+    def __init__(self):
+        super().__init__(["partial"])
+        self.closed = False
+
+    async def generate_stream(self, model_name, prompt, **kwargs):
+        try:
+            yield StreamingChunk(text="partial")
+            await asyncio.Event().wait()
+        finally:
+            self.closed = True
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after: int):
+        self.polls = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self.polls += 1
+        return self.polls > self.disconnect_after
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_graph_and_closes_ollama_stream():
+    """Cancellation travels through safe_graph_execute into the Ollama stream"""
+    from app.api.chat import _cancel_on_disconnect
+    from app.core.async_utils import safe_graph_execute
+    from app.graphs.chat_graph import ChatGraph
+    from app.monitoring.generation_metrics import generation_metrics
+
+    manager = _streaming_manager([])
+    ollama = HangingOllamaClient()
+    manager.ollama_client = ollama
+    state = GraphState(original_query="tell me a long story", token_queue=asyncio.Queue())
+    wasted_before = generation_metrics.get("generation_wasted_chunks_total")
+    disconnects_before = generation_metrics.get("chat_stream_client_disconnects_total")
+
+    graph_task = asyncio.create_task(safe_graph_execute(ChatGraph(manager), state, timeout=30.0))
+    assert await asyncio.wait_for(state.token_queue.get(), timeout=5.0) == "partial"
+
+    cancelled = await _cancel_on_disconnect(FakeRequest(disconnect_after=1), graph_task, poll_interval=0.01)
+    with pytest.raises(asyncio.CancelledError):
+        await graph_task
+
+    assert cancelled
+    assert ollama.closed
+    assert generation_metrics.get("generation_wasted_chunks_total") == wasted_before + 1
+    assert generation_metrics.get("chat_stream_client_disconnects_total") == disconnects_before + 1
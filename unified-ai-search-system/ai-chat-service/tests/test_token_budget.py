@@ -0,0 +1,135 @@
+"""
+Test prompt token budgeting against model context windows
+"""
+
+import pytest
+
+from app.models.manager import ModelInfo, ModelManager
+from app.models.ollama_client import ModelResult, ModelStatus
+from app.models.token_budget import TokenBudgeter
+
+
+class CountingTokenizer:
+    """Stand-in tokenizer: one token per word."""
+
+    class Encoding:
+        def __init__(self, ids):
+            self.ids = ids
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, add_special_tokens=False):
+        self.calls += 1
+        return self.Encoding(text.split())
+
+
+class RecordingClient:
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, **kwargs):
+        self.calls.append(kwargs)
+        return ModelResult(success=True, text="ok", model_used=kwargs["model_name"])
+
+
+def _budgeter(window=200):
+    budgeter = TokenBudgeter(context_windows={"phi3:mini": window}, min_output_tokens=16)
+    budgeter._tokenizers["phi3"] = CountingTokenizer()
+    return budgeter
+
+
+def _conversation(turns, words_per_message=20):
+    text = " ".join(["word"] * words_per_message)
+    messages = [{"role": "system", "content": "Be helpful."}]
+    for _ in range(turns):
+        messages += [{"role": "user", "content": text}, {"role": "assistant", "content": text}]
+    return messages + [{"role": "user", "content": "latest question"}]
+
+
+def test_counts_are_cached_per_text():
+    budgeter = _budgeter()
+    tokenizer = budgeter._tokenizers["phi3"]
+
+    assert budgeter.count("one two three", "phi3:mini") == 3
+    assert budgeter.count("one two three", "phi3:mini") == 3
+    assert tokenizer.calls == 1
+    assert budgeter.stats["cache_hits"] == 1
+
+
+def test_heuristic_count_without_tokenizer_is_conservative():
+    budgeter = TokenBudgeter()
+    text = "x" * 400
+
+    # 400 chars at 4 chars/token for llama3, padded by the safety margin
+    assert budgeter.count(text, "llama3:8b") == 110
+    assert budgeter.count(text, "phi3:mini") > budgeter.count(text, "llama3:8b")
+
+
+def test_oldest_turns_are_dropped_and_system_and_query_kept():
+    budgeter = _budgeter(window=200)
+    messages = _conversation(turns=5)
+
+    fitted, dropped = budgeter.fit_messages(messages, "phi3:mini", desired_output=50)
+
+    assert dropped % 2 == 0 and dropped > 0
+    assert fitted[0] == messages[0] and fitted[-1] == messages[-1]
+    assert fitted[1:-1] == messages[1 + dropped : -1]
+    assert budgeter.count_messages(fitted, "phi3:mini") <= 200 - 50
+
+
+def test_num_predict_is_clipped_to_the_remaining_window():
+    budgeter = _budgeter(window=200)
+
+    roomy = budgeter.plan("phi3:mini", 100, prompt="short prompt")
+    assert roomy.num_predict == 100 and roomy.num_ctx == 200
+
+    tight = budgeter.plan("phi3:mini", 100, prompt=" ".join(["word"] * 150))
+    assert tight.num_predict == 50 and tight.fits
+
+    overflow = budgeter.plan("phi3:mini", 100, prompt=" ".join(["word"] * 195))
+    assert overflow.num_predict == 16 and not overflow.fits
+
+
+@pytest.mark.asyncio
+async def test_manager_sends_budgeted_num_predict_and_num_ctx():
+    manager = ModelManager()
+    manager.is_initialized = True
+    manager.models = {"phi3:mini": ModelInfo(name="phi3:mini", status=ModelStatus.READY)}
+    manager.ollama_client = RecordingClient()
+    manager.token_budget = _budgeter(window=200)
+
+    result = await manager.generate(
+        " ".join(["word"] * 150), model_name="phi3:mini", max_tokens=1000
+    )
+
+    assert result.success
+    call = manager.ollama_client.calls[0]
+    assert call["max_tokens"] == 50
+    assert call["num_ctx"] == 200
+
+
+def test_plain_prompt_is_cut_in_the_middle_to_fit():
+    budgeter = _budgeter(window=200)
+    prompt = "instructions " + " ".join(["filler"] * 300) + " question?"
+
+    fitted, cut = budgeter.fit_prompt(prompt, "phi3:mini", desired_output=50)
+
+    assert cut > 0
+    assert fitted.startswith("instructions ") and fitted.endswith(" question?")
+    assert budgeter.count(fitted, "phi3:mini") <= 200 - 50
+    assert budgeter.fit_prompt("short prompt", "phi3:mini", desired_output=50) == ("short prompt", 0)
+
+
+@pytest.mark.asyncio
+async def test_manager_cuts_plain_prompts_that_overflow_the_window():
+    manager = ModelManager()
+    manager.is_initialized = True
+    manager.models = {"phi3:mini": ModelInfo(name="phi3:mini", status=ModelStatus.READY)}
+    manager.ollama_client = RecordingClient()
+    manager.token_budget = _budgeter(window=200)
+
+    await manager.generate(" ".join(["word"] * 400), model_name="phi3:mini", max_tokens=50)
+
+    call = manager.ollama_client.calls[0]
+    assert manager.token_budget.count(call["prompt"], "phi3:mini") + call["max_tokens"] <= 200
@@ -1,5 +1,6 @@
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 import time
@@ -7,8 +8,9 @@ import traceback
 from datetime import datetime, timezone
 
 from app.search.ultra_fast_engine import UltraFastSearchEngine, SearchResult
+from app.search.collections import CollectionManager
 from app.validation.validators import SearchRequest, IndexBuildRequest, HealthCheckResponse, MetricsResponse, ErrorResponse
-from app.error_handling.exceptions import SearchSystemException, handle_and_log_error, ErrorHandler
+from app.error_handling.exceptions import SearchSystemException, AdmissionRejectedException, handle_and_log_error, ErrorHandler
 from app.monitoring.health import HealthChecker
 from app.monitoring.metrics import metrics
 from app.logger import get_enhanced_logger, log_performance
@@ -22,19 +24,32 @@ error_handler = ErrorHandler(logger)
 # This will be set on application startup
 search_engine: Optional[UltraFastSearchEngine] = None
 health_checker: Optional[HealthChecker] = None
+collection_manager: Optional[CollectionManager] = None
 
 class SearchRequest(BaseModel):
     query: str = Field(..., description="Search query")
     num_results: int = Field(10, ge=1, le=100, description="Number of results to return")
     filters: Optional[Dict] = Field(None, description="Search filters")
+    facets: Optional[List[str]] = Field(None, description="Facets to count over every document passing the filters: skills, seniority_level, experience_band")
+    collapse_duplicates: bool = Field(False, description="Return only the best match of each near-duplicate group")
 
 class SearchResponse(BaseModel):
     success: bool
     results: List[Dict]
     total_found: int
     response_time_ms: float
+    facets: Optional[Dict[str, List[Dict]]] = None
     debug_info: Optional[Dict] = None
 
+def _admission_rejected(error: AdmissionRejectedException) -> HTTPException:
+    """Map an admission-control rejection to 429/503 with a Retry-After hint."""
+    metrics.increment_counter('search_requests_rejected_total', labels={'status': str(error.status_code)})
+    return HTTPException(
+        status_code=error.status_code,
+        detail=error.to_dict(),
+        headers={'Retry-After': str(error.retry_after)}
+    )
+
 @router.post("/search/ultra-fast", response_model=SearchResponse)
 @log_performance("search_request")
 async def ultra_fast_search(request: SearchRequest):
@@ -54,10 +69,12 @@ async def ultra_fast_search(request: SearchRequest):
         # Increment search counter
         metrics.increment_counter('search_requests_total')
         
-        results = await search_engine.search(
+        results, facets = await search_engine.search_with_facets(
             query=request.query,
             num_results=request.num_results,
-            filters=request.filters.dict() if request.filters else None
+            filters=request.filters,
+            facet_fields=request.facets,
+            collapse_duplicates=request.collapse_duplicates
         )
         response_time = (time.time() - start_time) * 1000
         
@@ -79,7 +96,8 @@ async def ultra_fast_search(request: SearchRequest):
             "success": True,
             "results": formatted_results,
             "total_found": len(results),
-            "response_time_ms": response_time
+            "response_time_ms": response_time,
+            "facets": facets
         }
         
         # Add debug information if requested
@@ -97,6 +115,9 @@ async def ultra_fast_search(request: SearchRequest):
         
         return SearchResponse(**response_data)
         
+    except AdmissionRejectedException as e:
+        raise _admission_rejected(e)
+    
     except SearchSystemException as e:
         metrics.increment_counter('search_errors_total', labels={'error_type': e.error_code.value})
         logger.error("Search system error", extra_fields=e.details)
@@ -107,6 +128,32 @@ async def ultra_fast_search(request: SearchRequest):
         metrics.increment_counter('search_errors_total', labels={'error_type': 'internal'})
         raise HTTPException(status_code=500, detail=handled_error.to_dict())
 
+@router.get("/suggest")
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100, description="Prefix typed so far"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+    kinds: Optional[List[str]] = Query(None, description="Restrict to skill, name and/or title")
+):
+    """Type-ahead suggestions for skills, names and titles."""
+    if search_engine is None:
+        raise HTTPException(status_code=503, detail="Search engine not initialized.")
+    
+    start_time = time.perf_counter()
+    try:
+        # Served straight from the in-memory prefix index; never queued behind searches
+        suggestions = search_engine.suggestion_index.suggest(q, limit=limit, kinds=kinds)
+        response_time = (time.perf_counter() - start_time) * 1000
+        metrics.record_histogram('suggest_response_time_ms', response_time)
+        
+        return {
+            "prefix": q,
+            "suggestions": suggestions,
+            "response_time_ms": response_time
+        }
+    except Exception as e:
+        handled_error = handle_and_log_error(e, logger, "suggest")
+        raise HTTPException(status_code=500, detail=handled_error.to_dict())
+
 @router.get("/search/performance", response_model=MetricsResponse)
 async def get_search_performance():
     """Get detailed search performance metrics."""
@@ -133,17 +180,26 @@ async def get_search_performance():
         handled_error = handle_and_log_error(e, logger, "performance metrics")
         raise HTTPException(status_code=500, detail=handled_error.to_dict())
 
+def _get_health_checker() -> HealthChecker:
+    """Return the shared health checker, starting its refresh loops if needed."""
+    global health_checker
+    if health_checker is None:
+        # Create health checker if not available
+        health_checker = HealthChecker(search_engine)
+    if not health_checker.refreshing:
+        health_checker.start_background_refresh()
+    return health_checker
+
 @router.get("/health", response_model=HealthCheckResponse)
 async def health_check():
-    """Comprehensive health check endpoint."""
-    global health_checker
+    """Comprehensive health check endpoint, served from the background-refreshed snapshot."""
     try:
-        if health_checker is None:
-            # Create health checker if not available
-            health_checker = HealthChecker(search_engine)
+        checker = _get_health_checker()
+        if not checker.has_snapshot:
+            # Nothing cached yet: run the checks once rather than report placeholders
+            return HealthCheckResponse(**await checker.check_all_health())
         
-        health_data = await health_checker.check_all_health()
-        return HealthCheckResponse(**health_data)
+        return HealthCheckResponse(**checker.get_cached_health())
     
     except Exception as e:
         # Even if health check fails, return what we can
@@ -158,12 +214,8 @@ async def health_check():
 @router.get("/health/quick")
 async def quick_health_check():
     """Quick health check for load balancers."""
-    global health_checker
     try:
-        if health_checker is None:
-            health_checker = HealthChecker(search_engine)
-        
-        return health_checker.get_quick_health()
+        return _get_health_checker().get_quick_health()
     
     except Exception:
         return {"status": "unhealthy", "timestamp": datetime.now(timezone.utc).isoformat()}
@@ -176,6 +228,11 @@ async def get_metrics():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Expose all metrics in the Prometheus text format for scrapers."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @router.post("/admin/build-indexes")
 @log_performance("build_indexes")
 async def build_indexes_endpoint(request: IndexBuildRequest, background_tasks: BackgroundTasks):
@@ -310,3 +367,129 @@ async def get_incremental_stats():
     except Exception as e:
         handled_error = handle_and_log_error(e, logger, "incremental stats")
         raise HTTPException(status_code=500, detail=handled_error.to_dict())
+
+# Collection endpoints
+@router.get("/collections")
+async def list_collections():
+    """List known collections with their residency, memory and QPS."""
+    if collection_manager is None:
+        raise HTTPException(status_code=503, detail="Collections not available")
+    
+    try:
+        return collection_manager.get_stats()
+    except Exception as e:
+        handled_error = handle_and_log_error(e, logger, "list collections")
+        raise HTTPException(status_code=500, detail=handled_error.to_dict())
+
+@router.get("/collections/{collection}/stats")
+async def get_collection_stats(collection: str):
+    """Get memory and QPS metrics for a single collection."""
+    if collection_manager is None:
+        raise HTTPException(status_code=503, detail="Collections not available")
+    
+    try:
+        if not collection_manager.exists(collection):
+            raise HTTPException(status_code=404, detail=f"Collection {collection} not found")
+        
+        return collection_manager.get_collection_stats(collection)
+    except HTTPException:
+        raise
+    except SearchSystemException as e:
+        raise HTTPException(status_code=400, detail=e.to_dict())
+    except Exception as e:
+        handled_error = handle_and_log_error(e, logger, "collection stats")
+        raise HTTPException(status_code=500, detail=handled_error.to_dict())
+
+@router.post("/collections/{collection}/search", response_model=SearchResponse)
+@log_performance("collection_search_request")
+async def collection_search(collection: str, request: SearchRequest):
+    """Search a named collection, loading it from disk on first use."""
+    if collection_manager is None:
+        raise HTTPException(status_code=503, detail="Collections not available")
+    
+    start_time = time.time()
+    try:
+        if not collection_manager.exists(collection):
+            raise HTTPException(status_code=404, detail=f"Collection {collection} not found")
+        
+        results, facets = await collection_manager.search(
+            collection,
+            query=request.query,
+            num_results=request.num_results,
+            filters=request.filters,
+            facet_fields=request.facets,
+            collapse_duplicates=request.collapse_duplicates
+        )
+        response_time = (time.time() - start_time) * 1000
+        metrics.record_histogram('search_response_time_ms', response_time, labels={'collection': collection})
+        
+        return SearchResponse(
+            success=True,
+            results=[{
+                "doc_id": r.doc_id,
+                "similarity_score": r.similarity_score,
+                "bm25_score": r.bm25_score,
+                "combined_score": r.combined_score,
+                **r.metadata
+            } for r in results],
+            total_found=len(results),
+            response_time_ms=response_time,
+            facets=facets
+        )
+    
+    except HTTPException:
+        raise
+    except AdmissionRejectedException as e:
+        raise _admission_rejected(e)
+    except SearchSystemException as e:
+        metrics.increment_counter('search_errors_total', labels={'error_type': e.error_code.value})
+        raise HTTPException(status_code=400, detail=e.to_dict())
+    except Exception as e:
+        handled_error = handle_and_log_error(e, logger, "collection search")
+        raise HTTPException(status_code=500, detail=handled_error.to_dict())
+
+@router.post("/collections/{collection}/documents")
+async def add_collection_documents(collection: str, documents: List[Dict]):
+    """Queue documents for incremental indexing into a named collection."""
+    if collection_manager is None:
+        raise HTTPException(status_code=503, detail="Collections not available")
+    
+    try:
+        from app.validation.validators import validate_document_structure
+        from app.indexing.incremental import ChangeType
+        
+        engine = await collection_manager.get(collection)
+        valid_docs = 0
+        for doc in documents:
+            if validate_document_structure(doc):
+                engine.incremental_manager.add_document_change(doc['id'], ChangeType.ADD, doc)
+                valid_docs += 1
+            else:
+                logger.warning(f"Invalid document structure for doc_id: {doc.get('id', 'unknown')}")
+        
+        return {"message": f"Added {valid_docs} documents to collection {collection} update queue"}
+    
+    except SearchSystemException as e:
+        raise HTTPException(status_code=400, detail=e.to_dict())
+    except Exception as e:
+        handled_error = handle_and_log_error(e, logger, "add collection documents")
+        raise HTTPException(status_code=500, detail=handled_error.to_dict())
+
+@router.delete("/collections/{collection}/documents/{doc_id}")
+async def delete_collection_document(collection: str, doc_id: str):
+    """Queue a document deletion in a named collection."""
+    if collection_manager is None:
+        raise HTTPException(status_code=503, detail="Collections not available")
+    
+    try:
+        from app.indexing.incremental import ChangeType
+        
+        engine = await collection_manager.get(collection)
+        engine.incremental_manager.add_document_change(doc_id, ChangeType.DELETE)
+        return {"message": f"Document {doc_id} queued for deletion from collection {collection}"}
+    
+    except SearchSystemException as e:
+        raise HTTPException(status_code=400, detail=e.to_dict())
+    except Exception as e:
+        handled_error = handle_and_log_error(e, logger, "delete collection document")
+        raise HTTPException(status_code=500, detail=handled_error.to_dict())
@@ -1,5 +1,6 @@
 
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -9,6 +10,29 @@ class Settings(BaseSettings):
     # Use Fly.io volume for persistent storage in production, fallback to temp directories
     index_path: str = os.getenv("INDEX_PATH", "/app/data/indexes" if os.getenv("PYTHON_ENV") == "production" else "./indexes")
     data_path: str = os.getenv("UPLOAD_PATH", "/app/data/uploads" if os.getenv("PYTHON_ENV") == "production" else "./data")
+    # Search result cache; set SEARCH_CACHE_REDIS_URL to share hits across replicas
+    search_cache_size: int = int(os.getenv("SEARCH_CACHE_SIZE", "1000"))
+    search_cache_ttl_seconds: float = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+    search_cache_redis_url: Optional[str] = os.getenv("SEARCH_CACHE_REDIS_URL")
+    # Named collections live under <index_path>/collections/<name>
+    collections_memory_budget_mb: int = int(os.getenv("COLLECTIONS_MEMORY_BUDGET_MB", "1024"))
+    # Search admission control; requests projected to wait longer than the target are rejected
+    search_max_concurrency: int = int(os.getenv("SEARCH_MAX_CONCURRENCY", str(os.cpu_count() or 4)))
+    search_max_queue_size: int = int(os.getenv("SEARCH_MAX_QUEUE_SIZE", "64"))
+    search_target_queue_ms: float = float(os.getenv("SEARCH_TARGET_QUEUE_MS", "250"))
+    # Near-duplicate documents above the MinHash Jaccard threshold become aliases of a canonical document
+    dedup_enabled: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    dedup_jaccard_threshold: float = float(os.getenv("DEDUP_JACCARD_THRESHOLD", "0.9"))
+    # Index aliases anyway and only group them, so searches can choose to collapse them
+    dedup_index_duplicates: bool = os.getenv("DEDUP_INDEX_DUPLICATES", "false").lower() == "true"
+    # Optional cross-encoder reranking of the top blended RAG candidates on CPU
+    rerank_enabled: bool = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    rerank_model_name: str = os.getenv("RERANK_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    rerank_backend: str = os.getenv("RERANK_BACKEND", "torch")  # torch or onnx
+    rerank_onnx_path: Optional[str] = os.getenv("RERANK_ONNX_PATH")
+    rerank_top_n: int = int(os.getenv("RERANK_TOP_N", "20"))
+    rerank_batch_size: int = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+    rerank_budget_ms: float = float(os.getenv("RERANK_BUDGET_MS", "150"))
 
     class Config:
         env_file = ".env"
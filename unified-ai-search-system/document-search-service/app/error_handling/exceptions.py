@@ -97,6 +97,17 @@ class ResourceExhaustedException(SearchSystemException):
             details['current_usage'] = current_usage
         super().__init__(message, ErrorCode.RESOURCE_EXHAUSTED, details)
 
+class AdmissionRejectedException(SearchSystemException):
+    """Exception for requests turned away by admission control."""
+    
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = 1, queue_depth: Optional[int] = None):
+        details = {'retry_after_seconds': retry_after}
+        if queue_depth is not None:
+            details['queue_depth'] = queue_depth
+        super().__init__(message, ErrorCode.RESOURCE_EXHAUSTED, details)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
 def safe_execute(func, *args, default_return=None, error_logger=None, **kwargs):
     """Safely execute a function with comprehensive error handling."""
     try:
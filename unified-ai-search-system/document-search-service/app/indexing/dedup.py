@@ -0,0 +1,226 @@
+"""Near-duplicate detection over LSH MinHash signatures."""
+
+import collections
+import dataclasses
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+class NearDuplicateDetector:
+    """
+    Groups near-identical documents under one canonical document.
+
+    A new document's MinHash signature is looked up in the LSH band buckets;
+    any candidate whose estimated Jaccard similarity reaches ``threshold`` is
+    a duplicate, and the document becomes an alias of that candidate's
+    canonical document. With ``index_duplicates`` off, aliases are not
+    embedded or indexed at all; their source documents are kept here so one
+    can be promoted if the canonical document is deleted. With it on, aliases
+    are indexed as usual and only grouped, so searches can collapse them.
+
+    Incremental batches mutate a ``clone`` that is published together with
+    the index batch, so a failed batch leaves the live groups untouched;
+    searches only do single-key lookups on whichever detector is current.
+    """
+
+    def __init__(self, threshold: float = 0.9, index_duplicates: bool = False):
+        self.threshold = threshold
+        self.index_duplicates = index_duplicates
+        # alias id -> canonical id
+        self.canonical_of: Dict[str, str] = {}
+        # canonical id -> alias ids, in registration order
+        self.aliases: Dict[str, List[str]] = {}
+        # Source documents of aliases that were not indexed
+        self.alias_documents: Dict[str, Dict[str, Any]] = {}
+        self.stats = {'checked': 0, 'duplicates': 0, 'promoted': 0, 'released': 0}
+
+    def canonical_id(self, doc_id: str) -> str:
+        return self.canonical_of.get(doc_id, doc_id)
+
+    def clone(self) -> 'NearDuplicateDetector':
+        """Independent copy for a write batch to mutate."""
+        clone = NearDuplicateDetector(self.threshold, self.index_duplicates)
+        clone.load_state(self.to_state())
+        clone.stats = dict(self.stats)
+        return clone
+
+    def find_duplicate(self, signature: np.ndarray, *lsh_indexes,
+                       exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """
+        Return ``(canonical id, similarity)`` of the closest document at or
+        above the threshold across ``lsh_indexes``, or None.
+        """
+        self.stats['checked'] += 1
+        skip = {exclude} if exclude is not None else set()
+        return self._closest(signature, [(lsh_index, skip) for lsh_index in lsh_indexes])
+
+    def _closest(self, signature: np.ndarray,
+                 searches: List[Tuple[Any, Set[str]]]) -> Optional[Tuple[str, float]]:
+        best: Optional[Tuple[str, float]] = None
+        for lsh_index, skip in searches:
+            for doc_id in lsh_index.candidates_for_signature(signature):
+                if doc_id in skip:
+                    continue
+                similarity = lsh_index.signature_similarity(signature, lsh_index.signatures[doc_id])
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (self.canonical_id(doc_id), similarity)
+        return best
+
+    def partition(self, lsh_index, documents: List[Dict[str, Any]],
+                  features_fn: Callable[[Dict[str, Any]], List[str]]) -> List[Dict[str, Any]]:
+        """
+        Register near-duplicates among ``documents`` and return the ones to
+        index. Documents are checked against ``lsh_index`` and against those
+        accepted earlier in the same call.
+
+        Updates to indexed documents keep their group, but each alias is
+        re-checked against the new content. Aliases that no longer match are
+        released; unindexed ones are then checked like new documents, so they
+        are indexed or join another group.
+        """
+        pending = lsh_index.empty_like()
+        # Indexed documents whose signature in lsh_index predates this call
+        updated: Set[str] = set()
+        to_index = []
+        queue = collections.deque(documents)
+        while queue:
+            document = queue.popleft()
+            doc_id = document['id']
+            signature = lsh_index.compute_signature(features_fn(document))
+            if doc_id in lsh_index.signatures and doc_id not in self.canonical_of:
+                updated.add(doc_id)
+                pending.add_signature(doc_id, signature)
+                queue.extend(self._release_aliases(lsh_index, doc_id, signature, features_fn))
+                to_index.append(document)
+                continue
+
+            self.remove_alias(doc_id)
+            self.stats['checked'] += 1
+            match = self._closest(signature, [(lsh_index, updated | {doc_id}), (pending, {doc_id})])
+            if match is not None:
+                self.add_alias(doc_id, match[0], document)
+                if not self.index_duplicates:
+                    continue
+            pending.add_signature(doc_id, signature)
+            to_index.append(document)
+        return to_index
+
+    def _release_aliases(self, lsh_index, canonical_id: str, signature: np.ndarray,
+                         features_fn: Callable[[Dict[str, Any]], List[str]]) -> List[Dict[str, Any]]:
+        """
+        Unlink the aliases of ``canonical_id`` that no longer match its new
+        ``signature``; returns the source documents of the unindexed ones.
+        """
+        released = []
+        for alias_id in list(self.aliases.get(canonical_id, ())):
+            document = self.alias_documents.get(alias_id)
+            if document is not None:
+                alias_signature = lsh_index.compute_signature(features_fn(document))
+            elif alias_id in lsh_index.signatures:
+                alias_signature = lsh_index.signatures[alias_id]
+            else:
+                continue
+            if lsh_index.signature_similarity(signature, alias_signature) >= self.threshold:
+                continue
+            self.remove_alias(alias_id)
+            self.stats['released'] += 1
+            if document is not None:
+                released.append(document)
+        return released
+
+    def add_alias(self, alias_id: str, canonical_id: str, document: Optional[Dict[str, Any]] = None):
+        canonical_id = self.canonical_id(canonical_id)
+        if alias_id == canonical_id or self.canonical_of.get(alias_id) == canonical_id:
+            return
+        self.remove_alias(alias_id)
+        self.canonical_of[alias_id] = canonical_id
+        self.aliases.setdefault(canonical_id, []).append(alias_id)
+        if document is not None and not self.index_duplicates:
+            self.alias_documents[alias_id] = document
+        self.stats['duplicates'] += 1
+
+    def remove_alias(self, alias_id: str) -> bool:
+        canonical_id = self.canonical_of.pop(alias_id, None)
+        if canonical_id is None:
+            return False
+        members = self.aliases.get(canonical_id, [])
+        if alias_id in members:
+            members.remove(alias_id)
+        if not members:
+            self.aliases.pop(canonical_id, None)
+        self.alias_documents.pop(alias_id, None)
+        return True
+
+    def remove_canonical(self, canonical_id: str) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Forget a deleted canonical document. Its first alias becomes the new
+        canonical for the rest; returns ``(promoted id, source document)`` so
+        the caller can index it, the document being None if it is already
+        indexed.
+        """
+        members = self.aliases.pop(canonical_id, None)
+        if not members:
+            return None
+        promoted = members[0]
+        del self.canonical_of[promoted]
+        document = self.alias_documents.pop(promoted, None)
+        if len(members) > 1:
+            self.aliases[promoted] = members[1:]
+            for alias_id in members[1:]:
+                self.canonical_of[alias_id] = promoted
+        self.stats['promoted'] += 1
+        return promoted, document
+
+    def collapse(self, results: List[Any]) -> List[Any]:
+        """
+        Keep the best-scoring result per duplicate group, in input order.
+
+        Kept results are copies whose metadata lists the group's other
+        members under ``duplicate_ids``; the indexed metadata is not touched.
+        """
+        kept: Dict[str, int] = {}
+        collapsed: Dict[str, Set[str]] = {}
+        output = []
+        for result in results:
+            group = self.canonical_id(result.doc_id)
+            if group in kept:
+                collapsed[group].add(result.doc_id)
+                continue
+            kept[group] = len(output)
+            collapsed[group] = set()
+            output.append(result)
+
+        for group, position in kept.items():
+            members = set(self.aliases.get(group, ())) | {group} | collapsed[group]
+            members.discard(output[position].doc_id)
+            if members:
+                result = output[position]
+                output[position] = dataclasses.replace(
+                    result, metadata={**result.metadata, 'duplicate_ids': sorted(members)}
+                )
+        return output
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'aliases': {canonical: list(members) for canonical, members in self.aliases.items()},
+            'alias_documents': dict(self.alias_documents)
+        }
+
+    def load_state(self, state: Optional[Dict[str, Any]]):
+        self.canonical_of = {}
+        self.aliases = {}
+        self.alias_documents = dict((state or {}).get('alias_documents', {}))
+        for canonical, members in (state or {}).get('aliases', {}).items():
+            self.aliases[canonical] = list(members)
+            for alias_id in members:
+                self.canonical_of[alias_id] = canonical
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'threshold': self.threshold,
+            'index_duplicates': self.index_duplicates,
+            'canonical_documents': len(self.aliases),
+            'aliases': len(self.canonical_of)
+        }
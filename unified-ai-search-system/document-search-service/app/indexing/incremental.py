@@ -11,6 +11,8 @@ from collections import deque
 import threading
 from datetime import datetime, timezone
 
+from app.indexing.snapshot import IndexWriteBatch
+
 class ChangeType(str, Enum):
     ADD = "add"
     UPDATE = "update"
@@ -23,6 +25,7 @@ class DocumentChange:
     change_type: ChangeType
     document: Optional[Dict[str, Any]] = None
     timestamp: float = None
+    attempts: int = 0
     
     def __post_init__(self):
         if self.timestamp is None:
@@ -31,10 +34,13 @@ class DocumentChange:
 class IncrementalIndexManager:
     """Manages incremental updates to search indexes."""
     
-    def __init__(self, search_engine, batch_size: int = 50, max_queue_size: int = 1000):
+    def __init__(self, search_engine, batch_size: int = 50, max_queue_size: int = 1000,
+                 max_attempts: int = 3):
         self.search_engine = search_engine
         self.batch_size = batch_size
         self.max_queue_size = max_queue_size
+        # Failed batches are requeued until each change has been tried this many times
+        self.max_attempts = max_attempts
         
         # Change tracking
         self.change_queue: deque = deque(maxlen=max_queue_size)
@@ -52,7 +58,8 @@ class IncrementalIndexManager:
             'successful_updates': 0,
             'failed_updates': 0,
             'last_update_time': None,
-            'queue_size': 0
+            'queue_size': 0,
+            'snapshot_epoch': 0
         }
         
         # Enable incremental updates
@@ -103,10 +110,16 @@ class IncrementalIndexManager:
     
     async def force_process_pending_changes(self) -> Dict[str, Any]:
         """Force processing of all pending changes immediately."""
-        if not self.pending_changes:
+        with self.processing_lock:
+            changes_to_process = list(self.pending_changes.values())
+            self.pending_changes.clear()
+            self.change_queue.clear()
+            self.stats['queue_size'] = 0
+        
+        if not changes_to_process:
             return {'processed': 0, 'errors': 0}
         
-        return await self._process_change_batch(list(self.pending_changes.values()))
+        return await self._process_change_batch(changes_to_process)
     
     async def _background_processor(self):
         """Background task to process incremental updates."""
@@ -159,165 +172,143 @@ class IncrementalIndexManager:
             self.is_processing = False
     
     async def _process_change_batch(self, changes: List[DocumentChange]) -> Dict[str, Any]:
-        """Process a batch of document changes."""
+        """
+        Apply a batch of document changes and publish them as one snapshot epoch.
+
+        The batch is built, embedded and saved in the default executor so
+        searches on the event loop keep running; the write lock is held only
+        to publish. Duplicate groups are changed on the batch's own detector
+        clone, published with the snapshot. If another writer published
+        first, the batch is rebuilt on the newer generation. Any failure
+        discards the whole batch, detector clone included, and requeues its
+        changes.
+        """
         if not changes:
             return {'processed': 0, 'errors': 0}
         
-        processed = 0
-        errors = 0
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                base = self.search_engine.snapshot
+                detector = getattr(self.search_engine, 'duplicate_detector', None)
+                batch = await loop.run_in_executor(None, base.begin_write, detector)
+                processed = await loop.run_in_executor(None, self._apply_changes, changes, batch)
+                
+                async with self.search_engine.write_lock:
+                    if self.search_engine.snapshot is not base:
+                        continue
+                    snapshot = batch.freeze(self.search_engine.next_snapshot_epoch())
+                    if batch.duplicate_detector is not None:
+                        self.search_engine.duplicate_detector = batch.duplicate_detector
+                    self.search_engine.publish_snapshot(snapshot, changed_doc_ids=batch.changed_docs)
+                    self.stats['snapshot_epoch'] = snapshot.epoch
+                break
+        except Exception as e:
+            if hasattr(self.search_engine, 'logger'):
+                self.search_engine.logger.error(f"Batch processing failed, requeueing {len(changes)} changes: {str(e)}")
+            self._requeue(changes)
+            self.stats['failed_updates'] += len(changes)
+            return {'processed': 0, 'errors': len(changes)}
         
-        # Group changes by type for efficient processing
-        adds = [c for c in changes if c.change_type == ChangeType.ADD]
-        updates = [c for c in changes if c.change_type == ChangeType.UPDATE]
-        deletes = [c for c in changes if c.change_type == ChangeType.DELETE]
+        # Update statistics
+        self.stats['total_changes_processed'] += processed
+        self.stats['successful_updates'] += processed
+        self.stats['last_update_time'] = datetime.now(timezone.utc).isoformat()
         
         try:
-            # Process deletions first
-            for change in deletes:
-                try:
-                    await self._delete_document(change.doc_id)
-                    processed += 1
-                except Exception as e:
-                    errors += 1
-                    if hasattr(self.search_engine, 'logger'):
-                        self.search_engine.logger.error(f"Failed to delete document {change.doc_id}: {str(e)}")
-            
-            # Process additions and updates together (they're handled similarly)
-            add_update_docs = []
-            for change in adds + updates:
-                if change.document:
-                    add_update_docs.append(change.document)
-            
-            if add_update_docs:
-                try:
-                    await self._add_update_documents(add_update_docs)
-                    processed += len(add_update_docs)
-                except Exception as e:
-                    errors += len(add_update_docs)
-                    if hasattr(self.search_engine, 'logger'):
-                        self.search_engine.logger.error(f"Failed to add/update documents: {str(e)}")
-            
-            # Update statistics
-            self.stats['total_changes_processed'] += processed
-            self.stats['successful_updates'] += processed
-            self.stats['failed_updates'] += errors
-            self.stats['last_update_time'] = datetime.now(timezone.utc).isoformat()
-            
-            # Save updated indexes if we processed any changes
-            if processed > 0:
-                self.search_engine.save_indexes()
-            
+            await loop.run_in_executor(None, self.search_engine.save_indexes)
         except Exception as e:
-            errors += len(changes)
+            # The batch is already live; the next save persists it
             if hasattr(self.search_engine, 'logger'):
-                self.search_engine.logger.error(f"Batch processing failed: {str(e)}")
+                self.search_engine.logger.error(f"Failed to save indexes after batch: {str(e)}")
         
-        return {'processed': processed, 'errors': errors}
+        return {'processed': processed, 'errors': 0}
     
-    async def _delete_document(self, doc_id: str):
-        """Delete a single document from all indexes."""
-        # Remove from document storage
-        if hasattr(self.search_engine, 'document_vectors') and doc_id in self.search_engine.document_vectors:
-            del self.search_engine.document_vectors[doc_id]
+    def _apply_changes(self, changes: List[DocumentChange], batch: IndexWriteBatch) -> int:
+        """Apply ``changes`` to the write batch; any exception aborts the whole batch."""
+        # Group changes by type for efficient processing
+        adds = [c for c in changes if c.change_type == ChangeType.ADD]
+        updates = [c for c in changes if c.change_type == ChangeType.UPDATE]
+        deletes = [c for c in changes if c.change_type == ChangeType.DELETE]
         
-        if hasattr(self.search_engine, 'document_metadata') and doc_id in self.search_engine.document_metadata:
-            del self.search_engine.document_metadata[doc_id]
+        # Process deletions first
+        for change in deletes:
+            self._delete_document(change.doc_id, batch)
         
-        if hasattr(self.search_engine, 'document_codes') and doc_id in self.search_engine.document_codes:
-            del self.search_engine.document_codes[doc_id]
+        # Process additions and updates together (they're handled similarly)
+        add_update_docs = [change.document for change in adds + updates if change.document]
+        if add_update_docs:
+            self._add_update_documents(add_update_docs, batch)
         
-        if hasattr(self.search_engine, 'document_text_features') and doc_id in self.search_engine.document_text_features:
-            del self.search_engine.document_text_features[doc_id]
+        return len(deletes) + len(add_update_docs)
+    
+    def _requeue(self, changes: List[DocumentChange]):
+        """Put the changes of a failed batch back, unless a newer change superseded them."""
+        with self.processing_lock:
+            for change in changes:
+                change.attempts += 1
+                if change.attempts >= self.max_attempts:
+                    if hasattr(self.search_engine, 'logger'):
+                        self.search_engine.logger.error(f"Dropping change to document {change.doc_id} after {change.attempts} failed attempts")
+                    continue
+                if change.doc_id not in self.pending_changes:
+                    self.pending_changes[change.doc_id] = change
+                    self.change_queue.append(change)
+            self.stats['queue_size'] = len(self.pending_changes)
+    
+    def _delete_document(self, doc_id: str, batch: IndexWriteBatch):
+        """Delete a single document from all indexes in the write batch."""
+        detector = batch.duplicate_detector
+        if detector is not None and detector.remove_alias(doc_id) and not detector.index_duplicates:
+            # Collapsed aliases were never indexed
+            return
         
-        # Remove from BM25 index
-        if hasattr(self.search_engine, 'bm25_index') and doc_id in self.search_engine.bm25_index:
-            del self.search_engine.bm25_index[doc_id]
+        batch.remove_document(doc_id)
         
-        # Remove from LSH index (requires rebuilding signatures)
-        if hasattr(self.search_engine, 'lsh_index') and hasattr(self.search_engine.lsh_index, 'signatures'):
-            if doc_id in self.search_engine.lsh_index.signatures:
-                del self.search_engine.lsh_index.signatures[doc_id]
+        # Promote an alias so its content stays searchable
+        promoted = detector.remove_canonical(doc_id) if detector is not None else None
+        if promoted is not None and promoted[1] is not None:
+            self._add_update_documents([promoted[1]], batch, detect_duplicates=False)
         
         # Note: HNSW index doesn't support individual deletions easily
         # We mark it for rebuild if too many deletions accumulate
-        if not hasattr(self.search_engine, '_deleted_docs'):
-            self.search_engine._deleted_docs = set()
-        self.search_engine._deleted_docs.add(doc_id)
-        
-        # Trigger rebuild if too many documents deleted
-        if len(self.search_engine._deleted_docs) > 100:  # Threshold
-            await self._schedule_index_rebuild()
+        if len(batch.deleted_docs) > 100:  # Threshold
+            self._schedule_index_rebuild()
     
-    async def _add_update_documents(self, documents: List[Dict[str, Any]]):
-        """Add or update multiple documents in the indexes."""
+    def _add_update_documents(self, documents: List[Dict[str, Any]], batch: IndexWriteBatch,
+                              detect_duplicates: bool = True):
+        """Add or update multiple documents in the write batch."""
+        # Near-duplicates of indexed documents become aliases before any embedding work
+        detector = batch.duplicate_detector
+        if detect_duplicates and detector is not None and documents:
+            documents = detector.partition(batch.lsh_index, documents, self.search_engine._extract_text_features)
+        
         if not documents:
             return
         
-        # Generate embeddings for new/updated documents
         texts_to_embed = [self.search_engine._get_document_text(doc) for doc in documents]
         vectors = self.search_engine.embedding_model.encode(texts_to_embed, show_progress_bar=False, convert_to_numpy=True)
+        pq_quantizer = getattr(self.search_engine, 'pq_quantizer', None)
         
         for i, doc in enumerate(documents):
-            doc_id = doc['id']
             vector = vectors[i]
+            code = None
+            if pq_quantizer is not None and pq_quantizer.trained:
+                code = pq_quantizer.encode(vector.reshape(1, -1))[0]
             
-            # Update document storage
-            self.search_engine.document_vectors[doc_id] = vector
-            self.search_engine.document_metadata[doc_id] = {
-                'name': doc.get('name', ''),
-                'experience_years': doc.get('experience_years', 0),
-                'skills': doc.get('skills', []),
-                'seniority_level': doc.get('seniority_level', 'unknown')
-            }
-            
-            # Update text features
-            text_features = self.search_engine._extract_text_features(doc)
-            self.search_engine.document_text_features[doc_id] = text_features
-            
-            # Update LSH index
-            self.search_engine.lsh_index.add_document(doc_id, text_features)
-            
-            # Update PQ codes
-            if hasattr(self.search_engine, 'pq_quantizer') and self.search_engine.pq_quantizer.trained:
-                self.search_engine.document_codes[doc_id] = self.search_engine.pq_quantizer.encode(vector.reshape(1, -1))[0]
-            
-            # Update BM25 index
-            text = self.search_engine._get_document_text(doc)
-            tokens = text.lower().split()
-            tf = {token: tokens.count(token) for token in set(tokens)}
-            
-            # Update document frequencies
-            if doc_id not in self.search_engine.bm25_index:  # New document
-                for token in set(tokens):
-                    self.search_engine.doc_frequencies[token] = self.search_engine.doc_frequencies.get(token, 0) + 1
-                self.search_engine.corpus_size += 1
-            
-            self.search_engine.bm25_index[doc_id] = {'tf': tf, 'length': len(tokens)}
+            batch.upsert_document(
+                doc['id'],
+                vector,
+                metadata=self.search_engine._extract_metadata(doc),
+                text_features=self.search_engine._extract_text_features(doc),
+                tokens=texts_to_embed[i].lower().split(),
+                code=code
+            )
         
-        # Add vectors to HNSW index (this requires rebuilding for now)
-        # In a production system, you'd use a more sophisticated approach
-        await self._update_hnsw_index(documents, vectors)
-    
-    async def _update_hnsw_index(self, documents: List[Dict[str, Any]], vectors):
-        """Update HNSW index with new documents."""
-        # For now, we add to the existing index
-        # In production, you might use a more sophisticated incremental approach
-        doc_ids = [doc['id'] for doc in documents]
-        
-        try:
-            # Add normalized vectors to HNSW index
-            import numpy as np
-            normalized_vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
-            self.search_engine.hnsw_index.index.add(normalized_vectors)
-            self.search_engine.hnsw_index.doc_ids.extend(doc_ids)
-            
-        except Exception as e:
-            # If adding fails, schedule a rebuild
-            if hasattr(self.search_engine, 'logger'):
-                self.search_engine.logger.warning(f"HNSW incremental update failed, scheduling rebuild: {str(e)}")
-            await self._schedule_index_rebuild()
+        # A failure here aborts the batch, so no document is published without its vector
+        batch.add_vectors(vectors, [doc['id'] for doc in documents])
     
-    async def _schedule_index_rebuild(self):
+    def _schedule_index_rebuild(self):
         """Schedule a full index rebuild."""
         # This would trigger a background rebuild of the indexes
         # For now, we just log the need for rebuild
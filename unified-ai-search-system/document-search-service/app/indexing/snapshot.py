@@ -0,0 +1,217 @@
+"""Immutable index snapshots for lock-free readers and batched writers."""
+
+import time
+import json
+import hashlib
+from collections import Counter
+from typing import Dict, List, Any, FrozenSet, Optional
+from dataclasses import dataclass, field
+
+
+def document_digest(doc_id: str, bm25_entry: Optional[Dict[str, Any]], metadata: Optional[Dict[str, Any]]) -> int:
+    """64-bit content digest of one indexed document."""
+    payload = json.dumps([doc_id, bm25_entry, metadata], sort_keys=True, default=str)
+    return int.from_bytes(hashlib.blake2b(payload.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """
+    A single published generation of every structure the search path reads.
+
+    Readers grab ``engine.snapshot`` once and use it for the whole request, so
+    they never observe a half-applied batch. Writers never touch a published
+    snapshot; they mutate an ``IndexWriteBatch`` and publish the result as the
+    next epoch.
+    """
+    epoch: int
+    lsh_index: Any
+    hnsw_index: Any
+    document_vectors: Dict[str, Any]
+    document_codes: Dict[str, Any]
+    document_metadata: Dict[str, Dict[str, Any]]
+    document_text_features: Dict[str, List[str]]
+    bm25_index: Dict[str, Dict[str, Any]]
+    doc_frequencies: Dict[str, int]
+    corpus_size: int
+    avg_doc_length: float
+    deleted_docs: FrozenSet[str] = frozenset()
+    fingerprint: int = 0
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def generation(self) -> str:
+        """
+        Content-derived version of this snapshot.
+
+        The fingerprint is the XOR of per-document digests, so any two
+        processes holding the same documents report the same generation
+        regardless of their local epoch counters.
+        """
+        return f"{self.fingerprint:016x}"
+
+    def begin_write(self, duplicate_detector=None) -> 'IndexWriteBatch':
+        """
+        Start a copy-on-write batch based on this snapshot. A near-duplicate
+        detector passed in is cloned so the batch can regroup documents
+        without touching the live one.
+        """
+        return IndexWriteBatch(self, duplicate_detector)
+
+
+class IndexWriteBatch:
+    """
+    Private, mutable working copy of an ``IndexSnapshot``.
+
+    Dictionaries are shallow-copied up front; the LSH and HNSW indexes are
+    cloned lazily the first time the batch changes them, so a delete-only
+    batch never pays for an HNSW copy. ``duplicate_detector`` is a private
+    clone that the publisher swaps in along with the snapshot.
+    """
+
+    def __init__(self, base: IndexSnapshot, duplicate_detector=None):
+        self.base = base
+        self.duplicate_detector = duplicate_detector.clone() if duplicate_detector is not None else None
+        self.document_vectors = dict(base.document_vectors)
+        self.document_codes = dict(base.document_codes)
+        self.document_metadata = dict(base.document_metadata)
+        self.document_text_features = dict(base.document_text_features)
+        self.bm25_index = dict(base.bm25_index)
+        self.doc_frequencies = dict(base.doc_frequencies)
+        self.corpus_size = base.corpus_size
+        self.deleted_docs = set(base.deleted_docs)
+        self._total_length = sum(entry['length'] for entry in base.bm25_index.values())
+        self.fingerprint = base.fingerprint
+        # Documents removed or upserted by this batch
+        self.changed_docs = set()
+        self._lsh_index = None
+        self._hnsw_index = None
+
+    @property
+    def lsh_index(self):
+        if self._lsh_index is None:
+            self._lsh_index = self.base.lsh_index.clone()
+        return self._lsh_index
+
+    @property
+    def hnsw_index(self):
+        if self._hnsw_index is None:
+            self._hnsw_index = self.base.hnsw_index.clone()
+        return self._hnsw_index
+
+    def remove_document(self, doc_id: str):
+        """Drop a document from every structure and from the BM25 corpus stats."""
+        self.changed_docs.add(doc_id)
+        self._forget_digest(doc_id)
+        self.document_vectors.pop(doc_id, None)
+        self.document_metadata.pop(doc_id, None)
+        self.document_codes.pop(doc_id, None)
+        self.document_text_features.pop(doc_id, None)
+        self._remove_bm25_entry(doc_id)
+
+        current_lsh = self._lsh_index if self._lsh_index is not None else self.base.lsh_index
+        if doc_id in current_lsh.signatures:
+            self.lsh_index.remove_document(doc_id)
+
+        # HNSW has no cheap deletes; results for ids missing from
+        # document_vectors are skipped at scoring time.
+        self.deleted_docs.add(doc_id)
+
+    def upsert_document(self, doc_id: str, vector, metadata: Dict[str, Any],
+                        text_features: List[str], tokens: List[str], code=None):
+        """Insert or replace a document, keeping document frequencies exact."""
+        self.changed_docs.add(doc_id)
+        self._forget_digest(doc_id)
+        self.document_vectors[doc_id] = vector
+        self.document_metadata[doc_id] = metadata
+        self.document_text_features[doc_id] = text_features
+        if code is not None:
+            self.document_codes[doc_id] = code
+
+        if doc_id in self.lsh_index.signatures:
+            self.lsh_index.remove_document(doc_id)
+        self.lsh_index.add_document(doc_id, text_features)
+
+        self._remove_bm25_entry(doc_id)
+        term_frequencies = dict(Counter(tokens))
+        for token in term_frequencies:
+            self.doc_frequencies[token] = self.doc_frequencies.get(token, 0) + 1
+        self.bm25_index[doc_id] = {
+            'tf': term_frequencies,
+            'length': len(tokens)
+        }
+        self.corpus_size += 1
+        self._total_length += len(tokens)
+        self.deleted_docs.discard(doc_id)
+        self.fingerprint ^= document_digest(doc_id, self.bm25_index[doc_id], metadata)
+
+    def add_vectors(self, vectors, doc_ids: List[str]):
+        """Append vectors to this batch's private HNSW clone."""
+        self.hnsw_index.add_documents(vectors, doc_ids)
+
+    def replace_hnsw_index(self, hnsw_index):
+        """Swap in a rebuilt ANN index that holds only live documents."""
+        self._hnsw_index = hnsw_index
+        self.deleted_docs.clear()
+
+    def freeze(self, epoch: int) -> IndexSnapshot:
+        """Turn the batch into the next immutable snapshot."""
+        return IndexSnapshot(
+            epoch=epoch,
+            lsh_index=self._lsh_index if self._lsh_index is not None else self.base.lsh_index,
+            hnsw_index=self._hnsw_index if self._hnsw_index is not None else self.base.hnsw_index,
+            document_vectors=self.document_vectors,
+            document_codes=self.document_codes,
+            document_metadata=self.document_metadata,
+            document_text_features=self.document_text_features,
+            bm25_index=self.bm25_index,
+            doc_frequencies=self.doc_frequencies,
+            corpus_size=self.corpus_size,
+            avg_doc_length=self._total_length / self.corpus_size if self.corpus_size else 0,
+            deleted_docs=frozenset(self.deleted_docs),
+            fingerprint=self.fingerprint
+        )
+
+    def _forget_digest(self, doc_id: str):
+        if doc_id in self.document_vectors:
+            self.fingerprint ^= document_digest(
+                doc_id, self.bm25_index.get(doc_id), self.document_metadata.get(doc_id)
+            )
+
+    def _remove_bm25_entry(self, doc_id: str):
+        entry = self.bm25_index.pop(doc_id, None)
+        if entry is None:
+            return
+        for token in entry['tf']:
+            remaining = self.doc_frequencies.get(token, 0) - 1
+            if remaining > 0:
+                self.doc_frequencies[token] = remaining
+            else:
+                self.doc_frequencies.pop(token, None)
+        self.corpus_size = max(0, self.corpus_size - 1)
+        self._total_length -= entry['length']
+
+
+def snapshot_from_engine(engine, epoch: int) -> IndexSnapshot:
+    """Capture the engine's current index attributes as a snapshot."""
+    fingerprint = 0
+    for doc_id in engine.document_vectors:
+        fingerprint ^= document_digest(
+            doc_id, engine.bm25_index.get(doc_id), engine.document_metadata.get(doc_id)
+        )
+
+    return IndexSnapshot(
+        epoch=epoch,
+        lsh_index=engine.lsh_index,
+        hnsw_index=engine.hnsw_index,
+        document_vectors=engine.document_vectors,
+        document_codes=engine.document_codes,
+        document_metadata=engine.document_metadata,
+        document_text_features=engine.document_text_features,
+        bm25_index=engine.bm25_index,
+        doc_frequencies=engine.doc_frequencies,
+        corpus_size=engine.corpus_size,
+        avg_doc_length=engine.avg_doc_length,
+        deleted_docs=frozenset(getattr(engine, '_deleted_docs', ())),
+        fingerprint=fingerprint
+    )
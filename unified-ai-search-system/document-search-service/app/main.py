@@ -2,6 +2,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
+import os
 import sys
 from contextlib import asynccontextmanager
 
@@ -12,6 +13,8 @@ if sys.platform != "win32":
 from app.api.ultra_fast_search import router as search_router
 from app.api import ultra_fast_search as api_module
 from app.search.ultra_fast_engine import UltraFastSearchEngine
+from app.search.collections import CollectionManager
+from app.search.executor import SearchExecutor
 from app.processing.batch_processor import MathematicalBatchProcessor
 from app.logger import get_enhanced_logger
 from app.config import settings
@@ -35,8 +38,34 @@ async def lifespan(app: FastAPI):
         )
         batch_processor = MathematicalBatchProcessor()
         
-        # Initialize health checker
+        # One bounded worker pool for all search work, shared by every collection
+        search_executor = SearchExecutor(
+            max_concurrency=settings.search_max_concurrency,
+            max_queue_size=settings.search_max_queue_size,
+            target_queue_ms=settings.search_target_queue_ms
+        )
+        search_engine.search_executor = search_executor
+        
+        def create_collection_engine(name: str, path: str) -> UltraFastSearchEngine:
+            engine = UltraFastSearchEngine(
+                embedding_dim=settings.embedding_dim,
+                use_gpu=settings.use_gpu,
+                index_path=path,
+                embedding_model=search_engine.embedding_model
+            )
+            engine.search_executor = search_executor
+            return engine
+        
+        # Named collections share the default engine's embedding model
+        collection_manager = CollectionManager(
+            base_path=os.path.join(settings.index_path, "collections"),
+            engine_factory=create_collection_engine,
+            memory_budget_bytes=settings.collections_memory_budget_mb * 1024 * 1024
+        )
+        
+        # Initialize health checker; checks refresh in the background and /health serves the cache
         health_checker_instance = HealthChecker(search_engine)
+        health_checker_instance.start_background_refresh()
         
         # Initialize RAG system
         await initialize_rag_system(
@@ -47,6 +76,7 @@ async def lifespan(app: FastAPI):
         # Make components available to the API router
         api_module.search_engine = search_engine
         api_module.health_checker = health_checker_instance
+        api_module.collection_manager = collection_manager
         
         # Start incremental indexing background processing
         await search_engine.incremental_manager.start_background_processing()
@@ -66,10 +96,22 @@ async def lifespan(app: FastAPI):
         logger.info("Shutting down...")
         
         try:
+            # Stop background health checks
+            await health_checker_instance.stop_background_refresh()
+            
             # Cleanup incremental manager
             if hasattr(search_engine, 'incremental_manager'):
                 await search_engine.incremental_manager.stop_background_processing()
             
+            # Release the shared result cache connection
+            await search_engine.result_cache.close()
+            
+            # Flush and unload resident collections
+            await collection_manager.shutdown()
+            
+            # Stop search workers
+            search_executor.shutdown()
+            
             # Cleanup batch processor
             await batch_processor.shutdown()
             
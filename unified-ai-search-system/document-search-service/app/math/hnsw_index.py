@@ -59,5 +59,16 @@ class HNSWIndex:
         
         return results
 
+    def clone(self) -> 'HNSWIndex':
+        """
+        Return an independent copy of the graph and id mapping.
+        Writers add to the clone so concurrent searches on this index stay safe.
+        """
+        clone = HNSWIndex.__new__(HNSWIndex)
+        clone.dimension = self.dimension
+        clone.index = faiss.clone_index(self.index)
+        clone.doc_ids = list(self.doc_ids)
+        return clone
+
     def __len__(self):
         return self.index.ntotal
@@ -60,13 +60,17 @@ class LSHIndex:
 
         return signature.astype(np.int32)
 
+    def compute_signature(self, text_features: List[str]) -> np.ndarray:
+        """MinHash signature of a feature set, comparable with stored signatures."""
+        shingle_hashes = np.array([mmh3.hash(shingle, signed=False) for shingle in text_features], dtype=np.uint32)
+        return self._compute_minhash_signature(shingle_hashes, self.hash_functions)
+
     def add_document(self, doc_id: str, text_features: List[str]):
         """Add document to LSH index with mathematical optimization."""
-        # Convert text features to shingle hashes
-        shingle_hashes = np.array([mmh3.hash(shingle, signed=False) for shingle in text_features], dtype=np.uint32)
+        self.add_signature(doc_id, self.compute_signature(text_features))
 
-        # Compute MinHash signature
-        signature = self._compute_minhash_signature(shingle_hashes, self.hash_functions)
+    def add_signature(self, doc_id: str, signature: np.ndarray):
+        """Add a precomputed signature and its band buckets."""
         self.signatures[doc_id] = signature
 
         # Band-wise hashing for faster retrieval
@@ -78,28 +82,74 @@ class LSHIndex:
             band_hash = mmh3.hash_bytes(signature[start_idx:end_idx].tobytes())
             self.hash_tables[band_idx][band_hash].add(doc_id)
 
-    def query_candidates(self,
-                        query_features: List[str],
-                        num_candidates: int = 100) -> List[str]:
-        """
-        Lightning-fast candidate retrieval using LSH mathematics.
-        Expected time complexity: $O(1)$ per candidate.
-        """
-        # Compute query signature
-        query_shingles = np.array([mmh3.hash(shingle, signed=False) for shingle in query_features], dtype=np.uint32)
-        query_signature = self._compute_minhash_signature(query_shingles, self.hash_functions)
-
-        # Collect candidates from all bands
+    def candidates_for_signature(self, signature: np.ndarray) -> set:
+        """Documents sharing at least one band bucket with ``signature``."""
         candidates = set()
         for band_idx in range(self.num_bands):
             start_idx = band_idx * self.rows_per_band
             end_idx = start_idx + self.rows_per_band
 
-            band_hash = mmh3.hash_bytes(query_signature[start_idx:end_idx].tobytes())
+            band_hash = mmh3.hash_bytes(signature[start_idx:end_idx].tobytes())
 
             if band_hash in self.hash_tables[band_idx]:
                 candidates.update(self.hash_tables[band_idx][band_hash])
+        return candidates
+
+    def signature_similarity(self, signature: np.ndarray, other: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two MinHash signatures."""
+        return float(np.sum(signature == other)) / self.num_hashes
+
+    def remove_document(self, doc_id: str):
+        """Remove a document's signature and its entries in every band bucket."""
+        signature = self.signatures.pop(doc_id, None)
+        if signature is None:
+            return
 
+        for band_idx in range(self.num_bands):
+            start_idx = band_idx * self.rows_per_band
+            end_idx = start_idx + self.rows_per_band
+
+            band_hash = mmh3.hash_bytes(signature[start_idx:end_idx].tobytes())
+            bucket = self.hash_tables[band_idx].get(band_hash)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self.hash_tables[band_idx][band_hash]
+
+    def clone(self) -> 'LSHIndex':
+        """Return a copy whose signatures and buckets can be mutated independently."""
+        clone = LSHIndex.__new__(LSHIndex)
+        clone.num_hashes = self.num_hashes
+        clone.num_bands = self.num_bands
+        clone.rows_per_band = self.rows_per_band
+        clone.hash_functions = self.hash_functions
+        clone.signatures = dict(self.signatures)
+        clone.hash_tables = [
+            defaultdict(set, {band_hash: set(bucket) for band_hash, bucket in table.items()})
+            for table in self.hash_tables
+        ]
+        return clone
+
+    def empty_like(self) -> 'LSHIndex':
+        """Return an empty index with the same hash functions and banding."""
+        empty = LSHIndex.__new__(LSHIndex)
+        empty.num_hashes = self.num_hashes
+        empty.num_bands = self.num_bands
+        empty.rows_per_band = self.rows_per_band
+        empty.hash_functions = self.hash_functions
+        empty.signatures = {}
+        empty.hash_tables = [defaultdict(set) for _ in range(self.num_bands)]
+        return empty
+
+    def query_candidates(self,
+                        query_features: List[str],
+                        num_candidates: int = 100) -> List[str]:
+        """
+        Lightning-fast candidate retrieval using LSH mathematics.
+        Expected time complexity: $O(1)$ per candidate.
+        """
+        # Collect candidates from all bands
+        candidates = self.candidates_for_signature(self.compute_signature(query_features))
         return list(candidates)[:num_candidates]
 
     def jaccard_similarity(self, doc_id: str, query_features: List[str]) -> float:
@@ -107,9 +157,7 @@ class LSHIndex:
         if doc_id not in self.signatures:
             return 0.0
 
-        query_shingles = np.array([mmh3.hash(shingle, signed=False) for shingle in query_features], dtype=np.uint32)
-        query_signature = self._compute_minhash_signature(query_shingles, self.hash_functions)
-
+        query_signature = self.compute_signature(query_features)
         doc_signature = self.signatures[doc_id]
 
         # Mathematical property: $E[|sig1 ∩ sig2|/|sig1 ∪ sig2|] = Jaccard(S1, S2)$
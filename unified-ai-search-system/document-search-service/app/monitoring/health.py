@@ -8,6 +8,21 @@ from datetime import datetime, timezone
 from enum import Enum
 import os
 
+from app.logger import get_enhanced_logger
+
+logger = get_enhanced_logger(__name__)
+
+# Seconds between background refreshes of each component; cheap checks run more often
+DEFAULT_CHECK_INTERVALS = {
+    'system': 10.0,
+    'search_engine': 5.0,
+    'embeddings': 60.0,
+    'indexes': 15.0,
+    'storage': 30.0,
+    'memory': 30.0,
+    'api': 30.0
+}
+
 class HealthStatus(str, Enum):
     HEALTHY = "healthy"
     DEGRADED = "degraded" 
@@ -16,11 +31,13 @@ class HealthStatus(str, Enum):
 class ComponentHealth:
     """Health status for individual system components."""
     
-    def __init__(self, name: str):
+    def __init__(self, name: str, interval: float = 30.0):
         self.name = name
+        self.interval = interval
         self.status = HealthStatus.HEALTHY
         self.message = "Component is healthy"
         self.last_check = time.time()
+        self.checked = False
         self.details = {}
     
     def update_status(self, status: HealthStatus, message: str, details: Optional[Dict[str, Any]] = None):
@@ -28,8 +45,17 @@ class ComponentHealth:
         self.status = status
         self.message = message
         self.last_check = time.time()
+        self.checked = True
         self.details = details or {}
     
+    def age_seconds(self, now: Optional[float] = None) -> float:
+        """Seconds since the last completed check."""
+        return (now if now is not None else time.time()) - self.last_check
+    
+    def is_stale(self, stale_factor: float, now: Optional[float] = None) -> bool:
+        """A result is stale once it has missed a few refreshes, or was never checked."""
+        return not self.checked or self.age_seconds(now) > self.interval * stale_factor
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for API response."""
         return {
@@ -40,50 +66,114 @@ class ComponentHealth:
         }
 
 class HealthChecker:
-    """Comprehensive system health checker."""
+    """
+    Comprehensive system health checker.
+    
+    Checks run in the background, each component on its own interval, and
+    the endpoints serve the last results from memory. A component whose
+    result is older than ``stale_factor`` intervals is reported as stale.
+    """
     
-    def __init__(self, search_engine=None):
+    def __init__(self, search_engine=None, intervals: Optional[Dict[str, float]] = None,
+                 stale_factor: float = 3.0):
         self.search_engine = search_engine
         self.start_time = time.time()
+        self.stale_factor = stale_factor
+        intervals = {**DEFAULT_CHECK_INTERVALS, **(intervals or {})}
         self.components = {
-            'system': ComponentHealth('system'),
-            'search_engine': ComponentHealth('search_engine'),
-            'embeddings': ComponentHealth('embeddings'),
-            'indexes': ComponentHealth('indexes'),
-            'storage': ComponentHealth('storage'),
-            'memory': ComponentHealth('memory'),
-            'api': ComponentHealth('api')
+            name: ComponentHealth(name, intervals[name]) for name in DEFAULT_CHECK_INTERVALS
         }
+        self._checks = {
+            'system': self._check_system_health,
+            'search_engine': self._check_search_engine_health,
+            'embeddings': self._check_embeddings_health,
+            'indexes': self._check_indexes_health,
+            'storage': self._check_storage_health,
+            'memory': self._check_memory_health,
+            'api': self._check_api_health
+        }
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+    
+    @property
+    def refreshing(self) -> bool:
+        return any(not task.done() for task in self._refresh_tasks.values())
+    
+    @property
+    def has_snapshot(self) -> bool:
+        return any(component.checked for component in self.components.values())
     
     async def check_all_health(self) -> Dict[str, Any]:
-        """Perform comprehensive health check on all components."""
+        """Run every health check now and return the fresh results."""
         # Run all health checks concurrently
         await asyncio.gather(
-            self._check_system_health(),
-            self._check_search_engine_health(),
-            self._check_embeddings_health(),
-            self._check_indexes_health(),
-            self._check_storage_health(),
-            self._check_memory_health(),
-            self._check_api_health(),
+            *(self._run_check(name) for name in self._checks),
             return_exceptions=True
         )
-        
-        # Determine overall health status
-        overall_status = self._determine_overall_status()
+        return self.get_cached_health()
+    
+    def get_cached_health(self) -> Dict[str, Any]:
+        """Return the last results of every check without running any."""
+        now = time.time()
+        components = {}
+        for name, component in self.components.items():
+            components[name] = {
+                **component.to_dict(),
+                'age_seconds': round(component.age_seconds(now), 3),
+                'stale': component.is_stale(self.stale_factor, now)
+            }
         
         return {
-            'status': overall_status.value,
+            'status': self._determine_overall_status().value,
             'timestamp': datetime.now(timezone.utc).isoformat(),
             'version': '2.0.0',
-            'uptime_seconds': time.time() - self.start_time,
-            'components': {name: component.to_dict() for name, component in self.components.items()}
+            'uptime_seconds': now - self.start_time,
+            'stale': any(component['stale'] for component in components.values()),
+            'age_seconds': max(component['age_seconds'] for component in components.values()),
+            'components': components
         }
     
+    def start_background_refresh(self):
+        """Start one refresh loop per component; safe to call more than once."""
+        for name in self._checks:
+            task = self._refresh_tasks.get(name)
+            if task is None or task.done():
+                self._refresh_tasks[name] = asyncio.create_task(self._refresh_loop(name))
+        logger.info("Background health refresh started", extra_fields={
+            'intervals': {name: component.interval for name, component in self.components.items()}
+        })
+    
+    async def stop_background_refresh(self):
+        """Cancel the refresh loops and wait for them to exit."""
+        tasks = list(self._refresh_tasks.values())
+        self._refresh_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _refresh_loop(self, name: str):
+        component = self.components[name]
+        while True:
+            await self._run_check(name)
+            await asyncio.sleep(component.interval)
+    
+    async def _run_check(self, name: str):
+        """Run one check, bounded by its interval so a hung check cannot pile up."""
+        component = self.components[name]
+        try:
+            await asyncio.wait_for(self._checks[name](), timeout=component.interval)
+        except asyncio.TimeoutError:
+            component.update_status(
+                HealthStatus.UNHEALTHY,
+                f"Health check timed out after {component.interval:.0f}s"
+            )
+        except Exception as e:
+            component.update_status(HealthStatus.UNHEALTHY, f"Health check failed: {str(e)}")
+    
     async def _check_system_health(self):
         """Check basic system health metrics."""
         try:
-            cpu_usage = psutil.cpu_percent(interval=1)
+            # Non-blocking: utilisation since the previous refresh
+            cpu_usage = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             
@@ -167,7 +257,10 @@ class HealthChecker:
             
             # Test embedding generation with a simple query
             test_start = time.time()
-            test_embedding = self.search_engine.embedding_model.encode(["test query"])
+            loop = asyncio.get_running_loop()
+            test_embedding = await loop.run_in_executor(
+                None, self.search_engine.embedding_model.encode, ["test query"]
+            )
             embedding_time = (time.time() - test_start) * 1000
             
             details = {
@@ -285,14 +378,13 @@ class HealthChecker:
         try:
             import gc
             
-            # Force garbage collection and get stats
-            gc.collect()
+            # Collector counters only; a forced collection or heap walk would stall requests
             memory_info = psutil.Process().memory_info()
             
             details = {
                 'rss_mb': memory_info.rss / (1024**2),
                 'vms_mb': memory_info.vms / (1024**2),
-                'gc_objects': len(gc.get_objects()),
+                'gc_counts': list(gc.get_count()),
                 'gc_stats': gc.get_stats()
             }
             
@@ -353,9 +445,11 @@ class HealthChecker:
     def get_quick_health(self) -> Dict[str, Any]:
         """Get a quick health check without running all diagnostics."""
         overall_status = self._determine_overall_status()
+        now = time.time()
         
         return {
             'status': overall_status.value,
             'timestamp': datetime.now(timezone.utc).isoformat(),
-            'uptime_seconds': time.time() - self.start_time
+            'uptime_seconds': now - self.start_time,
+            'stale': any(component.is_stale(self.stale_factor, now) for component in self.components.values())
         }
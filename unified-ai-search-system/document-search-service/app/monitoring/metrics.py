@@ -1,11 +1,15 @@
+import re
+import math
 import time
 import threading
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, field
 from collections import defaultdict, deque
 import json
 from datetime import datetime, timezone
-import numpy as np
+
+# Upper bounds of the cumulative buckets exposed to Prometheus (mostly milliseconds)
+PROMETHEUS_BUCKETS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
 
 @dataclass
 class MetricPoint:
@@ -13,6 +17,126 @@ class MetricPoint:
     value: float
     labels: Dict[str, str] = field(default_factory=dict)
 
+class LogBucketHistogram:
+    """
+    Fixed-memory histogram with log-spaced buckets.
+    
+    Each bucket spans a constant ratio, so any quantile is reported within
+    ``relative_accuracy`` of a recorded value. Values at or below
+    ``min_value`` share a zero bucket and values above ``max_value`` land in
+    the top bucket, which bounds the bucket count (about 1.4k at the
+    defaults) however long the process runs. Count, sum, min and max are
+    tracked exactly.
+    """
+    
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3, max_value: float = 1e9):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._max_index = self._index(max_value)
+        self._buckets: Dict[int, int] = defaultdict(int)
+        self._zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self._sum_squares = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._lock = threading.Lock()
+    
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+    
+    def _bucket_value(self, index: int) -> float:
+        """Representative value of a bucket: the point of equal relative error to both edges."""
+        return 2 * self._gamma ** index / (self._gamma + 1)
+    
+    def record(self, value: float):
+        value = float(value)
+        index = self._index(value) if value > self.min_value else None
+        with self._lock:
+            if index is None:
+                self._zero_count += 1
+            else:
+                self._buckets[min(index, self._max_index)] += 1
+            self.count += 1
+            self.sum += value
+            self._sum_squares += value * value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Consistent copy of the histogram state, taken under its lock."""
+        with self._lock:
+            return {
+                'count': self.count,
+                'sum': self.sum,
+                'sum_squares': self._sum_squares,
+                'min': self.min,
+                'max': self.max,
+                'zero_count': self._zero_count,
+                'buckets': sorted(self._buckets.items())
+            }
+    
+    def _sorted_buckets(self, state: Dict[str, Any]) -> List[Tuple[float, int]]:
+        """(representative value, count) pairs in ascending order, clamped to the observed range."""
+        buckets = [(self._bucket_value(index), count) for index, count in state['buckets']]
+        if state['zero_count']:
+            buckets.insert(0, (state['min'], state['zero_count']))
+        return [(min(max(value, state['min']), state['max']), count) for value, count in buckets]
+    
+    def quantiles(self, qs: List[float], state: Optional[Dict[str, Any]] = None) -> List[float]:
+        state = state or self.snapshot()
+        if not state['count']:
+            return [0.0 for _ in qs]
+        buckets = self._sorted_buckets(state)
+        results = []
+        for q in qs:
+            rank = q * (state['count'] - 1)
+            seen = 0
+            value = state['max']
+            for bucket_value, count in buckets:
+                seen += count
+                if seen > rank:
+                    value = bucket_value
+                    break
+            results.append(value)
+        return results
+    
+    def cumulative_counts(self, bounds, state: Optional[Dict[str, Any]] = None) -> List[int]:
+        """Number of values at or below each bound, for Prometheus ``le`` buckets."""
+        state = state or self.snapshot()
+        buckets = self._sorted_buckets(state)
+        counts = []
+        position = 0
+        seen = 0
+        for bound in bounds:
+            while position < len(buckets) and buckets[position][0] <= bound:
+                seen += buckets[position][1]
+                position += 1
+            counts.append(seen)
+        return counts
+    
+    def stats(self) -> Dict[str, float]:
+        state = self.snapshot()
+        count = state['count']
+        if not count:
+            return {}
+        mean = state['sum'] / count
+        median, p95, p99 = self.quantiles([0.5, 0.95, 0.99], state)
+        return {
+            'count': count,
+            'mean': mean,
+            'median': median,
+            'p95': p95,
+            'p99': p99,
+            'min': state['min'],
+            'max': state['max'],
+            'std': math.sqrt(max(0.0, state['sum_squares'] / count - mean * mean))
+        }
+
 class MetricsCollector:
     """Advanced metrics collection with structured logging support."""
     
@@ -21,13 +145,16 @@ class MetricsCollector:
         self._metrics: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_history))
         self._counters: Dict[str, float] = defaultdict(float)
         self._gauges: Dict[str, float] = defaultdict(float)
-        self._histograms: Dict[str, list] = defaultdict(list)
+        self._histograms: Dict[str, LogBucketHistogram] = {}
+        # key -> (metric name, labels), for the Prometheus exposition
+        self._series: Dict[str, Tuple[str, Dict[str, str]]] = {}
         self._lock = threading.RLock()
         
     def increment_counter(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
         """Increment a counter metric."""
         with self._lock:
             key = self._make_key(name, labels)
+            self._series.setdefault(key, (name, dict(labels or {})))
             self._counters[key] += value
             self._metrics[key].append(MetricPoint(time.time(), self._counters[key], labels or {}))
     
@@ -35,15 +162,22 @@ class MetricsCollector:
         """Set a gauge metric value."""
         with self._lock:
             key = self._make_key(name, labels)
+            self._series.setdefault(key, (name, dict(labels or {})))
             self._gauges[key] = value
             self._metrics[key].append(MetricPoint(time.time(), value, labels or {}))
     
     def record_histogram(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
-        """Record a value in a histogram."""
-        with self._lock:
-            key = self._make_key(name, labels)
-            self._histograms[key].append(value)
-            self._metrics[key].append(MetricPoint(time.time(), value, labels or {}))
+        """Record a value in a histogram; only the histogram's own lock is taken once it exists."""
+        key = self._make_key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = LogBucketHistogram()
+                    self._series[key] = (name, dict(labels or {}))
+                    self._histograms[key] = histogram
+        histogram.record(value)
     
     def get_counter(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
         """Get current counter value."""
@@ -58,31 +192,65 @@ class MetricsCollector:
     def get_histogram_stats(self, name: str, labels: Optional[Dict[str, str]] = None) -> Dict[str, float]:
         """Get histogram statistics."""
         key = self._make_key(name, labels)
-        values = self._histograms.get(key, [])
-        if not values:
-            return {}
-        
-        arr = np.array(values)
-        return {
-            'count': len(values),
-            'mean': float(np.mean(arr)),
-            'median': float(np.median(arr)),
-            'p95': float(np.percentile(arr, 95)),
-            'p99': float(np.percentile(arr, 99)),
-            'min': float(np.min(arr)),
-            'max': float(np.max(arr)),
-            'std': float(np.std(arr))
-        }
+        histogram = self._histograms.get(key)
+        return histogram.stats() if histogram is not None else {}
     
     def get_all_metrics(self) -> Dict[str, Any]:
         """Get all metrics in a structured format."""
         with self._lock:
-            return {
-                'counters': dict(self._counters),
-                'gauges': dict(self._gauges),
-                'histograms': {k: self.get_histogram_stats(k) for k in self._histograms.keys()},
-                'timestamp': datetime.now(timezone.utc).isoformat()
-            }
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = dict(self._histograms)
+        return {
+            'counters': counters,
+            'gauges': gauges,
+            'histograms': {key: histogram.stats() for key, histogram in histograms.items()},
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        }
+    
+    def render_prometheus(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        
+        The collector lock is held only to copy the metric maps; histograms
+        are read one at a time under their own locks, so a scrape never
+        blocks recording for longer than one bucket copy.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = dict(self._histograms)
+            series = dict(self._series)
+        
+        lines: List[str] = []
+        typed = set()
+        
+        def declare(name: str, metric_type: str):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} {metric_type}')
+        
+        for values, metric_type in ((counters, 'counter'), (gauges, 'gauge')):
+            for key in sorted(values):
+                name, labels = series.get(key, (key, {}))
+                name = _prometheus_name(name)
+                declare(name, metric_type)
+                lines.append(f'{name}{_prometheus_labels(labels)} {_prometheus_value(values[key])}')
+        
+        for key in sorted(histograms):
+            histogram = histograms[key]
+            name, labels = series.get(key, (key, {}))
+            name = _prometheus_name(name)
+            declare(name, 'histogram')
+            state = histogram.snapshot()
+            counts = histogram.cumulative_counts(PROMETHEUS_BUCKETS, state)
+            for bound, count in zip(PROMETHEUS_BUCKETS, counts):
+                lines.append(f'{name}_bucket{_prometheus_labels(labels, le=_prometheus_value(bound))} {count}')
+            lines.append(f'{name}_bucket{_prometheus_labels(labels, le="+Inf")} {state["count"]}')
+            lines.append(f'{name}_sum{_prometheus_labels(labels)} {_prometheus_value(state["sum"])}')
+            lines.append(f'{name}_count{_prometheus_labels(labels)} {state["count"]}')
+        
+        return '\n'.join(lines) + '\n'
     
     def _make_key(self, name: str, labels: Optional[Dict[str, str]]) -> str:
         """Create a unique key for the metric."""
@@ -91,6 +259,30 @@ class MetricsCollector:
         label_str = ','.join(f'{k}={v}' for k, v in sorted(labels.items()))
         return f'{name}[{label_str}]'
 
+def _prometheus_name(name: str) -> str:
+    name = re.sub(r'[^a-zA-Z0-9_:]', '_', name)
+    return name if not name[:1].isdigit() else f'_{name}'
+
+def _escape_label_value(value: Any) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+def _prometheus_labels(labels: Dict[str, str], **extra: str) -> str:
+    pairs = {**labels, **extra}
+    if not pairs:
+        return ''
+    rendered = ','.join(
+        f'{re.sub(r"[^a-zA-Z0-9_]", "_", str(k))}="{_escape_label_value(v)}"' for k, v in pairs.items()
+    )
+    return '{' + rendered + '}'
+
+def _prometheus_value(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if value.is_integer() else repr(value)
+
 # Global metrics instance
 metrics = MetricsCollector()
 
@@ -14,6 +14,7 @@ import os
 
 from app.rag.models import DocumentProcessor, DocumentChunker, DocumentStore, Document, DocumentChunk
 from app.rag.enhanced_engine import RAGUltraFastEngine, RAGSearchResult
+from app.rag.context import ContextPacker
 from app.logger import get_enhanced_logger
 from app.validation.validators import ErrorResponse
 from app.error_handling.exceptions import SearchSystemException, handle_and_log_error
@@ -26,6 +27,7 @@ rag_engine: Optional[RAGUltraFastEngine] = None
 document_processor: Optional[DocumentProcessor] = None
 document_chunker: Optional[DocumentChunker] = None
 document_store: Optional[DocumentStore] = None
+context_packer = ContextPacker()
 
 
 class RAGQueryRequest(BaseModel):
@@ -36,6 +38,8 @@ class RAGQueryRequest(BaseModel):
     include_citations: bool = Field(True, description="Include citations in response")
     confidence_threshold: float = Field(0.3, ge=0.0, le=1.0, description="Minimum confidence for chunks")
     search_type: str = Field("hybrid", description="Search type: hybrid, semantic, or keyword")
+    rerank: Optional[bool] = Field(None, description="Rerank top candidates with the cross-encoder (default: on when configured)")
+    context_token_budget: Optional[int] = Field(None, ge=16, le=32768, description="Pack retrieved chunks into a prompt context of at most this many tokens")
 
 
 class RAGQueryResponse(BaseModel):
@@ -48,6 +52,7 @@ class RAGQueryResponse(BaseModel):
     processing_time: float
     search_type: str
     metadata: Dict[str, Any]
+    context: Optional[Dict[str, Any]] = None
 
 
 class DocumentUploadRequest(BaseModel):
@@ -56,7 +61,7 @@ class DocumentUploadRequest(BaseModel):
     description: Optional[str] = None
     tags: List[str] = Field(default_factory=list)
     chunking_strategy: str = Field("semantic", description="Chunking strategy: semantic, fixed, or paragraph")
-    chunk_size: int = Field(512, ge=100, le=2000, description="Size of each chunk")
+    chunk_size: int = Field(512, ge=100, le=2000, description="Size of each chunk: embedding-model tokens for semantic chunking, characters for fixed and paragraph")
     chunk_overlap: int = Field(50, ge=0, le=500, description="Overlap between chunks")
 
 
@@ -123,7 +128,8 @@ async def rag_query(request: RAGQueryRequest) -> RAGQueryResponse:
                 query=request.query,
                 top_k=request.max_chunks,
                 document_filter=request.document_filter,
-                confidence_threshold=request.confidence_threshold
+                confidence_threshold=request.confidence_threshold,
+                rerank=request.rerank
             )
         
         # Convert results to response format
@@ -138,7 +144,8 @@ async def rag_query(request: RAGQueryRequest) -> RAGQueryResponse:
                 'metadata': result.metadata,
                 'embedding_score': result.embedding_score,
                 'keyword_score': result.keyword_score,
-                'combined_score': result.combined_score
+                'combined_score': result.combined_score,
+                'rerank_score': result.rerank_score
             }
             
             # Add citation if requested
@@ -147,6 +154,11 @@ async def rag_query(request: RAGQueryRequest) -> RAGQueryResponse:
             
             chunk_dicts.append(chunk_dict)
         
+        # Merged, de-overlapped and budgeted context for the caller's prompt
+        context = None
+        if request.context_token_budget:
+            context = context_packer.pack(results, request.context_token_budget).to_dict()
+        
         # Calculate overall confidence
         confidence_score = sum(r.combined_score for r in results) / len(results) if results else 0.0
         
@@ -168,7 +180,8 @@ async def rag_query(request: RAGQueryRequest) -> RAGQueryResponse:
             confidence_score=confidence_score,
             processing_time=processing_time,
             search_type=request.search_type,
-            metadata=metadata
+            metadata=metadata,
+            context=context
         )
         
         logger.info(f"RAG query completed in {processing_time:.2f}ms, found {len(results)} chunks")
@@ -199,7 +212,7 @@ async def upload_document(
         description: Optional document description
         tags: Comma-separated tags
         chunking_strategy: Strategy for chunking document
-        chunk_size: Size of each chunk
+        chunk_size: Size of each chunk (tokens for semantic, characters otherwise)
         chunk_overlap: Overlap between chunks
         
     Returns:
@@ -472,7 +485,7 @@ async def _process_document_background(
         description: Document description
         tags: Document tags
         chunking_strategy: Chunking strategy to use
-        chunk_size: Size of each chunk
+        chunk_size: Size of each chunk (tokens for semantic, characters otherwise)
         chunk_overlap: Overlap between chunks
     """
     try:
@@ -503,38 +516,30 @@ async def _process_document_background(
         document_chunker.chunk_size = chunk_size
         document_chunker.overlap = chunk_overlap
         
-        # Create chunks
-        chunks = document_chunker.chunk_document(document, strategy=chunking_strategy)
-        
-        # Store document and chunks
+        # Chunks stream through storage into the index in batches, so the
+        # full chunk list is never held
         document.status = "indexing"
-        store_success = document_store.store_document(document, chunks)
+        chunks = document_chunker.iter_chunks(document, strategy=chunking_strategy)
+        stored_chunks = document_store.store_document_stream(document, chunks)
         
-        if store_success:
-            # Index chunks in RAG engine
-            index_success = await rag_engine.index_document_chunks(chunks)
-            
-            if index_success:
-                document.status = "completed"
-                logger.info(f"Document {document_id} processed successfully with {len(chunks)} chunks")
-            else:
-                document.status = "error"
-                logger.error(f"Failed to index chunks for document {document_id}")
+        index_success = await rag_engine.index_document_chunks(stored_chunks)
+        
+        if index_success:
+            document.status = "completed"
+            chunk_count = len(rag_engine.document_chunks.get(document_id, ()))
+            logger.info(f"Document {document_id} processed successfully with {chunk_count} chunks")
+            document_store.update_document_status(document_id, document.status)
         else:
             document.status = "error"
-            logger.error(f"Failed to store document {document_id}")
-        
-        # Update status in store
-        document_store.store_document(document, chunks)
+            logger.error(f"Failed to store or index chunks for document {document_id}")
+            # Chunk batches are committed as they stream, so drop the partial ones
+            document_store.mark_document_failed(document_id)
         
     except Exception as e:
         logger.error(f"Background document processing failed for {document_id}: {e}")
         
-        # Update status to error
+        # Drop partially stored chunks and mark the document as errored
         try:
-            document = document_store.retrieve_document(document_id)
-            if document:
-                document.status = "error"
-                document_store.store_document(document, [])
+            document_store.mark_document_failed(document_id)
         except:
             pass  # Ignore errors in error handling
@@ -0,0 +1,135 @@
+"""
+Compressed, content-addressed blob storage for RAG documents.
+
+A blob holds one document's full text as a compressed frame, followed by a
+small JSON index. Chunk text is not framed here: it lives once in SQLite,
+where the FTS5 external-content index needs it for matching, ranking and
+deletes, so compressed copies would only ever be written.
+"""
+
+import gzip
+import json
+import os
+import struct
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    # zstd is optional; gzip is always available
+    zstandard = None
+
+BLOB_MAGIC = b"RAGB"
+BLOB_VERSION = 1
+# magic, version, codec id
+HEADER = struct.Struct(">4sBB")
+# length of the trailing JSON index
+FOOTER = struct.Struct(">Q")
+
+CODEC_GZIP = 1
+CODEC_ZSTD = 2
+
+
+@dataclass(frozen=True)
+class BlobLayout:
+    """Where the content frame of a stored blob lives, as an (offset, length) pair."""
+    key: str
+    content: Tuple[int, int]
+
+
+class BlobStore:
+    """
+    Content-addressed store of compressed document blobs.
+
+    The blob key is the SHA-256 of the document text, so re-uploading
+    identical content writes nothing and both documents share one file.
+    """
+
+    def __init__(self, root: str, compression_level: int = 3):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compression_level = compression_level
+        self.codec = CODEC_ZSTD if zstandard is not None else CODEC_GZIP
+
+    @staticmethod
+    def compute_key(content: str) -> str:
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.blob"
+
+    def exists(self, key: str) -> bool:
+        return self.path_for(key).exists()
+
+    def put(self, content: str) -> BlobLayout:
+        """Store a document blob, reusing an identical one if already present."""
+        key = self.compute_key(content)
+        path = self.path_for(key)
+        if path.exists():
+            return self.layout(key)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(BLOB_MAGIC, BLOB_VERSION, self.codec))
+                frame = self._compress(content.encode('utf-8'))
+                f.write(frame)
+                content_frame = (HEADER.size, len(frame))
+
+                index = json.dumps({'content': content_frame}).encode('utf-8')
+                f.write(index)
+                f.write(FOOTER.pack(len(index)))
+            # Atomic publish; a concurrent identical upload wrote the same bytes
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return BlobLayout(key=key, content=content_frame)
+
+    def layout(self, key: str) -> BlobLayout:
+        with open(self.path_for(key), 'rb') as f:
+            f.seek(-FOOTER.size, os.SEEK_END)
+            (index_length,) = FOOTER.unpack(f.read(FOOTER.size))
+            f.seek(-(FOOTER.size + index_length), os.SEEK_END)
+            index = json.loads(f.read(index_length))
+        return BlobLayout(key=key, content=tuple(index['content']))
+
+    def read_frame(self, key: str, offset: int, length: int) -> str:
+        """Read and decompress one frame without reading the rest of the blob."""
+        with open(self.path_for(key), 'rb') as f:
+            magic, version, codec = HEADER.unpack(f.read(HEADER.size))
+            if magic != BLOB_MAGIC or version != BLOB_VERSION:
+                raise ValueError(f"Blob {key} has an unknown format")
+            f.seek(offset)
+            frame = f.read(length)
+        return self._decompress(frame, codec).decode('utf-8')
+
+    def read_content(self, key: str, layout: Optional[BlobLayout] = None) -> str:
+        layout = layout or self.layout(key)
+        return self.read_frame(key, *layout.content)
+
+    def delete(self, key: str):
+        path = self.path_for(key)
+        if path.exists():
+            path.unlink()
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            return zstandard.ZstdCompressor(level=self.compression_level).compress(data)
+        # mtime=0 keeps output deterministic for identical input
+        return gzip.compress(data, compresslevel=min(self.compression_level + 3, 9), mtime=0)
+
+    @staticmethod
+    def _decompress(frame: bytes, codec: int) -> bytes:
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Blob was written with zstd but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(frame)
+        return gzip.decompress(frame)
@@ -0,0 +1,175 @@
+"""
+Streaming, token-aware text chunking.
+
+Text is consumed as an iterable of blocks, split into sentences
+incrementally and packed into chunks measured in embedding-model tokens, so
+memory stays bounded by one chunk regardless of document size and no chunk
+exceeds what the encoder can see.
+"""
+
+import re
+from collections import deque
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])["\')\]]*\s+|\n\s*\n')
+# Approximates word-piece tokenization when no model tokenizer is available
+APPROXIMATE_TOKEN = re.compile(r'\w+|[^\w\s]')
+ABBREVIATIONS = {
+    'e.g.', 'i.e.', 'etc.', 'vs.', 'mr.', 'mrs.', 'ms.', 'dr.', 'prof.', 'sr.', 'jr.',
+    'inc.', 'ltd.', 'co.', 'corp.', 'no.', 'fig.', 'al.', 'approx.', 'st.'
+}
+
+
+def iter_text_blocks(text: str, block_size: int = 64 * 1024) -> Iterator[str]:
+    """Yield an in-memory string in fixed-size blocks."""
+    for start in range(0, len(text), block_size):
+        yield text[start:start + block_size]
+
+
+def _ends_with_abbreviation(segment: str) -> bool:
+    words = segment.rsplit(None, 1)
+    if not words:
+        return False
+    last_word = words[-1].lower()
+    # Known abbreviations and single-letter initials such as "J."
+    return last_word in ABBREVIATIONS or bool(re.fullmatch(r'[a-z]\.', last_word))
+
+
+def iter_sentences(blocks: Iterable[str], max_sentence_chars: int = 20000) -> Iterator[str]:
+    """
+    Split streamed text into sentences and paragraphs.
+
+    Only the unfinished tail of the input is buffered. Runs longer than
+    ``max_sentence_chars`` without a boundary are cut at whitespace so a
+    pathological input cannot grow the buffer without bound.
+    """
+    buffer = ""
+    for block in blocks:
+        buffer += block
+        position = 0
+        for match in SENTENCE_BOUNDARY.finditer(buffer):
+            # A boundary at the very end may still be extended by the next block
+            if match.end() == len(buffer):
+                break
+            segment = buffer[position:match.start()]
+            if '\n' not in match.group() and _ends_with_abbreviation(segment):
+                continue
+            sentence = segment.strip()
+            if sentence:
+                yield sentence
+            position = match.end()
+        buffer = buffer[position:]
+
+        while len(buffer) > max_sentence_chars:
+            cut = buffer.rfind(' ', 0, max_sentence_chars)
+            if cut <= 0:
+                cut = max_sentence_chars
+            sentence = buffer[:cut].strip()
+            if sentence:
+                yield sentence
+            buffer = buffer[cut:]
+
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class TokenCounter:
+    """Counts tokens the way the embedding model will see them."""
+
+    def __init__(self, tokenizer: Any = None, max_sequence_length: Optional[int] = None):
+        self.tokenizer = tokenizer
+        self.max_sequence_length = max_sequence_length
+
+    @classmethod
+    def for_model(cls, model: Any) -> 'TokenCounter':
+        """Use a sentence-transformers model's tokenizer and max_seq_length when present."""
+        return cls(
+            tokenizer=getattr(model, 'tokenizer', None),
+            max_sequence_length=getattr(model, 'max_seq_length', None)
+        )
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return len(APPROXIMATE_TOKEN.findall(text))
+
+    @property
+    def special_tokens(self) -> int:
+        if self.tokenizer is not None and hasattr(self.tokenizer, 'num_special_tokens_to_add'):
+            return self.tokenizer.num_special_tokens_to_add()
+        # [CLS] and [SEP] for BERT-style encoders
+        return 2
+
+    def fit_budget(self, requested_tokens: int) -> int:
+        """Clamp a requested chunk size so the encoder never truncates it."""
+        if self.max_sequence_length:
+            return max(1, min(requested_tokens, self.max_sequence_length - self.special_tokens))
+        return max(1, requested_tokens)
+
+
+class StreamingChunker:
+    """Packs streamed sentences into chunks of at most ``max_tokens`` tokens."""
+
+    def __init__(self, token_counter: TokenCounter, max_tokens: int, overlap_tokens: int = 0):
+        self.token_counter = token_counter
+        self.max_tokens = max_tokens
+        # Overlap can never consume the whole budget
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    def iter_chunks(self, blocks: Iterable[str]) -> Iterator[Tuple[str, int]]:
+        """Yield ``(chunk_text, token_count)`` pairs lazily."""
+        window: deque = deque()
+        window_tokens = 0
+
+        for sentence in iter_sentences(blocks):
+            for part, tokens in self._fit(sentence):
+                if window and window_tokens + tokens > self.max_tokens:
+                    yield " ".join(text for text, _ in window), window_tokens
+
+                    # Carry trailing sentences forward as overlap
+                    carried: deque = deque()
+                    carried_tokens = 0
+                    while window:
+                        text, count = window[-1]
+                        if (carried_tokens + count > self.overlap_tokens or
+                                carried_tokens + count + tokens > self.max_tokens):
+                            break
+                        window.pop()
+                        carried.appendleft((text, count))
+                        carried_tokens += count
+                    window, window_tokens = carried, carried_tokens
+
+                window.append((part, tokens))
+                window_tokens += tokens
+
+        if window:
+            yield " ".join(text for text, _ in window), window_tokens
+
+    def _fit(self, sentence: str) -> Iterator[Tuple[str, int]]:
+        """Split a sentence that alone exceeds the budget at word boundaries."""
+        tokens = self.token_counter.count(sentence)
+        if tokens <= self.max_tokens:
+            yield sentence, tokens
+            return
+
+        words = []
+        words_tokens = 0
+        for word in sentence.split():
+            word_tokens = self.token_counter.count(word)
+            if word_tokens > self.max_tokens:
+                # A single unbroken token run (base64, hashes); cut by characters,
+                # which never yields more tokens than characters
+                if words:
+                    yield " ".join(words), words_tokens
+                    words, words_tokens = [], 0
+                for start in range(0, len(word), self.max_tokens):
+                    piece = word[start:start + self.max_tokens]
+                    yield piece, self.token_counter.count(piece)
+                continue
+            if words and words_tokens + word_tokens > self.max_tokens:
+                yield " ".join(words), words_tokens
+                words, words_tokens = [], 0
+            words.append(word)
+            words_tokens += word_tokens
+        if words:
+            yield " ".join(words), words_tokens
@@ -0,0 +1,200 @@
+"""
+Context assembly for RAG prompts.
+
+Retrieved chunks are merged into contiguous spans per source document, with
+the overlap the chunker repeats between neighbours removed, then packed by
+relevance into a token budget. Every packed span carries a citation with its
+character offsets in the assembled context.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from app.rag.chunking import TokenCounter
+
+if TYPE_CHECKING:
+    from app.rag.enhanced_engine import RAGSearchResult
+
+
+@dataclass
+class ContextSpan:
+    """A run of adjacent chunks from one source document"""
+    source_document_id: str
+    chunk_ids: List[str]
+    first_chunk_index: int
+    last_chunk_index: int
+    text: str
+    relevance_score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Citation:
+    """Where a packed span sits in the context and which chunks it came from"""
+    label: int
+    source_document_id: str
+    chunk_ids: List[str]
+    first_chunk_index: int
+    last_chunk_index: int
+    start: int
+    end: int
+    relevance_score: float
+    truncated: bool = False
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class PackedContext:
+    """Assembled prompt context and the citations for each of its spans"""
+    text: str
+    citations: List[Citation]
+    token_count: int
+    token_budget: int
+    spans_considered: int
+    spans_dropped: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def merge_overlapping(left: str, right: str, min_overlap_chars: int = 8) -> str:
+    """Join two consecutive chunk texts, dropping the longest suffix/prefix overlap"""
+    if not left or not right:
+        return left or right
+
+    probe = right[:min_overlap_chars]
+    position = left.find(probe, max(0, len(left) - len(right)))
+    while position != -1:
+        # Earliest match is the longest overlap
+        if right.startswith(left[position:]):
+            return left + right[len(left) - position:]
+        position = left.find(probe, position + 1)
+    return f"{left} {right}"
+
+
+class ContextPacker:
+    """
+    Builds a token-bounded prompt context from retrieval results.
+
+    Results from the same document whose ``chunk_index`` values are
+    consecutive become one span, so a passage split across chunks reads
+    contiguously and the chunk overlap is sent once. Spans are taken in
+    relevance order and added greedily while they fit; a span that does not
+    fit is skipped in favour of smaller, less relevant ones, except that the
+    first overflowing span may be cut at a word boundary to use a large
+    remainder.
+    """
+
+    def __init__(self,
+                 token_counter: Optional[TokenCounter] = None,
+                 separator: str = "\n\n",
+                 label_format: str = "[{label}] ",
+                 min_fragment_tokens: int = 64):
+        self.token_counter = token_counter or TokenCounter()
+        self.separator = separator
+        self.label_format = label_format
+        self.min_fragment_tokens = min_fragment_tokens
+
+    def build_spans(self, results: Sequence['RAGSearchResult']) -> List[ContextSpan]:
+        """Merge adjacent chunks of each source document into spans"""
+        by_document: Dict[str, Dict[int, 'RAGSearchResult']] = {}
+        for result in results:
+            chunks = by_document.setdefault(result.source_document_id, {})
+            existing = chunks.get(result.chunk_index)
+            if existing is None or result.combined_score > existing.combined_score:
+                chunks[result.chunk_index] = result
+
+        spans = []
+        for document_id, chunks in by_document.items():
+            span = None
+            for chunk_index in sorted(chunks):
+                result = chunks[chunk_index]
+                if span is not None and chunk_index == span.last_chunk_index + 1:
+                    span.text = merge_overlapping(span.text, result.content)
+                    span.chunk_ids.append(result.chunk_id)
+                    span.last_chunk_index = chunk_index
+                    span.relevance_score = max(span.relevance_score, result.combined_score)
+                    continue
+                span = ContextSpan(
+                    source_document_id=document_id,
+                    chunk_ids=[result.chunk_id],
+                    first_chunk_index=chunk_index,
+                    last_chunk_index=chunk_index,
+                    text=result.content,
+                    relevance_score=result.combined_score,
+                    metadata=result.metadata or {}
+                )
+                spans.append(span)
+
+        spans.sort(key=lambda span: (-span.relevance_score, span.source_document_id, span.first_chunk_index))
+        return spans
+
+    def pack(self, results: Sequence['RAGSearchResult'], token_budget: int) -> PackedContext:
+        """Pack results into at most ``token_budget`` tokens, most relevant first"""
+        spans = self.build_spans(results)
+        separator_tokens = self.token_counter.count(self.separator)
+        remaining = token_budget
+        parts: List[str] = []
+        citations: List[Citation] = []
+        offset = 0
+        truncated_one = False
+
+        for span in spans:
+            label = self.label_format.format(label=len(citations) + 1)
+            overhead = self.token_counter.count(label) + (separator_tokens if parts else 0)
+            text = span.text
+            tokens = self.token_counter.count(text)
+            truncated = False
+
+            if overhead + tokens > remaining:
+                available = remaining - overhead
+                if truncated_one or available < self.min_fragment_tokens:
+                    continue
+                text, tokens = self._truncate(text, available)
+                if not text:
+                    continue
+                truncated = truncated_one = True
+
+            if parts:
+                parts.append(self.separator)
+                offset += len(self.separator)
+            parts.append(label)
+            offset += len(label)
+            parts.append(text)
+            citations.append(Citation(
+                label=len(citations) + 1,
+                source_document_id=span.source_document_id,
+                chunk_ids=list(span.chunk_ids),
+                first_chunk_index=span.first_chunk_index,
+                last_chunk_index=span.last_chunk_index,
+                start=offset,
+                end=offset + len(text),
+                relevance_score=span.relevance_score,
+                truncated=truncated,
+                metadata=span.metadata
+            ))
+            offset += len(text)
+            remaining -= overhead + tokens
+
+        return PackedContext(
+            text="".join(parts),
+            citations=citations,
+            token_count=token_budget - remaining,
+            token_budget=token_budget,
+            spans_considered=len(spans),
+            spans_dropped=len(spans) - len(citations)
+        )
+
+    def _truncate(self, text: str, max_tokens: int) -> Tuple[str, int]:
+        """Longest word-boundary prefix of ``text`` within ``max_tokens``"""
+        words = text.split(" ")
+        low, high = 0, len(words)
+        # Binary search on the word count; token count grows with prefix length
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.token_counter.count(" ".join(words[:middle])) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        prefix = " ".join(words[:low])
+        return prefix, self.token_counter.count(prefix)
@@ -5,12 +5,20 @@ Extends the existing search engine with RAG capabilities
 
 import asyncio
 import time
-from typing import List, Dict, Optional, Any, Tuple
-from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Optional, Any, Tuple
+from dataclasses import dataclass, field
+
+import numpy as np
 
 from app.search.ultra_fast_engine import UltraFastSearchEngine, SearchResult
+from app.indexing.snapshot import IndexSnapshot, IndexWriteBatch
+from app.math.hnsw_index import HNSWIndex
 from app.rag.models import DocumentChunk, Document, DocumentStore
 from app.logger import get_enhanced_logger
+from app.monitoring.metrics import metrics
+from app.config import settings
+from app.search.rerank import CrossEncoderReranker
 
 logger = get_enhanced_logger(__name__)
 
@@ -27,6 +35,15 @@ class RAGSearchResult:
     embedding_score: float = 0.0
     keyword_score: float = 0.0
     combined_score: float = 0.0
+    rerank_score: Optional[float] = None
+
+
+@dataclass
+class ChunkMapBatch:
+    """Chunk map entries written by one indexing call, applied only when it publishes"""
+    embeddings: Dict[str, Any] = field(default_factory=dict)
+    metadata: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    document_chunks: Dict[str, List[str]] = field(default_factory=dict)
 
 
 class RAGUltraFastEngine(UltraFastSearchEngine):
@@ -38,60 +55,115 @@ class RAGUltraFastEngine(UltraFastSearchEngine):
         self.chunk_embeddings = {}  # chunk_id -> embedding
         self.chunk_metadata = {}    # chunk_id -> metadata
         self.document_chunks = {}   # document_id -> List[chunk_id]
+        # Fraction of stale ANN entries that triggers a rebuild at consolidation
+        self.consolidation_threshold = 0.2
+        self.reranker = CrossEncoderReranker(
+            model_name=settings.rerank_model_name,
+            backend=settings.rerank_backend,
+            onnx_path=settings.rerank_onnx_path,
+            top_n=settings.rerank_top_n,
+            batch_size=settings.rerank_batch_size,
+            budget_ms=settings.rerank_budget_ms
+        ) if settings.rerank_enabled else None
         self.logger = logger
         
-    async def index_document_chunks(self, chunks: List[DocumentChunk], 
-                                  batch_size: int = 32) -> bool:
+    async def index_document_chunks(self, chunks: Iterable[DocumentChunk], 
+                                  batch_size: int = 32,
+                                  consolidate: bool = True) -> bool:
         """
         Index document chunks for RAG retrieval
         
+        All batches go into one copy-on-write index batch that is published
+        once at the end, so the ANN, LSH and BM25 structures are copied once
+        per call and each batch only appends its own vectors and postings.
+        The chunk maps are staged alongside it, so a failure part way leaves
+        both the indexes and the chunk maps as they were.
+        
+        Pulling each batch from the stream (chunking and storing it) and
+        embedding it run in the default executor, so searches on the event
+        loop keep running; the write lock is held only to publish. If another
+        writer published first, the staged chunks are replayed onto the newer
+        snapshot without being embedded again.
+        
         Args:
-            chunks: List of DocumentChunk objects to index
+            chunks: DocumentChunk objects to index; any iterable, so a lazy
+                chunk stream is embedded batch by batch without being
+                materialized
             batch_size: Number of chunks to process in each batch
+            consolidate: Compact the ANN index at the end if deletions left
+                too many stale entries in it
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            self.logger.info(f"Starting to index {len(chunks)} document chunks")
+            self.logger.info("Starting to index document chunks")
+            loop = asyncio.get_running_loop()
+            indexed = 0
+            chunk_iter = iter(chunks)
+            
+            base = self.snapshot
+            write_batch = await loop.run_in_executor(None, base.begin_write)
+            chunk_maps = ChunkMapBatch()
             
             # Process chunks in batches
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i + batch_size]
-                await self._index_chunk_batch(batch)
+            batch_number = 0
+            while True:
+                staged = await loop.run_in_executor(
+                    None, self._stage_next_batch, chunk_iter, batch_size, write_batch, chunk_maps
+                )
+                if not staged:
+                    break
+                indexed += staged
                 
                 # Log progress
-                if i % (batch_size * 4) == 0:
-                    self.logger.info(f"Indexed {i + len(batch)}/{len(chunks)} chunks")
+                if batch_number % 4 == 0:
+                    self.logger.info(f"Indexed {indexed} chunks")
+                batch_number += 1
+            
+            if not indexed:
+                return True
+            
+            while True:
+                if consolidate:
+                    await loop.run_in_executor(None, self._consolidate_vector_index, write_batch)
+                
+                async with self.write_lock:
+                    if self.snapshot is base:
+                        self._apply_chunk_maps(chunk_maps)
+                        self.publish_snapshot(
+                            write_batch.freeze(self.next_snapshot_epoch()),
+                            changed_doc_ids=write_batch.changed_docs
+                        )
+                        break
+                
+                base = self.snapshot
+                write_batch = await loop.run_in_executor(None, self._replay_chunk_maps, base, chunk_maps)
             
-            self.logger.info(f"Successfully indexed {len(chunks)} document chunks")
+            self.logger.info(f"Successfully indexed {indexed} document chunks")
             return True
             
         except Exception as e:
             self.logger.error(f"Error indexing document chunks: {e}")
             return False
     
-    async def _index_chunk_batch(self, chunks: List[DocumentChunk]):
-        """Index a batch of chunks"""
+    def _stage_next_batch(self, chunk_iter: Iterator[DocumentChunk], batch_size: int,
+                          write_batch: IndexWriteBatch, chunk_maps: ChunkMapBatch) -> int:
+        """Pull, embed and stage the next batch of chunks; returns how many there were"""
+        chunks = list(islice(chunk_iter, batch_size))
+        if not chunks:
+            return 0
+        
         try:
             # Extract text for embedding
             chunk_texts = [chunk.content for chunk in chunks]
-            
-            # Generate embeddings if we have a model
-            if hasattr(self, 'embedding_model') and self.embedding_model:
-                embeddings = await self._generate_embeddings(chunk_texts)
-            else:
-                # Use simple text features if no embedding model
-                embeddings = [self._extract_text_features(text) for text in chunk_texts]
+            embeddings = np.asarray(self._embed_texts(chunk_texts), dtype=np.float32)
             
             # Store chunks and their embeddings
             for chunk, embedding in zip(chunks, embeddings):
-                # Store in parent class vectors
-                self.document_vectors[chunk.chunk_id] = embedding
-                
                 # Store chunk-specific data
-                self.chunk_embeddings[chunk.chunk_id] = embedding
-                self.chunk_metadata[chunk.chunk_id] = {
+                chunk_maps.embeddings[chunk.chunk_id] = embedding
+                chunk_maps.metadata[chunk.chunk_id] = {
                     'content': chunk.content,
                     'source_document_id': chunk.source_document_id,
                     'chunk_index': chunk.chunk_index,
@@ -101,24 +173,62 @@ class RAGUltraFastEngine(UltraFastSearchEngine):
                 }
                 
                 # Group by document
-                if chunk.source_document_id not in self.document_chunks:
-                    self.document_chunks[chunk.source_document_id] = []
-                self.document_chunks[chunk.source_document_id].append(chunk.chunk_id)
-                
-                # Add to text features for hybrid search
-                text_features = self._extract_text_features(chunk.content)
-                self.document_text_features[chunk.chunk_id] = text_features
+                chunk_maps.document_chunks.setdefault(chunk.source_document_id, []).append(chunk.chunk_id)
             
-            # Rebuild HNSW index if we have enough chunks
-            if len(self.document_vectors) > 100:
-                await self._rebuild_vector_index()
+            self._write_chunks(write_batch, [chunk.chunk_id for chunk in chunks], embeddings, chunk_maps)
+            return len(chunks)
                 
         except Exception as e:
             self.logger.error(f"Error indexing chunk batch: {e}")
             raise
     
+    def _write_chunks(self, write_batch: IndexWriteBatch, chunk_ids: List[str],
+                      embeddings: np.ndarray, chunk_maps: ChunkMapBatch):
+        """Append staged chunks to the pending index batch"""
+        for chunk_id, embedding in zip(chunk_ids, embeddings):
+            chunk_meta = chunk_maps.metadata[chunk_id]
+            
+            # Vector, LSH signature and BM25 postings for hybrid search
+            write_batch.upsert_document(
+                chunk_id,
+                embedding,
+                metadata={
+                    'source_document_id': chunk_meta['source_document_id'],
+                    'chunk_index': chunk_meta['chunk_index'],
+                    'chunk_type': chunk_meta['chunk_type']
+                },
+                text_features=self._extract_query_features(chunk_meta['content']),
+                tokens=chunk_meta['content'].lower().split()
+            )
+        
+        # Only the new vectors are inserted into the ANN graph
+        write_batch.add_vectors(embeddings, chunk_ids)
+    
+    def _replay_chunk_maps(self, base: IndexSnapshot, chunk_maps: ChunkMapBatch) -> IndexWriteBatch:
+        """Rebuild a call's index batch on a newer snapshot from its staged, already embedded chunks"""
+        write_batch = base.begin_write()
+        chunk_ids = list(chunk_maps.embeddings)
+        embeddings = np.asarray([chunk_maps.embeddings[chunk_id] for chunk_id in chunk_ids], dtype=np.float32)
+        self._write_chunks(write_batch, chunk_ids, embeddings, chunk_maps)
+        return write_batch
+    
+    def _apply_chunk_maps(self, chunk_maps: ChunkMapBatch):
+        """Merge a successful call's chunk entries; document lists are replaced, not mutated"""
+        self.chunk_embeddings.update(chunk_maps.embeddings)
+        self.chunk_metadata.update(chunk_maps.metadata)
+        for document_id, chunk_ids in chunk_maps.document_chunks.items():
+            existing = self.document_chunks.get(document_id, [])
+            known = set(existing)
+            self.document_chunks[document_id] = existing + [
+                chunk_id for chunk_id in dict.fromkeys(chunk_ids) if chunk_id not in known
+            ]
+    
     async def _generate_embeddings(self, texts: List[str]) -> List[Any]:
         """Generate embeddings for texts"""
+        return self._embed_texts(texts)
+    
+    def _embed_texts(self, texts: List[str]) -> List[Any]:
+        """Encode texts synchronously, so indexing can run it in an executor"""
         try:
             if hasattr(self.embedding_model, 'encode'):
                 # Sentence transformers model
@@ -131,27 +241,28 @@ class RAGUltraFastEngine(UltraFastSearchEngine):
             self.logger.error(f"Error generating embeddings: {e}")
             return [self._extract_text_features(text) for text in texts]
     
-    async def _rebuild_vector_index(self):
-        """Rebuild HNSW index with new vectors"""
-        try:
-            if not self.document_vectors:
-                return
-                
-            # Convert to numpy array for HNSW
-            import numpy as np
-            all_embeddings = np.array(list(self.document_vectors.values()))
-            all_ids = list(self.document_vectors.keys())
-            
-            # Build HNSW index
-            self._build_hnsw_index(all_ids, all_embeddings)
-            
-        except Exception as e:
-            self.logger.error(f"Error rebuilding vector index: {e}")
+    def _consolidate_vector_index(self, write_batch: IndexWriteBatch):
+        """Rebuild the ANN index from live vectors once deleted entries pile up"""
+        indexed = len(write_batch.hnsw_index)
+        stale = len(write_batch.deleted_docs)
+        if not indexed or stale / indexed < self.consolidation_threshold:
+            return
+        
+        live_ids = list(write_batch.document_vectors)
+        hnsw_index = HNSWIndex(dimension=self.embedding_dim)
+        if live_ids:
+            hnsw_index.add_documents(
+                np.array([write_batch.document_vectors[doc_id] for doc_id in live_ids], dtype=np.float32),
+                live_ids
+            )
+        write_batch.replace_hnsw_index(hnsw_index)
+        self.logger.info(f"Consolidated vector index: dropped {stale} stale entries, {len(live_ids)} live")
     
     async def retrieve_for_rag(self, query: str, 
                               top_k: int = 5,
                               document_filter: Optional[List[str]] = None,
-                              confidence_threshold: float = 0.3) -> List[RAGSearchResult]:
+                              confidence_threshold: float = 0.3,
+                              rerank: Optional[bool] = None) -> List[RAGSearchResult]:
         """
         Retrieve relevant chunks for RAG workflow
         
@@ -160,15 +271,34 @@ class RAGUltraFastEngine(UltraFastSearchEngine):
             top_k: Number of top chunks to retrieve
             document_filter: Optional list of document IDs to filter by
             confidence_threshold: Minimum confidence score for results
+            rerank: Rescore the top blended candidates with the cross-encoder;
+                defaults to on when a reranker is configured
             
         Returns:
             List of RAGSearchResult objects
         """
         try:
             start_time = time.time()
-            
-            # Perform hybrid search using parent class
-            search_results = await self.search(query, num_results=top_k * 2)
+            use_rerank = self.reranker is not None and self.reranker.available and rerank is not False
+            # Give the reranker its full candidate window
+            fetch_k = max(top_k, self.reranker.top_n) if use_rerank else top_k
+            
+            if document_filter:
+                # Scope first: score exactly the filtered documents' chunks, so
+                # cost and recall depend on the scope rather than the corpus
+                snapshot = self.snapshot
+                allowed_ids = self._chunk_ids_for_documents(document_filter, snapshot)
+                if not allowed_ids:
+                    return []
+                if self.search_executor is not None:
+                    search_results = await self.search_executor.run(
+                        self._execute_scoped_search, snapshot, query, allowed_ids, fetch_k
+                    )
+                else:
+                    search_results = self._execute_scoped_search(snapshot, query, allowed_ids, fetch_k)
+            else:
+                # Perform hybrid search using parent class
+                search_results = await self.search(query, num_results=fetch_k * 2)
             
             # Convert to RAG results and filter
             rag_results = []
@@ -177,10 +307,6 @@ class RAGUltraFastEngine(UltraFastSearchEngine):
                 if result.doc_id in self.chunk_metadata:
                     chunk_meta = self.chunk_metadata[result.doc_id]
                     
-                    # Apply document filter if specified
-                    if document_filter and chunk_meta['source_document_id'] not in document_filter:
-                        continue
-                    
                     # Apply confidence threshold
                     if result.combined_score < confidence_threshold:
                         continue
@@ -193,14 +319,16 @@ class RAGUltraFastEngine(UltraFastSearchEngine):
                         source_document_id=chunk_meta['source_document_id'],
                         chunk_index=chunk_meta['chunk_index'],
                         metadata=chunk_meta['metadata'],
-                        embedding_score=result.vector_score,
-                        keyword_score=result.keyword_score,
+                        embedding_score=result.similarity_score,
+                        keyword_score=result.bm25_score,
                         combined_score=result.combined_score
                     )
                     rag_results.append(rag_result)
             
             # Sort by relevance and take top_k
             rag_results.sort(key=lambda x: x.combined_score, reverse=True)
+            if use_rerank and rag_results:
+                rag_results = await self._rerank(query, rag_results)
             final_results = rag_results[:top_k]
             
             retrieval_time = (time.time() - start_time) * 1000
@@ -213,6 +341,37 @@ class RAGUltraFastEngine(UltraFastSearchEngine):
             self.logger.error(f"Error in RAG retrieval: {e}")
             return []
     
+    async def _rerank(self, query: str, results: List[RAGSearchResult]) -> List[RAGSearchResult]:
+        """Cross-encoder rerank on the search workers, within the reranker's budget"""
+        if self.search_executor is not None:
+            reranked = await self.search_executor.run(self.reranker.rerank, query, results, lambda r: r.content)
+        else:
+            reranked = self.reranker.rerank(query, results, lambda r: r.content)
+        for result, score in reranked:
+            result.rerank_score = score
+        return [result for result, _ in reranked]
+    
+    def _chunk_ids_for_documents(self, document_ids: List[str], snapshot: IndexSnapshot) -> List[str]:
+        """Indexed chunk ids belonging to the given documents"""
+        allowed_ids = []
+        for document_id in dict.fromkeys(document_ids):
+            allowed_ids.extend(
+                chunk_id for chunk_id in self.document_chunks.get(document_id, ())
+                if chunk_id in snapshot.document_vectors
+            )
+        return allowed_ids
+    
+    def _execute_scoped_search(self, snapshot: IndexSnapshot, query: str,
+                               allowed_ids: List[str], num_results: int) -> List[SearchResult]:
+        """Exact hybrid scoring restricted to an allowed set of chunk ids"""
+        query_vector = self.embedding_model.encode([query], convert_to_numpy=True)
+        query_features = self._extract_query_features(query)
+        metrics.record_histogram('rag_scoped_candidates_count', len(allowed_ids))
+        
+        scored_results = self._score_candidates(allowed_ids, query, query_vector[0], query_features, snapshot)
+        scored_results.sort(key=lambda x: x.combined_score, reverse=True)
+        return scored_results[:num_results]
+    
     async def get_document_chunks(self, document_id: str) -> List[RAGSearchResult]:
         """Get all chunks for a specific document"""
         try:
@@ -341,7 +500,8 @@ class RAGUltraFastEngine(UltraFastSearchEngine):
                 'total_documents': len(self.document_chunks),
                 'avg_chunks_per_document': len(self.chunk_embeddings) / len(self.document_chunks) if self.document_chunks else 0,
                 'chunk_types': self._get_chunk_type_distribution(),
-                'document_distribution': self._get_document_chunk_distribution()
+                'document_distribution': self._get_document_chunk_distribution(),
+                'reranker': self.reranker.get_stats() if self.reranker is not None else None
             }
             
             return {**base_stats, **rag_stats}
@@ -386,19 +546,23 @@ class RAGUltraFastEngine(UltraFastSearchEngine):
             
             chunk_ids = self.document_chunks[document_id]
             
-            # Remove from all data structures
-            for chunk_id in chunk_ids:
-                self.document_vectors.pop(chunk_id, None)
-                self.chunk_embeddings.pop(chunk_id, None)
-                self.chunk_metadata.pop(chunk_id, None)
-                self.document_text_features.pop(chunk_id, None)
-            
-            # Remove document entry
-            del self.document_chunks[document_id]
-            
-            # Rebuild index if necessary
-            if len(self.document_vectors) > 0:
-                await self._rebuild_vector_index()
+            # Remove from all data structures; the ANN graph keeps tombstones
+            # until the next consolidation
+            async with self.write_lock:
+                write_batch = self.snapshot.begin_write()
+                for chunk_id in chunk_ids:
+                    write_batch.remove_document(chunk_id)
+                
+                self.publish_snapshot(
+                    write_batch.freeze(self.next_snapshot_epoch()),
+                    changed_doc_ids=write_batch.changed_docs
+                )
+                
+                # Chunk maps change only once the removal is published
+                for chunk_id in chunk_ids:
+                    self.chunk_embeddings.pop(chunk_id, None)
+                    self.chunk_metadata.pop(chunk_id, None)
+                del self.document_chunks[document_id]
             
             self.logger.info(f"Deleted {len(chunk_ids)} chunks for document {document_id}")
             return True
@@ -78,6 +78,7 @@ class RAGSystemManager:
         try:
             from app.rag.models import DocumentProcessor, DocumentChunker, DocumentStore
             from app.rag.enhanced_engine import RAGUltraFastEngine
+            from app.rag.chunking import TokenCounter
             from app.logger import get_enhanced_logger
             
             logger = get_enhanced_logger(__name__)
@@ -104,6 +105,9 @@ class RAGSystemManager:
                 use_gpu=use_gpu
             )
             
+            # Size semantic chunks with the tokenizer the chunks are embedded with
+            self.document_chunker.token_counter = TokenCounter.for_model(self.rag_engine.embedding_model)
+            
             # Load existing documents if any
             await self._load_existing_documents()
             
@@ -120,28 +124,27 @@ class RAGSystemManager:
             from app.logger import get_enhanced_logger
             logger = get_enhanced_logger(__name__)
             
-            # Get list of all documents
-            documents = self.document_store.list_documents(limit=1000)
+            # Stream every stored chunk into one index batch, so startup
+            # copies and publishes the indexes once rather than per document
+            loaded_documents = set()
+            total_chunks = 0
+            
+            def stored_chunks():
+                nonlocal total_chunks
+                for chunk in self.document_store.iter_all_chunks():
+                    loaded_documents.add(chunk.source_document_id)
+                    total_chunks += 1
+                    yield chunk
             
-            if not documents:
-                logger.info("No existing documents found")
+            if not await self.rag_engine.index_document_chunks(stored_chunks()):
+                logger.warning("Failed to load existing document chunks")
                 return
             
-            logger.info(f"Loading {len(documents)} existing documents...")
+            if not total_chunks:
+                logger.info("No existing documents found")
+                return
             
-            # Load chunks for each document
-            total_chunks = 0
-            for doc_info in documents:
-                try:
-                    document = self.document_store.retrieve_document(doc_info['id'])
-                    if document and document.chunks:
-                        await self.rag_engine.index_document_chunks(document.chunks)
-                        total_chunks += len(document.chunks)
-                        
-                except Exception as e:
-                    logger.warning(f"Failed to load document {doc_info['id']}: {e}")
-            
-            logger.info(f"Loaded {total_chunks} chunks from {len(documents)} documents")
+            logger.info(f"Loaded {total_chunks} chunks from {len(loaded_documents)} documents")
             
         except Exception as e:
             logger.error(f"Error loading existing documents: {e}")
@@ -196,6 +199,9 @@ class RAGSystemManager:
                 # Save any pending indexes
                 pass
             
+            if self.document_store:
+                self.document_store.close()
+            
             self.initialized = False
             logger.info("RAG system shutdown completed")
             
@@ -279,6 +285,7 @@ class RAGIntegrationBridge:
         Returns:
             Processing result with document ID and stats
         """
+        document = None
         try:
             components = self.rag_manager.get_components()
             
@@ -293,32 +300,35 @@ class RAGIntegrationBridge:
             if metadata:
                 document.metadata.update(metadata)
             
-            # Create chunks
-            chunks = components['document_chunker'].chunk_document(document)
-            
-            # Store document and chunks
-            success = components['document_store'].store_document(document, chunks)
+            # Chunks stream through storage into the index in batches
+            chunks = components['document_chunker'].iter_chunks(document)
+            stored_chunks = components['document_store'].store_document_stream(document, chunks)
+            rag_engine = components['rag_engine']
+            success = await rag_engine.index_document_chunks(stored_chunks)
             
             if success:
-                # Index chunks
-                await components['rag_engine'].index_document_chunks(chunks)
-                
+                # Only completed documents are reloaded into the index on startup
+                components['document_store'].update_document_status(document.id, 'completed')
                 return {
                     'success': True,
                     'document_id': document.id,
                     'filename': filename,
-                    'chunks_created': len(chunks),
+                    'chunks_created': len(rag_engine.document_chunks.get(document.id, ())),
                     'processing_time': 0.0,  # TODO: Add timing
                     'status': 'completed'
                 }
             else:
+                # Chunk batches are committed as they stream, so drop the partial ones
+                components['document_store'].mark_document_failed(document.id)
                 return {
                     'success': False,
-                    'error': 'Failed to store document',
+                    'error': 'Failed to store or index document',
                     'status': 'error'
                 }
                 
         except Exception as e:
+            if document is not None:
+                components['document_store'].mark_document_failed(document.id)
             return {
                 'success': False,
                 'error': str(e),
@@ -326,7 +336,8 @@ class RAGIntegrationBridge:
             }
     
     async def rag_retrieve(self, query: str, top_k: int = 5, 
-                          filters: Dict[str, Any] = None) -> Dict[str, Any]:
+                          filters: Dict[str, Any] = None,
+                          context_token_budget: Optional[int] = None) -> Dict[str, Any]:
         """
         Retrieve documents for RAG
         
@@ -334,6 +345,8 @@ class RAGIntegrationBridge:
             query: Search query
             top_k: Number of results to return
             filters: Optional filters
+            context_token_budget: If set, also return the results packed into
+                a prompt context of at most this many tokens
             
         Returns:
             Retrieved chunks and metadata
@@ -360,13 +373,18 @@ class RAGIntegrationBridge:
                     'metadata': result.metadata
                 })
             
-            return {
+            response = {
                 'success': True,
                 'query': query,
                 'results': formatted_results,
                 'total_found': len(results),
                 'search_time': 0.0  # TODO: Add timing
             }
+            if context_token_budget:
+                from app.rag.context import ContextPacker
+                response['context'] = ContextPacker().pack(results, context_token_budget).to_dict()
+            
+            return response
             
         except Exception as e:
             return {
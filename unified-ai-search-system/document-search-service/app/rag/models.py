@@ -4,16 +4,20 @@ Implements document processing, chunking, and storage for RAG workflows
 """
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Union, Any
+from typing import List, Dict, Optional, Union, Any, Iterable, Iterator
 from datetime import datetime
 import uuid
 import numpy as np
 from pathlib import Path
+from itertools import islice
 import json
 import sqlite3
+import threading
 from abc import ABC, abstractmethod
 
 from app.logger import get_enhanced_logger
+from app.rag.blob_store import BlobStore
+from app.rag.chunking import StreamingChunker, TokenCounter, iter_text_blocks
 
 logger = get_enhanced_logger(__name__)
 
@@ -372,9 +376,15 @@ class DocumentProcessor:
 class DocumentChunker:
     """Handles document chunking with various strategies"""
     
-    def __init__(self, chunk_size: int = 512, overlap: int = 50):
+    def __init__(self, chunk_size: int = 512, overlap: int = 50,
+                 token_counter: Optional[TokenCounter] = None):
+        # Semantic chunks are sized in embedding-model tokens (clamped to the
+        # encoder's input length); fixed and paragraph chunks in characters.
+        # Chunks stored without a chunk_size_unit were sized in characters.
         self.chunk_size = chunk_size
         self.overlap = overlap
+        # Without a model tokenizer the counter approximates word pieces
+        self.token_counter = token_counter or TokenCounter()
         self.logger = logger
     
     def chunk_document(self, document: Document, 
@@ -392,28 +402,7 @@ class DocumentChunker:
         self.logger.info(f"Chunking document {document.filename} with strategy: {strategy}")
         
         try:
-            if strategy == "semantic":
-                chunks = self._semantic_chunk(document)
-            elif strategy == "fixed":
-                chunks = self._fixed_size_chunk(document)
-            elif strategy == "paragraph":
-                chunks = self._paragraph_chunk(document)
-            else:
-                self.logger.warning(f"Unknown chunking strategy: {strategy}, using semantic")
-                chunks = self._semantic_chunk(document)
-            
-            # Set chunk metadata
-            for i, chunk in enumerate(chunks):
-                chunk.source_document_id = document.id
-                chunk.chunk_index = i
-                chunk.metadata = {
-                    'source_filename': document.filename,
-                    'source_content_type': document.content_type,
-                    'chunking_strategy': strategy,
-                    'chunk_size': self.chunk_size,
-                    'overlap': self.overlap
-                }
-            
+            chunks = list(self.iter_chunks(document, strategy))
             self.logger.info(f"Created {len(chunks)} chunks for document {document.filename}")
             return chunks
             
@@ -421,37 +410,53 @@ class DocumentChunker:
             self.logger.error(f"Error chunking document {document.filename}: {e}")
             raise
     
-    def _semantic_chunk(self, document: Document) -> List[DocumentChunk]:
-        """Split text into semantically coherent chunks"""
-        text = document.content
-        sentences = self._split_into_sentences(text)
-        chunks = []
-        current_chunk = ""
-        current_size = 0
-        
-        for sentence in sentences:
-            sentence_len = len(sentence)
-            
-            # If adding this sentence would exceed chunk size, create a new chunk
-            if current_size + sentence_len > self.chunk_size and current_chunk:
-                chunks.append(DocumentChunk(content=current_chunk.strip()))
-                
-                # Handle overlap
-                if self.overlap > 0:
-                    current_chunk = current_chunk[-self.overlap:] + " " + sentence
-                    current_size = len(current_chunk)
-                else:
-                    current_chunk = sentence
-                    current_size = sentence_len
-            else:
-                current_chunk += " " + sentence if current_chunk else sentence
-                current_size += sentence_len
+    def iter_chunks(self, document: Document, strategy: str = "semantic",
+                    blocks: Optional[Iterable[str]] = None) -> Iterator[DocumentChunk]:
+        """
+        Yield chunks lazily so they can feed the embedding pipeline as produced
         
-        # Add final chunk if there's content
-        if current_chunk.strip():
-            chunks.append(DocumentChunk(content=current_chunk.strip()))
+        Args:
+            document: Document the chunks belong to
+            strategy: Chunking strategy ('semantic', 'fixed', 'paragraph')
+            blocks: Optional stream of text blocks to chunk instead of
+                document.content, e.g. a large file read incrementally
+        """
+        if strategy == "semantic":
+            chunks = self._semantic_chunk(document, blocks)
+        elif strategy == "fixed":
+            chunks = self._fixed_size_chunk(document)
+        elif strategy == "paragraph":
+            chunks = self._paragraph_chunk(document)
+        else:
+            self.logger.warning(f"Unknown chunking strategy: {strategy}, using semantic")
+            chunks = self._semantic_chunk(document, blocks)
         
-        return chunks
+        for i, chunk in enumerate(chunks):
+            chunk.source_document_id = document.id
+            chunk.chunk_index = i
+            chunk.metadata = {
+                'source_filename': document.filename,
+                'source_content_type': document.content_type,
+                'chunking_strategy': strategy,
+                'chunk_size': self.chunk_size,
+                'chunk_size_unit': 'tokens' if strategy not in ("fixed", "paragraph") else 'characters',
+                'overlap': self.overlap,
+                **chunk.metadata
+            }
+            yield chunk
+    
+    def _semantic_chunk(self, document: Document,
+                        blocks: Optional[Iterable[str]] = None) -> Iterator[DocumentChunk]:
+        """Pack whole sentences into chunks that fit the embedding model's input"""
+        chunker = StreamingChunker(
+            self.token_counter,
+            max_tokens=self.token_counter.fit_budget(self.chunk_size),
+            overlap_tokens=self.overlap
+        )
+        if blocks is None:
+            blocks = iter_text_blocks(document.content)
+        for text, token_count in chunker.iter_chunks(blocks):
+            yield DocumentChunk(content=text, metadata={'token_count': token_count})
     
     def _fixed_size_chunk(self, document: Document) -> List[DocumentChunk]:
         """Split text into fixed-size chunks with overlap"""
@@ -466,6 +471,8 @@ class DocumentChunker:
             if chunk_text.strip():
                 chunks.append(DocumentChunk(content=chunk_text.strip()))
             
+            if end == len(text):
+                break
             start = end - self.overlap if self.overlap > 0 else end
         
         return chunks
@@ -494,18 +501,6 @@ class DocumentChunker:
             chunks.append(DocumentChunk(content=current_chunk.strip()))
         
         return chunks
-    
-    def _split_into_sentences(self, text: str) -> List[str]:
-        """Split text into sentences using simple heuristics"""
-        import re
-        
-        # Simple sentence splitting using regex
-        sentences = re.split(r'[.!?]+', text)
-        
-        # Filter out empty sentences and clean up
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
-        return sentences
 
 
 class DocumentStore:
@@ -517,12 +512,48 @@ class DocumentStore:
         self.documents_dir = Path(documents_dir)
         self.documents_dir.mkdir(parents=True, exist_ok=True)
         self.logger = logger
+        # One long-lived connection per thread; sqlite connections are not
+        # safe to share, and reopening per call dominated small queries
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.fts_enabled = False
+        # Full text lives in compressed, content-addressed blobs; chunk text
+        # stays in SQLite, where the FTS5 index reads it
+        self.blob_store = BlobStore(str(self.documents_dir / "blobs"))
         self._init_database()
     
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # WAL lets readers proceed while an upload is being written
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # INSERT OR REPLACE must fire the delete trigger that keeps FTS in sync
+            conn.execute("PRAGMA recursive_triggers=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        """Close every connection opened by this store"""
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+    
     def _init_database(self):
         """Initialize SQLite database for document metadata"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            conn = self._connection()
+            with conn:
                 conn.execute("""
                     CREATE TABLE IF NOT EXISTS documents (
                         id TEXT PRIMARY KEY,
@@ -561,135 +592,404 @@ class DocumentStore:
                     ON document_chunks(relevance_score DESC)
                 """)
                 
-                conn.commit()
+                # Blob locations; added by migration so older databases upgrade in place
+                self._ensure_columns(conn, 'documents', {
+                    'blob_key': 'TEXT',
+                    'content_offset': 'INTEGER',
+                    'content_length': 'INTEGER'
+                })
+                self._ensure_columns(conn, 'document_chunks', {
+                    'chunk_type': "TEXT DEFAULT 'text'"
+                })
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_documents_blob_key 
+                    ON documents(blob_key)
+                """)
+            
+            self._init_fts(conn)
                 
         except Exception as e:
             self.logger.error(f"Error initializing database: {e}")
             raise
     
-    def store_document(self, document: Document, 
-                      chunks: List[DocumentChunk]) -> bool:
-        """Store document and its chunks"""
+    @staticmethod
+    def _ensure_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]):
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, column_type in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+    
+    def _init_fts(self, conn: sqlite3.Connection):
+        """Create the FTS5 index over chunk text, if this sqlite build has FTS5"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                # Store document metadata
+            with conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_chunks_fts'"
+                ).fetchone()
+                
+                # External-content table: the text lives once, in document_chunks
                 conn.execute("""
-                    INSERT OR REPLACE INTO documents 
-                    (id, filename, content_type, file_size, upload_date, 
-                     processed_date, metadata, chunk_count, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    document.id,
-                    document.filename,
-                    document.content_type,
-                    document.file_size,
-                    document.upload_date.isoformat(),
-                    document.processed_date.isoformat() if document.processed_date else None,
-                    json.dumps(document.metadata),
-                    len(chunks),
-                    document.status
-                ))
+                    CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts 
+                    USING fts5(content, content='document_chunks', content_rowid='rowid')
+                """)
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS document_chunks_fts_insert 
+                    AFTER INSERT ON document_chunks BEGIN
+                        INSERT INTO document_chunks_fts(rowid, content) VALUES (new.rowid, new.content);
+                    END
+                """)
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS document_chunks_fts_delete 
+                    AFTER DELETE ON document_chunks BEGIN
+                        INSERT INTO document_chunks_fts(document_chunks_fts, rowid, content) 
+                        VALUES ('delete', old.rowid, old.content);
+                    END
+                """)
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS document_chunks_fts_update 
+                    AFTER UPDATE OF content ON document_chunks BEGIN
+                        INSERT INTO document_chunks_fts(document_chunks_fts, rowid, content) 
+                        VALUES ('delete', old.rowid, old.content);
+                        INSERT INTO document_chunks_fts(rowid, content) VALUES (new.rowid, new.content);
+                    END
+                """)
                 
-                # Store chunks
-                for chunk in chunks:
-                    conn.execute("""
-                        INSERT OR REPLACE INTO document_chunks 
-                        (chunk_id, document_id, chunk_index, content, metadata, created_at)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (
+                if not exists:
+                    # Index chunks stored before the FTS table existed
+                    conn.execute("INSERT INTO document_chunks_fts(document_chunks_fts) VALUES ('rebuild')")
+            
+            self.fts_enabled = True
+            
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"FTS5 unavailable, keyword search falls back to LIKE scans: {e}")
+    
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """Quote each term so user input is never parsed as FTS5 syntax"""
+        terms = query.split()
+        return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+    
+    def store_document(self, document: Document, 
+                      chunks: Iterable[DocumentChunk]) -> bool:
+        """Store document and its chunks"""
+        try:
+            for _ in self.store_document_stream(document, chunks):
+                pass
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error storing document: {e}")
+            self.mark_document_failed(document.id)
+            return False
+    
+    def store_document_stream(self, document: Document, chunks: Iterable[DocumentChunk],
+                              batch_size: int = 256) -> Iterator[DocumentChunk]:
+        """
+        Store a document, writing its chunks in batches as they arrive
+        
+        Each chunk is yielded once its batch is committed, so a lazy chunk
+        stream can flow through storage into embedding without the full chunk
+        list ever being held. Batches commit one by one, so a stream that
+        fails part way leaves partial chunks behind; errors are raised to the
+        consumer, which must then call mark_document_failed.
+        """
+        # Identical content resolves to an existing blob
+        layout = self.blob_store.put(document.content)
+        
+        conn = self._connection()
+        with conn:
+            # The chunk count is filled in once the stream is exhausted
+            conn.execute("""
+                INSERT OR REPLACE INTO documents 
+                (id, filename, content_type, file_size, upload_date, 
+                 processed_date, metadata, chunk_count, status,
+                 blob_key, content_offset, content_length)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                document.id,
+                document.filename,
+                document.content_type,
+                document.file_size,
+                document.upload_date.isoformat(),
+                document.processed_date.isoformat() if document.processed_date else None,
+                json.dumps(document.metadata),
+                0,
+                document.status,
+                layout.key,
+                layout.content[0],
+                layout.content[1]
+            ))
+        
+        chunk_iter = iter(chunks)
+        chunk_count = 0
+        batch = list(islice(chunk_iter, batch_size))
+        while batch:
+            # One transaction per batch of chunks
+            with conn:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO document_chunks 
+                    (chunk_id, document_id, chunk_index, content, metadata, created_at,
+                     chunk_type)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (
                         chunk.chunk_id,
                         chunk.source_document_id,
                         chunk.chunk_index,
                         chunk.content,
                         json.dumps(chunk.metadata),
-                        chunk.created_at.isoformat()
-                    ))
-                
-                # Store full document content separately
-                doc_file_path = self.documents_dir / f"{document.id}.json"
-                with open(doc_file_path, 'w', encoding='utf-8') as f:
-                    json.dump({
-                        'document': document.to_dict(),
-                        'content': document.content,
-                        'chunks': [chunk.to_dict() for chunk in chunks]
-                    }, f, ensure_ascii=False, indent=2)
-                
-                conn.commit()
-                
-            self.logger.info(f"Stored document {document.id} with {len(chunks)} chunks")
+                        chunk.created_at.isoformat(),
+                        chunk.chunk_type
+                    )
+                    for chunk in batch
+                ])
+            chunk_count += len(batch)
+            yield from batch
+            batch = list(islice(chunk_iter, batch_size))
+        
+        with conn:
+            conn.execute("UPDATE documents SET chunk_count = ? WHERE id = ?", (chunk_count, document.id))
+        
+        self.logger.info(f"Stored document {document.id} with {chunk_count} chunks")
+    
+    def update_document_status(self, document_id: str, status: str,
+                               processed_date: Optional[datetime] = None) -> bool:
+        """Update a document's status without rewriting its chunks"""
+        try:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute("""
+                    UPDATE documents SET status = ?, processed_date = COALESCE(?, processed_date)
+                    WHERE id = ?
+                """, (status, processed_date.isoformat() if processed_date else None, document_id))
+            return cursor.rowcount > 0
+            
+        except Exception as e:
+            self.logger.error(f"Error updating status for document {document_id}: {e}")
+            return False
+    
+    def mark_document_failed(self, document_id: str) -> bool:
+        """Drop a failed upload's partially stored chunks and mark it as errored"""
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM document_chunks WHERE document_id = ?", (document_id,))
+                conn.execute(
+                    "UPDATE documents SET chunk_count = 0, status = 'error' WHERE id = ?",
+                    (document_id,)
+                )
             return True
             
         except Exception as e:
-            self.logger.error(f"Error storing document: {e}")
+            self.logger.error(f"Error discarding chunks for document {document_id}: {e}")
             return False
     
     def retrieve_document(self, document_id: str) -> Optional[Document]:
         """Retrieve document by ID"""
         try:
-            doc_file_path = self.documents_dir / f"{document_id}.json"
-            if not doc_file_path.exists():
-                return None
+            row = self._connection().execute("""
+                SELECT id, filename, content_type, file_size, upload_date, processed_date,
+                       metadata, status, blob_key, content_offset, content_length
+                FROM documents WHERE id = ?
+            """, (document_id,)).fetchone()
             
-            with open(doc_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if row is None or row[8] is None:
+                # Documents stored before the blob store existed
+                return self._retrieve_legacy_document(document_id, row)
             
-            doc_data = data['document']
             document = Document(
-                id=doc_data['id'],
-                filename=doc_data['filename'],
-                content=data['content'],
-                content_type=doc_data['content_type'],
-                file_size=doc_data['file_size'],
-                metadata=doc_data['metadata'],
-                upload_date=datetime.fromisoformat(doc_data['upload_date']),
-                processed_date=datetime.fromisoformat(doc_data['processed_date']) if doc_data['processed_date'] else None,
-                status=doc_data['status']
+                id=row[0],
+                filename=row[1],
+                content=self.blob_store.read_frame(row[8], row[9], row[10]),
+                content_type=row[2],
+                file_size=row[3],
+                metadata=json.loads(row[6]) if row[6] else {},
+                upload_date=datetime.fromisoformat(row[4]),
+                processed_date=datetime.fromisoformat(row[5]) if row[5] else None,
+                status=row[7]
             )
-            
-            # Load chunks
-            for chunk_data in data['chunks']:
-                chunk = DocumentChunk.from_dict(chunk_data)
-                document.chunks.append(chunk)
-            
+            document.chunks = self.get_chunks_by_document_id(document_id)
             return document
             
         except Exception as e:
             self.logger.error(f"Error retrieving document {document_id}: {e}")
             return None
     
+    def _retrieve_legacy_document(self, document_id: str, row) -> Optional[Document]:
+        doc_file_path = self.documents_dir / f"{document_id}.json"
+        if not doc_file_path.exists():
+            return None
+        
+        with open(doc_file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        doc_data = data['document']
+        document = Document(
+            id=doc_data['id'],
+            filename=doc_data['filename'],
+            content=data['content'],
+            content_type=doc_data['content_type'],
+            file_size=doc_data['file_size'],
+            metadata=doc_data['metadata'],
+            upload_date=datetime.fromisoformat(doc_data['upload_date']),
+            processed_date=datetime.fromisoformat(doc_data['processed_date']) if doc_data['processed_date'] else None,
+            status=doc_data['status']
+        )
+        
+        # Status changes are written to the database only
+        if row is not None:
+            document.status = row[7]
+            if row[5]:
+                document.processed_date = datetime.fromisoformat(row[5])
+        
+        # Load chunks
+        for chunk_data in data['chunks']:
+            chunk = DocumentChunk.from_dict(chunk_data)
+            document.chunks.append(chunk)
+        
+        return document
+    
+    def get_chunk_content(self, chunk_id: str) -> Optional[str]:
+        """Read one chunk's text"""
+        try:
+            row = self._connection().execute(
+                "SELECT content FROM document_chunks WHERE chunk_id = ?", (chunk_id,)
+            ).fetchone()
+            return row[0] if row else None
+            
+        except Exception as e:
+            self.logger.error(f"Error reading chunk {chunk_id}: {e}")
+            return None
+    
     def get_chunks_by_document_id(self, document_id: str) -> List[DocumentChunk]:
         """Get all chunks for a document"""
         chunks = []
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT chunk_id, chunk_index, content, metadata, created_at
-                    FROM document_chunks 
-                    WHERE document_id = ?
-                    ORDER BY chunk_index
-                """, (document_id,))
-                
-                for row in cursor.fetchall():
-                    chunk = DocumentChunk(
-                        chunk_id=row[0],
-                        source_document_id=document_id,
-                        chunk_index=row[1],
-                        content=row[2],
-                        metadata=json.loads(row[3]),
-                        created_at=datetime.fromisoformat(row[4])
-                    )
-                    chunks.append(chunk)
+            cursor = self._connection().execute("""
+                SELECT chunk_id, chunk_index, content, metadata, created_at, chunk_type
+                FROM document_chunks 
+                WHERE document_id = ?
+                ORDER BY chunk_index
+            """, (document_id,))
+            
+            for row in cursor.fetchall():
+                chunk = DocumentChunk(
+                    chunk_id=row[0],
+                    source_document_id=document_id,
+                    chunk_index=row[1],
+                    content=row[2],
+                    metadata=json.loads(row[3]),
+                    created_at=datetime.fromisoformat(row[4]),
+                    chunk_type=row[5] or 'text'
+                )
+                chunks.append(chunk)
                     
         except Exception as e:
             self.logger.error(f"Error retrieving chunks for document {document_id}: {e}")
         
         return chunks
     
+    def iter_all_chunks(self) -> Iterator[DocumentChunk]:
+        """
+        Stream the chunks of every completed document, grouped by document,
+        without loading them all at once
+        
+        Chunks of uploads that are still running or that failed part way
+        are skipped.
+        """
+        try:
+            cursor = self._connection().execute("""
+                SELECT c.chunk_id, c.document_id, c.chunk_index, c.content, c.metadata,
+                       c.created_at, c.chunk_type
+                FROM document_chunks c
+                JOIN documents d ON d.id = c.document_id
+                WHERE d.status = 'completed'
+                ORDER BY c.document_id, c.chunk_index
+            """)
+            for row in cursor:
+                yield DocumentChunk(
+                    chunk_id=row[0],
+                    source_document_id=row[1],
+                    chunk_index=row[2],
+                    content=row[3],
+                    metadata=json.loads(row[4]),
+                    created_at=datetime.fromisoformat(row[5]),
+                    chunk_type=row[6] or 'text'
+                )
+                    
+        except Exception as e:
+            self.logger.error(f"Error streaming stored chunks: {e}")
+    
+    def search_chunks(self, query: str, limit: int = 10,
+                      document_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Keyword search over chunk text, best BM25 match first"""
+        results = []
+        if not query.split():
+            return results
+        
+        try:
+            conn = self._connection()
+            document_clause = ""
+            params: List[Any] = []
+            if document_ids:
+                document_clause = f"AND c.document_id IN ({','.join('?' * len(document_ids))})"
+                params.extend(document_ids)
+            
+            if self.fts_enabled:
+                cursor = conn.execute(f"""
+                    SELECT c.chunk_id, c.document_id, c.chunk_index, c.content, bm25(document_chunks_fts) AS score
+                    FROM document_chunks_fts
+                    JOIN document_chunks c ON c.rowid = document_chunks_fts.rowid
+                    WHERE document_chunks_fts MATCH ? {document_clause}
+                    ORDER BY score
+                    LIMIT ?
+                """, [self._fts_query(query)] + params + [limit])
+            else:
+                cursor = conn.execute(f"""
+                    SELECT c.chunk_id, c.document_id, c.chunk_index, c.content, 0.0 AS score
+                    FROM document_chunks c
+                    WHERE c.content LIKE ? {document_clause}
+                    LIMIT ?
+                """, [f"%{query}%"] + params + [limit])
+            
+            for row in cursor.fetchall():
+                results.append({
+                    'chunk_id': row[0],
+                    'document_id': row[1],
+                    'chunk_index': row[2],
+                    'content': row[3],
+                    # bm25() is lower-is-better; expose higher-is-better
+                    'score': -row[4]
+                })
+                
+        except Exception as e:
+            self.logger.error(f"Error searching chunks: {e}")
+        
+        return results
+    
     def search_documents(self, query: str, limit: int = 10) -> List[Dict]:
-        """Simple text search across documents"""
+        """Text search across documents: chunk text via FTS, then filename and metadata"""
         results = []
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            conn = self._connection()
+            rows = []
+            if self.fts_enabled and query.split():
+                rows = conn.execute("""
+                    SELECT d.id, d.filename, d.content_type, d.upload_date, d.chunk_count, d.status
+                    FROM (
+                        SELECT c.document_id, MIN(document_chunks_fts.rank) AS score
+                        FROM document_chunks_fts
+                        JOIN document_chunks c ON c.rowid = document_chunks_fts.rowid
+                        WHERE document_chunks_fts MATCH ?
+                        GROUP BY c.document_id
+                    ) AS hits
+                    JOIN documents d ON d.id = hits.document_id
+                    ORDER BY hits.score
+                    LIMIT ?
+                """, (self._fts_query(query), limit)).fetchall()
+            
+            if len(rows) < limit:
+                seen = {row[0] for row in rows}
                 cursor = conn.execute("""
                     SELECT id, filename, content_type, upload_date, chunk_count, status
                     FROM documents 
@@ -697,16 +997,17 @@ class DocumentStore:
                     ORDER BY upload_date DESC
                     LIMIT ?
                 """, (f"%{query}%", f"%{query}%", limit))
-                
-                for row in cursor.fetchall():
-                    results.append({
-                        'id': row[0],
-                        'filename': row[1],
-                        'content_type': row[2],
-                        'upload_date': row[3],
-                        'chunk_count': row[4],
-                        'status': row[5]
-                    })
+                rows.extend(row for row in cursor.fetchall() if row[0] not in seen)
+            
+            for row in rows[:limit]:
+                results.append({
+                    'id': row[0],
+                    'filename': row[1],
+                    'content_type': row[2],
+                    'upload_date': row[3],
+                    'chunk_count': row[4],
+                    'status': row[5]
+                })
                     
         except Exception as e:
             self.logger.error(f"Error searching documents: {e}")
@@ -717,23 +1018,22 @@ class DocumentStore:
         """List all documents"""
         results = []
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT id, filename, content_type, upload_date, chunk_count, status
-                    FROM documents 
-                    ORDER BY upload_date DESC
-                    LIMIT ? OFFSET ?
-                """, (limit, offset))
-                
-                for row in cursor.fetchall():
-                    results.append({
-                        'id': row[0],
-                        'filename': row[1],
-                        'content_type': row[2],
-                        'upload_date': row[3],
-                        'chunk_count': row[4],
-                        'status': row[5]
-                    })
+            cursor = self._connection().execute("""
+                SELECT id, filename, content_type, upload_date, chunk_count, status
+                FROM documents 
+                ORDER BY upload_date DESC
+                LIMIT ? OFFSET ?
+            """, (limit, offset))
+            
+            for row in cursor.fetchall():
+                results.append({
+                    'id': row[0],
+                    'filename': row[1],
+                    'content_type': row[2],
+                    'upload_date': row[3],
+                    'chunk_count': row[4],
+                    'status': row[5]
+                })
                     
         except Exception as e:
             self.logger.error(f"Error listing documents: {e}")
@@ -743,20 +1043,30 @@ class DocumentStore:
     def delete_document(self, document_id: str) -> bool:
         """Delete a document and its chunks"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            conn = self._connection()
+            with conn:
+                row = conn.execute("SELECT blob_key FROM documents WHERE id = ?", (document_id,)).fetchone()
+                blob_key = row[0] if row else None
+                
                 # Delete chunks first
                 conn.execute("DELETE FROM document_chunks WHERE document_id = ?", (document_id,))
                 
                 # Delete document
                 conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
                 
-                # Delete document file
-                doc_file_path = self.documents_dir / f"{document_id}.json"
-                if doc_file_path.exists():
-                    doc_file_path.unlink()
-                
-                conn.commit()
-                
+                # Blobs are shared by identical uploads; drop only the last reference
+                shared = blob_key is not None and conn.execute(
+                    "SELECT 1 FROM documents WHERE blob_key = ? LIMIT 1", (blob_key,)
+                ).fetchone()
+            
+            if blob_key is not None and not shared:
+                self.blob_store.delete(blob_key)
+            
+            # Delete legacy document file
+            doc_file_path = self.documents_dir / f"{document_id}.json"
+            if doc_file_path.exists():
+                doc_file_path.unlink()
+            
             self.logger.info(f"Deleted document {document_id}")
             return True
             
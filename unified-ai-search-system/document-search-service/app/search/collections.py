@@ -0,0 +1,261 @@
+"""Named index collections with lazy loading and LRU eviction under a memory budget."""
+
+import os
+import re
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.logger import get_enhanced_logger
+from app.monitoring.metrics import metrics
+from app.error_handling.exceptions import ValidationException
+
+logger = get_enhanced_logger(__name__)
+
+COLLECTION_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class CollectionStats:
+    """Per-collection traffic counters with a sliding QPS window."""
+
+    def __init__(self, window_seconds: float = 60.0):
+        self.window_seconds = window_seconds
+        self.total_searches = 0
+        self.loads = 0
+        self.evictions = 0
+        self.last_access = 0.0
+        self._search_times: deque = deque()
+
+    def record_search(self):
+        now = time.time()
+        self.total_searches += 1
+        self.last_access = now
+        self._search_times.append(now)
+        self._trim(now)
+
+    def qps(self) -> float:
+        self._trim(time.time())
+        return len(self._search_times) / self.window_seconds
+
+    def _trim(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._search_times and self._search_times[0] < cutoff:
+            self._search_times.popleft()
+
+
+class CollectionManager:
+    """
+    Serves many small indexes from one node.
+
+    Each collection is an independent search engine rooted at
+    ``<base_path>/<name>``. Collections are loaded from disk on first use and
+    the least recently used ones are evicted once the estimated resident size
+    exceeds ``memory_budget_bytes``; the budget is checked on every load and
+    again whenever a resident collection publishes a new snapshot. Evicting
+    flushes pending incremental changes, so nothing is lost: the next access
+    waits for the flush and save, then reloads from disk.
+    """
+
+    def __init__(self,
+                 base_path: str,
+                 engine_factory: Callable[[str, str], Any],
+                 memory_budget_bytes: int):
+        self.base_path = base_path
+        self.engine_factory = engine_factory
+        self.memory_budget_bytes = memory_budget_bytes
+        self._resident: "OrderedDict[str, Any]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._evicting: Dict[str, asyncio.Future] = {}
+        self._budget_tasks: Set[asyncio.Task] = set()
+        self._stats: Dict[str, CollectionStats] = {}
+        os.makedirs(self.base_path, exist_ok=True)
+
+    @staticmethod
+    def validate_name(name: str) -> str:
+        if not isinstance(name, str) or not COLLECTION_NAME_PATTERN.match(name):
+            raise ValidationException(
+                "Collection name must be 1-64 characters of letters, digits, '_' or '-'",
+                field="collection", value=name
+            )
+        return name
+
+    def collection_path(self, name: str) -> str:
+        return os.path.join(self.base_path, self.validate_name(name))
+
+    def list_collections(self) -> List[str]:
+        """All collections known on disk or currently resident."""
+        on_disk = {
+            entry for entry in os.listdir(self.base_path)
+            if os.path.isdir(os.path.join(self.base_path, entry)) and COLLECTION_NAME_PATTERN.match(entry)
+        }
+        return sorted(on_disk | set(self._resident))
+
+    def is_resident(self, name: str) -> bool:
+        return name in self._resident
+
+    def exists(self, name: str) -> bool:
+        return name in self._resident or os.path.isdir(self.collection_path(name))
+
+    async def get(self, name: str) -> Any:
+        """Return the engine for ``name``, loading it from disk if needed."""
+        self.validate_name(name)
+        # Reloading before an eviction has saved would read stale index files
+        evicting = self._evicting.get(name)
+        if evicting is not None:
+            await asyncio.shield(evicting)
+
+        engine = self._resident.get(name)
+        if engine is not None:
+            self._resident.move_to_end(name)
+            return engine
+
+        # Concurrent first accesses share a single load
+        pending = self._loading.get(name)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._loading[name] = future
+        try:
+            engine = await self._load(name)
+            future.set_result(engine)
+            return engine
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._loading[name]
+
+    async def search(self, name: str, *args, **kwargs):
+        """Search a collection; returns ``(results, facets)`` like ``search_with_facets``."""
+        engine = await self.get(name)
+        stats = self._stats_for(name)
+        stats.record_search()
+        metrics.increment_counter('collection_searches_total', labels={'collection': name})
+        return await engine.search_with_facets(*args, **kwargs)
+
+    async def evict(self, name: str) -> bool:
+        """Unload a resident collection after flushing its pending changes."""
+        engine = self._resident.pop(name, None)
+        if engine is None:
+            return False
+
+        # Accesses wait on this until the flush has been saved to disk
+        future = asyncio.get_running_loop().create_future()
+        self._evicting[name] = future
+        engine.on_publish = None
+        try:
+            manager = getattr(engine, 'incremental_manager', None)
+            if manager is not None:
+                await manager.stop_background_processing()
+                await manager.force_process_pending_changes()
+
+            result_cache = getattr(engine, 'result_cache', None)
+            if result_cache is not None:
+                await result_cache.close()
+        finally:
+            future.set_result(None)
+            del self._evicting[name]
+
+        self._stats_for(name).evictions += 1
+        metrics.increment_counter('collection_evictions_total', labels={'collection': name})
+        metrics.set_gauge('collection_memory_bytes', 0, labels={'collection': name})
+        self._update_resident_gauges()
+        logger.info(f"Evicted collection {name}")
+        return True
+
+    async def shutdown(self):
+        if self._budget_tasks:
+            await asyncio.gather(*self._budget_tasks, return_exceptions=True)
+        for name in list(self._resident):
+            await self.evict(name)
+
+    def resident_memory_bytes(self) -> int:
+        return sum(engine.estimate_memory_bytes() for engine in self._resident.values())
+
+    def get_collection_stats(self, name: str) -> Dict[str, Any]:
+        self.validate_name(name)
+        stats = self._stats_for(name)
+        engine = self._resident.get(name)
+        memory_bytes = engine.estimate_memory_bytes() if engine is not None else 0
+        if engine is not None:
+            metrics.set_gauge('collection_memory_bytes', memory_bytes, labels={'collection': name})
+
+        return {
+            'name': name,
+            'resident': engine is not None,
+            'memory_bytes': memory_bytes,
+            'qps': stats.qps(),
+            'total_searches': stats.total_searches,
+            'loads': stats.loads,
+            'evictions': stats.evictions,
+            'last_access': stats.last_access,
+            'document_count': len(engine.snapshot.document_metadata) if engine is not None else None,
+            'index_epoch': engine.snapshot.epoch if engine is not None else None
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'memory_budget_bytes': self.memory_budget_bytes,
+            'resident_memory_bytes': self.resident_memory_bytes(),
+            'resident_collections': list(self._resident),
+            'collections': {name: self.get_collection_stats(name) for name in self.list_collections()}
+        }
+
+    async def _load(self, name: str) -> Any:
+        path = self.collection_path(name)
+        os.makedirs(path, exist_ok=True)
+
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        # Loading reads index files from disk; keep it off the event loop
+        engine = await loop.run_in_executor(None, self.engine_factory, name, path)
+        load_ms = (time.time() - start_time) * 1000
+
+        manager = getattr(engine, 'incremental_manager', None)
+        if manager is not None:
+            await manager.start_background_processing()
+
+        self._resident[name] = engine
+        engine.on_publish = lambda snapshot: self._check_budget_after_publish(name)
+        self._stats_for(name).loads += 1
+        metrics.increment_counter('collection_loads_total', labels={'collection': name})
+        metrics.record_histogram('collection_load_time_ms', load_ms)
+        metrics.set_gauge('collection_memory_bytes', engine.estimate_memory_bytes(), labels={'collection': name})
+        logger.info(f"Loaded collection {name}", extra_fields={'load_time_ms': load_ms, 'path': path})
+
+        await self._enforce_budget(keep=name)
+        return engine
+
+    async def _enforce_budget(self, keep: str):
+        while self.resident_memory_bytes() > self.memory_budget_bytes:
+            victims = [name for name in self._resident if name != keep]
+            if not victims:
+                if keep in self._resident and self._resident[keep].estimate_memory_bytes() > self.memory_budget_bytes:
+                    logger.warning(f"Collection {keep} alone exceeds the memory budget")
+                    metrics.increment_counter('collection_budget_overruns_total', labels={'collection': keep})
+                break
+            await self.evict(victims[0])
+        self._update_resident_gauges()
+
+    def _check_budget_after_publish(self, name: str):
+        """Indexes grow with each publish, so a collection can outgrow the budget without a load."""
+        if name not in self._resident:
+            return
+        task = asyncio.get_running_loop().create_task(self._enforce_budget(keep=name))
+        self._budget_tasks.add(task)
+        task.add_done_callback(self._budget_tasks.discard)
+
+    def _update_resident_gauges(self):
+        metrics.set_gauge('collections_resident_count', len(self._resident))
+        metrics.set_gauge('collections_resident_memory_bytes', self.resident_memory_bytes())
+
+    def _stats_for(self, name: str) -> CollectionStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = CollectionStats()
+        return stats
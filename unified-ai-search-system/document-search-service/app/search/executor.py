@@ -0,0 +1,160 @@
+"""Concurrency-limited executor with admission control for CPU-bound search work."""
+
+import math
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.logger import get_enhanced_logger
+from app.monitoring.metrics import metrics
+from app.error_handling.exceptions import AdmissionRejectedException
+
+logger = get_enhanced_logger(__name__)
+
+
+class SearchExecutor:
+    """
+    Runs embedding, ANN lookups and scoring on a bounded worker pool.
+
+    Search work never runs on the event loop, so health checks and cache hits
+    stay responsive during a burst. Requests are admitted only while the
+    projected queue wait is below ``target_queue_ms``; beyond that they are
+    rejected up front with a ``Retry-After`` hint instead of queueing until
+    they time out. A full queue yields 429, a queue that is too slow to drain
+    yields 503.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 4,
+                 max_queue_size: int = 64,
+                 target_queue_ms: float = 250.0,
+                 ewma_alpha: float = 0.2):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_size = max_queue_size
+        self.target_queue_ms = target_queue_ms
+        self.ewma_alpha = ewma_alpha
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="search-worker")
+        # Counters are touched from the event loop and from worker threads
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        # Smoothed service time drives the queue-wait projection
+        self._service_time_ms = 0.0
+        self.stats = {
+            'admitted': 0,
+            'completed': 0,
+            'rejected_queue_full': 0,
+            'rejected_overloaded': 0,
+            'shed_after_queueing': 0
+        }
+
+    def projected_queue_ms(self) -> float:
+        """Expected wait for a request admitted now."""
+        waiting = self._queued + self._in_flight - self.max_concurrency + 1
+        if waiting <= 0:
+            return 0.0
+        return waiting * self._service_time_ms / self.max_concurrency
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``func`` on a worker, or raise ``AdmissionRejectedException``."""
+        self._admit()
+
+        loop = asyncio.get_running_loop()
+        ticket = {'enqueued_at': time.perf_counter(), 'started': False}
+        with self._lock:
+            self._queued += 1
+        self._update_gauges()
+        try:
+            return await loop.run_in_executor(self._pool, self._execute, ticket, func, args, kwargs)
+        finally:
+            with self._lock:
+                # A caller cancelled before a worker picked the job up
+                if not ticket['started']:
+                    ticket['started'] = True
+                    self._queued -= 1
+            self._update_gauges()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'max_concurrency': self.max_concurrency,
+            'max_queue_size': self.max_queue_size,
+            'target_queue_ms': self.target_queue_ms,
+            'queued': self._queued,
+            'in_flight': self._in_flight,
+            'service_time_ewma_ms': self._service_time_ms,
+            'projected_queue_ms': self.projected_queue_ms()
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _admit(self):
+        if self._queued >= self.max_queue_size:
+            self.stats['rejected_queue_full'] += 1
+            metrics.increment_counter('search_admission_rejections_total', labels={'reason': 'queue_full'})
+            raise AdmissionRejectedException(
+                "Search queue is full",
+                status_code=429,
+                retry_after=self._retry_after(),
+                queue_depth=self._queued
+            )
+
+        projected_ms = self.projected_queue_ms()
+        if projected_ms > self.target_queue_ms:
+            self.stats['rejected_overloaded'] += 1
+            metrics.increment_counter('search_admission_rejections_total', labels={'reason': 'overloaded'})
+            raise AdmissionRejectedException(
+                "Search service is overloaded",
+                status_code=503,
+                retry_after=self._retry_after(),
+                queue_depth=self._queued
+            )
+
+        self.stats['admitted'] += 1
+
+    def _execute(self, ticket: Dict[str, Any], func: Callable[..., Any], args, kwargs) -> Any:
+        started_at = time.perf_counter()
+        queue_ms = (started_at - ticket['enqueued_at']) * 1000
+        with self._lock:
+            if ticket['started']:
+                return None
+            ticket['started'] = True
+            self._queued -= 1
+        metrics.record_histogram('search_queue_time_ms', queue_ms)
+
+        # Admission is a projection; if the wait still blew well past the
+        # target, the client has likely given up, so don't spend CPU on it
+        if queue_ms > self.target_queue_ms * 4:
+            self.stats['shed_after_queueing'] += 1
+            metrics.increment_counter('search_admission_rejections_total', labels={'reason': 'queue_timeout'})
+            raise AdmissionRejectedException(
+                "Search request waited too long in queue",
+                status_code=503,
+                retry_after=self._retry_after(),
+                queue_depth=self._queued
+            )
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            service_ms = (time.perf_counter() - started_at) * 1000
+            with self._lock:
+                self._in_flight -= 1
+                self.stats['completed'] += 1
+                self._service_time_ms = (
+                    service_ms if self._service_time_ms == 0.0
+                    else self.ewma_alpha * service_ms + (1 - self.ewma_alpha) * self._service_time_ms
+                )
+            metrics.record_histogram('search_service_time_ms', service_ms)
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.projected_queue_ms() / 1000))
+
+    def _update_gauges(self):
+        metrics.set_gauge('search_executor_queue_depth', self._queued)
+        metrics.set_gauge('search_executor_in_flight', self._in_flight)
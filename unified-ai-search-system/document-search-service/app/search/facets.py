@@ -0,0 +1,134 @@
+"""Columnar facet aggregation over document metadata."""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+FACET_FIELDS = ('skills', 'seniority_level', 'experience_band')
+
+# Lower bounds of the experience bands after the first one
+EXPERIENCE_BAND_EDGES = np.array([3, 6, 11])
+EXPERIENCE_BAND_LABELS = ('0-2', '3-5', '6-10', '11+')
+
+
+class FacetIndex:
+    """
+    Metadata laid out as integer columns, one row per document.
+
+    Seniority and experience band are dense code columns. Skills are stored
+    as a flattened (row, skill code) pair list, case-folded so "AWS" and
+    "aws" count together. Aggregating a match set is a boolean row mask plus
+    one ``bincount`` per facet, so counts cover every matching document at
+    roughly the cost of a few array passes.
+    """
+
+    def __init__(self, document_metadata: Dict[str, Dict[str, Any]]):
+        self.doc_ids = list(document_metadata)
+        self.row_of = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+
+        seniority_vocab: Dict[str, int] = {}
+        skill_vocab: Dict[str, int] = {}
+        self.skill_labels: List[str] = []
+        seniority_codes = np.empty(len(self.doc_ids), dtype=np.int32)
+        experience = np.empty(len(self.doc_ids), dtype=np.float64)
+        skill_rows: List[int] = []
+        skill_codes: List[int] = []
+
+        for row, doc_id in enumerate(self.doc_ids):
+            metadata = document_metadata[doc_id]
+            seniority = str(metadata.get('seniority_level') or 'unknown')
+            seniority_codes[row] = seniority_vocab.setdefault(seniority, len(seniority_vocab))
+            experience[row] = metadata.get('experience_years') or 0
+
+            seen = set()
+            for skill in metadata.get('skills') or []:
+                key = str(skill).strip().lower()
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                code = skill_vocab.get(key)
+                if code is None:
+                    code = skill_vocab[key] = len(skill_vocab)
+                    self.skill_labels.append(str(skill).strip())
+                skill_rows.append(row)
+                skill_codes.append(code)
+
+        self.seniority_labels = list(seniority_vocab)
+        self.seniority_codes = seniority_codes
+        self.seniority_vocab = seniority_vocab
+        self.skill_vocab = skill_vocab
+        self.experience = experience
+        self.band_codes = np.digitize(experience, EXPERIENCE_BAND_EDGES).astype(np.int32)
+        self.skill_rows = np.array(skill_rows, dtype=np.int32)
+        self.skill_codes = np.array(skill_codes, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def aggregate(self, doc_ids: Iterable[str], fields: Optional[Iterable[str]] = None,
+                  top_n: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+        """Count facet values across ``doc_ids``; unknown ids are ignored."""
+        rows = np.fromiter(
+            (self.row_of[doc_id] for doc_id in doc_ids if doc_id in self.row_of),
+            dtype=np.int64
+        )
+        mask = np.zeros(len(self.doc_ids), dtype=bool)
+        mask[rows] = True
+        return self.aggregate_mask(mask, fields, top_n)
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """
+        Row mask of every document passing ``filters``, evaluated on the
+        columns: ``min_experience``, ``seniority_levels`` and
+        ``required_skills`` (case-insensitive, all must be present).
+        """
+        mask = np.ones(len(self.doc_ids), dtype=bool)
+        filters = filters or {}
+        if 'min_experience' in filters:
+            mask &= self.experience >= filters['min_experience']
+        if 'seniority_levels' in filters:
+            codes = [self.seniority_vocab[level] for level in filters['seniority_levels']
+                     if level in self.seniority_vocab]
+            mask &= np.isin(self.seniority_codes, codes)
+        for skill in filters.get('required_skills') or []:
+            code = self.skill_vocab.get(str(skill).strip().lower())
+            has_skill = np.zeros(len(self.doc_ids), dtype=bool)
+            if code is not None:
+                has_skill[self.skill_rows[self.skill_codes == code]] = True
+            mask &= has_skill
+        return mask
+
+    def exclude(self, mask: np.ndarray, doc_ids: Iterable[str]) -> np.ndarray:
+        """Copy of ``mask`` with ``doc_ids`` cleared."""
+        mask = mask.copy()
+        rows = [self.row_of[doc_id] for doc_id in doc_ids if doc_id in self.row_of]
+        mask[rows] = False
+        return mask
+
+    def aggregate_mask(self, mask: np.ndarray, fields: Optional[Iterable[str]] = None,
+                       top_n: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+        """Count facet values across the rows set in ``mask``."""
+        fields = list(fields) if fields else list(FACET_FIELDS)
+        facets = {}
+        if 'skills' in fields:
+            counts = np.bincount(self.skill_codes[mask[self.skill_rows]], minlength=len(self.skill_labels))
+            facets['skills'] = self._top_counts(counts, self.skill_labels, top_n)
+        if 'seniority_level' in fields:
+            counts = np.bincount(self.seniority_codes[mask], minlength=len(self.seniority_labels))
+            facets['seniority_level'] = self._top_counts(counts, self.seniority_labels, top_n)
+        if 'experience_band' in fields:
+            counts = np.bincount(self.band_codes[mask], minlength=len(EXPERIENCE_BAND_LABELS))
+            # Bands keep their natural order rather than count order
+            facets['experience_band'] = [
+                {'value': label, 'count': int(count)}
+                for label, count in zip(EXPERIENCE_BAND_LABELS, counts) if count
+            ]
+        return facets
+
+    @staticmethod
+    def _top_counts(counts: np.ndarray, labels: List[str], top_n: int) -> List[Dict[str, Any]]:
+        nonzero = np.flatnonzero(counts)
+        if len(nonzero) > top_n:
+            nonzero = nonzero[np.argpartition(-counts[nonzero], top_n - 1)[:top_n]]
+        order = sorted(nonzero, key=lambda code: (-counts[code], labels[code]))
+        return [{'value': labels[code], 'count': int(counts[code])} for code in order]
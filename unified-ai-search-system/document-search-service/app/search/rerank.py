@@ -0,0 +1,166 @@
+"""Optional cross-encoder second-stage reranking under a latency budget."""
+
+import time
+import threading
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+from app.logger import get_enhanced_logger
+from app.monitoring.metrics import metrics
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:
+    CrossEncoder = None
+
+try:
+    import onnxruntime
+    from transformers import AutoTokenizer
+except ImportError:
+    # ONNX backend is optional
+    onnxruntime = None
+    AutoTokenizer = None
+
+logger = get_enhanced_logger(__name__)
+
+T = TypeVar('T')
+
+
+class OnnxCrossEncoder:
+    """Cross-encoder exported to ONNX, run with onnxruntime on CPU."""
+
+    def __init__(self, model_path: str, tokenizer_name: str, max_length: int = 512):
+        if onnxruntime is None or AutoTokenizer is None:
+            raise ImportError("onnxruntime and transformers are required for the ONNX reranker")
+        self.session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.max_length = max_length
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], **kwargs) -> np.ndarray:
+        encoded = self.tokenizer(
+            [query for query, _ in pairs], [text for _, text in pairs],
+            padding=True, truncation=True, max_length=self.max_length, return_tensors='np'
+        )
+        feeds = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+        logits = np.asarray(self.session.run(None, feeds)[0])
+        # Single-logit relevance models, or the positive class of two-label ones
+        return logits[:, -1] if logits.ndim == 2 else logits
+
+
+class CrossEncoderReranker:
+    """
+    Rescores the top blended candidates with a cross-encoder.
+
+    Only the first ``top_n`` candidates are scored, ``batch_size`` pairs at a
+    time. Before each batch the reranker checks whether another batch still
+    fits in ``budget_ms`` (using a smoothed per-batch time); once it does not,
+    the remaining candidates keep their blended order behind the reranked
+    ones. The model is loaded on first use; if it cannot be loaded the
+    reranker disables itself and passes candidates through unchanged.
+    """
+
+    def __init__(self,
+                 model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 backend: str = "torch",
+                 onnx_path: Optional[str] = None,
+                 top_n: int = 20,
+                 batch_size: int = 8,
+                 budget_ms: float = 150.0,
+                 max_length: int = 512,
+                 model: Any = None):
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_path = onnx_path
+        self.top_n = top_n
+        self.batch_size = max(1, batch_size)
+        self.budget_ms = budget_ms
+        self.max_length = max_length
+        self._model = model
+        self._load_lock = threading.Lock()
+        self._disabled = False
+        self._batch_ms = 0.0
+        self.stats = {'requests': 0, 'scored': 0, 'budget_exhausted': 0}
+
+    @property
+    def available(self) -> bool:
+        return not self._disabled
+
+    def rerank(self, query: str, candidates: Sequence[T],
+               text_of: Callable[[T], str]) -> List[Tuple[T, Optional[float]]]:
+        """
+        Return ``(candidate, rerank score)`` pairs, reranked candidates first.
+
+        ``candidates`` must already be in blended-score order; candidates
+        that were not scored get None and keep their relative order.
+        """
+        candidates = list(candidates)
+        model = self._get_model()
+        if model is None or not candidates:
+            return [(candidate, None) for candidate in candidates]
+
+        self.stats['requests'] += 1
+        start = time.perf_counter()
+        head = candidates[:self.top_n]
+        scores: List[float] = []
+
+        for batch_start in range(0, len(head), self.batch_size):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if scores and elapsed_ms + self._batch_ms > self.budget_ms:
+                self.stats['budget_exhausted'] += 1
+                metrics.increment_counter('rerank_budget_exhausted_total')
+                break
+
+            batch = head[batch_start:batch_start + self.batch_size]
+            batch_start_time = time.perf_counter()
+            batch_scores = model.predict(
+                [(query, text_of(candidate)) for candidate in batch],
+                batch_size=len(batch), show_progress_bar=False
+            )
+            batch_ms = (time.perf_counter() - batch_start_time) * 1000
+            self._batch_ms = batch_ms if self._batch_ms == 0.0 else 0.2 * batch_ms + 0.8 * self._batch_ms
+            scores.extend(float(score) for score in batch_scores)
+
+        self.stats['scored'] += len(scores)
+        metrics.record_histogram('rerank_time_ms', (time.perf_counter() - start) * 1000)
+        metrics.record_histogram('rerank_scored_count', len(scores))
+
+        # Stable sort keeps blended order among equal scores
+        order = sorted(range(len(scores)), key=lambda position: -scores[position])
+        reranked = [(candidates[position], scores[position]) for position in order]
+        return reranked + [(candidate, None) for candidate in candidates[len(scores):]]
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'model_name': self.model_name,
+            'backend': self.backend,
+            'available': self.available,
+            'top_n': self.top_n,
+            'batch_size': self.batch_size,
+            'budget_ms': self.budget_ms,
+            'batch_time_ewma_ms': self._batch_ms
+        }
+
+    def _get_model(self):
+        if self._model is not None or self._disabled:
+            return self._model
+        with self._load_lock:
+            if self._model is None and not self._disabled:
+                try:
+                    self._model = self._load_model()
+                    logger.info(f"Loaded {self.backend} cross-encoder {self.model_name}")
+                except Exception as e:
+                    self._disabled = True
+                    logger.warning(f"Cross-encoder reranking disabled: {str(e)}")
+        return self._model
+
+    def _load_model(self):
+        if self.backend == "onnx":
+            if not self.onnx_path:
+                raise ValueError("RERANK_ONNX_PATH is required for the ONNX backend")
+            return OnnxCrossEncoder(self.onnx_path, self.model_name, self.max_length)
+        if CrossEncoder is None:
+            raise ImportError("sentence-transformers is required for the PyTorch reranker")
+        return CrossEncoder(self.model_name, device='cpu', max_length=self.max_length)
@@ -0,0 +1,147 @@
+"""Generation-aware search result cache with an optional shared Redis tier."""
+
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.logger import get_enhanced_logger
+from app.monitoring.metrics import metrics
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    # Redis is optional; without it the cache is process-local only
+    aioredis = None
+
+logger = get_enhanced_logger(__name__)
+
+
+class SearchResultCache:
+    """
+    Two-tier LRU + TTL cache for search results.
+
+    Keys include the index generation, so a committed mutation batch makes
+    every earlier entry unreachable. The local tier is also cleared on
+    ``invalidate()`` to release memory. The optional Redis tier is shared by
+    all replicas serving the same generation and relies on Redis TTLs for
+    cleanup.
+    """
+
+    def __init__(self,
+                 max_size: int = 1000,
+                 ttl_seconds: float = 300.0,
+                 redis_url: Optional[str] = None,
+                 key_prefix: str = "search_cache",
+                 serializer: Optional[Callable[[Any], Any]] = None,
+                 deserializer: Optional[Callable[[Any], Any]] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self.serializer = serializer or (lambda value: value)
+        self.deserializer = deserializer or (lambda value: value)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.stats = {
+            'local_hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+            'shared_errors': 0
+        }
+
+        self._redis = None
+        if redis_url:
+            if aioredis is None:
+                logger.warning("Redis URL configured but redis package not installed; shared cache tier disabled")
+            else:
+                self._redis = aioredis.from_url(redis_url)
+
+    @property
+    def shared_enabled(self) -> bool:
+        return self._redis is not None
+
+    def make_key(self, generation: str, query: str, num_results: int, filters: Optional[Dict],
+                 facets: Optional[List[str]] = None, collapse_duplicates: bool = False) -> str:
+        """Build a cache key scoped to one index generation."""
+        payload = json.dumps([query, num_results, filters, sorted(facets or []), collapse_duplicates],
+                             sort_keys=True, default=str)
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        return f"{self.key_prefix}:{generation}:{digest}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return a cached value from the local tier, falling back to Redis."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats['local_hits'] += 1
+                metrics.increment_counter('search_result_cache_hits_total', labels={'tier': 'local'})
+                return value
+            del self._entries[key]
+            self.stats['expirations'] += 1
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(key)
+            except Exception as e:
+                self._record_shared_error("get", e)
+                raw = None
+            if raw is not None:
+                value = self.deserializer(json.loads(raw))
+                self._store_local(key, value)
+                self.stats['shared_hits'] += 1
+                metrics.increment_counter('search_result_cache_hits_total', labels={'tier': 'shared'})
+                return value
+
+        self.stats['misses'] += 1
+        metrics.increment_counter('search_result_cache_misses_total')
+        return None
+
+    async def set(self, key: str, value: Any):
+        """Store a value in the local tier and, if configured, in Redis."""
+        self._store_local(key, value)
+
+        if self._redis is not None:
+            try:
+                payload = json.dumps(self.serializer(value))
+                await self._redis.set(key, payload, ex=max(1, int(self.ttl_seconds)))
+            except Exception as e:
+                self._record_shared_error("set", e)
+
+    def invalidate(self):
+        """Drop every local entry; called whenever a new index generation is published."""
+        self._entries.clear()
+        self.stats['invalidations'] += 1
+        metrics.increment_counter('search_result_cache_invalidations_total')
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats['local_hits'] + self.stats['shared_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            **self.stats,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'shared_enabled': self.shared_enabled,
+            'hit_rate': hits / lookups if lookups else 0.0
+        }
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.close()
+
+    def _store_local(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _record_shared_error(self, operation: str, error: Exception):
+        self.stats['shared_errors'] += 1
+        metrics.increment_counter('search_result_cache_shared_errors_total', labels={'operation': operation})
+        logger.warning(f"Shared result cache {operation} failed: {str(error)}")
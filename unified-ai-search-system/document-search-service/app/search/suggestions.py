@@ -0,0 +1,160 @@
+"""Prefix suggestion index over skills, names and titles."""
+
+import bisect
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SUGGESTION_KINDS = ('skill', 'name', 'title')
+
+
+def normalize_suggestion(text: str) -> str:
+    return ' '.join(str(text).lower().split())
+
+
+def metadata_values(metadata: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(kind, display value) pairs a document contributes to suggestions."""
+    values = []
+    for skill in metadata.get('skills') or []:
+        values.append(('skill', skill))
+    for kind in ('name', 'title'):
+        if metadata.get(kind):
+            values.append((kind, metadata[kind]))
+    return [(kind, str(value)) for kind, value in values if normalize_suggestion(value)]
+
+
+class SuggestionIndex:
+    """
+    Sorted-array prefix index weighted by document frequency.
+
+    Every distinct value is stored once with the number of documents that
+    carry it. Its sort keys are the normalized value and each word-start
+    suffix, so "learn" finds "Senior Machine Learning Engineer". A lookup is a
+    binary search plus a scan of the matching key range; the most recent
+    prefixes are memoized until the next mutation, which keeps short, broad
+    prefixes as cheap as long ones.
+    """
+
+    def __init__(self, prefix_cache_size: int = 512):
+        self.prefix_cache_size = prefix_cache_size
+        # (kind, normalized) -> [display, document count]
+        self._entries: Dict[Tuple[str, str], List[Any]] = {}
+        # Sorted (search key, kind, normalized)
+        self._keys: List[Tuple[str, str, str]] = []
+        self._prefix_cache: "OrderedDict[Tuple, List[Dict[str, Any]]]" = OrderedDict()
+
+    @classmethod
+    def from_metadata(cls, document_metadata: Dict[str, Dict[str, Any]]) -> 'SuggestionIndex':
+        index = cls()
+        counts: Dict[Tuple[str, str], List[Any]] = {}
+        for metadata in document_metadata.values():
+            for kind, value in set(metadata_values(metadata)):
+                entry = counts.setdefault((kind, normalize_suggestion(value)), [value, 0])
+                entry[1] += 1
+        index._entries = counts
+        index._keys = sorted(
+            (key, kind, normalized)
+            for (kind, normalized) in counts
+            for key in cls._search_keys(normalized)
+        )
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_document(self, metadata: Dict[str, Any]):
+        for kind, value in set(metadata_values(metadata)):
+            self._add_value(kind, value)
+
+    def remove_document(self, metadata: Dict[str, Any]):
+        for kind, value in set(metadata_values(metadata)):
+            self._remove_value(kind, value)
+
+    def apply_changes(self, old_metadata: Dict[str, Dict[str, Any]],
+                      new_metadata: Dict[str, Dict[str, Any]], doc_ids: Iterable[str]):
+        """Move the given documents from their old metadata to their new metadata."""
+        for doc_id in doc_ids:
+            old = old_metadata.get(doc_id)
+            new = new_metadata.get(doc_id)
+            if old is new:
+                continue
+            if old is not None:
+                self.remove_document(old)
+            if new is not None:
+                self.add_document(new)
+
+    def suggest(self, prefix: str, limit: int = 10, kinds: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        normalized_prefix = normalize_suggestion(prefix)
+        if not normalized_prefix:
+            return []
+
+        kind_filter = tuple(sorted(set(kinds))) if kinds else None
+        cache_key = (normalized_prefix, limit, kind_filter)
+        cached = self._prefix_cache.get(cache_key)
+        if cached is not None:
+            self._prefix_cache.move_to_end(cache_key)
+            return cached
+
+        matches = {}
+        position = bisect.bisect_left(self._keys, (normalized_prefix,))
+        while position < len(self._keys) and self._keys[position][0].startswith(normalized_prefix):
+            _, kind, normalized = self._keys[position]
+            position += 1
+            if kind_filter and kind not in kind_filter:
+                continue
+            starts_with = normalized.startswith(normalized_prefix)
+            previous = matches.get((kind, normalized))
+            matches[(kind, normalized)] = starts_with or bool(previous)
+
+        # Most frequent first; whole-value prefix matches beat mid-phrase ones
+        ranked = sorted(
+            matches.items(),
+            key=lambda item: (-self._entries[item[0]][1], not item[1], len(item[0][1]), item[0][1])
+        )[:limit]
+        suggestions = [
+            {'text': self._entries[key][0], 'kind': key[0], 'count': self._entries[key][1]}
+            for key, _ in ranked
+        ]
+
+        self._prefix_cache[cache_key] = suggestions
+        if len(self._prefix_cache) > self.prefix_cache_size:
+            self._prefix_cache.popitem(last=False)
+        return suggestions
+
+    def get_stats(self) -> Dict[str, Any]:
+        by_kind = {kind: 0 for kind in SUGGESTION_KINDS}
+        for kind, _ in self._entries:
+            by_kind[kind] = by_kind.get(kind, 0) + 1
+        return {'entries': len(self._entries), 'keys': len(self._keys), 'by_kind': by_kind}
+
+    @staticmethod
+    def _search_keys(normalized: str) -> List[str]:
+        keys = [normalized]
+        for position, char in enumerate(normalized):
+            if char == ' ' and position + 1 < len(normalized):
+                keys.append(normalized[position + 1:])
+        return keys
+
+    def _add_value(self, kind: str, value: str):
+        normalized = normalize_suggestion(value)
+        entry = self._entries.get((kind, normalized))
+        if entry is not None:
+            entry[1] += 1
+        else:
+            self._entries[(kind, normalized)] = [value, 1]
+            for key in self._search_keys(normalized):
+                bisect.insort(self._keys, (key, kind, normalized))
+        self._prefix_cache.clear()
+
+    def _remove_value(self, kind: str, value: str):
+        normalized = normalize_suggestion(value)
+        entry = self._entries.get((kind, normalized))
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._entries[(kind, normalized)]
+            for key in self._search_keys(normalized):
+                position = bisect.bisect_left(self._keys, (key, kind, normalized))
+                if position < len(self._keys) and self._keys[position] == (key, kind, normalized):
+                    del self._keys[position]
+        self._prefix_cache.clear()
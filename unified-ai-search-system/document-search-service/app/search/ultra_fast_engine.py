@@ -2,9 +2,10 @@ import numpy as np
 import time
 import os
 import pickle
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from typing import Callable, List, Dict, Set, Tuple, Optional
+from dataclasses import dataclass, asdict
 import asyncio
+import threading
 from sentence_transformers import SentenceTransformer
 import faiss
 
@@ -13,9 +14,14 @@ from app.math.hnsw_index import HNSWIndex
 from app.math.product_quantization import ProductQuantizer
 from app.logger import get_enhanced_logger, log_performance, log_operation
 from app.config import settings
-from app.error_handling.exceptions import SearchEngineException, EmbeddingException, IndexBuildException, safe_execute_async
+from app.error_handling.exceptions import SearchEngineException, EmbeddingException, IndexBuildException, AdmissionRejectedException, safe_execute_async
 from app.monitoring.metrics import metrics
 from app.indexing.incremental import IncrementalIndexManager
+from app.indexing.snapshot import IndexSnapshot, snapshot_from_engine
+from app.search.result_cache import SearchResultCache
+from app.search.suggestions import SuggestionIndex
+from app.search.facets import FacetIndex, FACET_FIELDS
+from app.indexing.dedup import NearDuplicateDetector
 
 logger = get_enhanced_logger(__name__)
 
@@ -27,15 +33,48 @@ class SearchResult:
     combined_score: float
     metadata: Dict
 
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        for score_field in ('similarity_score', 'bm25_score', 'combined_score'):
+            data[score_field] = float(data[score_field])
+        return data
+
 class UltraFastSearchEngine:
 
-    def __init__(self, embedding_dim: int, use_gpu: bool):
+    def __init__(self, embedding_dim: int, use_gpu: bool,
+                 index_path: Optional[str] = None,
+                 embedding_model: Optional[SentenceTransformer] = None):
         try:
-            self.embedding_model = SentenceTransformer(settings.embedding_model_name, device='cuda' if use_gpu else 'cpu')
+            # Collections pass the shared model in so it is only loaded once per process
+            self.embedding_model = embedding_model or SentenceTransformer(settings.embedding_model_name, device='cuda' if use_gpu else 'cpu')
             self.embedding_dim = embedding_dim
-            self.index_path = settings.index_path
+            self.index_path = index_path or settings.index_path
+            self.snapshot: Optional[IndexSnapshot] = None
+            # Serialises writers (full builds and incremental batches); readers never take it
+            self.write_lock = asyncio.Lock()
+            # Saves may run on executor threads; one at a time writes the index files
+            self._save_lock = threading.Lock()
+            # Optional SearchExecutor; attached by the application at startup
+            self.search_executor = None
+            # Optional callback run after each publish; collections re-check their memory budget
+            self.on_publish: Optional[Callable[[IndexSnapshot], None]] = None
+            self.suggestion_index = SuggestionIndex()
+            # (snapshot, FacetIndex) built on first faceted search of each generation
+            self._facet_index = (None, None)
+            self.duplicate_detector = (
+                NearDuplicateDetector(settings.dedup_jaccard_threshold, settings.dedup_index_duplicates)
+                if settings.dedup_enabled else None
+            )
+            self.result_cache = SearchResultCache(
+                max_size=settings.search_cache_size,
+                ttl_seconds=settings.search_cache_ttl_seconds,
+                redis_url=settings.search_cache_redis_url,
+                serializer=lambda value: {'results': [r.to_dict() for r in value[0]], 'facets': value[1]},
+                deserializer=lambda payload: ([SearchResult(**r) for r in payload['results']], payload['facets'])
+            )
             self._initialize_indexes()
             self.load_indexes()
+            self._publish_current_indexes()
             
             # Initialize incremental update manager
             self.incremental_manager = IncrementalIndexManager(self)
@@ -63,17 +102,63 @@ class UltraFastSearchEngine:
         self.corpus_size = 0
         self.avg_doc_length = 0
         self.search_stats = {'total_searches': 0, 'avg_response_time': 0, 'cache_hits': 0}
-        self.query_cache = {}
-        self.cache_max_size = 1000
+
+    def publish_snapshot(self, snapshot: IndexSnapshot, changed_doc_ids: Optional[Set[str]] = None):
+        """
+        Atomically make ``snapshot`` the generation that new searches read.
+
+        Searches already in flight keep the snapshot they started with. The
+        legacy attributes are rebound afterwards so persistence and health
+        checks see the same generation. Pass ``changed_doc_ids`` for
+        incremental batches so derived indexes only revisit those documents.
+        """
+        previous = self.snapshot
+        self.snapshot = snapshot
+        self.lsh_index = snapshot.lsh_index
+        self.hnsw_index = snapshot.hnsw_index
+        self.document_vectors = snapshot.document_vectors
+        self.document_codes = snapshot.document_codes
+        self.document_metadata = snapshot.document_metadata
+        self.document_text_features = snapshot.document_text_features
+        self.bm25_index = snapshot.bm25_index
+        self.doc_frequencies = snapshot.doc_frequencies
+        self.corpus_size = snapshot.corpus_size
+        self.avg_doc_length = snapshot.avg_doc_length
+        self._deleted_docs = set(snapshot.deleted_docs)
+        if previous is None or changed_doc_ids is None:
+            self.suggestion_index = SuggestionIndex.from_metadata(snapshot.document_metadata)
+        else:
+            self.suggestion_index.apply_changes(previous.document_metadata, snapshot.document_metadata, changed_doc_ids)
+        # Results computed against earlier generations are no longer reachable
+        self.result_cache.invalidate()
+        metrics.set_gauge('index_snapshot_epoch', snapshot.epoch)
+        if self.on_publish is not None:
+            self.on_publish(snapshot)
+
+    def next_snapshot_epoch(self) -> int:
+        return self.snapshot.epoch + 1 if self.snapshot is not None else 1
+
+    def _publish_current_indexes(self):
+        """Publish whatever the index attributes currently hold as a new epoch."""
+        self.publish_snapshot(snapshot_from_engine(self, self.next_snapshot_epoch()))
 
     def save_indexes(self):
-        """Save indexes with proper FAISS serialization handling."""
+        """
+        Save indexes with proper FAISS serialization handling.
+
+        Everything is read from one published snapshot, so a save running on
+        an executor thread never mixes two generations.
+        """
+        with self._save_lock:
+            self._save_snapshot(self.snapshot if self.snapshot is not None else snapshot_from_engine(self, 0))
+
+    def _save_snapshot(self, snapshot: IndexSnapshot):
         logger.info(f"Saving indexes to {self.index_path}")
         os.makedirs(self.index_path, exist_ok=True)
         
         try:
             # Save FAISS HNSW index directly using FAISS writer
-            faiss.write_index(self.hnsw_index.index, os.path.join(self.index_path, "hnsw.index"))
+            faiss.write_index(snapshot.hnsw_index.index, os.path.join(self.index_path, "hnsw.index"))
             
             # Save FAISS ProductQuantizer separately
             if hasattr(self, 'pq_quantizer') and self.pq_quantizer and self.pq_quantizer.trained:
@@ -94,16 +179,17 @@ class UltraFastSearchEngine:
             # Save all other data that doesn't contain FAISS objects
             # Be very explicit about what we're saving to avoid any FAISS references
             other_data = {
-                "lsh_index": self.lsh_index,  # LSH index shouldn't contain FAISS objects
-                "document_vectors": self.document_vectors.tolist() if hasattr(self.document_vectors, 'tolist') else self.document_vectors,
-                "document_codes": self.document_codes.tolist() if hasattr(self.document_codes, 'tolist') else self.document_codes,
-                "document_metadata": dict(self.document_metadata) if hasattr(self.document_metadata, 'items') else self.document_metadata,
-                "document_text_features": dict(self.document_text_features) if hasattr(self.document_text_features, 'items') else self.document_text_features,
-                "bm25_index": dict(self.bm25_index) if hasattr(self.bm25_index, 'items') else self.bm25_index,
-                "doc_frequencies": dict(self.doc_frequencies) if hasattr(self.doc_frequencies, 'items') else self.doc_frequencies,
-                "corpus_size": int(self.corpus_size) if hasattr(self.corpus_size, '__int__') else self.corpus_size,
-                "avg_doc_length": float(self.avg_doc_length) if hasattr(self.avg_doc_length, '__float__') else self.avg_doc_length,
-                "doc_ids": list(self.hnsw_index.doc_ids) if hasattr(self.hnsw_index.doc_ids, '__iter__') else self.hnsw_index.doc_ids
+                "lsh_index": snapshot.lsh_index,  # LSH index shouldn't contain FAISS objects
+                "document_vectors": snapshot.document_vectors.tolist() if hasattr(snapshot.document_vectors, 'tolist') else snapshot.document_vectors,
+                "document_codes": snapshot.document_codes.tolist() if hasattr(snapshot.document_codes, 'tolist') else snapshot.document_codes,
+                "document_metadata": dict(snapshot.document_metadata) if hasattr(snapshot.document_metadata, 'items') else snapshot.document_metadata,
+                "document_text_features": dict(snapshot.document_text_features) if hasattr(snapshot.document_text_features, 'items') else snapshot.document_text_features,
+                "bm25_index": dict(snapshot.bm25_index) if hasattr(snapshot.bm25_index, 'items') else snapshot.bm25_index,
+                "doc_frequencies": dict(snapshot.doc_frequencies) if hasattr(snapshot.doc_frequencies, 'items') else snapshot.doc_frequencies,
+                "corpus_size": int(snapshot.corpus_size) if hasattr(snapshot.corpus_size, '__int__') else snapshot.corpus_size,
+                "avg_doc_length": float(snapshot.avg_doc_length) if hasattr(snapshot.avg_doc_length, '__float__') else snapshot.avg_doc_length,
+                "doc_ids": list(snapshot.hnsw_index.doc_ids) if hasattr(snapshot.hnsw_index.doc_ids, '__iter__') else snapshot.hnsw_index.doc_ids,
+                "duplicates": self.duplicate_detector.to_state() if self.duplicate_detector is not None else None
             }
             
             with open(os.path.join(self.index_path, "other_data.pkl"), "wb") as f:
@@ -140,6 +226,8 @@ class UltraFastSearchEngine:
                 self.corpus_size = data["corpus_size"]
                 self.avg_doc_length = data["avg_doc_length"]
                 self.hnsw_index.doc_ids = data["doc_ids"]
+                if self.duplicate_detector is not None:
+                    self.duplicate_detector.load_state(data.get("duplicates"))
             
             # Load ProductQuantizer if it exists
             pq_path = os.path.join(self.index_path, "pq_quantizer.pkl")
@@ -182,12 +270,17 @@ class UltraFastSearchEngine:
     @log_performance("build_indexes")
     async def build_indexes(self, documents: List[Dict]):
         """Build search indexes with comprehensive error handling and monitoring."""
+        async with self.write_lock:
+            await self._build_indexes(documents)
+
+    async def _build_indexes(self, documents: List[Dict]):
         logger.info(f"Building ultra-fast indexes for {len(documents)} documents...")
         
         with log_operation(logger, "index_building", document_count=len(documents)):
             try:
                 start_time = time.time()
                 self._initialize_indexes()
+                documents = self._drop_near_duplicates(documents)
 
                 # Generate embeddings with error handling
                 texts_to_embed = [self._get_document_text(doc) for doc in documents]
@@ -208,12 +301,7 @@ class UltraFastSearchEngine:
                         text_features = self._extract_text_features(doc)
                         self.document_text_features[doc_id] = text_features
                         self.document_vectors[doc_id] = vectors[i]
-                        self.document_metadata[doc_id] = {
-                            'name': doc.get('name', ''),
-                            'experience_years': doc.get('experience_years', 0),
-                            'skills': doc.get('skills', []),
-                            'seniority_level': doc.get('seniority_level', 'unknown')
-                        }
+                        self.document_metadata[doc_id] = self._extract_metadata(doc)
                         valid_docs_processed += 1
                         
                     except Exception as e:
@@ -230,6 +318,9 @@ class UltraFastSearchEngine:
                 
                 await asyncio.gather(*build_tasks, return_exceptions=True)
                 
+                # Readers switch to the rebuilt indexes in one step
+                self._publish_current_indexes()
+                
                 # Save indexes
                 self.save_indexes()
                 
@@ -248,9 +339,32 @@ class UltraFastSearchEngine:
                 metrics.increment_counter('index_build_errors_total')
                 raise IndexBuildException(f"Index building failed: {str(e)}", cause=e)
 
-    @log_performance("search")
+    def _drop_near_duplicates(self, documents: List[Dict]) -> List[Dict]:
+        """Register near-duplicates for a full build and return the documents to index."""
+        if self.duplicate_detector is None:
+            return documents
+        self.duplicate_detector.load_state(None)
+        to_index = self.duplicate_detector.partition(self.lsh_index, documents, self._extract_text_features)
+        if len(to_index) < len(documents):
+            logger.info(f"Collapsed {len(documents) - len(to_index)} near-duplicate documents into aliases")
+        return to_index
+
     async def search(self, query: str, num_results: int = 10, filters: Optional[Dict] = None) -> List[SearchResult]:
         """Enhanced search with comprehensive error handling and monitoring."""
+        results, _ = await self.search_with_facets(query, num_results, filters)
+        return results
+
+    @log_performance("search")
+    async def search_with_facets(self, query: str, num_results: int = 10, filters: Optional[Dict] = None,
+                                 facet_fields: Optional[List[str]] = None,
+                                 collapse_duplicates: bool = False) -> Tuple[List[SearchResult], Optional[Dict]]:
+        """
+        Search and, if ``facet_fields`` is given, aggregate those facets over
+        every document that passes ``filters`` rather than only the returned
+        page or the retrieval candidates. With
+        ``collapse_duplicates``, only the best match of each near-duplicate
+        group is returned and its metadata lists the others.
+        """
         search_start = time.time()
         
         try:
@@ -261,59 +375,35 @@ class UltraFastSearchEngine:
             if num_results <= 0 or num_results > 1000:
                 raise SearchEngineException("num_results must be between 1 and 1000")
 
-            cache_key = f"{query}:{num_results}:{str(filters)}"
-            if cache_key in self.query_cache:
-                self.search_stats['cache_hits'] += 1
-                metrics.increment_counter('search_cache_hits_total')
-                return self.query_cache[cache_key]
+            unknown_facets = set(facet_fields or ()) - set(FACET_FIELDS)
+            if unknown_facets:
+                raise SearchEngineException(f"Unknown facet fields: {sorted(unknown_facets)}; expected any of {list(FACET_FIELDS)}")
 
-            # Generate query embeddings with error handling
-            try:
-                # Run synchronously - embedding model encode is not async
-                query_vector = self.embedding_model.encode([query], convert_to_numpy=True)
-            except Exception as e:
-                raise EmbeddingException(f"Failed to generate query embedding: {str(e)}", query, e)
-
-            query_features = self._extract_query_features(query)
-
-            # Candidate retrieval with error handling
-            try:
-                lsh_candidates = self.lsh_index.query_candidates(query_features, num_candidates=200)
-                hnsw_results = self.hnsw_index.search(query_vector, k=100)
-                hnsw_candidates = [doc_id for doc_id, _ in hnsw_results]
-                
-                all_candidates = list(set(lsh_candidates + hnsw_candidates))
-                
-                # Record candidate retrieval metrics
-                metrics.record_histogram('lsh_candidates_count', len(lsh_candidates))
-                metrics.record_histogram('hnsw_candidates_count', len(hnsw_candidates))
-                metrics.record_histogram('total_candidates_count', len(all_candidates))
-                
-            except Exception as e:
-                raise SearchEngineException(f"Candidate retrieval failed: {str(e)}", query, e)
-
-            # Apply filters with validation
-            if filters:
-                try:
-                    all_candidates = self._apply_filters(all_candidates, filters)
-                    metrics.record_histogram('filtered_candidates_count', len(all_candidates))
-                except Exception as e:
-                    logger.warning(f"Filter application failed: {str(e)}", extra_fields={'filters': filters})
-                    # Continue without filters rather than failing
+            # Pin one index generation for the whole request
+            snapshot = self.snapshot
 
-            # Score candidates
-            try:
-                scored_results = await self._score_candidates(all_candidates, query, query_vector[0], query_features)
-            except Exception as e:
-                raise SearchEngineException(f"Candidate scoring failed: {str(e)}", query, e)
+            cache_key = self.result_cache.make_key(
+                snapshot.generation, query, num_results, filters, facet_fields, collapse_duplicates
+            )
+            cached = await self.result_cache.get(cache_key)
+            if cached is not None:
+                self.search_stats['cache_hits'] += 1
+                metrics.increment_counter('search_cache_hits_total')
+                return cached
 
-            scored_results.sort(key=lambda x: x.combined_score, reverse=True)
-            final_results = scored_results[:num_results]
+            # Embedding, ANN lookups and scoring are CPU-bound; with an executor
+            # attached they run on its worker pool instead of the event loop
+            if self.search_executor is not None:
+                final_results, candidates_count, facets = await self.search_executor.run(
+                    self._execute_search, snapshot, query, num_results, filters, facet_fields, collapse_duplicates
+                )
+            else:
+                final_results, candidates_count, facets = self._execute_search(
+                    snapshot, query, num_results, filters, facet_fields, collapse_duplicates
+                )
 
             # Update cache
-            if len(self.query_cache) >= self.cache_max_size:
-                self.query_cache.pop(next(iter(self.query_cache)))
-            self.query_cache[cache_key] = final_results
+            await self.result_cache.set(cache_key, (final_results, facets))
 
             # Update statistics and metrics
             response_time = (time.time() - search_start) * 1000
@@ -328,32 +418,101 @@ class UltraFastSearchEngine:
             logger.info(f"Search completed successfully", extra_fields={
                 'response_time_ms': response_time,
                 'results_count': len(final_results),
-                'candidates_count': len(all_candidates),
+                'candidates_count': candidates_count,
                 'query_length': len(query)
             })
             
-            return final_results
+            return final_results, facets
             
-        except SearchEngineException:
+        except (SearchEngineException, AdmissionRejectedException):
             # Re-raise our specific exceptions
             raise
         except Exception as e:
             # Wrap unexpected exceptions
             raise SearchEngineException(f"Unexpected search error: {str(e)}", query, e)
 
-    async def _score_candidates(self, candidates: List[str], query: str, query_vector: np.ndarray, query_features: List[str]) -> List[SearchResult]:
-        tasks = [self._score_single_candidate(candidate, query, query_vector, query_features) for candidate in candidates]
-        results = await asyncio.gather(*tasks)
+    def _execute_search(self, snapshot: IndexSnapshot, query: str, num_results: int, filters: Optional[Dict],
+                        facet_fields: Optional[List[str]] = None,
+                        collapse_duplicates: bool = False) -> Tuple[List[SearchResult], int, Optional[Dict]]:
+        """Uncached search against one snapshot; returns results, candidate count and facets."""
+        # Generate query embeddings with error handling
+        try:
+            query_vector = self.embedding_model.encode([query], convert_to_numpy=True)
+        except Exception as e:
+            raise EmbeddingException(f"Failed to generate query embedding: {str(e)}", query, e)
+
+        query_features = self._extract_query_features(query)
+
+        # Candidate retrieval with error handling
+        try:
+            lsh_candidates = snapshot.lsh_index.query_candidates(query_features, num_candidates=200)
+            hnsw_results = snapshot.hnsw_index.search(query_vector, k=100)
+            hnsw_candidates = [doc_id for doc_id, _ in hnsw_results]
+            
+            all_candidates = list(set(lsh_candidates + hnsw_candidates))
+            
+            # Record candidate retrieval metrics
+            metrics.record_histogram('lsh_candidates_count', len(lsh_candidates))
+            metrics.record_histogram('hnsw_candidates_count', len(hnsw_candidates))
+            metrics.record_histogram('total_candidates_count', len(all_candidates))
+            
+        except Exception as e:
+            raise SearchEngineException(f"Candidate retrieval failed: {str(e)}", query, e)
+
+        # Apply filters with validation
+        if filters:
+            try:
+                all_candidates = self._apply_filters(all_candidates, filters, snapshot)
+                metrics.record_histogram('filtered_candidates_count', len(all_candidates))
+            except Exception as e:
+                logger.warning(f"Filter application failed: {str(e)}", extra_fields={'filters': filters})
+                # Continue without filters rather than failing
+
+        # Score candidates
+        try:
+            scored_results = self._score_candidates(all_candidates, query, query_vector[0], query_features, snapshot)
+        except Exception as e:
+            raise SearchEngineException(f"Candidate scoring failed: {str(e)}", query, e)
+
+        scored_results.sort(key=lambda x: x.combined_score, reverse=True)
+        if collapse_duplicates and self.duplicate_detector is not None:
+            scored_results = self.duplicate_detector.collapse(scored_results)
+
+        facets = None
+        if facet_fields:
+            # Counts cover every document passing the filters, not just the
+            # ANN/LSH candidates scored above
+            facet_index = self._get_facet_index(snapshot)
+            mask = facet_index.filter_mask(filters)
+            if collapse_duplicates and self.duplicate_detector is not None:
+                mask = facet_index.exclude(mask, list(self.duplicate_detector.canonical_of))
+            facets = facet_index.aggregate_mask(mask, facet_fields)
+
+        return scored_results[:num_results], len(all_candidates), facets
+
+    def _get_facet_index(self, snapshot: IndexSnapshot) -> FacetIndex:
+        cached_snapshot, facet_index = self._facet_index
+        if cached_snapshot is not snapshot:
+            facet_index = FacetIndex(snapshot.document_metadata)
+            # Single tuple assignment so concurrent workers never see a mismatched pair
+            self._facet_index = (snapshot, facet_index)
+        return facet_index
+
+    def _score_candidates(self, candidates: List[str], query: str, query_vector: np.ndarray, query_features: List[str],
+                          snapshot: Optional[IndexSnapshot] = None) -> List[SearchResult]:
+        results = [self._score_single_candidate(candidate, query, query_vector, query_features, snapshot) for candidate in candidates]
         return [r for r in results if r is not None]
 
-    async def _score_single_candidate(self, doc_id: str, query: str, query_vector: np.ndarray, query_features: List[str]) -> Optional[SearchResult]:
-        if doc_id not in self.document_vectors:
+    def _score_single_candidate(self, doc_id: str, query: str, query_vector: np.ndarray, query_features: List[str],
+                                snapshot: Optional[IndexSnapshot] = None) -> Optional[SearchResult]:
+        view = snapshot or self
+        if doc_id not in view.document_vectors:
             return None
 
-        doc_vector = self.document_vectors[doc_id]
+        doc_vector = view.document_vectors[doc_id]
         vector_similarity = 1 - self._cosine_distance(query_vector, doc_vector)
-        jaccard_similarity = self.lsh_index.jaccard_similarity(doc_id, query_features)
-        bm25_score = self._compute_bm25_score(doc_id, query)
+        jaccard_similarity = view.lsh_index.jaccard_similarity(doc_id, query_features)
+        bm25_score = self._compute_bm25_score(doc_id, query, snapshot)
 
         combined_score = (0.4 * vector_similarity + 0.3 * jaccard_similarity + 0.3 * bm25_score)
 
@@ -362,7 +521,7 @@ class UltraFastSearchEngine:
             similarity_score=vector_similarity,
             bm25_score=bm25_score,
             combined_score=combined_score,
-            metadata=self.document_metadata.get(doc_id, {})
+            metadata=view.document_metadata.get(doc_id, {})
         )
 
     def _cosine_distance(self, v1: np.ndarray, v2: np.ndarray) -> float:
@@ -398,12 +557,14 @@ class UltraFastSearchEngine:
         self.corpus_size = len(documents)
         self.avg_doc_length = total_length / self.corpus_size
 
-    def _compute_bm25_score(self, doc_id: str, query: str) -> float:
-        if doc_id not in self.bm25_index:
+    def _compute_bm25_score(self, doc_id: str, query: str, snapshot: Optional[IndexSnapshot] = None) -> float:
+        # Corpus stats and postings must come from the same generation
+        view = snapshot or self
+        if doc_id not in view.bm25_index:
             return 0.0
         k1 = 1.5
         b = 0.75
-        doc_data = self.bm25_index[doc_id]
+        doc_data = view.bm25_index[doc_id]
         doc_tf = doc_data['tf']
         doc_length = doc_data['length']
         query_terms = query.lower().split()
@@ -411,11 +572,20 @@ class UltraFastSearchEngine:
         for term in query_terms:
             if term in doc_tf:
                 tf = doc_tf[term]
-                df = self.doc_frequencies.get(term, 0)
-                idf = np.log((self.corpus_size - df + 0.5) / (df + 0.5) + 1)
-                score += idf * (tf * (k1 + 1)) / (tf + k1 * (1 - b + b * doc_length / self.avg_doc_length))
+                df = view.doc_frequencies.get(term, 0)
+                idf = np.log((view.corpus_size - df + 0.5) / (df + 0.5) + 1)
+                score += idf * (tf * (k1 + 1)) / (tf + k1 * (1 - b + b * doc_length / view.avg_doc_length))
         return score
 
+    def _extract_metadata(self, doc: Dict) -> Dict:
+        return {
+            'name': doc.get('name', ''),
+            'title': doc.get('title', ''),
+            'experience_years': doc.get('experience_years', 0),
+            'skills': doc.get('skills', []),
+            'seniority_level': doc.get('seniority_level', 'unknown')
+        }
+
     def _extract_text_features(self, doc: Dict) -> List[str]:
         features = []
         if 'skills' in doc: features.extend([s.lower() for s in doc['skills']])
@@ -436,21 +606,42 @@ class UltraFastSearchEngine:
         if 'technologies' in doc: text_parts.extend(doc['technologies'])
         return ' '.join(text_parts)
 
-    def _apply_filters(self, candidates: List[str], filters: Dict) -> List[str]:
+    def _apply_filters(self, candidates: List[str], filters: Dict, snapshot: Optional[IndexSnapshot] = None) -> List[str]:
+        document_metadata = (snapshot or self).document_metadata
         filtered = []
         for doc_id in candidates:
-            if doc_id not in self.document_metadata: continue
-            doc_meta = self.document_metadata[doc_id]
+            if doc_id not in document_metadata: continue
+            doc_meta = document_metadata[doc_id]
             if 'min_experience' in filters and doc_meta['experience_years'] < filters['min_experience']: continue
             if 'seniority_levels' in filters and doc_meta['seniority_level'] not in filters['seniority_levels']: continue
             if 'required_skills' in filters and not set(s.lower() for s in filters['required_skills']).issubset(set(s.lower() for s in doc_meta['skills'])): continue
             filtered.append(doc_id)
         return filtered
 
+    def estimate_memory_bytes(self) -> int:
+        """Rough resident size of this engine's indexes, excluding the shared embedding model."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return 0
+        vector_bytes = sum(getattr(v, 'nbytes', self.embedding_dim * 4) for v in snapshot.document_vectors.values())
+        # HNSW stores a flat copy of every vector plus ~2*M neighbour links per node
+        hnsw_bytes = len(snapshot.hnsw_index) * (self.embedding_dim * 4 + 2 * 32 * 4)
+        lsh_bytes = len(snapshot.lsh_index.signatures) * (snapshot.lsh_index.num_hashes * 4 + snapshot.lsh_index.num_bands * 64)
+        # Python dict/str overhead dominates postings; ~100 bytes per term entry
+        bm25_bytes = sum(len(entry['tf']) for entry in snapshot.bm25_index.values()) * 100
+        metadata_bytes = len(snapshot.document_metadata) * 512
+        return int(vector_bytes + hnsw_bytes + lsh_bytes + bm25_bytes + metadata_bytes)
+
     def get_performance_stats(self) -> Dict:
         cache_hit_rate = self.search_stats['cache_hits'] / self.search_stats['total_searches'] if self.search_stats['total_searches'] > 0 else 0
         return {
             'total_searches': self.search_stats['total_searches'],
             'avg_response_time_ms': self.search_stats['avg_response_time'],
-            'cache_hit_rate': cache_hit_rate
+            'cache_hit_rate': cache_hit_rate,
+            'index_epoch': self.snapshot.epoch if self.snapshot is not None else 0,
+            'index_generation': self.snapshot.generation if self.snapshot is not None else None,
+            'result_cache': self.result_cache.get_stats(),
+            'suggestions': self.suggestion_index.get_stats(),
+            'executor': self.search_executor.get_stats() if self.search_executor is not None else None,
+            'duplicates': self.duplicate_detector.get_stats() if self.duplicate_detector is not None else None
         }
\ No newline at end of file
@@ -100,6 +100,8 @@ class HealthCheckResponse(BaseModel):
     timestamp: str = Field(..., description="Current timestamp")
     version: str = Field(..., description="System version")
     uptime_seconds: float = Field(..., description="System uptime in seconds")
+    stale: bool = Field(False, description="Whether any component result has missed its refreshes")
+    age_seconds: Optional[float] = Field(None, description="Age of the oldest component result")
     components: Dict[str, Dict[str, Any]] = Field(..., description="Component health status")
 
 class MetricsResponse(BaseModel):
@@ -119,7 +119,8 @@ def test_sentence_splitting():
         
         print(f"  📝 Test text: '{test_text}'")
         
-        sentences = chunker._split_into_sentences(test_text)
+        from app.rag.chunking import iter_sentences
+        sentences = list(iter_sentences([test_text]))
         print(f"  ✅ Split into {len(sentences)} sentences:")
         for i, sentence in enumerate(sentences):
             print(f"    {i+1}: '{sentence}'")
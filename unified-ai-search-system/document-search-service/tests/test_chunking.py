@@ -0,0 +1,93 @@
+"""Tests for streaming, token-aware chunking."""
+
+import itertools
+
+from app.rag.chunking import StreamingChunker, TokenCounter, iter_sentences
+from app.rag.models import Document, DocumentChunker
+
+
+class WordTokenizer:
+    """Stand-in tokenizer: one token per whitespace-separated word."""
+
+    def encode(self, text, add_special_tokens=True):
+        tokens = text.split()
+        return ["[CLS]"] + tokens + ["[SEP]"] if add_special_tokens else tokens
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+
+def test_sentences_survive_block_boundaries_and_abbreviations():
+    text = "Dr. Smith arrived. He met J. Doe, e.g. at noon! Was it late?\n\nNew paragraph"
+    blocks = [text[i:i + 3] for i in range(0, len(text), 3)]
+
+    assert list(iter_sentences(blocks)) == [
+        "Dr. Smith arrived.",
+        "He met J. Doe, e.g. at noon!",
+        "Was it late?",
+        "New paragraph",
+    ]
+
+
+def test_run_without_boundary_is_force_split():
+    sentences = list(iter_sentences(["word " * 1000], max_sentence_chars=100))
+    assert all(len(sentence) <= 100 for sentence in sentences)
+    assert " ".join(sentences).split() == ["word"] * 1000
+
+
+def test_budget_respects_encoder_max_sequence_length():
+    counter = TokenCounter(WordTokenizer(), max_sequence_length=128)
+    assert counter.fit_budget(512) == 126
+    assert counter.fit_budget(64) == 64
+    assert TokenCounter().fit_budget(512) == 512
+
+
+def test_chunks_never_exceed_token_budget_and_overlap():
+    counter = TokenCounter(WordTokenizer())
+    chunker = StreamingChunker(counter, max_tokens=12, overlap_tokens=5)
+    sentences = [f"Sentence {i} has five words." for i in range(20)]
+    chunks = list(chunker.iter_chunks([" ".join(sentences)]))
+
+    assert len(chunks) > 1
+    for text, tokens in chunks:
+        assert tokens == counter.count(text) <= 12
+    # The last sentence of each chunk opens the next one
+    for (previous, _), (current, _) in zip(chunks, chunks[1:]):
+        assert current.startswith(previous.split(". ")[-1])
+
+
+def test_overlong_sentence_is_split_at_words():
+    chunker = StreamingChunker(TokenCounter(WordTokenizer()), max_tokens=10)
+    chunks = list(chunker.iter_chunks([" ".join(["word"] * 35)]))
+    assert [tokens for _, tokens in chunks] == [10, 10, 10, 5]
+
+
+def test_chunker_is_lazy_over_large_streams():
+    sentence_blocks = itertools.repeat("A short sentence about search. ")
+    chunker = StreamingChunker(TokenCounter(), max_tokens=64, overlap_tokens=8)
+
+    # An unbounded stream still yields chunks one at a time
+    first = list(itertools.islice(chunker.iter_chunks(sentence_blocks), 3))
+    assert len(first) == 3
+    assert all(tokens <= 64 for _, tokens in first)
+
+
+def test_document_chunker_semantic_uses_token_counter():
+    document = Document(filename="doc.txt", content="One two three. " * 200)
+    chunker = DocumentChunker(
+        chunk_size=512,
+        overlap=3,
+        token_counter=TokenCounter(WordTokenizer(), max_sequence_length=32)
+    )
+    chunks = chunker.chunk_document(document, strategy="semantic")
+
+    assert [chunk.chunk_index for chunk in chunks] == list(range(len(chunks)))
+    assert all(chunk.source_document_id == document.id for chunk in chunks)
+    assert all(chunk.metadata['token_count'] <= 30 for chunk in chunks)
+    assert all(len(chunk.content.split()) <= 30 for chunk in chunks)
+
+
+def test_fixed_size_chunking_terminates_with_overlap():
+    document = Document(filename="doc.txt", content="x" * 250)
+    chunks = DocumentChunker(chunk_size=100, overlap=20).chunk_document(document, strategy="fixed")
+    assert [len(chunk.content) for chunk in chunks] == [100, 100, 90]
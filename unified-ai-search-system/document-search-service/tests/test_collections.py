@@ -0,0 +1,142 @@
+"""Tests for named collections with lazy loading and LRU eviction."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.error_handling.exceptions import ValidationException
+from app.search.collections import CollectionManager
+
+
+class FakeEngine:
+    """Minimal stand-in exposing the surface the collection manager uses."""
+
+    def __init__(self, name: str, memory_bytes: int):
+        self.name = name
+        self.memory_bytes = memory_bytes
+        self.snapshot = SimpleNamespace(document_metadata={}, epoch=1)
+        self.searches = 0
+
+    def estimate_memory_bytes(self) -> int:
+        return self.memory_bytes
+
+    async def search_with_facets(self, query, num_results=10, filters=None, facet_fields=None):
+        self.searches += 1
+        return [], None
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    created = []
+
+    def factory(name, path):
+        created.append(name)
+        return FakeEngine(name, memory_bytes=400)
+
+    def build(budget: int = 1000):
+        return CollectionManager(str(tmp_path), factory, memory_budget_bytes=budget), created
+
+    return build
+
+
+@pytest.mark.asyncio
+async def test_collections_load_lazily_and_once(make_manager):
+    manager, created = make_manager()
+    assert manager.list_collections() == []
+
+    engines = await asyncio.gather(manager.get("tenant-a"), manager.get("tenant-a"))
+
+    assert engines[0] is engines[1]
+    assert created == ["tenant-a"]
+    assert manager.list_collections() == ["tenant-a"]
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_collection_is_evicted(make_manager):
+    manager, created = make_manager(budget=1000)
+    await manager.get("a")
+    await manager.get("b")
+    await manager.get("a")  # "b" is now least recently used
+    await manager.get("c")  # 1200 bytes > budget
+
+    assert not manager.is_resident("b")
+    assert manager.is_resident("a") and manager.is_resident("c")
+    assert manager.get_collection_stats("b")['evictions'] == 1
+
+    # Evicted collections reload on demand
+    await manager.get("b")
+    assert created.count("b") == 2
+
+
+@pytest.mark.asyncio
+async def test_per_collection_search_stats(make_manager):
+    manager, _ = make_manager()
+    await manager.search("a", query="python")
+    await manager.search("a", query="aws")
+    await manager.search("b", query="java")
+
+    stats = manager.get_collection_stats("a")
+    assert stats['total_searches'] == 2
+    assert stats['qps'] > 0
+    assert stats['memory_bytes'] == 400
+    assert manager.get_collection_stats("b")['total_searches'] == 1
+
+
+def test_collection_names_are_validated(make_manager):
+    manager, _ = make_manager()
+    with pytest.raises(ValidationException):
+        manager.collection_path("../etc")
+
+
+class SlowFlushManager:
+    """Incremental manager whose final flush waits until released."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.flushed = False
+
+    async def stop_background_processing(self):
+        pass
+
+    async def force_process_pending_changes(self):
+        await self.release.wait()
+        self.flushed = True
+
+
+@pytest.mark.asyncio
+async def test_access_during_eviction_waits_for_the_flush(make_manager):
+    manager, created = make_manager()
+    engine = await manager.get("a")
+    engine.incremental_manager = SlowFlushManager()
+
+    eviction = asyncio.create_task(manager.evict("a"))
+    await asyncio.sleep(0)
+    access = asyncio.create_task(manager.get("a"))
+    await asyncio.sleep(0)
+
+    # The collection is not reloaded from disk before its changes are saved
+    assert created == ["a"]
+    assert not access.done()
+
+    engine.incremental_manager.release.set()
+    assert await eviction
+    reloaded = await access
+    assert engine.incremental_manager.flushed
+    assert reloaded is not engine
+    assert created == ["a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_budget_is_rechecked_after_a_publish(make_manager):
+    manager, _ = make_manager(budget=1000)
+    a = await manager.get("a")
+    await manager.get("b")
+
+    # Incremental updates grow "a" in place, without a load
+    a.memory_bytes = 700
+    a.on_publish(a.snapshot)
+    await asyncio.sleep(0)
+
+    assert manager.is_resident("a")
+    assert not manager.is_resident("b")
@@ -0,0 +1,77 @@
+"""Tests for RAG context packing."""
+
+from types import SimpleNamespace
+
+from app.rag.chunking import TokenCounter
+from app.rag.context import ContextPacker, merge_overlapping
+
+
+def _result(document_id, chunk_index, content, score):
+    return SimpleNamespace(
+        chunk_id=f"{document_id}_{chunk_index}",
+        source_document_id=document_id,
+        chunk_index=chunk_index,
+        content=content,
+        combined_score=score,
+        metadata={'source_filename': f"{document_id}.txt"}
+    )
+
+
+def test_merge_overlapping_drops_repeated_sentences():
+    left = "Alpha one. Beta two. Gamma three."
+    right = "Gamma three. Delta four."
+    assert merge_overlapping(left, right) == "Alpha one. Beta two. Gamma three. Delta four."
+    assert merge_overlapping("No overlap here.", "Next part.") == "No overlap here. Next part."
+
+
+def test_adjacent_chunks_merge_into_one_span():
+    results = [
+        _result("doc", 3, "Gamma three. Delta four.", 0.5),
+        _result("doc", 2, "Beta two. Gamma three.", 0.9),
+        _result("doc", 7, "Far away.", 0.4),
+    ]
+    spans = ContextPacker().build_spans(results)
+
+    assert [(span.first_chunk_index, span.last_chunk_index) for span in spans] == [(2, 3), (7, 7)]
+    assert spans[0].text == "Beta two. Gamma three. Delta four."
+    assert spans[0].chunk_ids == ["doc_2", "doc_3"]
+    assert spans[0].relevance_score == 0.9
+
+
+def test_pack_orders_by_relevance_and_maps_citations():
+    results = [
+        _result("a", 0, "Less relevant passage.", 0.3),
+        _result("b", 0, "Most relevant passage.", 0.9),
+    ]
+    packed = ContextPacker().pack(results, token_budget=100)
+
+    assert packed.text.startswith("[1] Most relevant passage.")
+    assert [citation.source_document_id for citation in packed.citations] == ["b", "a"]
+    for citation in packed.citations:
+        assert packed.text[citation.start:citation.end].endswith("passage.")
+    assert packed.spans_dropped == 0
+
+
+def test_pack_respects_budget_and_skips_spans_that_do_not_fit():
+    counter = TokenCounter()
+    long_text = " ".join(["word"] * 50)
+    results = [
+        _result("long", 0, long_text, 0.9),
+        _result("short", 0, "Short fact.", 0.5),
+    ]
+    packed = ContextPacker(token_counter=counter, min_fragment_tokens=100).pack(results, token_budget=20)
+
+    assert [citation.source_document_id for citation in packed.citations] == ["short"]
+    assert packed.spans_dropped == 1
+    assert counter.count(packed.text) <= 20
+    assert packed.token_count <= 20
+
+
+def test_pack_truncates_one_large_span_to_fill_remaining_budget():
+    counter = TokenCounter()
+    results = [_result("long", 0, " ".join(["word"] * 200), 0.9)]
+    packed = ContextPacker(token_counter=counter, min_fragment_tokens=10).pack(results, token_budget=40)
+
+    assert len(packed.citations) == 1
+    assert packed.citations[0].truncated
+    assert counter.count(packed.text) <= 40
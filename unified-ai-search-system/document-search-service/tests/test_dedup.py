@@ -0,0 +1,194 @@
+"""Tests for near-duplicate detection at ingest and collapse at query time."""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict
+
+import numpy as np
+
+from app.indexing.dedup import NearDuplicateDetector
+from app.indexing.incremental import ChangeType, IncrementalIndexManager
+from app.indexing.snapshot import IndexSnapshot
+from app.math.hnsw_index import HNSWIndex
+from app.math.lsh_index import LSHIndex
+
+RESUME = "senior python engineer aws docker kubernetes terraform postgres redis kafka airflow spark"
+
+
+def _features(document):
+    return sorted(set(document['text'].split()))
+
+
+@dataclass
+class Result:
+    doc_id: str
+    combined_score: float
+    metadata: Dict = field(default_factory=dict)
+
+
+class FakeEngine:
+    """Just enough of the search engine for the incremental manager."""
+
+    def __init__(self, detector):
+        self.duplicate_detector = detector
+        self.write_lock = asyncio.Lock()
+        self.snapshot = IndexSnapshot(
+            epoch=1, lsh_index=LSHIndex(), hnsw_index=HNSWIndex(dimension=8),
+            document_vectors={}, document_codes={}, document_metadata={}, document_text_features={},
+            bm25_index={}, doc_frequencies={}, corpus_size=0, avg_doc_length=0
+        )
+        self.embedded = []
+        self.embedding_model = self
+        self.fail_encode = False
+
+    def encode(self, texts, **kwargs):
+        if self.fail_encode:
+            raise RuntimeError("encoder unavailable")
+        self.embedded.extend(texts)
+        return np.random.rand(len(texts), 8).astype(np.float32)
+
+    def _get_document_text(self, doc):
+        return doc['text']
+
+    def _extract_metadata(self, doc):
+        return {'name': doc['id']}
+
+    def _extract_text_features(self, doc):
+        return _features(doc)
+
+    def next_snapshot_epoch(self):
+        return self.snapshot.epoch + 1
+
+    def publish_snapshot(self, snapshot, changed_doc_ids=None):
+        self.snapshot = snapshot
+
+    def save_indexes(self):
+        pass
+
+
+def test_partition_collapses_duplicates_within_and_across_batches():
+    lsh_index = LSHIndex()
+    detector = NearDuplicateDetector(threshold=0.8)
+    documents = [
+        {'id': 'a', 'text': RESUME},
+        {'id': 'b', 'text': RESUME + " spark"},
+        {'id': 'c', 'text': "junior designer figma sketch illustrator"},
+    ]
+    to_index = detector.partition(lsh_index, documents, _features)
+
+    assert [doc['id'] for doc in to_index] == ['a', 'c']
+    assert detector.canonical_id('b') == 'a'
+    assert detector.alias_documents['b'] == documents[1]
+
+
+def test_threshold_keeps_merely_similar_documents_apart():
+    detector = NearDuplicateDetector(threshold=0.9)
+    documents = [
+        {'id': 'a', 'text': RESUME},
+        {'id': 'b', 'text': "senior python engineer aws docker gcp java"},
+    ]
+    assert len(detector.partition(LSHIndex(), documents, _features)) == 2
+    assert detector.canonical_of == {}
+
+
+def test_collapse_keeps_best_per_group_and_lists_members():
+    detector = NearDuplicateDetector(index_duplicates=True)
+    detector.add_alias('b', 'a')
+    original = Result('b', 0.9, {'name': 'b'})
+    results = detector.collapse([original, Result('a', 0.8), Result('c', 0.5)])
+
+    assert [result.doc_id for result in results] == ['b', 'c']
+    assert results[0].metadata['duplicate_ids'] == ['a']
+    assert 'duplicate_ids' not in original.metadata
+
+
+def test_state_round_trips():
+    detector = NearDuplicateDetector()
+    detector.add_alias('b', 'a', {'id': 'b'})
+    restored = NearDuplicateDetector()
+    restored.load_state(detector.to_state())
+    assert restored.canonical_id('b') == 'a'
+    assert restored.aliases == {'a': ['b']}
+
+
+def test_ingest_skips_embedding_duplicates_and_promotes_alias_on_delete():
+    engine = FakeEngine(NearDuplicateDetector(threshold=0.8))
+    manager = IncrementalIndexManager(engine)
+
+    async def scenario():
+        manager.add_document_change('a', ChangeType.ADD, {'id': 'a', 'text': RESUME})
+        await manager.force_process_pending_changes()
+        manager.add_document_change('b', ChangeType.ADD, {'id': 'b', 'text': RESUME + " spark"})
+        await manager.force_process_pending_changes()
+        assert set(engine.snapshot.document_vectors) == {'a'}
+        assert len(engine.embedded) == 1
+
+        manager.add_document_change('a', ChangeType.DELETE)
+        await manager.force_process_pending_changes()
+
+    asyncio.run(scenario())
+    assert set(engine.snapshot.document_vectors) == {'b'}
+    assert engine.duplicate_detector.canonical_of == {}
+
+
+def test_deleting_collapsed_alias_leaves_index_untouched():
+    engine = FakeEngine(NearDuplicateDetector(threshold=0.8))
+    manager = IncrementalIndexManager(engine)
+
+    async def scenario():
+        manager.add_document_change('a', ChangeType.ADD, {'id': 'a', 'text': RESUME})
+        manager.add_document_change('b', ChangeType.ADD, {'id': 'b', 'text': RESUME})
+        await manager.force_process_pending_changes()
+        manager.add_document_change('b', ChangeType.DELETE)
+        await manager.force_process_pending_changes()
+
+    asyncio.run(scenario())
+    assert set(engine.snapshot.document_vectors) == {'a'}
+    assert engine.duplicate_detector.aliases == {}
+
+
+def test_canonical_update_releases_aliases_that_no_longer_match():
+    detector = NearDuplicateDetector(threshold=0.8)
+    lsh_index = LSHIndex()
+    lsh_index.add_document('a', _features({'text': RESUME}))
+    detector.add_alias('b', 'a', {'id': 'b', 'text': RESUME})
+    detector.add_alias('c', 'a', {'id': 'c', 'text': RESUME + " spark"})
+
+    # 'a' now matches neither alias; 'b' and 'c' still match each other
+    rewritten = {'id': 'a', 'text': "junior designer figma sketch illustrator"}
+    to_index = detector.partition(lsh_index, [rewritten], _features)
+
+    assert [doc['id'] for doc in to_index] == ['a', 'b']
+    assert detector.canonical_of == {'c': 'b'}
+    assert detector.stats['released'] == 2
+
+
+def test_canonical_update_keeps_aliases_that_still_match():
+    detector = NearDuplicateDetector(threshold=0.8)
+    lsh_index = LSHIndex()
+    lsh_index.add_document('a', _features({'text': RESUME}))
+    detector.add_alias('b', 'a', {'id': 'b', 'text': RESUME})
+
+    to_index = detector.partition(lsh_index, [{'id': 'a', 'text': RESUME + " spark"}], _features)
+
+    assert [doc['id'] for doc in to_index] == ['a']
+    assert detector.canonical_of == {'b': 'a'}
+
+
+def test_failed_batch_leaves_duplicate_groups_untouched():
+    engine = FakeEngine(NearDuplicateDetector(threshold=0.8))
+    manager = IncrementalIndexManager(engine)
+
+    async def scenario():
+        manager.add_document_change('a', ChangeType.ADD, {'id': 'a', 'text': RESUME})
+        await manager.force_process_pending_changes()
+
+        engine.fail_encode = True
+        manager.add_document_change('b', ChangeType.ADD, {'id': 'b', 'text': RESUME})
+        manager.add_document_change('c', ChangeType.ADD, {'id': 'c', 'text': "junior designer figma"})
+        return await manager.force_process_pending_changes()
+
+    result = asyncio.run(scenario())
+    assert result['errors'] == 2
+    assert engine.duplicate_detector.canonical_of == {}
+    assert set(manager.pending_changes) == {'b', 'c'}
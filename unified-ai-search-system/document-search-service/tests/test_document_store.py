@@ -0,0 +1,193 @@
+"""Tests for the SQLite-backed RAG document store."""
+
+import threading
+
+import pytest
+
+from app.rag.models import Document, DocumentChunk, DocumentStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DocumentStore(db_path=str(tmp_path / "rag.db"), documents_dir=str(tmp_path / "docs"))
+    yield store
+    store.close()
+
+
+def _document(filename, texts):
+    document = Document(filename=filename, content=" ".join(texts), status="indexing")
+    chunks = [
+        DocumentChunk(content=text, source_document_id=document.id, chunk_index=i)
+        for i, text in enumerate(texts)
+    ]
+    return document, chunks
+
+
+def test_database_uses_wal_journal(store):
+    mode = store._connection().execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode.lower() == "wal"
+
+
+def test_connections_are_reused_per_thread(store):
+    assert store._connection() is store._connection()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(store._connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not store._connection()
+
+
+def test_chunk_keyword_search_uses_fts(store):
+    if not store.fts_enabled:
+        pytest.skip("sqlite built without FTS5")
+
+    resume, resume_chunks = _document("resume.txt", ["Kubernetes operator in Go", "Python data pipelines"])
+    notes, notes_chunks = _document("notes.txt", ["Gardening tips", "More python scripting notes"])
+    assert store.store_document(resume, resume_chunks)
+    assert store.store_document(notes, notes_chunks)
+
+    hits = store.search_chunks("kubernetes")
+    assert [hit['chunk_id'] for hit in hits] == [resume_chunks[0].chunk_id]
+
+    python_hits = store.search_chunks("python", document_ids=[notes.id])
+    assert [hit['document_id'] for hit in python_hits] == [notes.id]
+
+    assert [doc['id'] for doc in store.search_documents("gardening")] == [notes.id]
+
+
+def test_fts_index_follows_replace_and_delete(store):
+    if not store.fts_enabled:
+        pytest.skip("sqlite built without FTS5")
+
+    document, chunks = _document("doc.txt", ["original text about kafka"])
+    store.store_document(document, chunks)
+    chunks[0].content = "rewritten text about flink"
+    store.store_document(document, chunks)
+
+    assert store.search_chunks("kafka") == []
+    assert len(store.search_chunks("flink")) == 1
+
+    store.delete_document(document.id)
+    assert store.search_chunks("flink") == []
+
+
+def test_status_updates_do_not_rewrite_chunks(store):
+    document, chunks = _document("doc.txt", ["first chunk", "second chunk"])
+    store.store_document(document, chunks)
+
+    assert store.update_document_status(document.id, "completed")
+
+    retrieved = store.retrieve_document(document.id)
+    assert retrieved.status == "completed"
+    assert len(retrieved.chunks) == 2
+    assert len(store.get_chunks_by_document_id(document.id)) == 2
+
+
+def _blob_files(store):
+    return list(store.blob_store.root.rglob("*.blob"))
+
+
+def test_identical_uploads_share_one_compressed_blob(store):
+    texts = ["Distributed systems notes. " * 200, "Consensus and replication. " * 200]
+    first, first_chunks = _document("a.txt", texts)
+    second, second_chunks = _document("copy-of-a.txt", texts)
+
+    store.store_document(first, first_chunks)
+    store.store_document(second, second_chunks)
+
+    blobs = _blob_files(store)
+    assert len(blobs) == 1
+    assert blobs[0].stat().st_size < len(first.content) / 4
+    assert store.retrieve_document(second.id).content == first.content
+
+    # The shared blob survives until its last document is deleted
+    store.delete_document(first.id)
+    assert len(_blob_files(store)) == 1
+    store.delete_document(second.id)
+    assert _blob_files(store) == []
+
+
+def test_single_chunk_is_read_by_id(store):
+    document, chunks = _document("doc.txt", ["alpha chunk", "beta chunk", "gamma chunk"])
+    store.store_document(document, chunks)
+
+    assert store.get_chunk_content(chunks[1].chunk_id) == "beta chunk"
+    assert store.get_chunk_content("missing") is None
+
+
+def test_legacy_json_documents_remain_readable(store):
+    import json
+
+    document, chunks = _document("legacy.txt", ["old chunk"])
+    legacy_path = store.documents_dir / f"{document.id}.json"
+    legacy_path.write_text(json.dumps({
+        'document': document.to_dict(),
+        'content': document.content,
+        'chunks': [chunk.to_dict() for chunk in chunks]
+    }))
+
+    retrieved = store.retrieve_document(document.id)
+    assert retrieved.content == "old chunk"
+    assert [chunk.content for chunk in retrieved.chunks] == ["old chunk"]
+
+
+def test_blob_holds_only_the_document_content(store):
+    document, chunks = _document("doc.txt", ["alpha chunk " * 50, "beta chunk " * 50])
+    store.store_document(document, chunks)
+    rechunked, rechunked_chunks = _document("same.txt", ["alpha chunk " * 50, "beta chunk " * 50])
+    rechunked_chunks[0].content += " extra"
+    store.store_document(rechunked, rechunked_chunks)
+
+    # Chunk text is stored once, in SQLite; the blob is keyed by content alone
+    [blob] = _blob_files(store)
+    key = blob.stem
+    offset, length = store.blob_store.layout(key).content
+    assert blob.stat().st_size < offset + length + 64
+    assert store.blob_store.read_content(key) == document.content
+
+
+def test_stream_stores_chunks_in_batches_as_they_are_consumed(store):
+    document, chunks = _document("doc.txt", [f"chunk number {i}" for i in range(5)])
+    produced = []
+
+    def lazy_chunks():
+        for chunk in chunks:
+            produced.append(chunk)
+            yield chunk
+
+    stream = store.store_document_stream(document, lazy_chunks(), batch_size=2)
+    first = next(stream)
+
+    # Only the first batch has been pulled from the chunker and written
+    assert first is chunks[0]
+    assert len(produced) == 2
+    assert len(store.get_chunks_by_document_id(document.id)) == 2
+
+    assert [chunk.chunk_id for chunk in stream] == [chunk.chunk_id for chunk in chunks[1:]]
+    retrieved = store.retrieve_document(document.id)
+    assert len(retrieved.chunks) == 5
+    assert retrieved.content == document.content
+
+
+def test_failed_stream_drops_its_partial_chunks(store):
+    document, chunks = _document("doc.txt", [f"chunk number {i}" for i in range(5)])
+
+    def failing_chunks():
+        yield from chunks[:3]
+        raise RuntimeError("chunker failed")
+
+    assert store.store_document(document, failing_chunks()) is False
+
+    assert store.get_chunks_by_document_id(document.id) == []
+    assert store.retrieve_document(document.id).status == "error"
+
+
+def test_iter_all_chunks_skips_unfinished_documents(store):
+    done, done_chunks = _document("done.txt", ["finished chunk"])
+    running, running_chunks = _document("running.txt", ["partial chunk"])
+    store.store_document(done, done_chunks)
+    store.store_document(running, running_chunks)
+    store.update_document_status(done.id, "completed")
+
+    assert [chunk.chunk_id for chunk in store.iter_all_chunks()] == [done_chunks[0].chunk_id]
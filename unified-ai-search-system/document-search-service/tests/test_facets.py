@@ -0,0 +1,61 @@
+"""Tests for columnar facet aggregation."""
+
+from app.search.facets import FacetIndex
+
+
+def _metadata():
+    return {
+        'd1': {'skills': ['Python', 'AWS'], 'seniority_level': 'senior', 'experience_years': 8},
+        'd2': {'skills': ['python', 'Go'], 'seniority_level': 'mid', 'experience_years': 4},
+        'd3': {'skills': ['Go', 'Rust', 'aws'], 'seniority_level': 'senior', 'experience_years': 12},
+        'd4': {'skills': [], 'seniority_level': 'junior', 'experience_years': 1},
+    }
+
+
+def test_counts_cover_the_whole_match_set():
+    index = FacetIndex(_metadata())
+
+    facets = index.aggregate(['d1', 'd2', 'd3'])
+
+    assert facets['skills'] == [
+        {'value': 'AWS', 'count': 2},
+        {'value': 'Go', 'count': 2},
+        {'value': 'Python', 'count': 2},
+        {'value': 'Rust', 'count': 1},
+    ]
+    assert facets['seniority_level'] == [{'value': 'senior', 'count': 2}, {'value': 'mid', 'count': 1}]
+    assert facets['experience_band'] == [
+        {'value': '3-5', 'count': 1},
+        {'value': '6-10', 'count': 1},
+        {'value': '11+', 'count': 1},
+    ]
+
+
+def test_requested_fields_and_unknown_ids():
+    index = FacetIndex(_metadata())
+
+    facets = index.aggregate(['d4', 'missing'], fields=['experience_band'])
+
+    assert facets == {'experience_band': [{'value': '0-2', 'count': 1}]}
+
+
+def test_top_n_limits_skill_values():
+    metadata = {f'd{i}': {'skills': [f's{j}' for j in range(i + 1)], 'experience_years': 0} for i in range(30)}
+    index = FacetIndex(metadata)
+
+    skills = index.aggregate(metadata, top_n=3)['skills']
+
+    assert skills == [{'value': 's0', 'count': 30}, {'value': 's1', 'count': 29}, {'value': 's2', 'count': 28}]
+
+
+def test_filter_mask_selects_every_filtered_document():
+    index = FacetIndex(_metadata())
+
+    mask = index.filter_mask({'min_experience': 4, 'required_skills': ['GO']})
+    assert [index.doc_ids[row] for row in mask.nonzero()[0]] == ['d2', 'd3']
+
+    mask = index.filter_mask({'seniority_levels': ['senior', 'staff'], 'required_skills': ['python', 'aws']})
+    assert index.aggregate_mask(mask, ['seniority_level']) == {'seniority_level': [{'value': 'senior', 'count': 1}]}
+
+    assert index.filter_mask({'required_skills': ['cobol']}).sum() == 0
+    assert index.exclude(index.filter_mask(None), ['d1', 'missing']).sum() == 3
@@ -0,0 +1,198 @@
+"""Tests for copy-on-write index snapshots."""
+
+import asyncio
+import threading
+
+import numpy as np
+
+from app.indexing.incremental import ChangeType, IncrementalIndexManager
+from app.indexing.snapshot import IndexSnapshot
+from app.math.hnsw_index import HNSWIndex
+from app.math.lsh_index import LSHIndex
+
+
+def _empty_snapshot(dimension: int = 8) -> IndexSnapshot:
+    return IndexSnapshot(
+        epoch=1,
+        lsh_index=LSHIndex(num_hashes=32, num_bands=8),
+        hnsw_index=HNSWIndex(dimension=dimension),
+        document_vectors={},
+        document_codes={},
+        document_metadata={},
+        document_text_features={},
+        bm25_index={},
+        doc_frequencies={},
+        corpus_size=0,
+        avg_doc_length=0
+    )
+
+
+def _add(batch, doc_id: str, text: str, dimension: int = 8):
+    vector = np.random.rand(dimension).astype(np.float32)
+    tokens = text.lower().split()
+    batch.upsert_document(doc_id, vector, {'name': doc_id}, list(set(tokens)), tokens)
+    batch.add_vectors(vector.reshape(1, -1), [doc_id])
+
+
+def test_write_batch_does_not_touch_published_snapshot():
+    base = _empty_snapshot()
+    batch = base.begin_write()
+    _add(batch, "doc1", "python aws docker")
+
+    assert base.document_vectors == {}
+    assert base.bm25_index == {}
+    assert len(base.hnsw_index) == 0
+    assert base.lsh_index.signatures == {}
+
+    published = batch.freeze(base.epoch + 1)
+    assert published.epoch == 2
+    assert "doc1" in published.bm25_index
+    assert len(published.hnsw_index) == 1
+    assert "doc1" in published.lsh_index.signatures
+
+
+def test_bm25_corpus_stats_stay_consistent_across_updates_and_deletes():
+    batch = _empty_snapshot().begin_write()
+    _add(batch, "doc1", "python python aws")
+    _add(batch, "doc2", "java aws")
+    first = batch.freeze(2)
+
+    assert first.corpus_size == 2
+    assert first.doc_frequencies == {"python": 1, "aws": 2, "java": 1}
+    assert first.avg_doc_length == 2.5
+
+    batch = first.begin_write()
+    _add(batch, "doc1", "golang")
+    batch.remove_document("doc2")
+    second = batch.freeze(3)
+
+    assert second.corpus_size == 1
+    assert second.doc_frequencies == {"golang": 1}
+    assert second.avg_doc_length == 1
+    assert "doc2" in second.deleted_docs
+    assert "doc2" not in second.lsh_index.signatures
+    # The previous generation is untouched
+    assert first.doc_frequencies == {"python": 1, "aws": 2, "java": 1}
+    assert "doc2" in first.lsh_index.signatures
+
+
+def test_delete_only_batch_reuses_hnsw_index():
+    batch = _empty_snapshot().begin_write()
+    _add(batch, "doc1", "python")
+    first = batch.freeze(2)
+
+    batch = first.begin_write()
+    batch.remove_document("doc1")
+    second = batch.freeze(3)
+
+    assert second.hnsw_index is first.hnsw_index
+    assert "doc1" not in second.document_vectors
+
+
+def test_generation_is_content_derived():
+    vector = np.ones(8, dtype=np.float32)
+
+    def build(order):
+        batch = _empty_snapshot().begin_write()
+        for doc_id in order:
+            batch.upsert_document(doc_id, vector, {'name': doc_id}, [doc_id], [doc_id])
+        return batch.freeze(2)
+
+    first = build(["doc1", "doc2"])
+    second = build(["doc2", "doc1"])
+    assert first.generation == second.generation
+
+    batch = first.begin_write()
+    batch.upsert_document("doc1", vector, {'name': 'changed'}, ["doc1"], ["doc1"])
+    changed = batch.freeze(3)
+    assert changed.generation != first.generation
+
+    batch = changed.begin_write()
+    batch.upsert_document("doc1", vector, {'name': 'doc1'}, ["doc1"], ["doc1"])
+    assert batch.freeze(4).generation == first.generation
+
+
+class BatchEngine:
+    """Just enough of the search engine to publish incremental batches."""
+
+    duplicate_detector = None
+
+    def __init__(self, fail_encode=False):
+        self.snapshot = _empty_snapshot()
+        self.write_lock = asyncio.Lock()
+        self.embedding_model = self
+        self.fail_encode = fail_encode
+        self.encode_threads = []
+        self.saves = 0
+
+    def encode(self, texts, **kwargs):
+        self.encode_threads.append(threading.current_thread())
+        if self.fail_encode:
+            raise RuntimeError("encoder unavailable")
+        return np.random.rand(len(texts), 8).astype(np.float32)
+
+    def _get_document_text(self, doc):
+        return doc['text']
+
+    def _extract_metadata(self, doc):
+        return {'name': doc['id']}
+
+    def _extract_text_features(self, doc):
+        return doc['text'].split()
+
+    def next_snapshot_epoch(self):
+        return self.snapshot.epoch + 1
+
+    def publish_snapshot(self, snapshot, changed_doc_ids=None):
+        self.snapshot = snapshot
+
+    def save_indexes(self):
+        self.saves += 1
+
+
+def test_batch_is_built_off_the_event_loop():
+    engine = BatchEngine()
+    manager = IncrementalIndexManager(engine)
+    manager.add_document_change('doc1', ChangeType.ADD, {'id': 'doc1', 'text': 'python aws'})
+
+    result = asyncio.run(manager.force_process_pending_changes())
+
+    assert result == {'processed': 1, 'errors': 0}
+    assert engine.encode_threads[0] is not threading.main_thread()
+    assert 'doc1' in engine.snapshot.document_vectors
+    assert engine.saves == 1
+
+
+def test_failed_batch_is_discarded_and_requeued():
+    engine = BatchEngine()
+    manager = IncrementalIndexManager(engine, max_attempts=2)
+    manager.add_document_change('doc1', ChangeType.ADD, {'id': 'doc1', 'text': 'python aws'})
+    asyncio.run(manager.force_process_pending_changes())
+    published = engine.snapshot
+
+    # The delete succeeds but the add fails: nothing from the batch is published
+    engine.fail_encode = True
+    manager.add_document_change('doc1', ChangeType.DELETE)
+    manager.add_document_change('doc2', ChangeType.ADD, {'id': 'doc2', 'text': 'java gcp'})
+    result = asyncio.run(manager.force_process_pending_changes())
+
+    assert result == {'processed': 0, 'errors': 2}
+    assert engine.snapshot is published
+    assert set(manager.pending_changes) == {'doc1', 'doc2'}
+
+    engine.fail_encode = False
+    asyncio.run(manager.force_process_pending_changes())
+    assert set(engine.snapshot.document_vectors) == {'doc2'}
+    assert manager.pending_changes == {}
+
+
+def test_changes_are_dropped_after_max_attempts():
+    engine = BatchEngine(fail_encode=True)
+    manager = IncrementalIndexManager(engine, max_attempts=2)
+    manager.add_document_change('doc1', ChangeType.ADD, {'id': 'doc1', 'text': 'python'})
+
+    for _ in range(3):
+        asyncio.run(manager.force_process_pending_changes())
+
+    assert manager.pending_changes == {}
+    assert manager.stats['failed_updates'] == 2
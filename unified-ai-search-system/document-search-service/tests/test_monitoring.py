@@ -88,3 +88,74 @@ def test_quick_health_check(health_checker):
     assert 'status' in quick_health
     assert 'timestamp' in quick_health
     assert 'uptime_seconds' in quick_health
+
+@pytest.mark.asyncio
+async def test_background_refresh_serves_cached_snapshot(mock_search_engine):
+    """Checks refresh on their own intervals; reads never run them."""
+    checker = HealthChecker(mock_search_engine, intervals={'search_engine': 0.05})
+    assert not checker.has_snapshot
+    assert checker.get_cached_health()['stale'] is True
+    
+    checker.start_background_refresh()
+    try:
+        await asyncio.sleep(0.2)
+        calls = mock_search_engine.get_performance_stats.call_count
+        assert calls >= 2
+        
+        health_data = checker.get_cached_health()
+        assert mock_search_engine.get_performance_stats.call_count == calls
+        assert health_data['stale'] is False
+        assert health_data['components']['search_engine']['age_seconds'] < 0.2
+    finally:
+        await checker.stop_background_refresh()
+    assert not checker.refreshing
+
+def test_cached_health_reports_staleness(health_checker):
+    """A component that missed its refreshes is flagged stale."""
+    for component in health_checker.components.values():
+        component.update_status(HealthStatus.HEALTHY, "ok")
+    assert health_checker.get_quick_health()['stale'] is False
+    
+    health_checker.components['embeddings'].last_check -= 10 * health_checker.components['embeddings'].interval
+    health_data = health_checker.get_cached_health()
+    
+    assert health_data['components']['embeddings']['stale'] is True
+    assert health_data['components']['system']['stale'] is False
+    assert health_data['stale'] is True
+    assert health_checker.get_quick_health()['stale'] is True
+
+def test_histogram_memory_is_bounded_and_quantiles_accurate():
+    """Log buckets keep a fixed footprint with ~1% quantile error."""
+    collector = MetricsCollector()
+    for value in range(1, 100001):
+        collector.record_histogram('latency_ms', value / 10)
+    
+    histogram = collector._histograms['latency_ms']
+    assert len(histogram._buckets) < 1500
+    
+    stats = collector.get_histogram_stats('latency_ms')
+    assert stats['count'] == 100000
+    assert stats['min'] == 0.1
+    assert stats['max'] == 10000.0
+    assert abs(stats['median'] - 5000) / 5000 < 0.02
+    assert abs(stats['p99'] - 9900) / 9900 < 0.02
+
+def test_prometheus_exposition():
+    """Counters, gauges and histograms render in the text format."""
+    collector = MetricsCollector()
+    collector.increment_counter('requests_total', labels={'status': '429'})
+    collector.set_gauge('queue_depth', 3)
+    for value in (0.2, 7, 40, 40000):
+        collector.record_histogram('search_time_ms', value)
+    
+    text = collector.render_prometheus()
+    
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{status="429"} 1' in text
+    assert 'queue_depth 3' in text
+    assert '# TYPE search_time_ms histogram' in text
+    assert 'search_time_ms_bucket{le="0.5"} 1' in text
+    assert 'search_time_ms_bucket{le="10"} 2' in text
+    assert 'search_time_ms_bucket{le="30000"} 3' in text
+    assert 'search_time_ms_bucket{le="+Inf"} 4' in text
+    assert 'search_time_ms_count 4' in text
@@ -285,6 +285,177 @@ class TestRAGEngine:
         assert results[0].content == "Test content 1"
 
 
+class HashingEncoder:
+    """Deterministic bag-of-words encoder standing in for the embedding model"""
+    
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+    
+    def encode(self, texts, **kwargs):
+        import numpy as np
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.lower().split():
+                vectors[row, hash(token) % self.dim] += 1.0
+        return vectors + 1e-3
+
+
+class TestRAGScopedRetrieval:
+    """Test document-scoped RAG retrieval against a real engine"""
+    
+    @pytest.fixture
+    def rag_engine(self, tmp_path):
+        from app.rag.enhanced_engine import RAGUltraFastEngine
+        from app.rag.models import DocumentChunk
+        
+        engine = RAGUltraFastEngine(64, False, index_path=str(tmp_path), embedding_model=HashingEncoder())
+        chunks = [
+            DocumentChunk(chunk_id=f"big_{i}", content=f"kubernetes deployment guide part {i}",
+                          source_document_id="big", chunk_index=i)
+            for i in range(300)
+        ]
+        chunks.append(DocumentChunk(chunk_id="small_0", content="kubernetes notes from the small handbook",
+                                    source_document_id="small", chunk_index=0))
+        asyncio.run(engine.index_document_chunks(chunks))
+        return engine
+    
+    def test_scoped_retrieval_finds_chunks_outside_global_top_k(self, rag_engine):
+        results = asyncio.run(rag_engine.retrieve_for_rag(
+            "kubernetes deployment guide", top_k=3, document_filter=["small"], confidence_threshold=0.0
+        ))
+        assert [result.chunk_id for result in results] == ["small_0"]
+        assert results[0].embedding_score > 0
+        assert results[0].keyword_score > 0
+    
+    def test_scoped_retrieval_unknown_document_returns_nothing(self, rag_engine):
+        results = asyncio.run(rag_engine.retrieve_for_rag(
+            "kubernetes", top_k=3, document_filter=["missing"], confidence_threshold=0.0
+        ))
+        assert results == []
+    
+    def test_reranker_reorders_top_candidates(self, rag_engine):
+        import numpy as np
+        from app.search.rerank import CrossEncoderReranker
+        
+        class PreferDeploymentGuide:
+            def predict(self, pairs, **kwargs):
+                return np.array([1.0 if "deployment" in text else 0.0 for _, text in pairs])
+        
+        query = "kubernetes notes from the small handbook"
+        blended = asyncio.run(rag_engine.retrieve_for_rag(query, top_k=1, document_filter=["big", "small"],
+                                                          confidence_threshold=0.0, rerank=False))
+        assert blended[0].chunk_id == "small_0"
+        
+        rag_engine.reranker = CrossEncoderReranker(top_n=10, model=PreferDeploymentGuide())
+        results = asyncio.run(rag_engine.retrieve_for_rag(query, top_k=1, document_filter=["big", "small"],
+                                                          confidence_threshold=0.0))
+        assert results[0].source_document_id == "big"
+        assert results[0].rerank_score == 1.0
+    
+    def test_unscoped_retrieval_reports_component_scores(self, rag_engine):
+        results = asyncio.run(rag_engine.retrieve_for_rag("deployment guide part 7", top_k=2,
+                                                          confidence_threshold=0.0))
+        assert len(results) == 2
+        assert all(result.source_document_id == "big" for result in results)
+        assert results[0].combined_score >= results[1].combined_score
+
+
+class TestRAGIncrementalIndexing:
+    """Test incremental chunk indexing and its rollback"""
+    
+    @staticmethod
+    def _chunks(document_id, count):
+        from app.rag.models import DocumentChunk
+        return [
+            DocumentChunk(chunk_id=f"{document_id}_{i}", content=f"{document_id} section {i} about caching",
+                          source_document_id=document_id, chunk_index=i)
+            for i in range(count)
+        ]
+    
+    @pytest.fixture
+    def rag_engine(self, tmp_path):
+        from app.rag.enhanced_engine import RAGUltraFastEngine
+        return RAGUltraFastEngine(64, False, index_path=str(tmp_path), embedding_model=HashingEncoder())
+    
+    def test_second_call_appends_without_touching_published_snapshot(self, rag_engine):
+        assert asyncio.run(rag_engine.index_document_chunks(self._chunks("a", 5), batch_size=2))
+        first = rag_engine.snapshot
+        
+        assert asyncio.run(rag_engine.index_document_chunks(self._chunks("b", 3), batch_size=2))
+        
+        assert len(first.hnsw_index) == 5
+        assert len(rag_engine.snapshot.hnsw_index) == 8
+        assert rag_engine.snapshot.epoch == first.epoch + 1
+        assert rag_engine.document_chunks == {"a": [f"a_{i}" for i in range(5)], "b": ["b_0", "b_1", "b_2"]}
+        assert set(rag_engine.chunk_metadata) == set(rag_engine.snapshot.document_vectors)
+    
+    def test_failed_call_leaves_indexes_and_chunk_maps_unchanged(self, rag_engine):
+        asyncio.run(rag_engine.index_document_chunks(self._chunks("a", 2)))
+        published = rag_engine.snapshot
+        
+        def failing_stream():
+            yield from self._chunks("b", 2)
+            raise RuntimeError("store went away")
+        
+        assert not asyncio.run(rag_engine.index_document_chunks(failing_stream(), batch_size=2))
+        
+        assert rag_engine.snapshot is published
+        assert set(rag_engine.chunk_metadata) == {"a_0", "a_1"}
+        assert set(rag_engine.chunk_embeddings) == {"a_0", "a_1"}
+        assert list(rag_engine.document_chunks) == ["a"]
+    
+    def test_publish_during_indexing_is_kept_and_staged_chunks_are_replayed(self, rag_engine):
+        asyncio.run(rag_engine.index_document_chunks(self._chunks("a", 2)))
+        
+        async def index_while_deleting():
+            loop = asyncio.get_running_loop()
+            
+            def stream():
+                yield from self._chunks("b", 2)
+                # Batches are pulled off the event loop without the write lock,
+                # so another writer can publish in the meantime
+                assert not rag_engine.write_lock.locked()
+                asyncio.run_coroutine_threadsafe(rag_engine.delete_document_chunks("a"), loop).result()
+                yield from self._chunks("c", 1)
+            
+            return await rag_engine.index_document_chunks(stream(), batch_size=2, consolidate=False)
+        
+        assert asyncio.run(index_while_deleting())
+        
+        assert set(rag_engine.snapshot.document_vectors) == {"b_0", "b_1", "c_0"}
+        assert rag_engine.document_chunks == {"b": ["b_0", "b_1"], "c": ["c_0"]}
+    
+    def test_consolidation_drops_stale_vectors(self, rag_engine):
+        asyncio.run(rag_engine.index_document_chunks(self._chunks("a", 4)))
+        asyncio.run(rag_engine.delete_document_chunks("a"))
+        assert len(rag_engine.snapshot.hnsw_index) == 4
+        
+        asyncio.run(rag_engine.index_document_chunks(self._chunks("b", 2)))
+        
+        assert len(rag_engine.snapshot.hnsw_index) == 2
+        assert rag_engine.snapshot.deleted_docs == frozenset()
+        assert "a" not in rag_engine.document_chunks
+    
+    def test_startup_loads_every_stored_chunk_in_one_call(self):
+        from app.rag.integration import RAGSystemManager
+        
+        manager = RAGSystemManager.__new__(RAGSystemManager)
+        manager.document_store = Mock()
+        manager.document_store.iter_all_chunks.return_value = iter(self._chunks("a", 2) + self._chunks("b", 1))
+        manager.rag_engine = Mock()
+        received = []
+        
+        async def index_document_chunks(chunks):
+            received.extend(chunks)
+            return True
+        
+        manager.rag_engine.index_document_chunks = Mock(side_effect=index_document_chunks)
+        asyncio.run(manager._load_existing_documents())
+        
+        manager.rag_engine.index_document_chunks.assert_called_once()
+        assert [chunk.chunk_id for chunk in received] == ["a_0", "a_1", "b_0"]
+
+
 class TestRAGIntegration:
     """Test RAG system integration"""
     
@@ -354,10 +525,11 @@ class TestRAGIntegration:
             mock_processor.process_document.return_value = mock_document
             
             mock_chunks = [Mock()]
-            mock_chunker.chunk_document.return_value = mock_chunks
+            mock_chunker.iter_chunks.return_value = iter(mock_chunks)
             
-            mock_store.store_document.return_value = True
+            mock_store.store_document_stream.return_value = iter(mock_chunks)
             mock_engine.index_document_chunks = AsyncMock(return_value=True)
+            mock_engine.document_chunks = {"doc1": ["chunk1"]}
             
             # Test processing
             bridge = RAGIntegrationBridge()
@@ -369,6 +541,8 @@ class TestRAGIntegration:
             
             assert result['success'] is True
             assert result['document_id'] == "doc1"
+            assert result['chunks_created'] == 1
+            mock_store.update_document_status.assert_called_once_with("doc1", "completed")
     
     @pytest.mark.asyncio
     async def test_rag_bridge_retrieval(self):
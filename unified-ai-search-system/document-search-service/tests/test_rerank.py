@@ -0,0 +1,56 @@
+"""Tests for cross-encoder reranking under a latency budget."""
+
+import time
+
+import numpy as np
+
+from app.search.rerank import CrossEncoderReranker
+
+
+class LengthScorer:
+    """Scores a pair by document length; records the batches it saw."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches = []
+
+    def predict(self, pairs, **kwargs):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay)
+        return np.array([len(text) for _, text in pairs], dtype=np.float32)
+
+
+def test_reranks_only_top_n_in_batches():
+    scorer = LengthScorer()
+    reranker = CrossEncoderReranker(top_n=5, batch_size=2, budget_ms=10_000, model=scorer)
+    candidates = ["a", "aaaa", "aa", "aaaaa", "aaa", "aaaaaaaaaa"]
+
+    reranked = reranker.rerank("query", candidates, text_of=lambda text: text)
+
+    assert [candidate for candidate, _ in reranked] == ["aaaaa", "aaaa", "aaa", "aa", "a", "aaaaaaaaaa"]
+    assert reranked[-1][1] is None
+    assert scorer.batches == [2, 2, 1]
+
+
+def test_stops_when_budget_runs_out():
+    scorer = LengthScorer(delay=0.03)
+    reranker = CrossEncoderReranker(top_n=8, batch_size=2, budget_ms=50, model=scorer)
+    candidates = ["b" * length for length in range(1, 9)]
+
+    reranked = reranker.rerank("query", candidates, text_of=lambda text: text)
+    scored = [score for _, score in reranked if score is not None]
+
+    # The first batch always runs; later ones only while another fits the budget
+    assert 2 <= len(scored) < 8
+    assert reranker.stats['budget_exhausted'] == 1
+    # Unscored candidates keep their original order behind the scored ones
+    unscored = [candidate for candidate, score in reranked if score is None]
+    assert unscored == candidates[len(scored):]
+
+
+def test_unavailable_model_passes_candidates_through():
+    reranker = CrossEncoderReranker(backend="onnx", onnx_path=None)
+    reranked = reranker.rerank("query", ["x", "y"], text_of=lambda text: text)
+
+    assert reranked == [("x", None), ("y", None)]
+    assert not reranker.available
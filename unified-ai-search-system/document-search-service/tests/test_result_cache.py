@@ -0,0 +1,48 @@
+"""Tests for the generation-aware search result cache."""
+
+import pytest
+
+from app.search.result_cache import SearchResultCache
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_keeps_recently_used_entries():
+    cache = SearchResultCache(max_size=2, ttl_seconds=60)
+    await cache.set("a", [1])
+    await cache.set("b", [2])
+    assert await cache.get("a") == [1]  # "a" becomes most recently used
+
+    await cache.set("c", [3])
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == [1]
+    assert await cache.get("c") == [3]
+    assert cache.get_stats()['evictions'] == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.search.result_cache.time.monotonic", lambda: now[0])
+    cache = SearchResultCache(max_size=10, ttl_seconds=5)
+    await cache.set("a", [1])
+
+    now[0] += 4
+    assert await cache.get("a") == [1]
+    now[0] += 2
+    assert await cache.get("a") is None
+    assert cache.get_stats()['expirations'] == 1
+
+
+@pytest.mark.asyncio
+async def test_keys_are_scoped_to_index_generation():
+    cache = SearchResultCache()
+    old_key = cache.make_key("0000000000000001", "python", 10, {"min_experience": 2})
+    new_key = cache.make_key("0000000000000002", "python", 10, {"min_experience": 2})
+    assert old_key != new_key
+    assert old_key == cache.make_key("0000000000000001", "python", 10, {"min_experience": 2})
+
+    await cache.set(old_key, ["stale"])
+    cache.invalidate()
+    assert await cache.get(old_key) is None
+    assert cache.get_stats()['size'] == 0
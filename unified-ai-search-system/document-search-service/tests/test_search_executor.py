@@ -0,0 +1,81 @@
+"""Tests for the concurrency-limited search executor."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.error_handling.exceptions import AdmissionRejectedException
+from app.monitoring.metrics import metrics
+from app.search.executor import SearchExecutor
+
+
+@pytest.mark.asyncio
+async def test_work_runs_off_the_event_loop():
+    executor = SearchExecutor(max_concurrency=2)
+    loop_thread = threading.get_ident()
+
+    worker_thread = await executor.run(threading.get_ident)
+
+    assert worker_thread != loop_thread
+    assert executor.get_stats()['completed'] == 1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_429():
+    executor = SearchExecutor(max_concurrency=1, max_queue_size=1, target_queue_ms=10_000)
+    release = threading.Event()
+
+    running = asyncio.ensure_future(executor.run(release.wait))
+    await asyncio.sleep(0.05)
+    queued = asyncio.ensure_future(executor.run(lambda: "queued"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejectedException) as exc_info:
+        await executor.run(lambda: "rejected")
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.retry_after >= 1
+
+    release.set()
+    assert await queued == "queued"
+    await running
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_projected_wait_over_target_is_rejected_with_503():
+    executor = SearchExecutor(max_concurrency=1, max_queue_size=10, target_queue_ms=50)
+    # Establish a service time well above the queueing target
+    await executor.run(time.sleep, 0.1)
+
+    release = threading.Event()
+    running = asyncio.ensure_future(executor.run(release.wait))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(AdmissionRejectedException) as exc_info:
+        await executor.run(lambda: None)
+
+    assert exc_info.value.status_code == 503
+    assert executor.get_stats()['rejected_overloaded'] == 1
+
+    release.set()
+    await running
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queue_and_service_time_are_reported_separately():
+    executor = SearchExecutor(max_concurrency=1)
+    queue_before = metrics.get_histogram_stats('search_queue_time_ms').get('count', 0)
+    service_before = metrics.get_histogram_stats('search_service_time_ms').get('count', 0)
+
+    await executor.run(time.sleep, 0.02)
+
+    assert metrics.get_histogram_stats('search_queue_time_ms')['count'] == queue_before + 1
+    service_stats = metrics.get_histogram_stats('search_service_time_ms')
+    assert service_stats['count'] == service_before + 1
+    assert service_stats['max'] >= 20
+    executor.shutdown()
@@ -0,0 +1,68 @@
+"""Tests for the type-ahead suggestion index."""
+
+import time
+
+from app.search.suggestions import SuggestionIndex
+
+
+def _metadata(name, title, skills):
+    return {'name': name, 'title': title, 'skills': skills, 'experience_years': 5, 'seniority_level': 'mid'}
+
+
+def _corpus():
+    return {
+        'd1': _metadata('Alice Johnson', 'Senior Machine Learning Engineer', ['Python', 'PyTorch', 'AWS']),
+        'd2': _metadata('Bob Smith', 'Backend Engineer', ['Python', 'PostgreSQL']),
+        'd3': _metadata('Carol Perez', 'Data Engineer', ['Python', 'Pandas', 'AWS']),
+    }
+
+
+def test_prefix_matches_are_ranked_by_frequency():
+    index = SuggestionIndex.from_metadata(_corpus())
+
+    suggestions = index.suggest('p', kinds=['skill'])
+
+    assert suggestions[0] == {'text': 'Python', 'kind': 'skill', 'count': 3}
+    assert {s['text'] for s in suggestions} == {'Python', 'PyTorch', 'PostgreSQL', 'Pandas'}
+
+
+def test_word_starts_inside_titles_match():
+    index = SuggestionIndex.from_metadata(_corpus())
+
+    titles = [s['text'] for s in index.suggest('learn', kinds=['title'])]
+    assert titles == ['Senior Machine Learning Engineer']
+    assert index.suggest('eng', kinds=['title'])[0]['count'] == 1
+    assert [s['text'] for s in index.suggest('ali')] == ['Alice Johnson']
+
+
+def test_incremental_changes_match_a_full_rebuild():
+    old = _corpus()
+    new = dict(old)
+    del new['d2']
+    new['d3'] = _metadata('Carol Perez', 'Data Engineer', ['Rust'])
+    new['d4'] = _metadata('Dan Lee', 'Platform Engineer', ['Python', 'Kubernetes'])
+
+    index = SuggestionIndex.from_metadata(old)
+    assert index.suggest('postg')  # warm the prefix cache
+    index.apply_changes(old, new, ['d2', 'd3', 'd4'])
+    rebuilt = SuggestionIndex.from_metadata(new)
+
+    for prefix in ('p', 'postg', 'ru', 'k', 'eng', 'd'):
+        assert index.suggest(prefix) == rebuilt.suggest(prefix)
+    assert index.suggest('postg') == []
+    assert index.get_stats() == rebuilt.get_stats()
+
+
+def test_lookup_is_sub_millisecond():
+    corpus = {
+        f'd{i}': _metadata(f'Person {i}', f'Engineer level {i % 7}', [f'skill{i % 500}', 'Python'])
+        for i in range(5000)
+    }
+    index = SuggestionIndex.from_metadata(corpus)
+
+    start = time.perf_counter()
+    for i in range(200):
+        index.suggest(f'skill{i}', limit=10)
+    per_lookup_ms = (time.perf_counter() - start) * 1000 / 200
+
+    assert per_lookup_ms < 1.0